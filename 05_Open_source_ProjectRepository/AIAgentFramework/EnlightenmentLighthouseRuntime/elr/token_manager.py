@@ -8,55 +8,428 @@ import json
 import time
 import os
 import hashlib
+import heapq
+import hmac
+import secrets
+import threading
 import uuid
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def hash_secret(secret):
+    """计算令牌密钥的存储哈希（文件中只保存哈希，不保存明文）"""
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()
+
+
+class FileLock:
+    """
+    跨进程文件锁
+    同一实例可重入；实例本身不是线程安全的，调用方需在线程锁内使用
+    """
+
+    def __init__(self, path):
+        """初始化文件锁"""
+        self.path = path
+        self._file = None
+        self._depth = 0
+
+    def __enter__(self):
+        if self._depth == 0:
+            self._file = open(self.path, 'a+b')
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK 重试约 10 秒后放弃，继续等待
+                        continue
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+                else:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                self._file.close()
+                self._file = None
+        return False
+
 
 class TokenManager:
     """令牌管理器"""
     
-    def __init__(self, token_file="elr_token.json"):
-        """初始化令牌管理器"""
+    def __init__(self, token_file="elr_token.json", cache_ttl=30.0, cache_size=1024,
+                 compact_threshold=1000, purge_after=24 * 3600, sync_writes=False):
+        """
+        初始化令牌管理器
+        
+        令牌文件是某一时刻的快照，之后的变更逐条追加到事件日志（token_file + ".log"），
+        日志条数达到 max(compact_threshold, 令牌数) 时压缩为新快照，使每次变更的均摊写入量与令牌数无关
+        
+        多个进程可共享同一令牌文件：写入在文件锁（token_file + ".lock"）内进行，写入前先读取其他进程追加的事件；
+        各进程通过 sync() 只读取日志的新增部分，其他进程压缩后替换了日志时才重新加载快照；
+        每次验证前先以一次 os.stat 检查日志是否变化，其他进程的撤销立即生效
+        
+        cache_ttl: 已验证令牌缓存的有效期（秒），0 表示不缓存
+        cache_size: 已验证令牌缓存的最大条目数
+        compact_threshold: 触发压缩的最少日志条数
+        purge_after: 已撤销或已过期的令牌保留多久（秒）后清除
+        sync_writes: 每条日志写入后是否 fsync（防止掉电丢失，代价是每次变更一次磁盘同步）
+        """
         self.token_file = token_file
+        self.log_file = f"{token_file}.log"
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.compact_threshold = compact_threshold
+        self.purge_after = purge_after
+        self.sync_writes = sync_writes
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(f"{token_file}.lock")
+        # 令牌ID -> 令牌记录；缺少ID的旧记录原样保留在快照中
+        self._index = {}
+        self._extra = []
+        # (清除计时起点, 令牌ID) 的最小堆，过时的条目在弹出时跳过
+        self._expiry_heap = []
+        # 令牌ID -> (完整令牌, 缓存失效时间)，按最近使用排序
+        self._verified = OrderedDict()
+        # 事件日志：最后一条事件的序号、快照之后的事件数、已读取的字节数、文件标识、追加写入的文件句柄
+        self._log_seq = 0
+        self._log_entries = 0
+        self._log_offset = 0
+        self._log_identity = None
+        self._log_damaged = False
+        self._log = None
+        # 后台清理线程
+        self._sweeper = None
+        self._sweeper_stop = threading.Event()
         self.token_data = self.load_tokens()
+        # 迁移后的记录与损坏的日志末行都需要写入新快照
+        if self._migrate_plaintext_secrets() or self._log_damaged:
+            self.save_tokens()
+    
+    def _migrate_plaintext_secrets(self):
+        """将旧版文件中的明文密钥替换为哈希，返回是否有记录被迁移"""
+        migrated = False
+        for t in self._index.values():
+            if "secret" in t:
+                t["secret_hash"] = hash_secret(t.pop("secret"))
+                migrated = True
+        return migrated
+    
+    @staticmethod
+    def _purge_from(t):
+        """令牌的清除计时起点：过期时间，已撤销时取撤销时间"""
+        start = t.get("expires_at", float("inf"))
+        if t.get("status") != "active":
+            start = min(start, t.get("revoked_at") or 0)
+        return start
+    
+    def _cache_put(self, token, token_id, expires_at):
+        """记录已验证的令牌，缓存失效时间不晚于令牌过期时间"""
+        if self.cache_ttl <= 0:
+            return
+        with self._lock:
+            # 在锁内复核状态，避免与并发的撤销交错后缓存已撤销的令牌
+            if self._index.get(token_id, {}).get("status") != "active":
+                return
+            self._verified[token_id] = (token, min(time.time() + self.cache_ttl, expires_at))
+            self._verified.move_to_end(token_id)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+    
+    def _cache_get(self, token, token_id):
+        """查询已验证令牌缓存，命中且未失效时返回 True"""
+        with self._lock:
+            entry = self._verified.get(token_id)
+            if entry is None or not hmac.compare_digest(entry[0], token):
+                return False
+            if time.time() >= entry[1]:
+                del self._verified[token_id]
+                return False
+            self._verified.move_to_end(token_id)
+            return True
     
     def load_tokens(self):
-        """从文件加载令牌数据"""
-        if os.path.exists(self.token_file):
-            try:
-                with open(self.token_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Error loading token file: {e}")
-        return {
-            "tokens": [],
-            "last_updated": time.time()
-        }
+        """从快照加载令牌数据，并重放快照之后的事件日志"""
+        with self._lock, self._file_lock:
+            data = None
+            if os.path.exists(self.token_file):
+                try:
+                    with open(self.token_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except Exception as e:
+                    print(f"Error loading token file: {e}")
+            if data is None:
+                data = {
+                    "tokens": [],
+                    "last_updated": time.time()
+                }
+            
+            self._index = {}
+            self._extra = []
+            for t in data["tokens"]:
+                if "id" in t:
+                    self._index[t["id"]] = t
+                else:
+                    self._extra.append(t)
+            self._verified.clear()
+            self._log_seq = data.get("log_seq", 0)
+            self._log_entries = 0
+            self._log_offset = 0
+            self._log_identity = None
+            self._close_log()
+            
+            # 确保日志存在，以便通过文件标识发现其他进程的压缩
+            if not os.path.exists(self.log_file):
+                open(self.log_file, 'ab').close()
+            self._read_log(locked=True)
+            self._expiry_heap = [(self._purge_from(t), token_id) for token_id, t in self._index.items()]
+            heapq.heapify(self._expiry_heap)
+            self.token_data = data
+            return data
     
-    def save_tokens(self):
-        """保存令牌数据到文件"""
+    def _read_log(self, locked=False):
+        """
+        应用事件日志中尚未读取的部分，返回应用的事件数
+        
+        locked: 调用方是否持有文件锁；持锁时不会有写入中的末行，不完整的末行即为崩溃残留
+        """
         try:
-            self.token_data["last_updated"] = time.time()
-            with open(self.token_file, 'w', encoding='utf-8') as f:
-                json.dump(self.token_data, f, indent=2, ensure_ascii=False)
+            stat = os.stat(self.log_file)
+        except FileNotFoundError:
+            return 0
+        identity = (stat.st_dev, stat.st_ino)
+        if self._log_identity is not None and (identity != self._log_identity or stat.st_size < self._log_offset):
+            # 其他进程压缩后替换了日志：重新加载新快照
+            self.load_tokens()
+            return 0
+        self._log_identity = identity
+        if stat.st_size == self._log_offset:
+            return 0
+        
+        applied = 0
+        try:
+            with open(self.log_file, 'rb') as f:
+                f.seek(self._log_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # 未持锁时可能是其他进程正在写入的行，留待下次读取
+                        self._log_damaged = self._log_damaged or locked
+                        break
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        self._log_damaged = True
+                        break
+                    self._log_offset += len(line)
+                    self._log_entries += 1
+                    if event.get("seq", 0) <= self._log_seq:
+                        continue
+                    self._apply_event(event)
+                    self._log_seq = event["seq"]
+                    applied += 1
+        except OSError as e:
+            print(f"Error loading token log: {e}")
+        return applied
+    
+    def _apply_event(self, event):
+        """将一条事件应用到令牌索引"""
+        op = event["op"]
+        if op == "add":
+            t = event["token"]
+            self._index[t["id"]] = t
+            heapq.heappush(self._expiry_heap, (self._purge_from(t), t["id"]))
+        elif op == "status":
+            t = self._index.get(event["id"])
+            if t is not None:
+                t["status"] = event["status"]
+                t["revoked_at"] = event.get("revoked_at")
+                heapq.heappush(self._expiry_heap, (self._purge_from(t), t["id"]))
+            self._verified.pop(event["id"], None)
+        elif op == "remove":
+            for token_id in event["ids"]:
+                self._index.pop(token_id, None)
+                self._verified.pop(token_id, None)
+    
+    def _append_event(self, op, **fields):
+        """
+        在文件锁内读取其他进程的变更后，追加一条事件并应用；日志条数达到阈值时压缩
+        
+        返回事件是否已写入日志；写入失败时内存状态不变
+        """
+        with self._lock, self._file_lock:
+            self._read_log(locked=True)
+            if self._log_damaged:
+                self.save_tokens()
+            event = dict(fields, op=op, seq=self._log_seq + 1)
+            line = (json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+            try:
+                if self._log is None:
+                    self._log = open(self.log_file, 'ab')
+                self._log.write(line)
+                self._log.flush()
+                if self.sync_writes:
+                    os.fsync(self._log.fileno())
+            except OSError as e:
+                print(f"Error writing token log: {e}")
+                # 可能留下了不完整的行，下次写入前先压缩为新快照
+                self._close_log()
+                self._log_damaged = True
+                return False
+            self._apply_event(event)
+            self._log_seq = event["seq"]
+            self._log_offset += len(line)
+            self._log_entries += 1
+            if self._log_entries >= max(self.compact_threshold, len(self._index)):
+                # 事件已持久化在日志中，压缩失败只推迟到下一次
+                self.save_tokens()
             return True
-        except Exception as e:
-            print(f"Error saving token file: {e}")
-            return False
+    
+    def _pop_purgeable(self, cutoff, limit=None):
+        """从过期堆弹出清除计时起点早于 cutoff 的令牌ID"""
+        token_ids = []
+        heap = self._expiry_heap
+        while heap and heap[0][0] < cutoff and (limit is None or len(token_ids) < limit):
+            _, token_id = heapq.heappop(heap)
+            t = self._index.get(token_id)
+            # 已清除或清除计时起点已变化的令牌留下的是过时条目
+            if t is not None and self._purge_from(t) < cutoff:
+                token_ids.append(token_id)
+        return token_ids
+    
+    def save_tokens(self):
+        """压缩：清除失效令牌，原子写入新快照并替换事件日志"""
+        with self._lock, self._file_lock:
+            try:
+                self._read_log(locked=True)
+                for token_id in self._pop_purgeable(time.time() - self.purge_after):
+                    self._index.pop(token_id, None)
+                    self._verified.pop(token_id, None)
+                self.token_data = {
+                    "tokens": self._extra + list(self._index.values()),
+                    "last_updated": time.time(),
+                    "log_seq": self._log_seq
+                }
+                # 先写临时文件再原子替换，崩溃时旧快照保持完整
+                temp_file = f"{self.token_file}.tmp"
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.token_data, f, ensure_ascii=False, separators=(",", ":"))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_file, self.token_file)
+                # 以新文件替换日志，其他进程据文件标识的变化重新加载快照；
+                # 若在替换前崩溃，重放时按序号跳过快照已包含的事件
+                self._close_log()
+                temp_log = f"{self.log_file}.tmp"
+                open(temp_log, 'wb').close()
+                os.replace(temp_log, self.log_file)
+                stat = os.stat(self.log_file)
+                self._log_identity = (stat.st_dev, stat.st_ino)
+                self._log_offset = 0
+                self._log_entries = 0
+                self._log_damaged = False
+                return True
+            except Exception as e:
+                print(f"Error saving token file: {e}")
+                return False
+    
+    def _close_log(self):
+        """关闭追加写入的日志句柄"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+    
+    def sync(self):
+        """读取其他进程追加的变更，返回应用的事件数"""
+        with self._lock:
+            return self._read_log()
+    
+    def sweep_expired(self, batch_size=1000):
+        """清除一批已撤销或已过期超过保留期的令牌，返回清除的数量"""
+        with self._lock:
+            token_ids = self._pop_purgeable(time.time() - self.purge_after, batch_size)
+            if token_ids and not self._append_event("remove", ids=token_ids):
+                # 写入失败：放回过期堆，留待下次清除
+                for token_id in token_ids:
+                    t = self._index.get(token_id)
+                    if t is not None:
+                        heapq.heappush(self._expiry_heap, (self._purge_from(t), token_id))
+                return 0
+            return len(token_ids)
+    
+    def start_sweeper(self, interval=60.0, batch_size=1000, sync_interval=1.0):
+        """
+        启动后台线程：每 sync_interval 秒读取其他进程的变更，每 interval 秒分批清除失效令牌
+        
+        验证本身不依赖此线程；它使 list_tokens 等读取及时反映其他进程的变更
+        """
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper_stop.clear()
+            self._sweeper = threading.Thread(target=self._sweep_loop, args=(interval, batch_size, sync_interval),
+                                             daemon=True)
+            self._sweeper.start()
+    
+    def _sweep_loop(self, interval, batch_size, sync_interval):
+        """后台清理循环"""
+        next_sweep = time.time() + interval
+        while not self._sweeper_stop.wait(sync_interval):
+            try:
+                self.sync()
+                if time.time() >= next_sweep:
+                    # 每批之间释放锁，避免长时间阻塞验证
+                    while self.sweep_expired(batch_size) == batch_size and not self._sweeper_stop.is_set():
+                        pass
+                    next_sweep = time.time() + interval
+            except Exception as e:
+                print(f"Error sweeping tokens: {e}")
+    
+    def stop_sweeper(self):
+        """停止后台线程"""
+        thread = self._sweeper
+        if thread is not None:
+            self._sweeper_stop.set()
+            thread.join(timeout=5)
+            self._sweeper = None
+    
+    def close(self):
+        """停止后台线程并关闭事件日志"""
+        self.stop_sweeper()
+        with self._lock:
+            self._close_log()
     
     def generate_token(self, description="ELR Container Token"):
-        """生成新令牌"""
+        """生成新令牌，无法写入日志时返回 None"""
         token_id = str(uuid.uuid4())
-        token_secret = hashlib.sha256(str(uuid.uuid4()).encode()).hexdigest()
+        token_secret = secrets.token_hex(32)
         token = {
             "id": token_id,
-            "secret": token_secret,
+            "secret_hash": hash_secret(token_secret),
             "description": description,
             "created_at": time.time(),
             "expires_at": time.time() + (7 * 24 * 3600),  # 7天过期
             "status": "active"
         }
         
-        self.token_data["tokens"].append(token)
-        self.save_tokens()
+        if not self._append_event("add", token=token):
+            return None
         
         # 返回完整令牌（id + secret）
         return f"{token_id}.{token_secret}"
@@ -73,17 +446,23 @@ class TokenManager:
             
             token_id, token_secret = token_parts
             
-            for t in self.token_data["tokens"]:
-                if t["id"] == token_id and t["secret"] == token_secret:
-                    # 检查令牌是否过期
-                    if time.time() > t["expires_at"]:
-                        return False, "Token has expired"
-                    # 检查令牌状态
-                    if t["status"] != "active":
-                        return False, "Token is not active"
-                    return True, "Token is valid"
+            # 先应用其他进程的变更（日志未变化时只是一次 os.stat），使其撤销在缓存与索引上立即生效
+            self.sync()
+            if self._cache_get(token, token_id):
+                return True, "Token is valid"
             
-            return False, "Token not found"
+            t = self._index.get(token_id)
+            # 对密钥哈希做常量时间比较，避免通过响应时间推测密钥
+            if t is None or not hmac.compare_digest(hash_secret(token_secret), t.get("secret_hash", "")):
+                return False, "Token not found"
+            # 检查令牌是否过期
+            if time.time() > t["expires_at"]:
+                return False, "Token has expired"
+            # 检查令牌状态
+            if t["status"] != "active":
+                return False, "Token is not active"
+            self._cache_put(token, token_id, t["expires_at"])
+            return True, "Token is valid"
         except Exception as e:
             return False, f"Error validating token: {e}"
     
@@ -98,38 +477,40 @@ class TokenManager:
         token_parts = old_token.split('.')
         token_id = token_parts[0]
         
-        for i, t in enumerate(self.token_data["tokens"]):
-            if t["id"] == token_id:
-                self.token_data["tokens"][i]["status"] = "revoked"
-                break
+        if not self._append_event("status", id=token_id, status="revoked", revoked_at=time.time()):
+            return None, "Failed to persist token revocation"
         
         # 生成新令牌
         new_token = self.generate_token(description)
+        if new_token is None:
+            return None, "Failed to persist new token"
         return new_token, "Token refreshed successfully"
     
     def list_tokens(self):
         """列出所有令牌"""
-        tokens = []
-        for t in self.token_data["tokens"]:
-            token_info = {
+        now = time.time()
+        with self._lock:
+            records = list(self._index.values())
+        return [
+            {
                 "id": t["id"],
                 "description": t["description"],
                 "created_at": t["created_at"],
                 "expires_at": t["expires_at"],
                 "status": t["status"],
-                "expired": time.time() > t["expires_at"]
+                "expired": now > t["expires_at"]
             }
-            tokens.append(token_info)
-        return tokens
+            for t in records
+        ]
     
     def revoke_token(self, token_id):
         """撤销令牌"""
-        for i, t in enumerate(self.token_data["tokens"]):
-            if t["id"] == token_id:
-                self.token_data["tokens"][i]["status"] = "revoked"
-                self.save_tokens()
-                return True, "Token revoked successfully"
-        return False, "Token not found"
+        with self._lock:
+            if token_id not in self._index:
+                return False, "Token not found"
+            if not self._append_event("status", id=token_id, status="revoked", revoked_at=time.time()):
+                return False, "Failed to persist token revocation"
+        return True, "Token revoked successfully"
 
 if __name__ == "__main__":
     # 测试令牌管理器
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+动态微批处理
+功能：在微模型前汇集并发的 predict 请求，凑满 N 条或等待 T 毫秒后整批推理；
+      模型提供 predict_batch 时整批调用，否则逐条回退到 predict，并统计批大小与排队延迟分布
+无外部依赖
+"""
+
+import bisect
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class Histogram:
+    """固定分桶直方图（单线程写入，读取时无需加锁）"""
+
+    def __init__(self, buckets):
+        """
+        初始化直方图
+        参数:
+            buckets: 递增的桶上界
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """记录一个观测值"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        """
+        导出累计分桶
+        返回:
+            {"buckets": {上界: 累计次数}, "count", "sum", "mean"}
+        """
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {
+            "buckets": cumulative,
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0
+        }
+
+
+class DynamicBatcher:
+    """
+    动态批处理器
+    收集线程取到第一条请求后继续等待，直到凑满 max_batch_size 条或距第一条入队已过 max_delay_ms，
+    然后把整批交给执行器；多个批次可在执行器中并发推理
+    """
+
+    _CLOSE = object()
+
+    def __init__(self, pool, executor, max_batch_size=16, max_delay_ms=2.0):
+        """
+        初始化批处理器
+        参数:
+            pool: 模型实例池（提供 checkout()）
+            executor: 执行整批推理的线程池
+            max_batch_size: 每批最多条数
+            max_delay_ms: 第一条请求最多等待凑批的时间（毫秒）
+        """
+        self.pool = pool
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000.0
+        self.batch_sizes = Histogram((1, 2, 4, 8, 16, 32, 64, 128))
+        self.queue_delay_ms = Histogram((0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100))
+        self.batches = 0
+        self.fallback_batches = 0
+        self._fallback_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._collector = threading.Thread(target=self._collect, daemon=True,
+                                           name=f"batcher-{pool.name}")
+        self._collector.start()
+
+    def submit(self, input_text):
+        """
+        提交一条推理请求
+        参数:
+            input_text: 输入文本
+        返回:
+            Future，结果为模型输出
+        """
+        future = Future()
+        self._queue.put((input_text, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        """收集循环：按条数或等待时间切分批次"""
+        while True:
+            item = self._queue.get()
+            if item is self._CLOSE:
+                return
+            batch = [item]
+            deadline = item[2] + self.max_delay
+            closing = False
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._CLOSE:
+                    closing = True
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+            if closing:
+                return
+
+    def _dispatch(self, batch):
+        """记录批次统计并交给执行器"""
+        now = time.perf_counter()
+        self.batches += 1
+        self.batch_sizes.observe(len(batch))
+        for _, _, enqueued_at in batch:
+            self.queue_delay_ms.observe((now - enqueued_at) * 1000)
+        self.executor.submit(self._run, batch)
+
+    def _run(self, batch):
+        """整批推理；模型不支持 predict_batch 或整批失败时逐条调用，单条失败只影响该条"""
+        texts = [text for text, _, _ in batch]
+        with self.pool.checkout() as instance:
+            if hasattr(instance, "predict_batch"):
+                try:
+                    outputs = instance.predict_batch(texts)
+                    if len(outputs) == len(batch):
+                        for (_, future, _), output in zip(batch, outputs):
+                            future.set_result(output)
+                        return
+                except Exception:
+                    pass
+            with self._fallback_lock:
+                self.fallback_batches += 1
+            for text, future, _ in batch:
+                try:
+                    future.set_result(instance.predict(text))
+                except Exception as e:
+                    future.set_exception(e)
+
+    def get_stats(self):
+        """
+        获取批处理统计
+        返回:
+            统计字典
+        """
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_delay_ms": self.max_delay * 1000,
+            "batches": self.batches,
+            "fallback_batches": self.fallback_batches,
+            "batch_size": self.batch_sizes.to_dict(),
+            "queue_delay_ms": self.queue_delay_ms.to_dict()
+        }
+
+    def close(self):
+        """处理完已提交的请求后停止收集线程"""
+        self._queue.put(self._CLOSE)
+        self._collector.join()
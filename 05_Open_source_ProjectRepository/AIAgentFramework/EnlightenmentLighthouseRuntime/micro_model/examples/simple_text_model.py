@@ -29,6 +29,16 @@ class SimpleTextModel:
         response = self._generate_response(input_text)
         return response
     
+    def predict_batch(self, input_texts):
+        """
+        批量推理方法
+        参数:
+            input_texts: 输入文本列表
+        返回:
+            响应文本列表，顺序与输入一致
+        """
+        return [self._generate_response(input_text) for input_text in input_texts]
+    
     def _generate_response(self, input_text):
         """
         生成响应文本
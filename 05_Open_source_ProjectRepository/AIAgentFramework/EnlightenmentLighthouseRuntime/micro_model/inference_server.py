@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+微模型推理服务
+功能：常驻进程中为每个微模型预热一组实例，经动态批处理与工作线程池分发 predict 调用，
+      通过 HTTP 提供 /predict 与 /predict_batch，省去每次请求的进程启动与导入开销；
+      /stats 返回各模型的批大小与排队延迟分布
+无外部依赖
+
+用法:
+    python inference_server.py --port 8090 --pool-size 4 --workers 8
+    python inference_server.py --max-batch-size 1  # 关闭批处理
+    curl -X POST localhost:8090/predict -d '{"model": "simple_text_model", "input": "你好"}'
+"""
+
+import argparse
+import contextlib
+import http.server
+import importlib.util
+import io
+import json
+import os
+import queue
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from batcher import DynamicBatcher
+
+PORT = 8090
+
+# 模型名 -> (相对本目录的源文件, 属性名)；属性为类时实例化后调用 predict，为函数时直接调用
+MODEL_SPECS = {
+    "simple_text_model": ("examples/simple_text_model.py", "SimpleTextModel"),
+    "elr_chat_model": ("model/models/elr_chat_model/elr_chat_model.py", "ELRChatModel"),
+    "el_cscc_archive": ("model/models/el_cscc_archive/el_cscc_archive_model.py", "ELCSCCArchiveModel"),
+    "poetry_model": ("../models/poetry_model.py", "generate_poetry"),
+    "novel_model": ("../models/novel_model.py", "generate_novel"),
+    "script_model": ("../models/script_model.py", "generate_script"),
+    "literature_model": ("../models/literature_model.py", "generate_literature"),
+    "marketing_model": ("../models/marketing_model.py", "analyze_marketing"),
+    "finance_model": ("../models/finance_model.py", "analyze_finance"),
+    "hr_model": ("../models/hr_model.py", "optimize_hr"),
+    "operations_model": ("../models/operations_model.py", "optimize_operations"),
+}
+
+
+class FunctionModel:
+    """把单函数脚本（原先经 sys.argv 一次性调用）包装为带 predict 方法的模型"""
+
+    def __init__(self, function):
+        self.function = function
+
+    def predict(self, input_text):
+        return self.function(input_text)
+
+
+def load_factory(name, path, attribute):
+    """
+    导入模型源文件，返回创建模型实例的工厂函数
+    参数:
+        name: 模型名
+        path: 相对本目录的源文件路径
+        attribute: 模型类名或函数名
+    返回:
+        无参工厂函数
+    """
+    full_path = os.path.normpath(os.path.join(BASE_DIR, path))
+    spec = importlib.util.spec_from_file_location(f"micro_model_{name}", full_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    target = getattr(module, attribute)
+    if isinstance(target, type):
+        return target
+    return lambda: FunctionModel(target)
+
+
+class ModelPool:
+    """
+    模型实例池
+    实例在启动时全部创建（预热）；每次调用独占一个实例，有状态的模型（如对话上下文）不会被并发请求交错
+    """
+
+    def __init__(self, name, factory, size):
+        """
+        初始化模型实例池
+        参数:
+            name: 模型名
+            factory: 无参工厂函数
+            size: 实例数
+        """
+        self.name = name
+        self.size = size
+        self._instances = queue.Queue()
+        # 模型构造时会打印加载信息，预热期间不输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(size):
+                self._instances.put(factory())
+
+    @contextlib.contextmanager
+    def checkout(self):
+        """借出一个实例，用完归还"""
+        instance = self._instances.get()
+        try:
+            yield instance
+        finally:
+            self._instances.put(instance)
+
+    def predict(self, input_text):
+        """
+        单条推理
+        参数:
+            input_text: 输入文本
+        返回:
+            模型输出
+        """
+        with self.checkout() as instance:
+            return instance.predict(input_text)
+
+    def get_info(self):
+        """
+        获取模型信息
+        返回:
+            模型信息字典
+        """
+        with self.checkout() as instance:
+            info = instance.get_info() if hasattr(instance, "get_info") else {"model_name": self.name}
+        return dict(info, pool_size=self.size)
+
+
+class InferenceServer:
+    """微模型推理服务"""
+
+    def __init__(self, models=None, pool_size=4, workers=8, host="127.0.0.1", port=PORT, timeout=30.0,
+                 max_batch_size=16, max_delay_ms=2.0):
+        """
+        初始化推理服务：加载并预热模型，创建工作线程池与 HTTP 服务
+        参数:
+            models: 要加载的模型名列表（默认为 MODEL_SPECS 中的全部模型）
+            pool_size: 每个模型的预热实例数
+            workers: 推理工作线程数
+            host: 监听地址
+            port: 监听端口（0 表示由系统分配）
+            timeout: 单次推理的等待上限（秒）
+            max_batch_size: 动态批处理每批最多条数（1 表示不批处理，逐条分发）
+            max_delay_ms: 动态批处理等待凑批的最长时间（毫秒）
+        """
+        self.timeout = timeout
+        self.pools = {}
+        self.unavailable = {}
+        for name in models or list(MODEL_SPECS):
+            if name not in MODEL_SPECS:
+                self.unavailable[name] = "unknown model"
+                continue
+            try:
+                self.pools[name] = ModelPool(name, load_factory(name, *MODEL_SPECS[name]), pool_size)
+            except Exception as e:
+                # 源文件缺失或无法导入的模型不影响其他模型
+                self.unavailable[name] = f"{type(e).__name__}: {e}"
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="predict")
+        self.batchers = {}
+        if max_batch_size > 1:
+            self.batchers = {name: DynamicBatcher(pool, self.executor, max_batch_size, max_delay_ms)
+                             for name, pool in self.pools.items()}
+        self.httpd = http.server.ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._serving = False
+
+    @property
+    def address(self):
+        """实际监听的 (地址, 端口)"""
+        return self.httpd.server_address[:2]
+
+    def predict(self, model, input_text):
+        """
+        经动态批处理（或直接经工作线程池）执行单条推理
+        参数:
+            model: 模型名
+            input_text: 输入文本
+        返回:
+            模型输出
+        """
+        return self._submit(model, input_text).result(self.timeout)
+
+    def predict_batch(self, model, inputs):
+        """
+        逐条提交并行推理（启用批处理时与其他并发请求合批），输出顺序与输入一致
+        参数:
+            model: 模型名
+            inputs: 输入文本列表
+        返回:
+            模型输出列表
+        """
+        futures = [self._submit(model, text) for text in inputs]
+        return [future.result(self.timeout) for future in futures]
+
+    def _submit(self, model, input_text):
+        """提交单条推理：启用批处理时进入该模型的批处理队列，否则直接交给工作线程池"""
+        batcher = self.batchers.get(model)
+        if batcher is not None:
+            return batcher.submit(input_text)
+        return self.executor.submit(self.pools[model].predict, input_text)
+
+    def get_stats(self):
+        """
+        获取各模型的批处理统计
+        返回:
+            统计字典
+        """
+        return {
+            "status": "ok",
+            "batching": bool(self.batchers),
+            "models": {name: batcher.get_stats() for name, batcher in self.batchers.items()}
+        }
+
+    def list_models(self):
+        """
+        列出已加载与不可用的模型
+        返回:
+            模型列表字典
+        """
+        return {
+            "status": "ok",
+            "models": [pool.get_info() for pool in self.pools.values()],
+            "unavailable": self.unavailable
+        }
+
+    def _make_handler(self):
+        server = self
+
+        def health(data):
+            return 200, {"status": "ok", "models": sorted(server.pools)}
+
+        def models(data):
+            return 200, server.list_models()
+
+        def stats(data):
+            return 200, server.get_stats()
+
+        def predict(data):
+            model, error = server._resolve_model(data)
+            if error:
+                return error
+            if not isinstance(data.get("input"), str):
+                return 400, {"status": "error", "message": "'input' must be a string"}
+            return 200, {"status": "ok", "model": model, "output": server.predict(model, data["input"])}
+
+        def predict_batch(data):
+            model, error = server._resolve_model(data)
+            if error:
+                return error
+            inputs = data.get("inputs")
+            if not isinstance(inputs, list) or not all(isinstance(text, str) for text in inputs):
+                return 400, {"status": "error", "message": "'inputs' must be a list of strings"}
+            return 200, {"status": "ok", "model": model, "outputs": server.predict_batch(model, inputs)}
+
+        get_routes = {'/health': health, '/models': models, '/stats': stats}
+        post_routes = {'/predict': predict, '/predict_batch': predict_batch}
+
+        class InferenceHandler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def send_json(self, status, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def dispatch(self, routes, data):
+                route = routes.get(self.path)
+                if route is None:
+                    self.send_json(404, {"status": "error", "message": "Endpoint not found"})
+                    return
+                try:
+                    self.send_json(*route(data))
+                except Exception as e:
+                    self.send_json(500, {"status": "error", "message": f"{type(e).__name__}: {e}"})
+
+            def do_GET(self):
+                self.dispatch(get_routes, {})
+
+            def do_POST(self):
+                content_length = int(self.headers.get('Content-Length') or 0)
+                post_data = self.rfile.read(content_length)
+                try:
+                    data = json.loads(post_data or b"{}")
+                except ValueError:
+                    self.send_json(400, {"status": "error", "message": "Invalid JSON body"})
+                    return
+                if not isinstance(data, dict):
+                    self.send_json(400, {"status": "error", "message": "JSON body must be an object"})
+                    return
+                self.dispatch(post_routes, data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return InferenceHandler
+
+    def _resolve_model(self, data):
+        """校验请求中的模型名，返回 (模型名, 错误响应)"""
+        model = data.get("model")
+        if model in self.pools:
+            return model, None
+        if model in self.unavailable:
+            return model, (503, {"status": "error", "message": f"Model {model} is unavailable: {self.unavailable[model]}"})
+        return model, (404, {"status": "error", "message": f"Model {model} not found"})
+
+    def serve_forever(self):
+        """在当前线程中运行服务"""
+        self._serving = True
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        """停止服务并关闭工作线程池"""
+        # 未调用 serve_forever 时 httpd.shutdown() 会一直等待
+        if self._serving:
+            self.httpd.shutdown()
+        self.httpd.server_close()
+        for batcher in self.batchers.values():
+            batcher.close()
+        self.executor.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="微模型推理服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=PORT, help="监听端口")
+    parser.add_argument("--models", default=None, help="要加载的模型，逗号分隔（默认全部）")
+    parser.add_argument("--pool-size", type=int, default=4, help="每个模型的预热实例数")
+    parser.add_argument("--workers", type=int, default=8, help="推理工作线程数")
+    parser.add_argument("--max-batch-size", type=int, default=16, help="每批最多条数（1 表示不批处理）")
+    parser.add_argument("--max-delay-ms", type=float, default=2.0, help="等待凑批的最长时间（毫秒）")
+    args = parser.parse_args()
+
+    server = InferenceServer(
+        models=args.models.split(",") if args.models else None,
+        pool_size=args.pool_size,
+        workers=args.workers,
+        host=args.host,
+        port=args.port,
+        max_batch_size=args.max_batch_size,
+        max_delay_ms=args.max_delay_ms
+    )
+    host, port = server.address
+    print(f"微模型推理服务: http://{host}:{port}")
+    print(f"已加载模型: {', '.join(sorted(server.pools)) or '无'}")
+    for name, error in server.unavailable.items():
+        print(f"不可用模型: {name} ({error})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n服务已停止")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Load test for the mock ELR API server and the micro model inference server
+
+Runs concurrent clients against the server for a fixed duration and reports
+requests per second and latency percentiles.
+
+Usage:
+    python mock_server.py &
+    python load_test.py --port 8082 --concurrency 32 --duration 10
+    python load_test.py --spawn --no-keepalive
+    python inference_server.py &
+    python load_test.py --port 8090 --path /predict --body '{"model": "simple_text_model", "input": "hello"}'
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import GET_ROUTES, create_server
+
+
+def serve(host, port, ready):
+    """Run the mock server in a child process"""
+    with create_server(host, port) as httpd:
+        ready.set()
+        httpd.serve_forever()
+
+
+def client(host, port, paths, deadline, keepalive, results, body=None):
+    """
+    Issue requests until the deadline (POST when body is given); append (latencies, errors) to results
+
+    Only successful (200) responses contribute latencies, so errors never inflate req/s
+    """
+    latencies = []
+    errors = 0
+    connection = None
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = http.client.HTTPConnection(host, port, timeout=10)
+            headers = {} if keepalive else {"Connection": "close"}
+            if body is None:
+                connection.request("GET", path, headers=headers)
+            else:
+                headers["Content-Type"] = "application/json"
+                connection.request("POST", path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if not keepalive or response.will_close:
+                connection.close()
+                connection = None
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            if connection is not None:
+                connection.close()
+                connection = None
+            continue
+        # Error responses count as errors only, never as completed requests
+        if response.status != 200:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    if connection is not None:
+        connection.close()
+    results.append((latencies, errors))
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the mock ELR API server and the inference server")
+    parser.add_argument("--host", default="127.0.0.1", help="server host")
+    parser.add_argument("--port", type=int, default=8082, help="server port")
+    parser.add_argument("--concurrency", type=int, default=16, help="number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=5.0, help="test duration in seconds")
+    parser.add_argument("--path", action="append", default=None,
+                        help="request path (repeatable; default: every static GET route)")
+    parser.add_argument("--body", default=None, help="JSON body to POST to every path (default: GET)")
+    parser.add_argument("--no-keepalive", dest="keepalive", action="store_false",
+                        help="open a new connection for every request")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start the mock server in a child process on a free port")
+    args = parser.parse_args()
+
+    server = None
+    port = args.port
+    if args.spawn:
+        # Pick a free port, then hand it to the child process
+        with create_server(args.host, 0) as probe:
+            port = probe.server_address[1]
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(target=serve, args=(args.host, port, ready), daemon=True)
+        server.start()
+        ready.wait(10)
+
+    paths = args.path or list(GET_ROUTES)
+    results = []
+    deadline = time.perf_counter() + args.duration
+    body = args.body.encode("utf-8") if args.body is not None else None
+    threads = [threading.Thread(target=client, args=(args.host, port, paths, deadline, args.keepalive, results, body))
+               for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    if server is not None:
+        server.terminate()
+        server.join()
+
+    latencies = sorted(l for batch, _ in results for l in batch)
+    errors = sum(e for _, e in results)
+    print("=" * 60)
+    print(f"Load test: {args.host}:{port}, {args.concurrency} clients, "
+          f"keep-alive {'on' if args.keepalive else 'off'}")
+    print("=" * 60)
+    print(f"  requests:   {len(latencies)} ({errors} errors) in {elapsed:.2f}s")
+    print(f"  throughput: {len(latencies) / elapsed:.0f} req/s")
+    print(f"  latency:    p50 {percentile(latencies, 50) * 1000:.2f} ms, "
+          f"p95 {percentile(latencies, 95) * 1000:.2f} ms, p99 {percentile(latencies, 99) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
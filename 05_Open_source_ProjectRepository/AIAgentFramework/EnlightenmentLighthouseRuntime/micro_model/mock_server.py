@@ -1,117 +1,140 @@
 #!/usr/bin/env python3
 """
 Mock ELR API server for testing
+
+Serves each connection on its own thread with HTTP/1.1 keep-alive. Static GET
+responses are encoded once at import time and routes are looked up in tables.
 """
 
 import http.server
 import json
-import socketserver
 
 PORT = 8082
 
-class MockELRHandler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        # API endpoints
-        if self.path == '/api':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response = {
-                "status": "ok",
-                "message": "ELR API is running",
+
+def encode(payload):
+    """Encode a response payload once so it can be reused for every request"""
+    return json.dumps(payload).encode('utf-8')
+
+
+NOT_FOUND = encode({
+    "status": "error",
+    "message": "Endpoint not found"
+})
+
+# Static GET responses, pre-encoded
+GET_ROUTES = {
+    '/api': encode({
+        "status": "ok",
+        "message": "ELR API is running",
+        "version": "1.0.0",
+        "endpoints": [
+            "/api/models",
+            "/api/containers",
+            "/api/sandbox"
+        ]
+    }),
+    '/api/models': encode({
+        "status": "ok",
+        "models": [
+            {
+                "name": "fish-speech",
                 "version": "1.0.0",
-                "endpoints": [
-                    "/api/models",
-                    "/api/containers",
-                    "/api/sandbox"
-                ]
-            }
-            self.wfile.write(json.dumps(response).encode('utf-8'))
-        elif self.path == '/api/models':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response = {
-                "status": "ok",
-                "models": [
-                    {
-                        "name": "fish-speech",
-                        "version": "1.0.0",
-                        "status": "loaded",
-                        "path": "model/models/fish-speech"
-                    }
-                ]
+                "status": "loaded",
+                "path": "model/models/fish-speech"
             }
-            self.wfile.write(json.dumps(response).encode('utf-8'))
-        elif self.path == '/api/containers':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response = {
-                "status": "ok",
-                "containers": [
-                    {
-                        "id": "elr-1234567890",
-                        "name": "test-container",
-                        "status": "running"
-                    }
-                ]
+        ]
+    }),
+    '/api/containers': encode({
+        "status": "ok",
+        "containers": [
+            {
+                "id": "elr-1234567890",
+                "name": "test-container",
+                "status": "running"
             }
-            self.wfile.write(json.dumps(response).encode('utf-8'))
-        elif self.path == '/api/sandbox':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response = {
-                "status": "ok",
-                "sandbox": {
-                    "status": "running",
-                    "models": ["fish-speech"]
-                }
-            }
-            self.wfile.write(json.dumps(response).encode('utf-8'))
+        ]
+    }),
+    '/api/sandbox': encode({
+        "status": "ok",
+        "sandbox": {
+            "status": "running",
+            "models": ["fish-speech"]
+        }
+    }),
+}
+
+
+def load_model(data):
+    """POST /api/models/load"""
+    return 200, encode({
+        "status": "ok",
+        "message": f"Model {data.get('model')} loaded successfully"
+    })
+
+
+# POST handlers: handler(parsed JSON body) -> (status code, encoded body)
+POST_ROUTES = {
+    '/api/models/load': load_model,
+}
+
+
+class MockELRHandler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests; every response sets Content-Length
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY, Nagle's algorithm
+    # holds the body back until the client's delayed ACK (~40 ms) on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def send_body(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        body = GET_ROUTES.get(self.path)
+        if body is None:
+            self.send_body(404, NOT_FOUND)
         else:
-            self.send_response(404)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response = {
-                "status": "error",
-                "message": "Endpoint not found"
-            }
-            self.wfile.write(json.dumps(response).encode('utf-8'))
+            self.send_body(200, body)
 
     def do_POST(self):
-        # Handle POST requests
-        if self.path == '/api/models/load':
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data)
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response = {
-                "status": "ok",
-                "message": f"Model {data.get('model')} loaded successfully"
-            }
-            self.wfile.write(json.dumps(response).encode('utf-8'))
-        else:
-            self.send_response(404)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response = {
-                "status": "error",
-                "message": "Endpoint not found"
-            }
-            self.wfile.write(json.dumps(response).encode('utf-8'))
+        # Always consume the request body so the next request on the connection starts cleanly
+        content_length = int(self.headers.get('Content-Length') or 0)
+        post_data = self.rfile.read(content_length)
 
-def start_server():
+        handler = POST_ROUTES.get(self.path)
+        if handler is None:
+            self.send_body(404, NOT_FOUND)
+            return
+        try:
+            data = json.loads(post_data or b"{}")
+        except ValueError:
+            self.send_body(400, encode({"status": "error", "message": "Invalid JSON body"}))
+            return
+        self.send_body(*handler(data))
+
+    def log_message(self, format, *args):
+        # Per-request logging dominates the cost of serving static responses under load
+        pass
+
+
+def create_server(host="", port=PORT):
+    """Create the threaded mock ELR API server (port 0 picks a free port)"""
+    httpd = http.server.ThreadingHTTPServer((host, port), MockELRHandler)
+    httpd.daemon_threads = True
+    return httpd
+
+
+def start_server(host="", port=PORT):
     """Start the mock ELR API server"""
-    print(f"Starting mock ELR API server on port {PORT}...")
-    print(f"API endpoints available at: http://localhost:{PORT}/api")
+    print(f"Starting mock ELR API server on port {port}...")
+    print(f"API endpoints available at: http://localhost:{port}/api")
     print("Press Ctrl+C to stop the server")
-    
-    with socketserver.TCPServer(("", PORT), MockELRHandler) as httpd:
+
+    with create_server(host, port) as httpd:
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+ELR令牌管理基准测试
+在大量已签发令牌下比较线性扫描、哈希索引与已验证缓存三种验证方式的耗时，
+并测量不同令牌数下签发与撤销的单次写入开销
+
+用法:
+    python test/bench_token_manager.py --tokens 100000 --validations 20000 --churn 2000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "elr"))
+
+from token_manager import TokenManager
+
+
+def write_legacy_file(path, count, expired_ratio=0.0):
+    """写入旧版格式（明文密钥）的令牌文件，返回全部完整令牌；前 expired_ratio 比例的令牌已过期"""
+    now = time.time()
+    expired = int(count * expired_ratio)
+    tokens, records = [], []
+    for i in range(count):
+        token_id = str(uuid.uuid4())
+        secret = hashlib.sha256(str(uuid.uuid4()).encode()).hexdigest()
+        records.append({
+            "id": token_id,
+            "secret": secret,
+            "description": f"Bench Token {i}",
+            "created_at": now,
+            "expires_at": now - 60 if i < expired else now + 7 * 24 * 3600,
+            "status": "active"
+        })
+        tokens.append(f"{token_id}.{secret}")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"tokens": records, "last_updated": now}, f)
+    return tokens, records
+
+
+def linear_validate(records, token):
+    """旧版验证：逐条扫描并以 == 比较明文密钥"""
+    token_id, token_secret = token.split(".")
+    for t in records:
+        if t["id"] == token_id and t["secret"] == token_secret:
+            if time.time() > t["expires_at"]:
+                return False, "Token has expired"
+            if t["status"] != "active":
+                return False, "Token is not active"
+            return True, "Token is valid"
+    return False, "Token not found"
+
+
+def rewrite_seconds(path, records):
+    """旧版持久化：每次变更以 indent=2 重写整个文件"""
+    start = time.perf_counter()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"tokens": records, "last_updated": time.time()}, f, indent=2, ensure_ascii=False)
+    return time.perf_counter() - start
+
+
+def churn(directory, count, operations):
+    """在 count 个令牌上交替签发与撤销，返回 (事件日志均摊耗时, 整体重写耗时)，单位微秒"""
+    path = os.path.join(directory, f"churn_{count}.json")
+    _, records = write_legacy_file(path, count)
+    manager = TokenManager(token_file=path)
+    start = time.perf_counter()
+    for i in range(operations):
+        token = manager.generate_token(f"Churn {i}")
+        if i % 2:
+            manager.revoke_token(token.split(".")[0])
+    logged = (time.perf_counter() - start) / operations * 1e6
+    manager.close()
+    return logged, rewrite_seconds(os.path.join(directory, "rewrite.json"), records) * 1e6
+
+
+def sweep(directory, count, batch_size):
+    """在一半令牌已过期的文件上分批清除，返回 (总耗时秒, 批数, 单批最长耗时毫秒)"""
+    path = os.path.join(directory, f"sweep_{count}.json")
+    write_legacy_file(path, count, expired_ratio=0.5)
+    manager = TokenManager(token_file=path, compact_threshold=count)
+    # 加载时迁移明文密钥会触发压缩，加载后再取消保留期，使过期令牌留给后台清理
+    manager.purge_after = 0
+    batches, longest = 0, 0.0
+    start = time.perf_counter()
+    while True:
+        batch_start = time.perf_counter()
+        removed = manager.sweep_expired(batch_size)
+        longest = max(longest, time.perf_counter() - batch_start)
+        if not removed:
+            break
+        batches += 1
+    total = time.perf_counter() - start
+    assert len(manager.list_tokens()) == count - count // 2
+    manager.close()
+    return total, batches, longest * 1000
+
+
+def measure(validate, tokens):
+    """返回平均每次验证的耗时（微秒）"""
+    start = time.perf_counter()
+    for token in tokens:
+        assert validate(token)[0]
+    return (time.perf_counter() - start) / len(tokens) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ELR令牌管理基准测试")
+    parser.add_argument("--tokens", type=int, default=100000, help="已签发令牌数")
+    parser.add_argument("--validations", type=int, default=20000, help="验证次数")
+    parser.add_argument("--linear-validations", type=int, default=200, help="线性扫描的验证次数")
+    parser.add_argument("--hot", type=int, default=100, help="反复验证的活跃令牌数")
+    parser.add_argument("--churn", type=int, default=2000, help="每个规模下签发/撤销的次数")
+    parser.add_argument("--batch-size", type=int, default=1000, help="后台清理每批清除的令牌数")
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "elr_token.json")
+        tokens, records = write_legacy_file(path, args.tokens)
+
+        start = time.perf_counter()
+        manager = TokenManager(token_file=path)
+        load_seconds = time.perf_counter() - start
+        uncached = TokenManager(token_file=path, cache_ttl=0)
+
+        samples = [random.choice(tokens) for _ in range(args.validations)]
+        hot = random.sample(tokens, min(args.hot, len(tokens)))
+        hot_samples = [random.choice(hot) for _ in range(args.validations)]
+
+        print("=" * 60)
+        print(f"ELR令牌管理基准测试: {args.tokens} 个令牌")
+        print("=" * 60)
+        print(f"  加载并迁移明文密钥: {load_seconds:.2f}s")
+        linear = measure(lambda t: linear_validate(records, t), samples[:args.linear_validations])
+        indexed = measure(uncached.validate_token, samples)
+        cached = measure(manager.validate_token, hot_samples)
+        print(f"  线性扫描:   {linear:10.1f} µs/次")
+        print(f"  哈希索引:   {indexed:10.1f} µs/次  ({linear / indexed:.0f}x)")
+        print(f"  已验证缓存: {cached:10.1f} µs/次  ({linear / cached:.0f}x, {len(hot)} 个活跃令牌)")
+
+        print(f"  签发/撤销（{args.churn} 次，含压缩）:")
+        for count in sorted({args.tokens // 100, args.tokens // 10, args.tokens}):
+            logged, rewrite = churn(directory, count, args.churn)
+            print(f"    {count:>7} 个令牌: 事件日志 {logged:8.1f} µs/次, 整体重写 {rewrite:10.1f} µs/次")
+
+        total, batches, longest = sweep(directory, args.tokens, args.batch_size)
+        print(f"  清除 {args.tokens // 2} 个过期令牌: {total:.2f}s, {batches} 批, 单批最长 {longest:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
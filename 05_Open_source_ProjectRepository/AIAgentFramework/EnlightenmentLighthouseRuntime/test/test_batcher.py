@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+动态批处理测试
+
+用法:
+    python -m pytest test/test_batcher.py
+"""
+
+import json
+import os
+import sys
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "micro_model"))
+
+from batcher import DynamicBatcher
+from inference_server import InferenceServer, ModelPool
+
+
+class EchoModel:
+    """逐条推理的测试模型，输入 "bad" 时失败"""
+
+    def __init__(self):
+        self.batch_calls = []
+
+    def predict(self, input_text):
+        if input_text == "bad":
+            raise ValueError("bad input")
+        return input_text.upper()
+
+
+class BatchModel(EchoModel):
+    """整批推理的测试模型"""
+
+    def predict_batch(self, input_texts):
+        self.batch_calls.append(list(input_texts))
+        return [text.upper() for text in input_texts]
+
+
+class RaisingBatchModel(EchoModel):
+    """整批推理总是失败的测试模型"""
+
+    def predict_batch(self, input_texts):
+        raise RuntimeError("batch failed")
+
+
+class ShortBatchModel(EchoModel):
+    """整批推理返回条数不对的测试模型"""
+
+    def predict_batch(self, input_texts):
+        return [text.upper() for text in input_texts[1:]]
+
+
+def run_batch(model_cls, texts, max_batch_size=None):
+    """经批处理器提交全部输入（一批内完成），返回 (各条结果或异常, 统计, 模型实例)"""
+    model = model_cls()
+    pool = ModelPool("test", lambda: model, 1)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        batcher = DynamicBatcher(pool, executor, max_batch_size or len(texts), max_delay_ms=1000)
+        futures = [batcher.submit(text) for text in texts]
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result(5))
+            except Exception as e:
+                outcomes.append(e)
+        batcher.close()
+    return outcomes, batcher.get_stats(), model
+
+
+def test_batches_by_size():
+    """
+    测试凑满 max_batch_size 条即整批调用 predict_batch，并记录批大小与排队延迟
+    """
+    texts = [f"t{i}" for i in range(8)]
+    outcomes, stats, model = run_batch(BatchModel, texts, max_batch_size=4)
+    assert outcomes == [text.upper() for text in texts]
+    assert model.batch_calls == [texts[:4], texts[4:]]
+    assert stats["batches"] == 2 and stats["fallback_batches"] == 0
+    assert stats["batch_size"]["buckets"]["4"] == 2 and stats["batch_size"]["mean"] == 4
+    assert stats["queue_delay_ms"]["count"] == 8
+
+
+def test_fallback_isolates_bad_item():
+    """
+    测试 predict_batch 失败、返回条数不对或模型不支持时逐条回退，只有出错的一条失败
+    """
+    texts = ["a", "bad", "c"]
+    for model_cls in (RaisingBatchModel, ShortBatchModel, EchoModel):
+        outcomes, stats, _ = run_batch(model_cls, texts)
+        assert outcomes[0] == "A" and outcomes[2] == "C"
+        assert isinstance(outcomes[1], ValueError)
+        assert stats["batches"] == 1 and stats["fallback_batches"] == 1
+
+
+def test_delay_flushes_partial_batch():
+    """
+    测试未凑满时等待 max_delay_ms 后发出部分批次
+    """
+    pool = ModelPool("test", BatchModel, 1)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        batcher = DynamicBatcher(pool, executor, max_batch_size=16, max_delay_ms=5)
+        assert batcher.submit("x").result(5) == "X"
+        batcher.close()
+    assert batcher.get_stats()["batch_size"]["buckets"]["1"] == 1
+
+
+def test_server_stats_and_shutdown_without_serving():
+    """
+    测试服务的 /stats 统计，以及未调用 serve_forever 时 shutdown() 立即返回
+    """
+    server = InferenceServer(models=["simple_text_model"], pool_size=1, workers=2, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert server.predict_batch("simple_text_model", ["你好", "消息"])[1].endswith("消息。随时为您服务！")
+        host, port = server.address
+        with urllib.request.urlopen(f"http://{host}:{port}/stats", timeout=5) as response:
+            stats = json.loads(response.read())
+        assert stats["batching"]
+        assert stats["models"]["simple_text_model"]["queue_delay_ms"]["count"] == 2
+    finally:
+        server.shutdown()
+
+    idle = InferenceServer(models=["simple_text_model"], pool_size=1, workers=1, port=0, max_batch_size=1)
+    stopper = threading.Thread(target=idle.shutdown, daemon=True)
+    stopper.start()
+    stopper.join(5)
+    assert not stopper.is_alive()
+    assert idle.get_stats() == {"status": "ok", "batching": False, "models": {}}
+
+
+if __name__ == "__main__":
+    test_batches_by_size()
+    test_fallback_isolates_bad_item()
+    test_delay_flushes_partial_batch()
+    test_server_stats_and_shutdown_without_serving()
+    print("动态批处理测试通过！")
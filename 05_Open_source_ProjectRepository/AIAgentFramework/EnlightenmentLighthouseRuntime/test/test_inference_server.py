@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+微模型推理服务测试
+
+用法:
+    python -m pytest test/test_inference_server.py
+"""
+
+import contextlib
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "micro_model"))
+
+import inference_server
+from inference_server import InferenceServer
+
+
+@contextlib.contextmanager
+def running_server(**kwargs):
+    """
+    在后台线程中运行推理服务（系统分配端口），返回 HTTP 连接
+    另注册两个不可用的模型：源文件有语法错误的 broken_model 与源文件缺失的 absent_model
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        broken_path = os.path.join(tmp_dir, "broken_model.py")
+        with open(broken_path, "w", encoding="utf-8") as f:
+            f.write("def generate(:\n")
+        specs = {
+            "broken_model": (broken_path, "generate"),
+            "absent_model": (os.path.join(tmp_dir, "absent_model.py"), "generate"),
+        }
+        with mock.patch.dict(inference_server.MODEL_SPECS, specs):
+            server = InferenceServer(models=["simple_text_model", "elr_chat_model", "broken_model",
+                                             "absent_model", "missing_model"],
+                                     pool_size=2, workers=4, port=0, **kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        host, port = server.address
+        connection = http.client.HTTPConnection(host, port, timeout=10)
+        try:
+            yield server, connection
+        finally:
+            connection.close()
+            server.shutdown()
+
+
+def request(connection, method, path, body=None):
+    """发送请求，返回 (状态码, 解析后的 JSON)"""
+    if body is not None and not isinstance(body, bytes):
+        body = json.dumps(body).encode("utf-8")
+    connection.request(method, path, body=body)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_routing_and_errors():
+    """
+    测试路由与 400/404/503 错误响应
+    """
+    with running_server() as (server, connection):
+        status, health = request(connection, "GET", "/health")
+        assert status == 200 and health["models"] == ["elr_chat_model", "simple_text_model"]
+
+        status, models = request(connection, "GET", "/models")
+        assert status == 200
+        assert {m["pool_size"] for m in models["models"]} == {2}
+        assert models["unavailable"]["missing_model"] == "unknown model"
+        assert models["unavailable"]["broken_model"].startswith("SyntaxError")
+        assert models["unavailable"]["absent_model"].startswith("FileNotFoundError")
+
+        status, payload = request(connection, "POST", "/predict", {"model": "simple_text_model", "input": "你好"})
+        assert status == 200 and payload["model"] == "simple_text_model" and "问候" in payload["output"]
+
+        assert request(connection, "POST", "/predict", b"{not json") == (
+            400, {"status": "error", "message": "Invalid JSON body"})
+        assert request(connection, "POST", "/predict", b"[1, 2]") == (
+            400, {"status": "error", "message": "JSON body must be an object"})
+        assert request(connection, "POST", "/predict", {"model": "simple_text_model", "input": 1}) == (
+            400, {"status": "error", "message": "'input' must be a string"})
+        assert request(connection, "POST", "/predict_batch", {"model": "simple_text_model", "inputs": "x"}) == (
+            400, {"status": "error", "message": "'inputs' must be a list of strings"})
+
+        assert request(connection, "POST", "/predict", {"model": "nope", "input": "x"}) == (
+            404, {"status": "error", "message": "Model nope not found"})
+        assert request(connection, "GET", "/missing") == (
+            404, {"status": "error", "message": "Endpoint not found"})
+        for model in ("broken_model", "absent_model"):
+            status, payload = request(connection, "POST", "/predict", {"model": model, "input": "x"})
+            assert status == 503 and payload["message"].startswith(f"Model {model} is unavailable")
+
+
+def test_predict_batch_keeps_order():
+    """
+    测试 /predict_batch 的输出顺序与输入一致
+    """
+    inputs = [f"消息{i}" for i in range(20)]
+    with running_server() as (server, connection):
+        for model in ("simple_text_model", "elr_chat_model"):
+            status, payload = request(connection, "POST", "/predict_batch", {"model": model, "inputs": inputs})
+            assert status == 200 and len(payload["outputs"]) == len(inputs)
+            for text, output in zip(inputs, payload["outputs"]):
+                assert text in output
+        assert server.predict_batch("simple_text_model", []) == []
+
+
+if __name__ == "__main__":
+    test_routing_and_errors()
+    test_predict_batch_keeps_order()
+    print("推理服务测试通过！")
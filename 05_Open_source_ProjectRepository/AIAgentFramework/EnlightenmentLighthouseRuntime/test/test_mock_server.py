@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the mock ELR API server and the load test client
+
+Usage:
+    python -m pytest test/test_mock_server.py
+"""
+
+import contextlib
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "micro_model"))
+
+from load_test import client
+from mock_server import GET_ROUTES, create_server
+
+
+@contextlib.contextmanager
+def running_server():
+    """Serve the mock API on a free port in a background thread"""
+    httpd = create_server("127.0.0.1", 0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd.server_address[1]
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def request(connection, method, path, body=None):
+    """Send a request and return (status, parsed JSON body)"""
+    connection.request(method, path, body=body)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_routing():
+    """GET routes, POST handlers and error responses"""
+    with running_server() as port:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        try:
+            for path in GET_ROUTES:
+                status, payload = request(connection, "GET", path)
+                assert status == 200 and payload["status"] == "ok"
+            assert request(connection, "GET", "/missing") == (
+                404, {"status": "error", "message": "Endpoint not found"})
+
+            status, payload = request(connection, "POST", "/api/models/load", b'{"model": "fish-speech"}')
+            assert status == 200 and payload["message"] == "Model fish-speech loaded successfully"
+            assert request(connection, "POST", "/api/models/load", b"{not json") == (
+                400, {"status": "error", "message": "Invalid JSON body"})
+            assert request(connection, "POST", "/missing", b"{}")[0] == 404
+        finally:
+            connection.close()
+
+
+def test_keepalive_reuses_connection():
+    """Sequential requests, including error responses, share one TCP connection"""
+    with running_server() as port:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        try:
+            request(connection, "GET", "/api")
+            sock = connection.sock
+            assert sock is not None
+            for path in ("/api/models", "/missing", "/api/sandbox"):
+                request(connection, "GET", path)
+                assert connection.sock is sock
+            request(connection, "POST", "/api/models/load", b"{}")
+            assert connection.sock is sock
+        finally:
+            connection.close()
+
+
+def test_load_client_counts_only_successes():
+    """Error responses are counted as errors and never as completed requests"""
+    with running_server() as port:
+        results = []
+        client("127.0.0.1", port, ["/api", "/missing"], time.perf_counter() + 0.2, True, results)
+        latencies, errors = results[0]
+        assert latencies and errors
+        assert abs(len(latencies) - errors) <= 1
+
+
+if __name__ == "__main__":
+    test_routing()
+    test_keepalive_reuses_connection()
+    test_load_client_counts_only_successes()
+    print("Mock server tests passed")
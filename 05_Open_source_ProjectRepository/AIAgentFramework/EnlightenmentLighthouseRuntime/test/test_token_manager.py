@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+ELR令牌管理器测试
+
+用法:
+    python -m pytest test/test_token_manager.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "elr"))
+
+from token_manager import TokenManager, hash_secret
+
+
+class BrokenLog:
+    """写入总是失败的日志句柄，模拟磁盘写满"""
+
+    def write(self, data):
+        raise OSError("No space left on device")
+
+    def close(self):
+        pass
+
+
+def test_secrets_stored_as_hashes():
+    """
+    测试快照与日志中只保存密钥哈希
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "tokens.json")
+        tm = TokenManager(path)
+        try:
+            token = tm.generate_token()
+            secret = token.split(".")[1]
+            with open(path + ".log", encoding="utf-8") as f:
+                log = f.read()
+            assert secret not in log and hash_secret(secret) in log
+            tm.save_tokens()
+            with open(path, encoding="utf-8") as f:
+                record = json.load(f)["tokens"][0]
+            assert "secret" not in record and record["secret_hash"] == hash_secret(secret)
+            assert tm.validate_token(token) == (True, "Token is valid")
+            assert tm.validate_token(token.split(".")[0] + ".0") == (False, "Token not found")
+        finally:
+            tm.close()
+
+
+def test_plaintext_secrets_migrated():
+    """
+    测试旧版文件中的明文密钥在加载时迁移为哈希，旧令牌仍可验证
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "tokens.json")
+        now = time.time()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"tokens": [{
+                "id": "legacy", "secret": "s3cret", "description": "旧令牌",
+                "created_at": now, "expires_at": now + 3600, "status": "active"
+            }], "last_updated": now}, f)
+
+        tm = TokenManager(path)
+        try:
+            with open(path, encoding="utf-8") as f:
+                record = json.load(f)["tokens"][0]
+            assert "secret" not in record and record["secret_hash"] == hash_secret("s3cret")
+            assert tm.validate_token("legacy.s3cret") == (True, "Token is valid")
+        finally:
+            tm.close()
+
+
+def test_revoke_invalidates_cache():
+    """
+    测试撤销与刷新使已验证缓存中的令牌立即失效
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tm = TokenManager(os.path.join(tmp_dir, "tokens.json"))
+        try:
+            token = tm.generate_token()
+            assert tm.validate_token(token)[0]
+            assert token.split(".")[0] in tm._verified
+            tm.revoke_token(token.split(".")[0])
+            assert tm.validate_token(token) == (False, "Token is not active")
+
+            other = tm.generate_token()
+            assert tm.validate_token(other)[0]
+            new_token, _ = tm.refresh_token(other)
+            assert tm.validate_token(other) == (False, "Token is not active")
+            assert tm.validate_token(new_token) == (True, "Token is valid")
+        finally:
+            tm.close()
+
+
+def test_replay_skips_events_in_snapshot():
+    """
+    测试快照替换后、日志替换前崩溃：重放时按序号跳过快照已包含的事件，已清除的令牌不会复活
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "tokens.json")
+        tm = TokenManager(path, purge_after=0)
+        try:
+            revoked = tm.generate_token("revoked")
+            tm.generate_token("kept")
+            tm.revoke_token(revoked.split(".")[0])
+            with open(path + ".log", "rb") as f:
+                stale_log = f.read()
+            time.sleep(0.01)
+            tm.save_tokens()
+        finally:
+            tm.close()
+        # 模拟日志未被替换
+        with open(path + ".log", "wb") as f:
+            f.write(stale_log)
+
+        reloaded = TokenManager(path)
+        try:
+            assert [t["description"] for t in reloaded.list_tokens()] == ["kept"]
+            assert reloaded.validate_token(revoked) == (False, "Token not found")
+            token = reloaded.generate_token("new")
+            other = TokenManager(path)
+            assert other.validate_token(token) == (True, "Token is valid")
+            other.close()
+        finally:
+            reloaded.close()
+
+
+def test_torn_log_tail_recovered():
+    """
+    测试日志末行写入中断：加载时丢弃残行并写入新快照，之后的事件不会拼接到残行上
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "tokens.json")
+        tm = TokenManager(path)
+        first = tm.generate_token("first")
+        tm.close()
+        with open(path + ".log", "ab") as f:
+            f.write(b'{"op":"add","token":{"id"')
+
+        recovered = TokenManager(path)
+        try:
+            assert os.path.getsize(path + ".log") == 0
+            second = recovered.generate_token("second")
+        finally:
+            recovered.close()
+        reloaded = TokenManager(path)
+        try:
+            assert reloaded.validate_token(first)[0] and reloaded.validate_token(second)[0]
+        finally:
+            reloaded.close()
+
+
+def test_compaction():
+    """
+    测试日志达到阈值时压缩为快照，压缩时清除超过保留期的失效令牌
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "tokens.json")
+        tm = TokenManager(path, compact_threshold=4, purge_after=0)
+        try:
+            tokens = [tm.generate_token(f"t{i}") for i in range(10)]
+            with open(path + ".log", "rb") as f:
+                assert len(f.readlines()) < len(tokens)
+            with open(path, encoding="utf-8") as f:
+                assert json.load(f)["log_seq"] > 0
+
+            tm.revoke_token(tokens[0].split(".")[0])
+            time.sleep(0.01)
+            assert tm.save_tokens()
+            assert os.path.getsize(path + ".log") == 0
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            assert len(snapshot["tokens"]) == 9 and snapshot["log_seq"] == 11
+            reloaded = TokenManager(path)
+            assert sorted(t["description"] for t in reloaded.list_tokens()) == [f"t{i}" for i in range(1, 10)]
+            reloaded.close()
+        finally:
+            tm.close()
+
+
+def test_revoke_visible_to_other_instance():
+    """
+    测试两个实例共享令牌文件：一方签发的令牌另一方可验证，一方撤销后另一方（含已验证缓存）立即拒绝
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "tokens.json")
+        a, b = TokenManager(path), TokenManager(path)
+        try:
+            token = a.generate_token("shared")
+            assert b.validate_token(token) == (True, "Token is valid")
+            # 第二次验证命中 b 的已验证缓存
+            assert b.validate_token(token) == (True, "Token is valid")
+
+            assert a.revoke_token(token.split(".")[0])[0]
+            assert b.validate_token(token) == (False, "Token is not active")
+        finally:
+            a.close()
+            b.close()
+
+
+def test_failed_append_is_not_applied():
+    """
+    测试日志写入失败时不签发令牌、不改变内存状态，之后的写入恢复正常
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "tokens.json")
+        tm = TokenManager(path)
+        try:
+            kept = tm.generate_token("kept")
+            tm._log = BrokenLog()
+            assert tm.generate_token("lost") is None
+            assert [t["description"] for t in tm.list_tokens()] == ["kept"]
+
+            # 失败后下次写入先压缩为新快照，再重新打开日志
+            assert tm.generate_token("after") is not None
+            tm._log = BrokenLog()
+            assert tm.revoke_token(kept.split(".")[0]) == (False, "Failed to persist token revocation")
+            assert tm.validate_token(kept) == (True, "Token is valid")
+
+            reloaded = TokenManager(path)
+            assert sorted(t["description"] for t in reloaded.list_tokens()) == ["after", "kept"]
+            reloaded.close()
+        finally:
+            tm.close()
+
+
+def test_sweep_in_batches():
+    """
+    测试分批清除超过保留期的失效令牌，清除以日志事件记录，其他实例同步后一致
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "tokens.json")
+        tm = TokenManager(path, purge_after=0)
+        try:
+            tokens = [tm.generate_token(f"t{i}") for i in range(5)]
+            for token in tokens[:4]:
+                tm.revoke_token(token.split(".")[0])
+            time.sleep(0.01)
+
+            assert tm.sweep_expired(batch_size=3) == 3
+            assert tm.sweep_expired(batch_size=3) == 1
+            assert tm.sweep_expired(batch_size=3) == 0
+            assert [t["description"] for t in tm.list_tokens()] == ["t4"]
+
+            with open(path + ".log", "rb") as f:
+                events = [json.loads(line) for line in f]
+            assert [len(e["ids"]) for e in events if e["op"] == "remove"] == [3, 1]
+
+            other = TokenManager(path, purge_after=3600)
+            assert [t["description"] for t in other.list_tokens()] == ["t4"]
+            other.close()
+        finally:
+            tm.close()
+
+
+if __name__ == "__main__":
+    test_secrets_stored_as_hashes()
+    test_plaintext_secrets_migrated()
+    test_revoke_invalidates_cache()
+    test_replay_skips_events_in_snapshot()
+    test_torn_log_tail_recovered()
+    test_compaction()
+    test_revoke_visible_to_other_instance()
+    test_failed_append_is_not_applied()
+    test_sweep_in_batches()
+    print("令牌管理器测试通过！")
@@ -7,6 +7,7 @@ Meta-CreationPower 智能体嵌入包
 
 from .collaborator import AgentCollaborator
 from .embedding_api import EmbeddingAPI
+from .runtime import AgentContext, CollaborationRuntime, get_default_runtime
 from .utils import setup_logger, validate_config
 
 __version__ = "0.1.0"
@@ -16,6 +17,9 @@ __description__ = "Meta-CreationPower Agent Embedding Package"
 __all__ = [
     "AgentCollaborator",
     "EmbeddingAPI",
+    "AgentContext",
+    "CollaborationRuntime",
+    "get_default_runtime",
     "setup_logger",
     "validate_config"
 ]
@@ -6,13 +6,8 @@
 """
 
 import time
-from src.layers.voice_recognition.voice_recognition import CollaborativeSonicMap
-from src.layers.meta_protocol.meta_protocol import MetaProtocolManager
-from src.layers.counterpoint_design.counterpoint_design import CounterpointDesigner
-from src.layers.steady_execution.steady_execution import SteadyExecutor
-from src.layers.consensus_crystal.consensus_crystal import CrystalRepository
-from src.mechanisms.counterpoint_validation import CounterpointValidator
-from src.mechanisms.entropy_evolution import EntropyEvolutionManager
+from src.utils.tracing import Tracer, get_tracer
+from .runtime import get_default_runtime
 
 
 class AgentCollaborator:
@@ -21,7 +16,8 @@ class AgentCollaborator:
     实现智能体与碳基伙伴的协同创作
     """
     
-    def __init__(self, agent_name, agent_description="", capabilities=None, intentions=None):
+    def __init__(self, agent_name, agent_description="", capabilities=None, intentions=None, runtime=None,
+                 trace=None):
         """
         初始化智能体协同器
         
@@ -30,15 +26,20 @@ class AgentCollaborator:
             agent_description: 智能体描述
             capabilities: 智能体能力向量（可选）
             intentions: 智能体意图向量（可选）
+            runtime: 协同运行时（可选，默认挂载到进程级共享运行时）
+            trace: 调用追踪配置（可选）：None 使用进程级追踪器（由环境变量 META_CREATION_TRACE 启用），
+                   True/False 使用独立追踪器并启用/禁用，也可直接传入 Tracer 实例
         """
-        # 初始化核心模块
-        self.sonic_map = CollaborativeSonicMap()
-        self.protocol_manager = MetaProtocolManager()
-        self.designer = CounterpointDesigner()
-        self.executor = SteadyExecutor()
-        self.crystal_repo = CrystalRepository()
-        self.validator = CounterpointValidator()
-        self.entropy_manager = EntropyEvolutionManager()
+        if isinstance(trace, Tracer):
+            self.tracer = trace
+        elif trace is None:
+            self.tracer = get_tracer()
+        else:
+            self.tracer = Tracer(enabled=bool(trace))
+        
+        # 挂载到共享运行时，核心模块在首次使用时创建
+        self.runtime = runtime or get_default_runtime()
+        self.context = self.runtime.attach(agent_name)
         
         # 默认能力向量
         if capabilities is None:
@@ -57,16 +58,68 @@ class AgentCollaborator:
             }
         
         # 注册智能体
-        self.agent_voice = self.sonic_map.register_voice(
-            name=agent_name,
-            voice_type="silicon",
-            capability_vector=capabilities,
-            intention_vector=intentions,
-            description=agent_description
-        )
+        with self.tracer.span("sonic_map.register_voice", "registration", voice_type="silicon"):
+            self.agent_voice = self.sonic_map.register_voice(
+                name=agent_name,
+                voice_type="silicon",
+                capability_vector=capabilities,
+                intention_vector=intentions,
+                description=agent_description
+            )
         
         print(f"智能体 '{agent_name}' 注册成功！")
     
+    @property
+    def namespace(self):
+        """
+        智能体在运行时中的命名空间
+        """
+        return self.context.namespace
+    
+    @property
+    def sonic_map(self):
+        """协同声部图谱（本智能体独立持有）"""
+        return self.context.sonic_map
+    
+    @property
+    def protocol_manager(self):
+        """元协议管理器（本智能体独立持有）"""
+        return self.context.protocol_manager
+    
+    @property
+    def designer(self):
+        """对位设计器（本智能体独立持有）"""
+        return self.context.designer
+    
+    @property
+    def executor(self):
+        """静定执行器（运行时共享）"""
+        return self.context.executor
+    
+    @property
+    def crystal_repo(self):
+        """共识晶体仓库（运行时共享）"""
+        return self.context.crystal_repo
+    
+    @property
+    def validator(self):
+        """对位验证器（本智能体独立持有）"""
+        return self.context.validator
+    
+    @property
+    def entropy_manager(self):
+        """熵值进化管理器（本智能体独立持有）"""
+        return self.context.entropy_manager
+    
+    def detach(self):
+        """
+        从运行时卸载智能体（共享的执行器与晶体仓库不受影响）
+        
+        Returns:
+            是否卸载成功
+        """
+        return self.runtime.detach(self.context.namespace)
+    
     def register_carbon_partner(self, partner_name, partner_description="", capabilities=None, intentions=None):
         """
         注册碳基伙伴
@@ -96,13 +149,14 @@ class AgentCollaborator:
                 "效率": 0.6
             }
         
-        carbon_voice = self.sonic_map.register_voice(
-            name=partner_name,
-            voice_type="carbon",
-            capability_vector=capabilities,
-            intention_vector=intentions,
-            description=partner_description
-        )
+        with self.tracer.span("sonic_map.register_voice", "registration", voice_type="carbon"):
+            carbon_voice = self.sonic_map.register_voice(
+                name=partner_name,
+                voice_type="carbon",
+                capability_vector=capabilities,
+                intention_vector=intentions,
+                description=partner_description
+            )
         
         print(f"碳基伙伴 '{partner_name}' 注册成功！")
         return carbon_voice
@@ -120,16 +174,41 @@ class AgentCollaborator:
         Returns:
             协同路径对象
         """
-        path = self.designer.create_counterpoint_path(
-            name=path_name,
-            pattern_type=pattern_type,
-            participating_voices=[carbon_voice.voice_id, self.agent_voice.voice_id],
-            creation_theme=creation_theme
-        )
+        with self.tracer.span("designer.create_counterpoint_path", "design", pattern_type=pattern_type):
+            path = self.designer.create_counterpoint_path(
+                name=path_name,
+                pattern_type=pattern_type,
+                participating_voices=[carbon_voice.voice_id, self.agent_voice.voice_id],
+                creation_theme=creation_theme
+            )
         
         print(f"协同路径 '{path_name}' 创建成功！")
         return path
     
+    def create_collaboration_paths(self, jobs):
+        """
+        批量创建协同路径（任一模式类型无效则不创建任何路径）
+        
+        Args:
+            jobs: 路径参数列表，每项包含 path_name、pattern_type、carbon_voice、creation_theme
+        
+        Returns:
+            协同路径对象列表，顺序与 jobs 一致
+        """
+        with self.tracer.span("designer.create_paths_bulk", "design", count=len(jobs)):
+            paths = self.designer.create_paths_bulk([
+                {
+                    "name": job["path_name"],
+                    "pattern_type": job["pattern_type"],
+                    "participating_voices": [job["carbon_voice"].voice_id, self.agent_voice.voice_id],
+                    "creation_theme": job["creation_theme"]
+                }
+                for job in jobs
+            ])
+        
+        print(f"批量创建 {len(paths)} 条协同路径成功！")
+        return paths
+    
     def execute_collaboration(self, path, carbon_voice):
         """
         执行协同
@@ -141,19 +220,62 @@ class AgentCollaborator:
         Returns:
             执行结果
         """
-        result = self.executor.execute_counterpoint_path(
-            path_id=path.path_id,
-            steps=path.steps,
-            voice_map={
-                "carbon": carbon_voice.voice_id,
-                "silicon": self.agent_voice.voice_id
-            }
-        )
+        with self.tracer.span("executor.execute_counterpoint_path", "execution", path_id=path.path_id) as span:
+            result = self.executor.execute_counterpoint_path(
+                path_id=path.path_id,
+                steps=path.steps,
+                voice_map={
+                    "carbon": carbon_voice.voice_id,
+                    "silicon": self.agent_voice.voice_id
+                }
+            )
+            span.set(success=result["success"])
+            self._record_step_spans(result)
         
         print(f"协同执行 {'成功' if result['success'] else '失败'}！")
         return result
     
-    def create_consensus_crystal(self, crystal_name, path, carbon_voice, satisfaction_score=0.8, flow_duration=30.0):
+    def _record_step_spans(self, result):
+        """
+        将执行器线程中完成的步骤补记为执行区间的子区间
+        
+        Args:
+            result: 执行结果
+        """
+        if not self.tracer.enabled:
+            return
+        for task in result.get("task_results", []):
+            if task.get("started_at") and task.get("completed_at"):
+                self.tracer.record(
+                    task["name"], "execution.step", task["started_at"], task["completed_at"],
+                    thread_id="SteadyExecutor", task_id=task["task_id"], status=task["status"]
+                )
+    
+    def stream_step(self, path, step_index, inputs=None, producer=None, buffer_size=16):
+        """
+        流式执行协同步骤，由本智能体作为执行声部
+        
+        Args:
+            path: 协同路径
+            step_index: 步骤索引
+            inputs: 输入参数（可选）
+            producer: 步骤生产函数（可选）
+            buffer_size: 缓冲区容量
+        
+        Returns:
+            事件迭代器，部分结果一产生即返回
+        """
+        return self.designer.stream_path_step(
+            path_id=path.path_id,
+            step_index=step_index,
+            voice_id=self.agent_voice.voice_id,
+            inputs=inputs or {},
+            producer=producer,
+            buffer_size=buffer_size
+        )
+    
+    def create_consensus_crystal(self, crystal_name, path, carbon_voice, satisfaction_score=0.8, flow_duration=30.0,
+                                 persist=True):
         """
         创建共识晶体
         
@@ -163,36 +285,39 @@ class AgentCollaborator:
             carbon_voice: 碳基伙伴声部
             satisfaction_score: 满意度
             flow_duration: 心流时长（分钟）
+            persist: 是否立即写入文件（为 False 时由调用方经 crystal_repo.write_crystals 写入）
         
         Returns:
             共识晶体对象
         """
-        crystal = self.crystal_repo.create_crystal(
-            name=crystal_name,
-            description=f"基于{path.pattern_type}模式的协同模板",
-            participating_voices=[
-                {
-                    "voice_id": carbon_voice.voice_id,
-                    "name": carbon_voice.name,
-                    "capabilities": carbon_voice.capability_vector
-                },
-                {
-                    "voice_id": self.agent_voice.voice_id,
-                    "name": self.agent_voice.name,
-                    "capabilities": self.agent_voice.capability_vector
-                }
-            ],
-            counterpoint_pattern=path.pattern_type,
-            steps=path.steps,
-            decision_points=[
-                {"step": 3, "description": "碳基筛选深化", "importance": "high"}
-            ],
-            satisfaction_score=satisfaction_score,
-            flow_duration=flow_duration,
-            micro_rules=["当碳基提出模糊概念时，硅基应生成至少5个不同方向的变体"],
-            creation_theme=path.creation_theme,
-            tags=["协同创作", path.pattern_type, "智能体"]
-        )
+        with self.tracer.span("crystal_repo.create_crystal", "crystal"):
+            crystal = self.crystal_repo.create_crystal(
+                name=crystal_name,
+                description=f"基于{path.pattern_type}模式的协同模板",
+                participating_voices=[
+                    {
+                        "voice_id": carbon_voice.voice_id,
+                        "name": carbon_voice.name,
+                        "capabilities": carbon_voice.capability_vector
+                    },
+                    {
+                        "voice_id": self.agent_voice.voice_id,
+                        "name": self.agent_voice.name,
+                        "capabilities": self.agent_voice.capability_vector
+                    }
+                ],
+                counterpoint_pattern=path.pattern_type,
+                steps=path.steps,
+                decision_points=[
+                    {"step": 3, "description": "碳基筛选深化", "importance": "high"}
+                ],
+                satisfaction_score=satisfaction_score,
+                flow_duration=flow_duration,
+                micro_rules=["当碳基提出模糊概念时，硅基应生成至少5个不同方向的变体"],
+                creation_theme=path.creation_theme,
+                tags=["协同创作", path.pattern_type, "智能体", self.context.namespace_tag],
+                persist=persist
+            )
         
         print(f"共识晶体 '{crystal_name}' 创建成功！")
         return crystal
@@ -219,12 +344,13 @@ class AgentCollaborator:
         ]
         
         # 执行验证
-        validation_result = self.validator.validate(
-            action_id=f"validation_{int(time.time())}",
-            carbon_intention=carbon_intention,
-            silicon_output=silicon_output,
-            thinking_process=thinking_process
-        )
+        with self.tracer.span("validator.validate", "validation"):
+            validation_result = self.validator.validate(
+                action_id=f"validation_{int(time.time())}",
+                carbon_intention=carbon_intention,
+                silicon_output=silicon_output,
+                thinking_process=thinking_process
+            )
         
         if len(validation_result.differences) == 0:
             print("协同验证成功！")
@@ -235,6 +361,19 @@ class AgentCollaborator:
         
         return validation_result
     
+    def validate_protocol(self, action):
+        """
+        校验动作是否符合元协议核心价值观
+        
+        Args:
+            action: 动作字典
+        
+        Returns:
+            (是否通过, 说明)
+        """
+        with self.tracer.span("protocol_manager.validate_core_values", "protocol"):
+            return self.protocol_manager.validate_core_values(action)
+    
     def calculate_entropy(self, validation_failure_rate=0.1, satisfaction_volatility=0.2, task_interruption_count=1, communication_rounds=3):
         """
         计算系统熵值
@@ -248,12 +387,13 @@ class AgentCollaborator:
         Returns:
             熵值数据
         """
-        entropy_data = self.entropy_manager.calculate_entropy(
-            validation_failure_rate=validation_failure_rate,
-            satisfaction_volatility=satisfaction_volatility,
-            task_interruption_count=task_interruption_count,
-            communication_rounds=communication_rounds
-        )
+        with self.tracer.span("entropy_manager.calculate_entropy", "entropy"):
+            entropy_data = self.entropy_manager.calculate_entropy(
+                validation_failure_rate=validation_failure_rate,
+                satisfaction_volatility=satisfaction_volatility,
+                task_interruption_count=task_interruption_count,
+                communication_rounds=communication_rounds
+            )
         
         print(f"系统熵值: {entropy_data.entropy_score:.2f}")
         print(f"系统状态: {'健康' if entropy_data.entropy_score < 0.3 else '警告' if entropy_data.entropy_score < 0.7 else '临界'}")
@@ -5,16 +5,155 @@
 提供高级API接口，方便其他智能体快速集成和使用
 """
 
+import collections
+import queue
+import threading
 from .collaborator import AgentCollaborator
 
 
+# 批次结束标记
+_BATCH_DONE = object()
+
+
+class CollaborationBatch:
+    """
+    批量协同
+    创建时即在运行时共享的协同线程池上开始执行，同时执行的协同不超过 max_workers；
+    迭代按完成顺序产出结果。全部协同结束（或停止后进行中的协同结束）时，
+    本批次的共识晶体一次写入同一个批量文件，与是否迭代无关
+    """
+    
+    def __init__(self, api, jobs, paths, max_workers, create_crystals):
+        """
+        初始化批量协同
+        
+        Args:
+            api: 嵌入API
+            jobs: 规范化后的协同任务列表
+            paths: 对应的协同路径列表
+            max_workers: 同时执行的协同数量
+            create_crystals: 是否为执行成功的协同创建共识晶体
+        """
+        self._api = api
+        self._pool = api.collaborator.context.collaboration_pool
+        self._pending = collections.deque(enumerate(zip(jobs, paths)))
+        self._max_workers = max(1, max_workers)
+        self._create_crystals = create_crystals
+        self._crystals = []
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._running = 0
+        self._stopped = False
+        self._finished = False
+        self._exhausted = False
+        self._done = threading.Event()
+    
+    def start(self):
+        """
+        提交首批协同
+        
+        Returns:
+            批量协同自身
+        """
+        self._launch()
+        self._maybe_finish()
+        return self
+    
+    def _launch(self):
+        """
+        在并发上限内提交等待中的协同
+        """
+        while True:
+            with self._lock:
+                if self._stopped or not self._pending or self._running >= self._max_workers:
+                    return
+                index, (job, path) = self._pending.popleft()
+                self._running += 1
+            try:
+                future = self._pool.submit(self._api._run_collaboration, index, job, path,
+                                           self._create_crystals, self._crystals)
+            except RuntimeError:
+                # 运行时已关闭，放弃其余协同
+                with self._lock:
+                    self._running -= 1
+                    self._stopped = True
+                return
+            future.add_done_callback(self._on_done)
+    
+    def _on_done(self, future):
+        """
+        协同结束：登记结果并补充提交下一个协同
+        """
+        try:
+            self._results.put(future.result())
+        finally:
+            with self._lock:
+                self._running -= 1
+        self._launch()
+        self._maybe_finish()
+    
+    def _maybe_finish(self):
+        """
+        没有进行中与等待中的协同时写入本批次的晶体并结束批次
+        """
+        with self._lock:
+            if self._finished or self._running or (self._pending and not self._stopped):
+                return
+            self._finished = True
+        try:
+            self._api.collaborator.crystal_repo.write_crystals(self._crystals)
+        finally:
+            self._results.put(_BATCH_DONE)
+            self._done.set()
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        if self._exhausted:
+            raise StopIteration
+        outcome = self._results.get()
+        if outcome is _BATCH_DONE:
+            self._exhausted = True
+            raise StopIteration
+        return outcome
+    
+    def wait(self, timeout=None):
+        """
+        等待批次结束（晶体已写入）
+        
+        Args:
+            timeout: 超时时间（秒）
+        
+        Returns:
+            批次是否已结束
+        """
+        return self._done.wait(timeout)
+    
+    def close(self, timeout=None):
+        """
+        停止提交尚未开始的协同，并等待进行中的协同结束、晶体写入
+        
+        Args:
+            timeout: 超时时间（秒）
+        
+        Returns:
+            批次是否已结束
+        """
+        with self._lock:
+            self._stopped = True
+        self._maybe_finish()
+        return self.wait(timeout)
+
+
 class EmbeddingAPI:
     """
     智能体嵌入API
     提供高级接口，简化智能体集成流程
     """
     
-    def __init__(self, agent_name, agent_description="", capabilities=None, intentions=None):
+    def __init__(self, agent_name, agent_description="", capabilities=None, intentions=None, runtime=None,
+                 trace=None):
         """
         初始化嵌入API
         
@@ -23,15 +162,35 @@ class EmbeddingAPI:
             agent_description: 智能体描述
             capabilities: 智能体能力向量
             intentions: 智能体意图向量
+            runtime: 协同运行时（可选，默认使用进程级共享运行时）
+            trace: 调用追踪配置（可选，见 AgentCollaborator）
         """
         self.collaborator = AgentCollaborator(
             agent_name=agent_name,
             agent_description=agent_description,
             capabilities=capabilities,
-            intentions=intentions
+            intentions=intentions,
+            runtime=runtime,
+            trace=trace
         )
         self.carbon_partners = {}
     
+    def close(self):
+        """
+        从运行时卸载本智能体（共享的执行器与晶体仓库不受影响）
+        
+        Returns:
+            是否卸载成功
+        """
+        return self.collaborator.detach()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+        return False
+    
     def register_carbon_partner(self, partner_name, partner_description="", capabilities=None, intentions=None):
         """
         注册碳基伙伴
@@ -66,33 +225,35 @@ class EmbeddingAPI:
         Returns:
             协同结果
         """
-        carbon_voice = self.carbon_partners.get(partner_name)
-        if not carbon_voice:
-            raise ValueError(f"碳基伙伴 '{partner_name}' 未注册")
-        
-        # 创建协同路径
-        path = self.collaborator.create_collaboration_path(
-            path_name=collaboration_name,
-            pattern_type="staggered_complement",
-            carbon_voice=carbon_voice,
-            creation_theme=creation_theme
-        )
-        
-        # 执行协同
-        result = self.collaborator.execute_collaboration(
-            path=path,
-            carbon_voice=carbon_voice
-        )
-        
-        # 创建共识晶体
-        crystal_name = f"{collaboration_name}_模板"
-        self.collaborator.create_consensus_crystal(
-            crystal_name=crystal_name,
-            path=path,
-            carbon_voice=carbon_voice
-        )
-        
-        return result
+        with self.collaborator.tracer.span("collaboration", "collaboration",
+                                           pattern_type="staggered_complement", theme=creation_theme):
+            carbon_voice = self.carbon_partners.get(partner_name)
+            if not carbon_voice:
+                raise ValueError(f"碳基伙伴 '{partner_name}' 未注册")
+            
+            # 创建协同路径
+            path = self.collaborator.create_collaboration_path(
+                path_name=collaboration_name,
+                pattern_type="staggered_complement",
+                carbon_voice=carbon_voice,
+                creation_theme=creation_theme
+            )
+            
+            # 执行协同
+            result = self.collaborator.execute_collaboration(
+                path=path,
+                carbon_voice=carbon_voice
+            )
+            
+            # 创建共识晶体
+            crystal_name = f"{collaboration_name}_模板"
+            self.collaborator.create_consensus_crystal(
+                crystal_name=crystal_name,
+                path=path,
+                carbon_voice=carbon_voice
+            )
+            
+            return result
     
     def create_canon_progression_collaboration(self, partner_name, collaboration_name, creation_theme):
         """
@@ -106,25 +267,27 @@ class EmbeddingAPI:
         Returns:
             协同结果
         """
-        carbon_voice = self.carbon_partners.get(partner_name)
-        if not carbon_voice:
-            raise ValueError(f"碳基伙伴 '{partner_name}' 未注册")
-        
-        # 创建协同路径
-        path = self.collaborator.create_collaboration_path(
-            path_name=collaboration_name,
-            pattern_type="canon_progression",
-            carbon_voice=carbon_voice,
-            creation_theme=creation_theme
-        )
-        
-        # 执行协同
-        result = self.collaborator.execute_collaboration(
-            path=path,
-            carbon_voice=carbon_voice
-        )
-        
-        return result
+        with self.collaborator.tracer.span("collaboration", "collaboration",
+                                           pattern_type="canon_progression", theme=creation_theme):
+            carbon_voice = self.carbon_partners.get(partner_name)
+            if not carbon_voice:
+                raise ValueError(f"碳基伙伴 '{partner_name}' 未注册")
+            
+            # 创建协同路径
+            path = self.collaborator.create_collaboration_path(
+                path_name=collaboration_name,
+                pattern_type="canon_progression",
+                carbon_voice=carbon_voice,
+                creation_theme=creation_theme
+            )
+            
+            # 执行协同
+            result = self.collaborator.execute_collaboration(
+                path=path,
+                carbon_voice=carbon_voice
+            )
+            
+            return result
     
     def create_fugue_interweaving_collaboration(self, partner_name, collaboration_name, creation_theme):
         """
@@ -138,25 +301,145 @@ class EmbeddingAPI:
         Returns:
             协同结果
         """
-        carbon_voice = self.carbon_partners.get(partner_name)
-        if not carbon_voice:
-            raise ValueError(f"碳基伙伴 '{partner_name}' 未注册")
+        with self.collaborator.tracer.span("collaboration", "collaboration",
+                                           pattern_type="fugue_interweaving", theme=creation_theme):
+            carbon_voice = self.carbon_partners.get(partner_name)
+            if not carbon_voice:
+                raise ValueError(f"碳基伙伴 '{partner_name}' 未注册")
+            
+            # 创建协同路径
+            path = self.collaborator.create_collaboration_path(
+                path_name=collaboration_name,
+                pattern_type="fugue_interweaving",
+                carbon_voice=carbon_voice,
+                creation_theme=creation_theme
+            )
+            
+            # 执行协同
+            result = self.collaborator.execute_collaboration(
+                path=path,
+                carbon_voice=carbon_voice
+            )
+            
+            return result
+    
+    def run_collaborations(self, batch, max_workers=8, create_crystals=True):
+        """
+        批量并发运行协同，结果按完成顺序返回
         
-        # 创建协同路径
-        path = self.collaborator.create_collaboration_path(
-            path_name=collaboration_name,
-            pattern_type="fugue_interweaving",
-            carbon_voice=carbon_voice,
-            creation_theme=creation_theme
-        )
+        路径在调用时一次性创建（任一协同类型无效则抛出 ValueError 且不执行任何协同），
+        各协同随即在运行时共享的协同线程池上并发执行，步骤由共享执行器执行，无需迭代结果即会运行；
+        共识晶体创建后立即可查询，批次结束时一次写入同一个批量文件
+        
+        Args:
+            batch: 协同任务列表，每项为 {"partner": 伙伴名称, "theme": 创作主题, "pattern": 协同类型,
+                   "name": 协同名称（可选）} 或 (伙伴名称, 创作主题[, 协同类型]) 元组
+            max_workers: 同时执行的协同数量
+            create_crystals: 是否为执行成功的协同创建共识晶体
+        
+        Returns:
+            批量协同（CollaborationBatch），迭代产出的每项包含 index、partner、theme、pattern、path_id、
+            success、result、crystal_id、error；close() 停止尚未开始的协同，wait() 等待批次结束
+        """
+        jobs = [self._normalize_job(job) for job in batch]
         
-        # 执行协同
-        result = self.collaborator.execute_collaboration(
+        # 未注册的伙伴自动注册
+        for job in jobs:
+            if job["partner"] not in self.carbon_partners:
+                self.register_carbon_partner(job["partner"])
+        
+        paths = self.collaborator.create_collaboration_paths([
+            {
+                "path_name": job["name"],
+                "pattern_type": job["pattern"],
+                "carbon_voice": self.carbon_partners[job["partner"]],
+                "creation_theme": job["theme"]
+            }
+            for job in jobs
+        ])
+        return CollaborationBatch(self, jobs, paths, max_workers, create_crystals).start()
+    
+    @staticmethod
+    def _normalize_job(job):
+        """
+        将协同任务统一为字典形式
+        """
+        if isinstance(job, dict):
+            partner, theme = job["partner"], job["theme"]
+            pattern = job.get("pattern", "staggered_complement")
+            name = job.get("name")
+        else:
+            partner, theme = job[0], job[1]
+            pattern = job[2] if len(job) > 2 else "staggered_complement"
+            name = None
+        return {
+            "partner": partner,
+            "theme": theme,
+            "pattern": pattern,
+            "name": name or f"批量协同_{str(theme)[:10]}"
+        }
+    
+    def _run_collaboration(self, index, job, path, create_crystals, crystals):
+        """
+        执行单个协同并按需创建共识晶体（晶体登记到 crystals，暂不写入文件）
+        """
+        outcome = {
+            "index": index,
+            "partner": job["partner"],
+            "theme": job["theme"],
+            "pattern": job["pattern"],
+            "path_id": path.path_id,
+            "success": False,
+            "result": None,
+            "crystal_id": None,
+            "error": None
+        }
+        carbon_voice = self.carbon_partners[job["partner"]]
+        # 工作线程中没有活动区间，每个协同成为独立的根区间
+        with self.collaborator.tracer.span("collaboration", "collaboration",
+                                           pattern_type=job["pattern"], theme=job["theme"], index=index):
+            try:
+                result = self.collaborator.execute_collaboration(path=path, carbon_voice=carbon_voice)
+                outcome["result"] = result
+                outcome["success"] = result["success"]
+                if create_crystals and result["success"]:
+                    crystal = self.collaborator.create_consensus_crystal(
+                        crystal_name=f"{job['name']}_模板",
+                        path=path,
+                        carbon_voice=carbon_voice,
+                        persist=False
+                    )
+                    crystals.append(crystal)
+                    outcome["crystal_id"] = crystal.crystal_id
+            except Exception as e:
+                outcome["error"] = str(e)
+        return outcome
+    
+    def stream_collaboration_step(self, path_id, step_index, inputs=None, producer=None, buffer_size=16):
+        """
+        流式执行协同步骤（如生成百种变体），首个结果产生后即可开始处理
+        
+        Args:
+            path_id: 路径ID（协同结果中的 path_id）
+            step_index: 步骤索引
+            inputs: 输入参数（可选）
+            producer: 步骤生产函数（可选）
+            buffer_size: 缓冲区容量
+        
+        Returns:
+            事件迭代器
+        """
+        path = self.collaborator.designer.get_counterpoint_path(path_id)
+        if not path:
+            raise ValueError(f"协同路径 '{path_id}' 不存在")
+        
+        return self.collaborator.stream_step(
             path=path,
-            carbon_voice=carbon_voice
+            step_index=step_index,
+            inputs=inputs,
+            producer=producer,
+            buffer_size=buffer_size
         )
-        
-        return result
     
     def validate_collaboration(self, carbon_intention, silicon_output):
         """
@@ -198,6 +481,25 @@ class EmbeddingAPI:
         
         return health_status
     
+    def export_trace(self, path=None, trace_format="chrome", execution_id=None):
+        """
+        导出调用追踪
+        
+        Args:
+            path: 输出文件路径（可选）
+            trace_format: 导出格式，"chrome"（Chrome trace JSON）或 "folded"（火焰图折叠栈）
+            execution_id: 执行ID过滤（可选）
+        
+        Returns:
+            Chrome trace 字典或折叠栈文本
+        """
+        tracer = self.collaborator.tracer
+        if trace_format == "chrome":
+            return tracer.export_chrome_trace(path, execution_id=execution_id)
+        if trace_format == "folded":
+            return tracer.export_folded(path, execution_id=execution_id)
+        raise ValueError(f"不支持的追踪导出格式: {trace_format}")
+    
     def get_agent_info(self):
         """
         获取智能体信息
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+共享运行时模块
+
+同一进程中的多个智能体挂载到同一个运行时：执行器线程、晶体目录扫描与日志配置只发生一次，
+各智能体的声部图谱、对位设计器等子系统按命名空间隔离，并在首次访问时才创建
+"""
+
+import concurrent.futures
+import threading
+import weakref
+from src.layers.voice_recognition.voice_recognition import CollaborativeSonicMap
+from src.layers.meta_protocol.meta_protocol import MetaProtocolManager
+from src.layers.counterpoint_design.counterpoint_design import CounterpointDesigner
+from src.layers.steady_execution.steady_execution import SteadyExecutor
+from src.layers.consensus_crystal.consensus_crystal import CrystalRepository
+from src.mechanisms.counterpoint_validation import CounterpointValidator
+from src.mechanisms.entropy_evolution import EntropyEvolutionManager
+from src.utils.metrics import start_metrics_server
+
+
+# 命名空间标签前缀，写入智能体创建的共识晶体
+NAMESPACE_TAG_PREFIX = "agent:"
+
+
+class AgentContext:
+    """
+    智能体上下文
+    持有单个智能体命名空间下的子系统，首次访问时创建；执行器、批量协同线程池与晶体仓库由运行时共享
+    """
+
+    def __init__(self, runtime, namespace):
+        """
+        初始化智能体上下文
+
+        Args:
+            runtime: 所属运行时
+            namespace: 命名空间
+        """
+        self.runtime = runtime
+        self.namespace = namespace
+        self._subsystems = {}
+
+    def _subsystem(self, name, factory):
+        """
+        获取子系统，不存在时创建
+        """
+        subsystem = self._subsystems.get(name)
+        if subsystem is None:
+            with self.runtime._lock:
+                subsystem = self._subsystems.get(name)
+                if subsystem is None:
+                    subsystem = factory()
+                    self._subsystems[name] = subsystem
+        return subsystem
+
+    @property
+    def sonic_map(self):
+        """
+        协同声部图谱
+        """
+        return self._subsystem("sonic_map", CollaborativeSonicMap)
+
+    @property
+    def protocol_manager(self):
+        """
+        元协议管理器
+        """
+        return self._subsystem("protocol_manager", MetaProtocolManager)
+
+    @property
+    def designer(self):
+        """
+        对位设计器
+        """
+        return self._subsystem("designer", CounterpointDesigner)
+
+    @property
+    def validator(self):
+        """
+        对位验证器
+        """
+        return self._subsystem("validator", CounterpointValidator)
+
+    @property
+    def entropy_manager(self):
+        """
+        熵值进化管理器
+        """
+        return self._subsystem("entropy_manager", EntropyEvolutionManager)
+
+    @property
+    def executor(self):
+        """
+        共享的静定执行器
+        """
+        return self.runtime.executor
+
+    @property
+    def collaboration_pool(self):
+        """
+        共享的批量协同线程池
+        """
+        return self.runtime.collaboration_pool
+
+    @property
+    def crystal_repo(self):
+        """
+        共享的共识晶体仓库
+        """
+        return self.runtime.crystal_repo
+
+    @property
+    def namespace_tag(self):
+        """
+        本命名空间的晶体标签
+        """
+        return f"{NAMESPACE_TAG_PREFIX}{self.namespace}"
+
+    def get_created_subsystems(self):
+        """
+        获取已创建的子系统名称
+
+        Returns:
+            子系统名称列表
+        """
+        return sorted(self._subsystems)
+
+    def list_crystals(self):
+        """
+        获取本命名空间创建的共识晶体
+
+        Returns:
+            共识晶体列表
+        """
+        return self.crystal_repo.search_crystals(tags=[self.namespace_tag])
+
+
+class CollaborationRuntime:
+    """
+    协同运行时
+    在多个智能体之间共享静定执行器与共识晶体仓库，并为每个智能体分配唯一命名空间
+    """
+
+    def __init__(self, storage_path="./crystals", collaboration_workers=32):
+        """
+        初始化协同运行时
+
+        Args:
+            storage_path: 共识晶体存储路径
+            collaboration_workers: 批量协同共享线程池的线程数上限
+        """
+        self.storage_path = storage_path
+        self.collaboration_workers = collaboration_workers
+        # 只弱引用智能体上下文：智能体被丢弃后其子系统随之释放，无需显式卸载
+        self.contexts = weakref.WeakValueDictionary()
+        self._executor = None
+        self._collaboration_pool = None
+        self._crystal_repo = None
+        self._metrics_server = None
+        self._lock = threading.RLock()
+
+    @property
+    def executor(self):
+        """
+        共享的静定执行器（首次访问时启动执行线程）
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = SteadyExecutor()
+            return self._executor
+
+    @property
+    def collaboration_pool(self):
+        """
+        共享的批量协同线程池（首次访问时创建，线程按需启动）；协同在其中等待执行器完成步骤
+        """
+        with self._lock:
+            if self._collaboration_pool is None:
+                self._collaboration_pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.collaboration_workers, thread_name_prefix="collaboration")
+            return self._collaboration_pool
+
+    @property
+    def crystal_repo(self):
+        """
+        共享的共识晶体仓库（首次访问时扫描存储目录）
+        """
+        with self._lock:
+            if self._crystal_repo is None:
+                self._crystal_repo = CrystalRepository(self.storage_path)
+            return self._crystal_repo
+
+    def attach(self, agent_name):
+        """
+        挂载智能体，重名时在命名空间后追加序号
+
+        Args:
+            agent_name: 智能体名称
+
+        Returns:
+            智能体上下文
+        """
+        with self._lock:
+            namespace = agent_name
+            suffix = 1
+            while namespace in self.contexts:
+                suffix += 1
+                namespace = f"{agent_name}#{suffix}"
+            context = AgentContext(self, namespace)
+            self.contexts[namespace] = context
+            return context
+
+    def detach(self, namespace):
+        """
+        卸载智能体
+
+        Args:
+            namespace: 命名空间
+
+        Returns:
+            是否卸载成功
+        """
+        with self._lock:
+            return self.contexts.pop(namespace, None) is not None
+
+    def get_stats(self):
+        """
+        获取运行时统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            return {
+                "agents": len(self.contexts),
+                "executor_started": self._executor is not None,
+                "crystal_repo_loaded": self._crystal_repo is not None,
+                "storage_path": self.storage_path
+            }
+
+    def start_metrics_server(self, port=9464, host="127.0.0.1"):
+        """
+        启动 Prometheus 指标端点（只监听本机回环地址，重复调用返回已启动的端点）
+
+        Args:
+            port: 监听端口（0 表示由系统分配）
+            host: 监听地址
+
+        Returns:
+            指标端点，url 属性为抓取地址
+        """
+        with self._lock:
+            if self._metrics_server is None:
+                self._metrics_server = start_metrics_server(port, host)
+            return self._metrics_server
+
+    def shutdown(self):
+        """
+        关闭运行时（等待进行中的批量协同结束，停止共享执行器与指标端点）
+        """
+        with self._lock:
+            pool, self._collaboration_pool = self._collaboration_pool, None
+        if pool is not None:
+            # 不持锁等待：协同结束时仍需访问运行时的共享子系统
+            pool.shutdown(wait=True)
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            if self._metrics_server is not None:
+                self._metrics_server.stop()
+                self._metrics_server = None
+
+
+_default_runtime = None
+_default_lock = threading.Lock()
+
+
+def get_default_runtime():
+    """
+    获取进程级默认运行时
+
+    Returns:
+        协同运行时
+    """
+    global _default_runtime
+    with _default_lock:
+        if _default_runtime is None:
+            _default_runtime = CollaborationRuntime()
+        return _default_runtime
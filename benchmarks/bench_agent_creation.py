@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+智能体创建基准测试
+
+比较每个智能体独立构建全部子系统（原有行为）与挂载共享运行时的创建耗时、内存与线程数
+
+用法:
+    python benchmarks/bench_agent_creation.py --agents 1000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_embedding import AgentCollaborator, CollaborationRuntime
+
+
+def create_isolated(count, storage):
+    """
+    每个智能体独立运行时，并立即创建全部子系统（等价于原有的初始化方式）
+    """
+    agents, runtimes = [], []
+    for i in range(count):
+        runtime = CollaborationRuntime(storage_path=storage)
+        agent = AgentCollaborator(f"智能体{i}", runtime=runtime)
+        for name in ("protocol_manager", "designer", "executor", "crystal_repo",
+                     "validator", "entropy_manager"):
+            getattr(agent, name)
+        agents.append(agent)
+        runtimes.append(runtime)
+    return agents, runtimes
+
+
+def create_shared(count, storage):
+    """
+    全部智能体挂载同一运行时，子系统按需创建
+    """
+    runtime = CollaborationRuntime(storage_path=storage)
+    agents = [AgentCollaborator(f"智能体{i}", runtime=runtime) for i in range(count)]
+    return agents, [runtime]
+
+
+def measure(label, create, count, storage):
+    """
+    测量创建耗时、内存增量与新增线程数
+    """
+    threads_before = threading.active_count()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        agents, runtimes = create(count, storage)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    threads = threading.active_count() - threads_before
+
+    print(f"  {label}: {elapsed:.2f}s ({elapsed / count * 1000:.2f} ms/个), "
+          f"内存 {current / 1024 / 1024:.1f} MB ({current / count / 1024:.1f} KB/个), 新增线程 {threads}")
+
+    for runtime in runtimes:
+        runtime.shutdown()
+    return elapsed, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="智能体创建基准测试")
+    parser.add_argument("--agents", type=int, default=1000, help="智能体数量")
+    parser.add_argument("--crystals", type=int, default=50, help="存储目录中预置的晶体文件数量")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"智能体创建基准测试: {args.agents} 个智能体, {args.crystals} 个晶体文件")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as storage:
+        # 预置晶体文件，使每次目录扫描都有实际开销
+        seed = CollaborationRuntime(storage_path=storage).crystal_repo
+        for i in range(args.crystals):
+            seed.create_crystal(name=f"晶体{i}", description="", participating_voices=[],
+                                counterpoint_pattern="staggered_complement", steps=[],
+                                decision_points=[], satisfaction_score=0.8, flow_duration=30.0,
+                                micro_rules=[], creation_theme="基准")
+
+        isolated_time, isolated_memory = measure("独立子系统", create_isolated, args.agents, storage)
+        shared_time, shared_memory = measure("共享运行时", create_shared, args.agents, storage)
+
+    print(f"  加速比 {isolated_time / shared_time:.1f}x, 内存减少 {1 - shared_memory / isolated_memory:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+批量协同基准测试
+
+比较逐个调用 quick_start_collaboration 与 run_collaborations 并发批处理的总耗时
+
+用法:
+    python benchmarks/bench_batch_collaboration.py --jobs 100 --workers 16 --max-concurrent-tasks 32
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_embedding import CollaborationRuntime, EmbeddingAPI
+
+
+PATTERNS = ["staggered_complement", "canon_progression", "fugue_interweaving"]
+
+
+def make_api(storage, max_concurrent_tasks):
+    """
+    创建挂载独立运行时的嵌入API
+    """
+    runtime = CollaborationRuntime(storage_path=storage)
+    runtime.executor.set_max_concurrent_tasks(max_concurrent_tasks)
+    return EmbeddingAPI("基准智能体", runtime=runtime), runtime
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量协同基准测试")
+    parser.add_argument("--jobs", type=int, default=100, help="协同任务数量")
+    parser.add_argument("--partners", type=int, default=10, help="碳基伙伴数量")
+    parser.add_argument("--workers", type=int, default=16, help="批处理并发协同数量")
+    parser.add_argument("--max-concurrent-tasks", type=int, default=32, help="执行器最大并发任务数")
+    args = parser.parse_args()
+
+    jobs = [(f"伙伴{i % args.partners}", f"主题{i}", PATTERNS[i % len(PATTERNS)]) for i in range(args.jobs)]
+
+    print("=" * 60)
+    print(f"批量协同基准测试: {args.jobs} 个协同, {args.partners} 个伙伴")
+    print("=" * 60)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        with tempfile.TemporaryDirectory() as storage:
+            api, runtime = make_api(storage, args.max_concurrent_tasks)
+            start = time.perf_counter()
+            serial_ok = sum(1 for partner, theme, pattern in jobs
+                            if api.quick_start_collaboration(partner, theme, pattern)["success"])
+            serial = time.perf_counter() - start
+            runtime.shutdown()
+
+        with tempfile.TemporaryDirectory() as storage:
+            api, runtime = make_api(storage, args.max_concurrent_tasks)
+            start = time.perf_counter()
+            first_latency = None
+            batch_ok = 0
+            for outcome in api.run_collaborations(jobs, max_workers=args.workers):
+                if first_latency is None:
+                    first_latency = time.perf_counter() - start
+                batch_ok += outcome["success"]
+            batch = time.perf_counter() - start
+            runtime.shutdown()
+
+    print(f"  逐个执行: {serial:.2f}s ({args.jobs / serial:.1f} 协同/秒, 成功 {serial_ok})")
+    print(f"  批量并发: {batch:.2f}s ({args.jobs / batch:.1f} 协同/秒, 成功 {batch_ok}), "
+          f"首个结果 {first_latency * 1000:.0f} ms")
+    print(f"  加速比 {serial / batch:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+路径优化基准测试
+
+随机生成带依赖声明的赋格式路径，以执行观测训练代价模型，再对优化前后的阶段划分
+进行蒙特卡洛模拟（步骤耗时按对数正态分布抖动），比较完成时间与碳基打扰次数
+
+用法:
+    python benchmarks/bench_path_optimizer.py --paths 200 --runs 200
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.layers.counterpoint_design.counterpoint_design import CounterpointDesigner
+from src.layers.counterpoint_design.path_optimizer import sequential_stages
+
+
+CARBON_ACTIONS = {"定义主题": 40.0, "确认风格": 20.0, "调整权重": 30.0, "最终裁决": 25.0}
+SILICON_ACTIONS = {"演绎": 12.0, "配图": 8.0, "整合": 15.0, "润色": 5.0}
+SILICON_SPEEDS = {"s1": 0.8, "s2": 1.0, "s3": 1.3}
+
+
+def random_steps(rng):
+    """
+    生成一条随机的赋格式路径：主题 → 若干互不依赖的碳基/硅基分支 → 汇合 → 裁决
+    """
+    steps = [{"step": 1, "role": "carbon", "action": "定义主题"}]
+    branches = []
+    for _ in range(rng.randint(2, 6)):
+        number = len(steps) + 1
+        if rng.random() < 0.25:
+            steps.append({"step": number, "role": "carbon", "action": "确认风格", "depends_on": [1]})
+        else:
+            steps.append({"step": number, "role": "silicon", "action": rng.choice(["演绎", "配图", "润色"]),
+                          "depends_on": [1]})
+        branches.append(number)
+    steps.append({"step": len(steps) + 1, "role": "carbon", "action": "调整权重", "depends_on": branches})
+    steps.append({"step": len(steps) + 1, "role": "silicon", "action": "整合", "depends_on": [len(steps)]})
+    steps.append({"step": len(steps) + 1, "role": "carbon", "action": "最终裁决", "depends_on": [len(steps)]})
+    return steps
+
+
+def train(designer, rng, samples=2000):
+    """
+    以模拟的执行观测训练代价模型
+    """
+    observations = []
+    for _ in range(samples):
+        if rng.random() < 0.4:
+            action = rng.choice(list(CARBON_ACTIONS))
+            observations.append({"role": "carbon", "action": action, "voice_id": "c",
+                                 "duration": CARBON_ACTIONS[action] * rng.lognormvariate(0, 0.2)})
+        else:
+            action = rng.choice(list(SILICON_ACTIONS))
+            voice = rng.choice(list(SILICON_SPEEDS))
+            observations.append({"role": "silicon", "action": action, "voice_id": voice,
+                                 "duration": SILICON_ACTIONS[action] * SILICON_SPEEDS[voice]
+                                 * rng.lognormvariate(0, 0.2)})
+    designer.cost_model.observe_history(observations)
+
+
+def true_duration(step, voice, rng):
+    """
+    按真实分布抽样单个原步骤的耗时
+    """
+    if step["role"] == "carbon":
+        return CARBON_ACTIONS[step["action"]] * rng.lognormvariate(0, 0.3)
+    return SILICON_ACTIONS[step["action"]] * SILICON_SPEEDS[voice] * rng.lognormvariate(0, 0.3)
+
+
+def simulate(stages, steps, handoff, rng):
+    """
+    模拟一次执行：硅基并行单元分配给最先空闲的声部
+    """
+    total = handoff * max(len(stages) - 1, 0)
+    voices = sorted(SILICON_SPEEDS, key=SILICON_SPEEDS.get)
+    for stage in stages:
+        if stage["role"] == "carbon":
+            total += sum(true_duration(steps[i], "c", rng) for unit in stage["units"] for i in unit)
+            continue
+        finish = {voice: 0.0 for voice in voices}
+        for unit in stage["units"]:
+            voice = min(voices, key=lambda v: finish[v])
+            finish[voice] += sum(true_duration(steps[i], voice, rng) for i in unit)
+        total += max(finish.values())
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="路径优化基准测试")
+    parser.add_argument("--paths", type=int, default=200, help="路径数量")
+    parser.add_argument("--runs", type=int, default=200, help="每条路径的模拟次数")
+    parser.add_argument("--seed", type=int, default=7, help="随机种子")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    designer = CounterpointDesigner()
+    train(designer, rng)
+    handoff = designer.cost_model.handoff_cost
+
+    print("=" * 60)
+    print(f"路径优化基准测试: {args.paths} 条路径 × {args.runs} 次模拟")
+    print("=" * 60)
+
+    before, after, interruptions_before, interruptions_after = [], [], [], []
+    optimize_time = 0.0
+    for _ in range(args.paths):
+        steps = random_steps(rng)
+        path = designer.create_counterpoint_path("基准路径", "fugue_interweaving",
+                                                 ["c"] + list(SILICON_SPEEDS), "基准主题", steps)
+        original_stages = sequential_stages(steps)
+
+        start = time.perf_counter()
+        designer.optimize_counterpoint_path(path.path_id)
+        optimize_time += time.perf_counter() - start
+        report = designer.get_optimization_report(path.path_id)
+        stages = report["stages"] if report["applied"] else original_stages
+
+        for _ in range(args.runs):
+            before.append(simulate(original_stages, steps, handoff, rng))
+            after.append(simulate(stages, steps, handoff, rng))
+        interruptions_before.append(report["interruptions_before"])
+        interruptions_after.append(report["interruptions_after"])
+
+    mean_before, mean_after = statistics.mean(before), statistics.mean(after)
+    print(f"  平均完成时间:   {mean_before:8.1f}s → {mean_after:8.1f}s "
+          f"({(1 - mean_after / mean_before) * 100:.1f}% 缩短)")
+    print(f"  P95 完成时间:   {sorted(before)[int(len(before) * 0.95)]:8.1f}s → "
+          f"{sorted(after)[int(len(after) * 0.95)]:8.1f}s")
+    print(f"  平均碳基打扰:   {statistics.mean(interruptions_before):8.2f} → "
+          f"{statistics.mean(interruptions_after):8.2f}")
+    print(f"  单条路径优化耗时: {optimize_time / args.paths * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
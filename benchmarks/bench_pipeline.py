@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+卡农式推进流水线基准测试
+
+比较逐会话串行执行与阶段流水线执行的吞吐
+
+用法:
+    python benchmarks/bench_pipeline.py --sessions 50 --step-ms 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.layers.counterpoint_design.counterpoint_design import CounterpointDesigner
+from src.layers.steady_execution.pipeline import StagePipeline
+
+
+def make_handler(durations):
+    """
+    按动作设定耗时的模拟处理函数
+    """
+    def handler(step, session):
+        time.sleep(durations[step["action"]])
+        return step["action"]
+    return handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="卡农式推进流水线基准测试")
+    parser.add_argument("--sessions", type=int, default=50, help="会话数量")
+    parser.add_argument("--step-ms", type=float, default=20.0, help="基准步骤耗时（毫秒）")
+    parser.add_argument("--queue-size", type=int, default=2, help="阶段间队列容量")
+    args = parser.parse_args()
+
+    steps = list(CounterpointDesigner().patterns["canon_progression"]["steps"])
+    base = args.step_ms / 1000.0
+    # 动画化最慢，决定流水线的吞吐上限
+    durations = {"写作": base, "配图": base, "调色": base * 0.5, "动画化": base * 2, "剪辑": base}
+    handler = make_handler(durations)
+
+    print("=" * 60)
+    print(f"卡农式推进流水线基准测试: {args.sessions} 个会话")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    for i in range(args.sessions):
+        session = {"session_id": str(i), "inputs": {}}
+        for step in steps:
+            handler(step, session)
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pipeline = StagePipeline(steps, handler=handler, queue_size=args.queue_size)
+    for i in range(args.sessions):
+        pipeline.submit(str(i))
+    pipeline.close()
+    completed = sum(1 for _ in pipeline.iter_results())
+    pipeline.join()
+    pipelined = time.perf_counter() - start
+
+    bound = 1.0 / max(durations.values())
+    print(f"  串行:   {serial:.2f}s ({args.sessions / serial:.1f} 会话/秒)")
+    print(f"  流水线: {pipelined:.2f}s ({completed / pipelined:.1f} 会话/秒)")
+    print(f"  最慢阶段上限: {bound:.1f} 会话/秒, 加速比 {serial / pipelined:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
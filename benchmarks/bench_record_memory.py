@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+核心记录内存基准测试
+
+比较数据类与紧凑变体（__slots__ + 整数ID）在大量实例下的单对象内存占用
+
+用法:
+    python benchmarks/bench_record_memory.py --count 1000000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.compact_records import CompactTask, CompactValidationResult, CompactVoice, FrozenVoice
+from src.layers.voice_recognition.voice_recognition import Voice
+from src.layers.steady_execution.steady_execution import Task
+from src.mechanisms.counterpoint_validation import ValidationResult
+
+
+CAPABILITIES = {"创意生成": 0.8, "逻辑分析": 0.9}
+INTENTIONS = {"探索性": 0.7, "效率": 0.9}
+PAYLOAD = {"step": 1}
+
+
+def make_voice(cls):
+    return lambda: cls(str(uuid.uuid4()), "声部", "silicon", CAPABILITIES, INTENTIONS, "", time.time(), 0.0)
+
+
+def make_task(cls):
+    return lambda: cls(str(uuid.uuid4()), "任务", "counterpoint_step", 0, PAYLOAD,
+                       "completed", time.time(), time.time(), time.time(), None)
+
+
+def make_validation(cls):
+    return lambda: cls(str(uuid.uuid4()), str(uuid.uuid4()), PAYLOAD, PAYLOAD, [], [],
+                       "none", None, False, time.time())
+
+
+def measure(factory, count):
+    """
+    返回每个实例（含其ID与时间戳对象）的平均字节数
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # 扣除列表自身每个槽位的指针开销
+    per_object = (after - before - sys.getsizeof(objects)) / count
+    del objects
+    return per_object
+
+
+def main():
+    parser = argparse.ArgumentParser(description="核心记录内存基准测试")
+    parser.add_argument("--count", type=int, default=1000000, help="实例数量")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"核心记录内存基准测试: {args.count} 个实例")
+    print("=" * 60)
+
+    cases = [
+        ("Voice", make_voice(Voice)),
+        ("CompactVoice", make_voice(CompactVoice)),
+        ("FrozenVoice", make_voice(FrozenVoice)),
+        ("Task", make_task(Task)),
+        ("CompactTask", make_task(CompactTask)),
+        ("ValidationResult", make_validation(ValidationResult)),
+        ("CompactValidationResult", make_validation(CompactValidationResult)),
+    ]
+    for label, factory in cases:
+        per_object = measure(factory, args.count)
+        print(f"  {label:<26} {per_object:8.1f} 字节/对象")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+声部图谱持久化基准测试
+
+测量完整快照保存、增量保存、延迟加载与首次访问的耗时
+
+用法:
+    python benchmarks/bench_sonic_map_persistence.py --voices 100000 --delta 100
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.layers.voice_recognition.voice_recognition import CollaborativeSonicMap
+
+
+def register_voices(sonic_map, count, prefix="声部"):
+    """
+    批量注册声部
+    """
+    voices = []
+    for i in range(count):
+        voices.append(sonic_map.register_voice(
+            name=f"{prefix}{i}",
+            voice_type="carbon" if i % 10 == 0 else "silicon",
+            capability_vector={"创意生成": 0.8, "逻辑分析": 0.9, "情感共鸣": 0.6},
+            intention_vector={"探索性": 0.7, "完美性": 0.8, "效率": 0.9},
+            description="基准测试声部"
+        ))
+    return voices
+
+
+def timed(label, func):
+    """
+    执行并打印耗时
+    """
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed * 1000:10.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="声部图谱持久化基准测试")
+    parser.add_argument("--voices", type=int, default=100000, help="声部数量")
+    parser.add_argument("--delta", type=int, default=100, help="增量保存时的变更数量")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"声部图谱持久化基准测试: {args.voices} 个声部, 增量 {args.delta}")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "sonic_map.jsonl")
+
+        sonic_map = CollaborativeSonicMap()
+        voices = timed("注册声部", lambda: register_voices(sonic_map, args.voices))
+        timed("完整快照保存", lambda: sonic_map.save_to_file(file_path))
+        print(f"  快照大小: {os.path.getsize(file_path) / 1024 / 1024:.2f} MB")
+
+        def apply_delta():
+            register_voices(sonic_map, args.delta // 2, prefix="新增声部")
+            for voice in voices[:args.delta - args.delta // 2]:
+                sonic_map.remove_voice(voice.voice_id)
+
+        apply_delta()
+        timed(f"增量保存 ({args.delta} 项变更)", lambda: sonic_map.save_to_file(file_path))
+
+        loaded = CollaborativeSonicMap()
+        timed("延迟加载 (load_from_file)", lambda: loaded.load_from_file(file_path))
+        timed("首次访问 (读取并回放日志)", lambda: loaded.get_voices_by_type("carbon"))
+        timed("再次按类型获取", lambda: loaded.get_voices_by_type("carbon"))
+
+        assert len(loaded.voices) == len(sonic_map.voices)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+调用追踪开销基准测试
+
+测量未启用与启用追踪时单个区间的开销，并导出一次协同的 Chrome trace 与折叠栈
+
+用法:
+    python benchmarks/bench_tracing_overhead.py --iterations 1000000 --output trace.json
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_embedding import CollaborationRuntime, EmbeddingAPI
+from src.utils.tracing import Tracer
+
+
+def per_call(iterations, body):
+    """
+    测量每次调用的平均耗时（纳秒）
+    """
+    start = time.perf_counter()
+    body(iterations)
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="调用追踪开销基准测试")
+    parser.add_argument("--iterations", type=int, default=1000000, help="区间数量")
+    parser.add_argument("--output", default=None, help="导出一次协同的 Chrome trace 文件路径（可选）")
+    args = parser.parse_args()
+
+    def baseline(n):
+        for _ in range(n):
+            pass
+
+    def spans(tracer):
+        def body(n):
+            span = tracer.span
+            for _ in range(n):
+                with span("bench", "bench"):
+                    pass
+        return body
+
+    disabled = Tracer(enabled=False)
+    enabled = Tracer(enabled=True, max_spans=args.iterations)
+
+    print("=" * 60)
+    print(f"调用追踪开销基准测试: {args.iterations} 个区间")
+    print("=" * 60)
+    empty = per_call(args.iterations, baseline)
+    print(f"  空循环:   {empty:.0f} ns/次")
+    print(f"  未启用:   {per_call(args.iterations, spans(disabled)) - empty:.0f} ns/区间")
+    print(f"  已启用:   {per_call(args.iterations, spans(enabled)) - empty:.0f} ns/区间")
+
+    with tempfile.TemporaryDirectory() as storage:
+        runtime = CollaborationRuntime(storage_path=storage)
+        with contextlib.redirect_stdout(io.StringIO()):
+            api = EmbeddingAPI("追踪基准", runtime=runtime, trace=True)
+            api.quick_start_collaboration("伙伴", "主题", "canon_progression")
+        runtime.shutdown()
+
+    trace = api.export_trace(args.output)
+    print(f"  一次协同记录 {len(api.collaborator.tracer.get_spans())} 个区间, "
+          f"Chrome trace 事件 {len(trace['traceEvents'])} 个")
+    print("  折叠栈:")
+    for line in api.export_trace(trace_format="folded").splitlines():
+        print(f"    {line}")
+
+
+if __name__ == "__main__":
+    main()
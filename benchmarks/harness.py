@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+基准测试框架
+
+按规模运行基准用例，统计吞吐与 p50/p95/p99 延迟，结果写入 JSON 并与基线比较以发现性能回退
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.layers.counterpoint_design.simulator import percentile
+
+
+# 结果文件格式版本
+RESULTS_VERSION = 1
+
+
+@dataclass
+class BenchmarkCase:
+    """
+    基准用例
+    setup(scale) 构建规模为 scale 的初始状态，operation(state, i) 执行一次被测操作，
+    teardown(state) 释放资源（可选）
+    """
+    name: str
+    setup: Callable[[int], Any]
+    operation: Callable[[Any, int], Any]
+    scales: Sequence[int]
+    iterations: int = 200  # 每个规模的测量次数上限
+    warmup: int = 5
+    rounds: int = 3  # 重复测量轮数，取平均耗时最低的一轮以降低噪声
+    teardown: Optional[Callable[[Any], None]] = None
+    description: str = ""
+
+
+@dataclass
+class BenchmarkResult:
+    """基准结果（延迟单位为毫秒）"""
+    name: str
+    scale: int
+    iterations: int
+    total_seconds: float
+    throughput: float  # 每秒操作数
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+    @property
+    def key(self) -> str:
+        """
+        结果键：用例名@规模
+        """
+        return f"{self.name}@{self.scale}"
+
+
+def summarize(name: str, scale: int, latencies: List[float]) -> BenchmarkResult:
+    """
+    汇总单个规模的延迟样本
+
+    Args:
+        name: 用例名称
+        scale: 规模
+        latencies: 每次操作的耗时（秒）
+
+    Returns:
+        基准结果
+    """
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    count = len(ordered)
+    return BenchmarkResult(
+        name=name,
+        scale=scale,
+        iterations=count,
+        total_seconds=total,
+        throughput=count / total if total > 0 else 0.0,
+        mean_ms=total / count * 1000 if count else 0.0,
+        p50_ms=percentile(ordered, 50) * 1000,
+        p95_ms=percentile(ordered, 95) * 1000,
+        p99_ms=percentile(ordered, 99) * 1000,
+        max_ms=(ordered[-1] if ordered else 0.0) * 1000
+    )
+
+
+def run_case(case: BenchmarkCase, scale: int, iterations: Optional[int] = None,
+             seed: int = 0, rounds: Optional[int] = None) -> BenchmarkResult:
+    """
+    在单个规模上运行基准用例
+
+    运行前固定随机种子，每轮测量前执行垃圾回收；多轮测量取平均耗时最低的一轮，
+    以排除调度等外部干扰，保证结果可复现
+
+    Args:
+        case: 基准用例
+        scale: 规模
+        iterations: 每轮测量次数（不超过用例上限，默认取上限）
+        seed: 随机种子
+        rounds: 测量轮数（默认取用例设置）
+
+    Returns:
+        基准结果
+    """
+    count = case.iterations if iterations is None else max(1, min(iterations, case.iterations))
+    random.seed(seed)
+    state = case.setup(scale)
+    best: Optional[List[float]] = None
+    try:
+        for i in range(case.warmup):
+            case.operation(state, i)
+
+        clock = time.perf_counter
+        operation = case.operation
+        index = case.warmup
+        for _ in range(max(1, case.rounds if rounds is None else rounds)):
+            gc.collect()
+            latencies = []
+            for _ in range(count):
+                start = clock()
+                operation(state, index)
+                latencies.append(clock() - start)
+                index += 1
+            if best is None or sum(latencies) < sum(best):
+                best = latencies
+    finally:
+        if case.teardown is not None:
+            case.teardown(state)
+    return summarize(case.name, scale, best)
+
+
+def environment_info() -> Dict[str, Any]:
+    """
+    记录运行环境，便于判断结果之间是否可比
+
+    Returns:
+        环境信息字典
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.time()
+    }
+
+
+def results_to_dict(results: List[BenchmarkResult], seed: int = 0) -> Dict[str, Any]:
+    """
+    将结果转换为可写入 JSON 的字典
+
+    Args:
+        results: 基准结果列表
+        seed: 随机种子
+
+    Returns:
+        结果字典
+    """
+    return {
+        "version": RESULTS_VERSION,
+        "seed": seed,
+        "environment": environment_info(),
+        "results": {
+            result.key: {
+                "name": result.name,
+                "scale": result.scale,
+                "iterations": result.iterations,
+                "total_seconds": result.total_seconds,
+                "throughput": result.throughput,
+                "mean_ms": result.mean_ms,
+                "p50_ms": result.p50_ms,
+                "p95_ms": result.p95_ms,
+                "p99_ms": result.p99_ms,
+                "max_ms": result.max_ms
+            }
+            for result in results
+        }
+    }
+
+
+def save_results(data: Dict[str, Any], path: str):
+    """
+    写入结果文件
+
+    Args:
+        data: 结果字典
+        path: 文件路径
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """
+    读取结果文件
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        结果字典
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any],
+                    tolerance: float = 0.25,
+                    metrics: Tuple[str, ...] = ("p50_ms", "p95_ms", "throughput"),
+                    min_delta_ms: float = 0.25) -> List[Dict[str, Any]]:
+    """
+    与基线比较
+
+    延迟指标高于基线 (1 + tolerance) 倍、吞吐低于基线 (1 - tolerance) 倍视为回退；
+    同时要求单次操作的耗时增加超过 min_delta_ms，避免亚毫秒级操作的计时抖动被误判。
+    只比较两边都存在的用例
+
+    Args:
+        current: 本次结果字典
+        baseline: 基线结果字典
+        tolerance: 允许的相对变化
+        metrics: 比较的指标
+        min_delta_ms: 判定回退所需的最小单次耗时增量（毫秒）
+
+    Returns:
+        每个用例每个指标的比较记录，含 baseline、current、change（相对变化）与 regression
+    """
+    comparisons = []
+    for key, result in current["results"].items():
+        reference = baseline.get("results", {}).get(key)
+        if reference is None:
+            continue
+        for metric in metrics:
+            before, after = reference.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if metric == "throughput":
+                # 吞吐换算为单次操作耗时的增量
+                delta_ms = (1000.0 / after if after > 0 else float("inf")) - 1000.0 / before
+                regression = after < before * (1 - tolerance) and delta_ms > min_delta_ms
+            else:
+                regression = after > before * (1 + tolerance) and after - before > min_delta_ms
+            comparisons.append({
+                "key": key,
+                "metric": metric,
+                "baseline": before,
+                "current": after,
+                "change": change,
+                "regression": regression
+            })
+    return comparisons
+
+
+def format_results(results: List[BenchmarkResult]) -> str:
+    """
+    格式化结果表格
+
+    Args:
+        results: 基准结果列表
+
+    Returns:
+        表格文本
+    """
+    lines = [f"  {'用例':<36}{'次数':>6}{'吞吐/秒':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+    for r in results:
+        lines.append(f"  {r.key:<38}{r.iterations:>6}{r.throughput:>12.1f}"
+                     f"{r.p50_ms:>10.3f}{r.p95_ms:>10.3f}{r.p99_ms:>10.3f}")
+    return "\n".join(lines)
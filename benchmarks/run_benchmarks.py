@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+可复现基准测试
+
+在多个规模下测量核心操作的吞吐与 p50/p95/p99 延迟，结果写入 JSON，
+并可与已保存的基线比较，出现回退时以非零状态码退出
+
+用法:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline
+    python benchmarks/run_benchmarks.py --quick --only crystal
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baselines/default.json
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import (BenchmarkCase, compare_results, format_results, load_results,
+                                results_to_dict, run_case, save_results)
+from agent_embedding import CollaborationRuntime, EmbeddingAPI
+from src.layers.consensus_crystal.consensus_crystal import ConsensusCrystal, CrystalRepository
+from src.layers.counterpoint_design.counterpoint_design import CounterpointDesigner
+from src.layers.steady_execution.steady_execution import SteadyExecutor
+from src.layers.voice_recognition.voice_recognition import CollaborativeSonicMap
+from src.mechanisms.counterpoint_validation import CounterpointValidator
+from src.mechanisms.entropy_evolution import EntropyEvolutionManager
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "default.json")
+
+CAPABILITIES = {"创意生成": 0.8, "逻辑分析": 0.9, "情感共鸣": 0.6}
+INTENTIONS = {"探索性": 0.7, "完美性": 0.8, "效率": 0.9}
+PATTERNS = ["staggered_complement", "canon_progression", "fugue_interweaving"]
+
+
+def register(sonic_map, i):
+    """
+    注册一个声部
+    """
+    return sonic_map.register_voice(
+        name=f"声部{i}",
+        voice_type="carbon" if i % 10 == 0 else "silicon",
+        capability_vector=CAPABILITIES,
+        intention_vector=INTENTIONS,
+        description="基准测试声部"
+    )
+
+
+# ---------- 声部注册 ----------
+
+def setup_voices(scale):
+    sonic_map = CollaborativeSonicMap()
+    for i in range(scale):
+        register(sonic_map, i)
+    return {"sonic_map": sonic_map, "offset": scale}
+
+
+def op_register_voice(state, i):
+    register(state["sonic_map"], state["offset"] + i)
+
+
+# ---------- 路径创建 ----------
+
+def setup_paths(scale):
+    designer = CounterpointDesigner()
+    for i in range(scale):
+        designer.create_counterpoint_path(f"路径{i}", PATTERNS[i % 3], ["c", "s"], "主题")
+    return designer
+
+
+def op_create_path(designer, i):
+    designer.create_counterpoint_path(f"路径{i}", PATTERNS[i % 3], ["c", "s"], "主题")
+
+
+# ---------- 路径执行 ----------
+
+def setup_execution(scale):
+    executor = SteadyExecutor()
+    steps = [{"step": i + 1, "role": "carbon" if i % 2 == 0 else "silicon", "action": f"动作{i + 1}"}
+             for i in range(scale)]
+    return {"executor": executor, "steps": steps}
+
+
+def op_execute_path(state, i):
+    state["executor"].execute_counterpoint_path(f"路径{i}", state["steps"], {"carbon": "c", "silicon": "s"})
+
+
+def teardown_execution(state):
+    state["executor"].shutdown()
+
+
+# ---------- 对位验证 ----------
+
+def setup_validator(scale):
+    validator = CounterpointValidator()
+    thinking = [f"思考步骤{i}" for i in range(8)]
+    for i in range(scale):
+        validator.validate(f"预置{i}", {"主题": "春天", "风格": "温暖"}, {"主题": "春天"}, thinking)
+    return {"validator": validator, "thinking": thinking}
+
+
+def op_validate(state, i):
+    state["validator"].validate(f"动作{i}", {"主题": "春天", "风格": "温暖"},
+                                {"主题": "春天", "风格": "清冷"}, state["thinking"])
+
+
+# ---------- 熵值计算 ----------
+
+def setup_entropy(scale):
+    manager = EntropyEvolutionManager()
+    for i in range(scale):
+        manager.calculate_entropy(0.1, 0.2, i % 3, 3)
+    return manager
+
+
+def op_calculate_entropy(manager, i):
+    manager.calculate_entropy(0.1 + (i % 5) * 0.1, 0.2, i % 3, 3)
+
+
+# ---------- 共识晶体 ----------
+
+def make_crystal(i):
+    timestamp = time.time()
+    return ConsensusCrystal(
+        crystal_id=f"晶体{i}", name=f"晶体{i}", description=f"基于{PATTERNS[i % 3]}模式的协同模板",
+        participating_voices=[], counterpoint_pattern=PATTERNS[i % 3], steps=[], decision_points=[],
+        satisfaction_score=(i % 10) / 10, flow_duration=30.0, micro_rules=[],
+        creation_theme=f"主题{i % 50}", created_at=timestamp, updated_at=timestamp,
+        tags=["协同创作", PATTERNS[i % 3]]
+    )
+
+
+def setup_crystal_create(scale):
+    storage = tempfile.mkdtemp(prefix="bench_crystals_")
+    repo = CrystalRepository(storage)
+    crystals = [make_crystal(i) for i in range(scale)]
+    repo.crystals.update((crystal.crystal_id, crystal) for crystal in crystals)
+    repo.write_crystals(crystals)
+    return {"repo": repo, "storage": storage}
+
+
+def op_create_crystal(state, i):
+    state["repo"].create_crystal(
+        name=f"新晶体{i}", description="基准", participating_voices=[],
+        counterpoint_pattern=PATTERNS[i % 3], steps=[], decision_points=[],
+        satisfaction_score=0.8, flow_duration=30.0, micro_rules=[], creation_theme="主题"
+    )
+
+
+def teardown_storage(state):
+    shutil.rmtree(state["storage"], ignore_errors=True)
+
+
+def setup_crystal_search(scale):
+    # 仅在内存中填充，避免搜索用例受文件写入影响
+    storage = tempfile.mkdtemp(prefix="bench_crystals_")
+    repo = CrystalRepository(storage)
+    for i in range(scale):
+        crystal = make_crystal(i)
+        repo.crystals[crystal.crystal_id] = crystal
+    return {"repo": repo, "storage": storage}
+
+
+def op_search_crystals(state, i):
+    state["repo"].search_crystals(query=f"主题{i % 50}", tags=[PATTERNS[i % 3]], min_satisfaction=0.5)
+
+
+# ---------- 端到端协同 ----------
+
+def setup_quick_start(scale):
+    storage = tempfile.mkdtemp(prefix="bench_crystals_")
+    runtime = CollaborationRuntime(storage_path=storage)
+    with contextlib.redirect_stdout(io.StringIO()):
+        api = EmbeddingAPI("基准智能体", runtime=runtime)
+        for i in range(scale):
+            api.register_carbon_partner(f"伙伴{i}")
+    return {"api": api, "runtime": runtime, "storage": storage, "partners": scale}
+
+
+def op_quick_start(state, i):
+    with contextlib.redirect_stdout(io.StringIO()):
+        state["api"].quick_start_collaboration(f"伙伴{i % state['partners']}", f"主题{i}", PATTERNS[i % 3])
+
+
+def teardown_quick_start(state):
+    state["runtime"].shutdown()
+    shutil.rmtree(state["storage"], ignore_errors=True)
+
+
+CASES = [
+    BenchmarkCase("voice_registration", setup_voices, op_register_voice, scales=(100, 1000, 10000),
+                  iterations=2000, description="声部注册（规模为已注册声部数）"),
+    BenchmarkCase("path_creation", setup_paths, op_create_path, scales=(100, 1000, 10000),
+                  iterations=2000, description="协同路径创建（规模为已有路径数）"),
+    BenchmarkCase("execute_counterpoint_path", setup_execution, op_execute_path, scales=(2, 5, 10),
+                  iterations=20, warmup=1, rounds=1, teardown=teardown_execution,
+                  description="协同路径执行（规模为步骤数）"),
+    BenchmarkCase("validate", setup_validator, op_validate, scales=(100, 1000, 10000),
+                  iterations=2000, description="对位验证（规模为历史验证数）"),
+    BenchmarkCase("calculate_entropy", setup_entropy, op_calculate_entropy, scales=(100, 1000, 10000),
+                  iterations=2000, description="熵值计算（规模为历史记录数）"),
+    BenchmarkCase("crystal_create", setup_crystal_create, op_create_crystal, scales=(10, 100, 1000),
+                  iterations=200, teardown=teardown_storage,
+                  description="共识晶体创建并落盘（规模为已有晶体数）"),
+    BenchmarkCase("crystal_search", setup_crystal_search, op_search_crystals, scales=(100, 1000, 10000),
+                  iterations=200, teardown=teardown_storage,
+                  description="共识晶体搜索（规模为晶体数）"),
+    BenchmarkCase("quick_start_collaboration", setup_quick_start, op_quick_start, scales=(1, 10, 100),
+                  iterations=20, warmup=1, rounds=1, teardown=teardown_quick_start,
+                  description="端到端快速协同（规模为已注册伙伴数）"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="可复现基准测试")
+    parser.add_argument("--output", default=None, help="结果 JSON 文件路径")
+    parser.add_argument("--baseline", nargs="?", const=DEFAULT_BASELINE, default=None,
+                        help="与之比较的基线 JSON 文件路径（不带值时使用 baselines/default.json）")
+    parser.add_argument("--save-baseline", default=None, help="将本次结果保存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的相对变化（默认 25%%）")
+    parser.add_argument("--min-delta-ms", type=float, default=0.25,
+                        help="判定回退所需的最小单次耗时增量（毫秒）")
+    parser.add_argument("--iterations", type=int, default=None, help="每轮测量次数（不超过用例上限）")
+    parser.add_argument("--rounds", type=int, default=None, help="测量轮数，取最快一轮（默认取用例设置）")
+    parser.add_argument("--only", default=None, help="只运行名称包含该字符串的用例")
+    parser.add_argument("--quick", action="store_true", help="每个用例只运行最小规模")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    cases = [case for case in CASES if not args.only or args.only in case.name]
+    if not cases:
+        parser.error(f"没有名称包含 '{args.only}' 的用例")
+
+    print("=" * 92)
+    print("基准测试")
+    print("=" * 92)
+    print(format_results([]))
+    results = []
+    for case in cases:
+        for scale in (case.scales[:1] if args.quick else case.scales):
+            result = run_case(case, scale, iterations=args.iterations, seed=args.seed, rounds=args.rounds)
+            results.append(result)
+            print(format_results([result]).splitlines()[-1])
+
+    data = results_to_dict(results, seed=args.seed)
+    for path in (args.output, args.save_baseline):
+        if path:
+            save_results(data, path)
+            print(f"\n结果已写入: {path}")
+
+    if args.baseline:
+        comparisons = compare_results(data, load_results(args.baseline), tolerance=args.tolerance,
+                                      min_delta_ms=args.min_delta_ms)
+        regressions = [c for c in comparisons if c["regression"]]
+        print(f"\n与基线比较: {len(comparisons)} 项指标，{len(regressions)} 项回退（容差 {args.tolerance:.0%}）")
+        for c in regressions:
+            print(f"  回退 {c['key']} {c['metric']}: {c['baseline']:.3f} → {c['current']:.3f} ({c['change']:+.0%})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,9 @@ setup(
     python_requires=">=3.8",
     install_requires=[],
     extras_require={
+        "vector": [
+            "numpy>=1.20.0",
+        ],
         "dev": [
             "pytest>=7.0.0",
             "black>=23.0.0",
@@ -0,0 +1,35 @@
+"""
+核心记录的紧凑变体
+功能：集中定义各层数据类的紧凑变体（__slots__，UUID 以整数存储，属性接口与原数据类一致），
+      以及对应的不可变变体；通过 to_record() / from_record() 与原数据类互相转换
+"""
+
+from src.layers.voice_recognition.voice_recognition import Voice
+from src.layers.steady_execution.steady_execution import Task
+from src.layers.consensus_crystal.consensus_crystal import ConsensusCrystal
+from src.layers.counterpoint_design.counterpoint_design import CounterpointPath
+from src.mechanisms.counterpoint_validation import ValidationResult
+from src.mechanisms.entropy_evolution import EntropyData, EvolutionProposal
+from src.utils.compact_record import compact_record
+
+
+CompactVoice = compact_record(Voice, id_fields=("voice_id",))
+FrozenVoice = compact_record(Voice, id_fields=("voice_id",), frozen=True)
+
+CompactTask = compact_record(Task, id_fields=("task_id",))
+FrozenTask = compact_record(Task, id_fields=("task_id",), frozen=True)
+
+CompactConsensusCrystal = compact_record(ConsensusCrystal, id_fields=("crystal_id",))
+FrozenConsensusCrystal = compact_record(ConsensusCrystal, id_fields=("crystal_id",), frozen=True)
+
+CompactCounterpointPath = compact_record(CounterpointPath, id_fields=("path_id",))
+FrozenCounterpointPath = compact_record(CounterpointPath, id_fields=("path_id",), frozen=True)
+
+CompactValidationResult = compact_record(ValidationResult, id_fields=("validation_id", "action_id"))
+FrozenValidationResult = compact_record(ValidationResult, id_fields=("validation_id", "action_id"), frozen=True)
+
+CompactEntropyData = compact_record(EntropyData, id_fields=("entropy_id",))
+FrozenEntropyData = compact_record(EntropyData, id_fields=("entropy_id",), frozen=True)
+
+CompactEvolutionProposal = compact_record(EvolutionProposal, id_fields=("proposal_id",))
+FrozenEvolutionProposal = compact_record(EvolutionProposal, id_fields=("proposal_id",), frozen=True)
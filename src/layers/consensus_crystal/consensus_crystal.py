@@ -4,11 +4,14 @@
 """
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Iterable
 import json
 import uuid
 import time
 import os
+import threading
+import weakref
+from src.utils.metrics import get_registry
 
 
 @dataclass
@@ -33,6 +36,16 @@ class ConsensusCrystal:
     tags: List[str]  # 标签
 
 
+# 批量写入的晶体文件：每行一个晶体
+BATCH_FILE_PREFIX = "batch-"
+BATCH_FILE_SUFFIX = ".jsonl"
+
+# 运行指标：晶体库规模在抓取时汇总所有存活的晶体库
+_live_repositories: "weakref.WeakSet[CrystalRepository]" = weakref.WeakSet()
+CRYSTAL_STORE_SIZE = get_registry().gauge("meta_creation_crystal_store_size", "共识晶体库中的晶体数")
+CRYSTAL_STORE_SIZE.set_function(lambda: sum(len(r.crystals) for r in list(_live_repositories)))
+
+
 class CrystalRepository:
     """
     共识晶体仓库
@@ -49,18 +62,34 @@ class CrystalRepository:
         self.storage_path = storage_path
         self.crystals: Dict[str, ConsensusCrystal] = {}
         
+        # 批量写入的晶体 → 所在批量文件名；批量文件的增删与改写需持锁
+        self._batch_files: Dict[str, str] = {}
+        self._write_lock = threading.Lock()
+        
         # 创建存储目录
         os.makedirs(self.storage_path, exist_ok=True)
         
         # 加载已有的共识晶体
         self._load_crystals()
+        _live_repositories.add(self)
     
     def _load_crystals(self):
         """
-        加载已有的共识晶体
+        加载已有的共识晶体：先加载批量文件，再加载单个晶体文件（晶体更新后写入单个文件，以其为准）
         """
         try:
-            for filename in os.listdir(self.storage_path):
+            filenames = sorted(os.listdir(self.storage_path))
+            for filename in filenames:
+                if filename.startswith(BATCH_FILE_PREFIX) and filename.endswith(BATCH_FILE_SUFFIX):
+                    file_path = os.path.join(self.storage_path, filename)
+                    try:
+                        for data in self._read_batch_file(file_path):
+                            crystal = ConsensusCrystal(**data)
+                            self.crystals[crystal.crystal_id] = crystal
+                            self._batch_files[crystal.crystal_id] = filename
+                    except Exception as e:
+                        print(f"加载晶体文件失败: {file_path} - {str(e)}")
+            for filename in filenames:
                 if filename.endswith(".json"):
                     file_path = os.path.join(self.storage_path, filename)
                     try:
@@ -84,7 +113,8 @@ class CrystalRepository:
                      flow_duration: float,
                      micro_rules: List[str],
                      creation_theme: str,
-                     tags: List[str] = None) -> ConsensusCrystal:
+                     tags: List[str] = None,
+                     persist: bool = True) -> ConsensusCrystal:
         """
         创建共识晶体
         
@@ -100,6 +130,7 @@ class CrystalRepository:
             micro_rules: 发现或验证的微小新规则
             creation_theme: 创作主题
             tags: 标签（可选）
+            persist: 是否立即写入文件；为 False 时晶体立即可查询，由调用方稍后经 write_crystals 批量写入
         
         Returns:
             共识晶体对象
@@ -125,10 +156,96 @@ class CrystalRepository:
         )
         
         self.crystals[crystal_id] = crystal
-        self._save_crystal(crystal)
+        if persist:
+            self._save_crystal(crystal)
         
         return crystal
     
+    def write_crystals(self, crystals: Iterable[ConsensusCrystal]) -> int:
+        """
+        将多个晶体写入同一个批量文件（写入前已被删除的晶体不再落盘）
+        
+        整批晶体只需一次文件创建与替换；之后更新的晶体写入单个文件，加载时以单个文件为准
+        
+        Args:
+            crystals: 共识晶体列表
+        
+        Returns:
+            写入的晶体数量
+        """
+        with self._write_lock:
+            written = [crystal for crystal in crystals if crystal.crystal_id in self.crystals]
+            if not written:
+                return 0
+            filename = f"{BATCH_FILE_PREFIX}{uuid.uuid4()}{BATCH_FILE_SUFFIX}"
+            file_path = os.path.join(self.storage_path, filename)
+            try:
+                self._write_batch_file(file_path, (self._crystal_dict(crystal) for crystal in written))
+            except Exception as e:
+                print(f"批量保存晶体失败: {str(e)}")
+                return 0
+            for crystal in written:
+                self._batch_files[crystal.crystal_id] = filename
+            return len(written)
+    
+    @staticmethod
+    def _read_batch_file(file_path: str) -> List[Dict[str, Any]]:
+        """
+        读取批量文件中的晶体字典
+        """
+        with open(file_path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    
+    @staticmethod
+    def _write_batch_file(file_path: str, records: Iterable[Dict[str, Any]]):
+        """
+        原子写入批量文件：先写临时文件再替换
+        """
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        os.replace(tmp_path, file_path)
+    
+    def _remove_from_batch(self, crystal_id: str):
+        """
+        从所在批量文件中移除晶体，批量文件为空时删除（调用方持有写锁）
+        """
+        filename = self._batch_files.pop(crystal_id, None)
+        if filename is None:
+            return
+        file_path = os.path.join(self.storage_path, filename)
+        try:
+            records = [record for record in self._read_batch_file(file_path)
+                       if record.get("crystal_id") != crystal_id]
+            if records:
+                self._write_batch_file(file_path, records)
+            else:
+                os.remove(file_path)
+        except Exception as e:
+            print(f"删除晶体文件失败: {str(e)}")
+    
+    @staticmethod
+    def _crystal_dict(crystal: ConsensusCrystal) -> Dict[str, Any]:
+        """
+        将共识晶体转换为可序列化的字典
+        """
+        return {
+            "crystal_id": crystal.crystal_id,
+            "name": crystal.name,
+            "description": crystal.description,
+            "participating_voices": crystal.participating_voices,
+            "counterpoint_pattern": crystal.counterpoint_pattern,
+            "steps": crystal.steps,
+            "decision_points": crystal.decision_points,
+            "satisfaction_score": crystal.satisfaction_score,
+            "flow_duration": crystal.flow_duration,
+            "micro_rules": crystal.micro_rules,
+            "creation_theme": crystal.creation_theme,
+            "created_at": crystal.created_at,
+            "updated_at": crystal.updated_at,
+            "tags": crystal.tags
+        }
+    
     def _save_crystal(self, crystal: ConsensusCrystal):
         """
         保存共识晶体到文件
@@ -139,24 +256,7 @@ class CrystalRepository:
         try:
             file_path = os.path.join(self.storage_path, f"{crystal.crystal_id}.json")
             with open(file_path, "w", encoding="utf-8") as f:
-                # 将dataclass转换为字典
-                crystal_dict = {
-                    "crystal_id": crystal.crystal_id,
-                    "name": crystal.name,
-                    "description": crystal.description,
-                    "participating_voices": crystal.participating_voices,
-                    "counterpoint_pattern": crystal.counterpoint_pattern,
-                    "steps": crystal.steps,
-                    "decision_points": crystal.decision_points,
-                    "satisfaction_score": crystal.satisfaction_score,
-                    "flow_duration": crystal.flow_duration,
-                    "micro_rules": crystal.micro_rules,
-                    "creation_theme": crystal.creation_theme,
-                    "created_at": crystal.created_at,
-                    "updated_at": crystal.updated_at,
-                    "tags": crystal.tags
-                }
-                json.dump(crystal_dict, f, ensure_ascii=False, indent=2)
+                json.dump(self._crystal_dict(crystal), f, ensure_ascii=False, indent=2)
         except Exception as e:
             print(f"保存晶体失败: {str(e)}")
     
@@ -261,19 +361,21 @@ class CrystalRepository:
         Returns:
             是否删除成功
         """
-        if crystal_id not in self.crystals:
-            return False
-        
-        # 删除文件
-        file_path = os.path.join(self.storage_path, f"{crystal_id}.json")
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                print(f"删除晶体文件失败: {str(e)}")
-        
-        # 从内存中删除
-        self.crystals.pop(crystal_id)
+        with self._write_lock:
+            if crystal_id not in self.crystals:
+                return False
+            
+            # 删除文件（批量写入的晶体同时从批量文件中移除）
+            file_path = os.path.join(self.storage_path, f"{crystal_id}.json")
+            if os.path.exists(file_path):
+                try:
+                    os.remove(file_path)
+                except Exception as e:
+                    print(f"删除晶体文件失败: {str(e)}")
+            self._remove_from_batch(crystal_id)
+            
+            # 从内存中删除
+            self.crystals.pop(crystal_id)
         
         return True
     
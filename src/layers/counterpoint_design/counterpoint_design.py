@@ -4,9 +4,37 @@
 """
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple, Any, Callable
+from typing import Dict, List, Optional, Tuple, Any, AsyncIterator, Callable, Iterable, Iterator
 import json
+import time
 import uuid
+from src.layers.counterpoint_design.step_template import FrozenStep, freeze_steps, instantiate_steps
+from src.layers.counterpoint_design.path_optimizer import PathOptimizer, StepCostModel
+from src.layers.counterpoint_design.simulator import CounterpointSimulator, SimulationConfig
+from src.utils.bounded_stream import aiterate_in_background, iterate_in_background
+
+
+# 步骤生产函数：producer(step, voice_id, inputs) -> 部分结果的可迭代对象
+StepProducer = Callable[[Dict[str, Any], str, Dict[str, Any]], Iterable[Any]]
+
+
+def simulated_step_producer(step: Dict[str, Any], voice_id: str, inputs: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    模拟步骤生产函数：按 inputs["variants"]（默认1）逐个产出变体
+    
+    Args:
+        step: 路径步骤
+        voice_id: 执行声部ID
+        inputs: 输入参数
+    
+    Returns:
+        部分结果迭代器
+    """
+    for index in range(int(inputs.get("variants", 1))):
+        yield {
+            "message": f"执行步骤 {step.get('step')}: {step['action']}（变体 {index + 1}）",
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
 
 
 @dataclass
@@ -71,6 +99,59 @@ class CounterpointDesigner:
         }
         
         self.counterpoint_paths: Dict[str, CounterpointPath] = {}
+        
+        # 创作类型 → 模式摘要 的索引
+        self._pattern_index: Dict[str, Tuple[Dict[str, str], ...]] = {}
+        # 模式类型 → 冻结的步骤模板，由该模式的所有路径共享；patterns 中的步骤保持原样
+        self._pattern_templates: Dict[str, Tuple[FrozenStep, ...]] = {}
+        self._rebuild_pattern_index()
+        
+        # 路径优化的代价模型与最近一次优化报告
+        self.cost_model = StepCostModel()
+        self.optimization_reports: Dict[str, Dict[str, Any]] = {}
+        
+        # 动作 → 步骤生产函数（流式执行步骤时使用）
+        self.step_producers: Dict[str, StepProducer] = {}
+    
+    def _rebuild_pattern_index(self):
+        """
+        重建创作类型索引，并丢弃已冻结的步骤模板
+        """
+        self._pattern_templates = {}
+        index: Dict[str, List[Dict[str, str]]] = {}
+        for pattern_id, pattern in self.patterns.items():
+            summary = {
+                "pattern_id": pattern_id,
+                "name": pattern["name"],
+                "description": pattern["description"]
+            }
+            for creation_type in pattern["suitable_for"]:
+                index.setdefault(creation_type, []).append(summary)
+        self._pattern_index = {k: tuple(v) for k, v in index.items()}
+    
+    def _pattern_template(self, pattern_type: str) -> Tuple[FrozenStep, ...]:
+        """
+        获取模式的冻结步骤模板；patterns 中的步骤被直接修改后重新冻结
+        """
+        steps = self.patterns[pattern_type]["steps"]
+        template = self._pattern_templates.get(pattern_type)
+        if template is None or template != tuple(steps):
+            template = self._pattern_templates[pattern_type] = freeze_steps(steps)
+        return template
+    
+    def register_pattern(self, pattern_type: str, pattern: Dict[str, Any]):
+        """
+        注册或替换对位模式
+        
+        Args:
+            pattern_type: 模式类型
+            pattern: 模式定义，需包含 name、description、suitable_for、steps
+        """
+        for key in ("name", "description", "suitable_for", "steps"):
+            if key not in pattern:
+                raise ValueError(f"模式定义缺少字段: {key}")
+        self.patterns[pattern_type] = dict(pattern)
+        self._rebuild_pattern_index()
     
     def create_counterpoint_path(self, 
                                 name: str, 
@@ -94,13 +175,20 @@ class CounterpointDesigner:
         if pattern_type not in self.patterns:
             raise ValueError(f"未知的模式类型: {pattern_type}")
         
-        path_id = str(uuid.uuid4())
+        path = self._new_path(name, pattern_type, participating_voices, creation_theme, custom_steps)
+        self.counterpoint_paths[path.path_id] = path
+        return path
+    
+    def _new_path(self, name: str, pattern_type: str, participating_voices: List[str],
+                  creation_theme: str, custom_steps: Optional[List[Dict[str, Any]]]) -> CounterpointPath:
+        """
+        构造路径对象：步骤列表归路径所有，元素与模式模板共享
+        """
         pattern = self.patterns[pattern_type]
+        steps = list(custom_steps) if custom_steps else instantiate_steps(self._pattern_template(pattern_type))
         
-        steps = custom_steps if custom_steps else pattern["steps"]
-        
-        path = CounterpointPath(
-            path_id=path_id,
+        return CounterpointPath(
+            path_id=str(uuid.uuid4()),
             name=name,
             description=pattern["description"],
             pattern_type=pattern_type,
@@ -109,9 +197,32 @@ class CounterpointDesigner:
             creation_theme=creation_theme,
             status="planning"
         )
+    
+    def create_paths_bulk(self, specs: List[Dict[str, Any]]) -> List[CounterpointPath]:
+        """
+        批量创建协同路径
         
-        self.counterpoint_paths[path_id] = path
-        return path
+        先校验全部模式类型，任一无效则不创建任何路径
+        
+        Args:
+            specs: 路径参数列表，每项包含 name、pattern_type、participating_voices、
+                   creation_theme，可选 custom_steps
+        
+        Returns:
+            协同路径对象列表，顺序与 specs 一致
+        """
+        unknown = {spec["pattern_type"] for spec in specs} - self.patterns.keys()
+        if unknown:
+            raise ValueError(f"未知的模式类型: {', '.join(sorted(unknown))}")
+        
+        new_path = self._new_path
+        paths = [
+            new_path(spec["name"], spec["pattern_type"], spec["participating_voices"],
+                     spec["creation_theme"], spec.get("custom_steps"))
+            for spec in specs
+        ]
+        self.counterpoint_paths.update((path.path_id, path) for path in paths)
+        return paths
     
     def get_counterpoint_path(self, path_id: str) -> Optional[CounterpointPath]:
         """
@@ -141,6 +252,27 @@ class CounterpointDesigner:
             return True
         return False
     
+    def update_path_step(self, path_id: str, step_index: int, updates: Dict[str, Any]) -> bool:
+        """
+        修改路径中的单个步骤（写入时复制，不影响模式模板与其他路径）
+        
+        Args:
+            path_id: 路径ID
+            step_index: 步骤索引
+            updates: 需要修改的字段
+        
+        Returns:
+            是否更新成功
+        """
+        path = self.counterpoint_paths.get(path_id)
+        if not path or step_index < 0 or step_index >= len(path.steps):
+            return False
+        
+        step = dict(path.steps[step_index])
+        step.update(updates)
+        path.steps[step_index] = step
+        return True
+    
     def execute_path_step(self, path_id: str, step_index: int, 
                          voice_id: str, 
                          inputs: Dict[str, Any]) -> Dict[str, Any]:
@@ -167,7 +299,6 @@ class CounterpointDesigner:
         
         # 实际实现中应根据步骤类型执行相应的操作
         # 这里仅返回模拟结果
-        import time
         return {
             "success": True,
             "step": step,
@@ -179,6 +310,110 @@ class CounterpointDesigner:
             }
         }
     
+    def register_step_producer(self, action: str, producer: StepProducer):
+        """
+        注册步骤生产函数，流式执行该动作的步骤时使用
+        
+        Args:
+            action: 步骤动作（如"生成百种变体"）
+            producer: 步骤生产函数 producer(step, voice_id, inputs) -> 部分结果的可迭代对象
+        """
+        self.step_producers[action] = producer
+    
+    def _step_stream_factory(self, path_id: str, step_index: int, voice_id: str,
+                             inputs: Dict[str, Any],
+                             producer: Optional[StepProducer]) -> Tuple[Optional[Dict[str, Any]], Any]:
+        """
+        解析流式执行的步骤与生产函数
+        
+        Returns:
+            (错误字典或None, 生成部分结果的无参函数)
+        """
+        path = self.counterpoint_paths.get(path_id)
+        if not path:
+            return {"error": "路径不存在"}, None
+        if step_index < 0 or step_index >= len(path.steps):
+            return {"error": "步骤索引超出范围"}, None
+        
+        step = path.steps[step_index]
+        producer = producer or self.step_producers.get(step["action"], simulated_step_producer)
+        return None, lambda: producer(step, voice_id, inputs)
+    
+    def stream_path_step(self, path_id: str, step_index: int,
+                         voice_id: str,
+                         inputs: Dict[str, Any],
+                         producer: Optional[StepProducer] = None,
+                         buffer_size: int = 16) -> Iterator[Dict[str, Any]]:
+        """
+        流式执行路径步骤：部分结果一产生即返回，无需等待整个步骤完成
+        
+        生产函数在后台线程运行，最多领先消费者 buffer_size 个结果；提前停止迭代时生产函数
+        随之停止
+        
+        Args:
+            path_id: 路径ID
+            step_index: 步骤索引
+            voice_id: 执行声部ID
+            inputs: 输入参数
+            producer: 步骤生产函数（可选，默认按动作查找已注册的生产函数，其次为模拟生产）
+            buffer_size: 缓冲区容量
+        
+        Returns:
+            事件迭代器：{"type": "partial", "index", "output"}，最后为
+            {"type": "done", "count", "first_output_latency", "elapsed"}；路径或步骤无效时
+            仅产出一个错误字典
+        """
+        error, factory = self._step_stream_factory(path_id, step_index, voice_id, inputs, producer)
+        if error:
+            yield error
+            return
+        
+        start = time.perf_counter()
+        first_latency = None
+        count = 0
+        for output in iterate_in_background(factory, buffer_size):
+            if first_latency is None:
+                first_latency = time.perf_counter() - start
+            yield {"type": "partial", "index": count, "voice_id": voice_id, "output": output}
+            count += 1
+        yield {"type": "done", "count": count, "first_output_latency": first_latency,
+               "elapsed": time.perf_counter() - start}
+    
+    async def astream_path_step(self, path_id: str, step_index: int,
+                                voice_id: str,
+                                inputs: Dict[str, Any],
+                                producer: Optional[StepProducer] = None,
+                                buffer_size: int = 16) -> AsyncIterator[Dict[str, Any]]:
+        """
+        stream_path_step 的异步版本，生产函数在后台线程运行，不阻塞事件循环
+        
+        Args:
+            path_id: 路径ID
+            step_index: 步骤索引
+            voice_id: 执行声部ID
+            inputs: 输入参数
+            producer: 步骤生产函数（可选）
+            buffer_size: 缓冲区容量
+        
+        Returns:
+            与 stream_path_step 相同的事件异步迭代器
+        """
+        error, factory = self._step_stream_factory(path_id, step_index, voice_id, inputs, producer)
+        if error:
+            yield error
+            return
+        
+        start = time.perf_counter()
+        first_latency = None
+        count = 0
+        async for output in aiterate_in_background(factory, buffer_size):
+            if first_latency is None:
+                first_latency = time.perf_counter() - start
+            yield {"type": "partial", "index": count, "voice_id": voice_id, "output": output}
+            count += 1
+        yield {"type": "done", "count": count, "first_output_latency": first_latency,
+               "elapsed": time.perf_counter() - start}
+    
     def get_suitable_patterns(self, creation_type: str) -> List[Dict[str, Any]]:
         """
         获取适合特定创作类型的模式
@@ -189,15 +424,7 @@ class CounterpointDesigner:
         Returns:
             适合的模式列表
         """
-        suitable_patterns = []
-        for pattern_id, pattern in self.patterns.items():
-            if creation_type in pattern["suitable_for"]:
-                suitable_patterns.append({
-                    "pattern_id": pattern_id,
-                    "name": pattern["name"],
-                    "description": pattern["description"]
-                })
-        return suitable_patterns
+        return [dict(summary) for summary in self._pattern_index.get(creation_type, ())]
     
     def validate_counterpoint_path(self, path: CounterpointPath) -> Tuple[bool, str]:
         """
@@ -231,12 +458,38 @@ class CounterpointDesigner:
         """
         return self.counterpoint_paths
     
-    def optimize_counterpoint_path(self, path_id: str) -> CounterpointPath:
+    def observe_execution(self, executor: Any, limit: int = 1000) -> int:
+        """
+        从静定执行器的任务历史更新代价模型
+        
+        Args:
+            executor: 静定执行器（需提供 get_step_observations）
+            limit: 导入的观测数量上限
+        
+        Returns:
+            导入的观测数量
+        """
+        return self.cost_model.observe_history(executor.get_step_observations(limit))
+    
+    def optimize_counterpoint_path(self, path_id: str, 
+                                   executor: Any = None,
+                                   silicon_voices: Optional[List[str]] = None,
+                                   max_carbon_interruptions: Optional[int] = None) -> CounterpointPath:
         """
         优化协同路径
         
+        以代价模型预测完成时间，重排互不依赖的步骤（由步骤的 depends_on 声明，未声明时
+        依赖前一步）、合并相邻同角色步骤、将互不依赖的硅基步骤并行分配给多个硅基声部；
+        遵循"寂"原则，碳基打扰次数不超过原路径（或给定上限）。仅在预测完成时间缩短或
+        打扰次数减少时改写路径步骤，报告可通过 get_optimization_report 获取。
+        改写后的并行步骤（parallel）由 SteadyExecutor.execute_counterpoint_path 按分支扇出为独立任务执行
+        
         Args:
             path_id: 路径ID
+            executor: 静定执行器（可选），提供时先以其任务历史更新代价模型
+            silicon_voices: 可用硅基声部（默认为代价模型观测到的硅基声部，
+                            其次为参与声部中除首个碳基声部外的其他声部）
+            max_carbon_interruptions: 碳基打扰次数上限（可选）
         
         Returns:
             优化后的协同路径
@@ -245,36 +498,134 @@ class CounterpointDesigner:
         if not path:
             raise ValueError(f"路径不存在: {path_id}")
         
-        # 实际实现中应包含优化逻辑
-        # 这里仅返回原路径
+        if executor is not None:
+            self.observe_execution(executor)
+        
+        if silicon_voices is None:
+            known = set(self.cost_model.known_voices("silicon"))
+            silicon_voices = [v for v in path.participating_voices if v in known] \
+                or path.participating_voices[1:] or ["silicon"]
+        
+        optimizer = PathOptimizer(self.cost_model)
+        report = optimizer.optimize(path.steps, silicon_voices, max_carbon_interruptions)
+        
+        improved = (report["makespan_after"] < report["makespan_before"]
+                    or report["interruptions_after"] < report["interruptions_before"])
+        if improved:
+            path.steps = report["steps"]
+        report["applied"] = improved
+        self.optimization_reports[path_id] = report
         return path
     
-    def simulate_counterpoint_execution(self, path_id: str) -> List[Dict[str, Any]]:
+    def get_optimization_report(self, path_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取路径最近一次优化的报告
+        
+        Args:
+            path_id: 路径ID
+        
+        Returns:
+            优化报告，包含预测完成时间与碳基打扰次数的前后对比，不存在则返回None
+        """
+        return self.optimization_reports.get(path_id)
+    
+    def _simulation_config(self, config: Optional[SimulationConfig]) -> SimulationConfig:
+        """
+        获取模拟配置：未指定时以代价模型的观测均值构建
+        """
+        return config or SimulationConfig.from_cost_model(self.cost_model)
+    
+    def simulate_counterpoint_execution(self, path_id: str, 
+                                        config: Optional[SimulationConfig] = None) -> List[Dict[str, Any]]:
         """
         模拟协同路径执行
         
         Args:
             path_id: 路径ID
+            config: 模拟配置（可选，默认由代价模型构建）
         
         Returns:
-            执行模拟结果
+            执行模拟结果，每个步骤包含模拟的开始、结束时间与排队等待时间（秒）
         """
         path = self.counterpoint_paths.get(path_id)
         if not path:
             return [{"error": "路径不存在"}]
         
+        report = CounterpointSimulator(self._simulation_config(config)).run([path.steps], trace=True)
+        spans: Dict[int, List[Dict[str, Any]]] = {}
+        for record in report["trace"]:
+            spans.setdefault(record["stage"], []).append(record)
+        
         simulation_results = []
         for i, step in enumerate(path.steps):
+            records = spans.get(i, [])
+            start = min((r["start"] for r in records), default=0.0)
+            end = max((r["end"] for r in records), default=0.0)
             simulation_results.append({
                 "step": i + 1,
                 "action": step["action"],
                 "role": step["role"],
                 "status": "completed",
-                "result": f"模拟执行: {step['action']}"
+                "result": f"模拟执行: {step['action']}",
+                "start": start,
+                "end": end,
+                "duration": end - start,
+                "wait": sum(r["start"] - r["ready"] for r in records)
             })
         
         return simulation_results
     
+    def simulate_paths(self, path_ids: List[str], 
+                       sessions_per_path: int = 1,
+                       config: Optional[SimulationConfig] = None,
+                       arrival_interval: float = 0.0) -> Dict[str, Any]:
+        """
+        模拟多条路径并发执行
+        
+        Args:
+            path_ids: 路径ID列表
+            sessions_per_path: 每条路径的会话数
+            config: 模拟配置（可选，默认由代价模型构建）
+            arrival_interval: 相邻会话的到达间隔（秒），0表示同时到达
+        
+        Returns:
+            模拟报告，包含完成时间分位数、排队等待、声部池利用率等
+        """
+        paths = []
+        for path_id in path_ids:
+            path = self.counterpoint_paths.get(path_id)
+            if not path:
+                raise ValueError(f"路径不存在: {path_id}")
+            paths.extend([path.steps] * sessions_per_path)
+        
+        arrivals = [i * arrival_interval for i in range(len(paths))]
+        return CounterpointSimulator(self._simulation_config(config)).run(paths, arrivals)
+    
+    def plan_voice_capacity(self, path_id: str, sessions: int, target_makespan: float,
+                            role: str = "silicon",
+                            config: Optional[SimulationConfig] = None,
+                            q: float = 95) -> Optional[Dict[str, Any]]:
+        """
+        容量规划：N 个并发会话下满足完成时间目标所需的最少声部数量
+        
+        Args:
+            path_id: 路径ID
+            sessions: 并发会话数
+            target_makespan: 完成时间目标（秒）
+            role: 规划的共享声部角色
+            config: 模拟配置（可选，默认由代价模型构建）
+            q: 目标所针对的完成时间百分位（50、95 或 99）
+        
+        Returns:
+            {"voices": 声部数量, "makespan": 完成时间, "report": 模拟报告}，无法满足时返回None
+        """
+        path = self.counterpoint_paths.get(path_id)
+        if not path:
+            raise ValueError(f"路径不存在: {path_id}")
+        
+        simulator = CounterpointSimulator(self._simulation_config(config))
+        return simulator.plan_capacity([path.steps] * sessions, target_makespan, role=role, q=q)
+    
     def generate_counterpoint_visualization(self, path_id: str) -> str:
         """
         生成协同路径可视化
@@ -0,0 +1,448 @@
+"""
+路径优化 (Path Optimizer)
+功能：基于观测到的步骤耗时与声部吞吐构建代价模型，在"寂"约束（不增加对碳基的打扰次数）下
+      重排独立步骤、合并相邻同角色步骤、并行化硅基扇出，使预测的完成时间最短
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# 无观测数据时各角色的默认步骤耗时（秒）
+DEFAULT_ROLE_DURATIONS: Dict[str, float] = {
+    "carbon": 60.0,
+    "silicon": 10.0,
+}
+
+# 阶段切换（交接）开销（秒）
+DEFAULT_HANDOFF_COST = 2.0
+
+
+def step_dependencies(steps: Sequence[Dict[str, Any]]) -> List[Tuple[int, ...]]:
+    """
+    解析步骤依赖
+
+    步骤可通过 depends_on 声明所依赖的步骤编号（step 字段）；未声明时依赖前一步，
+    即保持原有的顺序语义
+
+    Args:
+        steps: 步骤列表
+
+    Returns:
+        每个步骤所依赖的步骤下标
+    """
+    index_of = {}
+    for index, step in enumerate(steps):
+        index_of.setdefault(step.get("step", index + 1), index)
+
+    dependencies = []
+    for index, step in enumerate(steps):
+        declared = step.get("depends_on")
+        if declared is None:
+            dependencies.append((index - 1,) if index > 0 else ())
+            continue
+        resolved = []
+        for number in declared:
+            if number not in index_of:
+                raise ValueError(f"步骤 {step.get('step', index + 1)} 依赖不存在的步骤: {number}")
+            resolved.append(index_of[number])
+        dependencies.append(tuple(resolved))
+    return dependencies
+
+
+class StepCostModel:
+    """
+    步骤代价模型
+    按 (角色, 动作) 与角色统计平均耗时，按声部统计相对吞吐（耗时倍率）
+    """
+
+    def __init__(self, role_durations: Optional[Dict[str, float]] = None,
+                 handoff_cost: float = DEFAULT_HANDOFF_COST):
+        """
+        初始化代价模型
+
+        Args:
+            role_durations: 无观测数据时的角色默认耗时
+            handoff_cost: 阶段切换开销
+        """
+        self.role_durations = dict(DEFAULT_ROLE_DURATIONS)
+        if role_durations:
+            self.role_durations.update(role_durations)
+        self.handoff_cost = handoff_cost
+
+        self._action_stats: Dict[Tuple[str, str], List[float]] = {}  # [总耗时, 次数]
+        self._role_stats: Dict[str, List[float]] = {}
+        self._voice_stats: Dict[str, List[float]] = {}  # [耗时/角色均值之和, 次数]
+        self._voice_roles: Dict[str, str] = {}
+
+    def observe(self, role: str, action: str, duration: float, voice_id: str = ""):
+        """
+        记录一次步骤执行
+
+        Args:
+            role: 角色
+            action: 动作
+            duration: 耗时（秒）
+            voice_id: 执行声部ID
+        """
+        if duration is None or duration < 0:
+            return
+        for stats, key in ((self._action_stats, (role, action)), (self._role_stats, role)):
+            entry = stats.setdefault(key, [0.0, 0])
+            entry[0] += duration
+            entry[1] += 1
+
+        if voice_id:
+            baseline = self.step_duration({"role": role, "action": action})
+            if baseline > 0:
+                entry = self._voice_stats.setdefault(voice_id, [0.0, 0])
+                entry[0] += duration / baseline
+                entry[1] += 1
+            self._voice_roles[voice_id] = role
+
+    def observe_history(self, observations: Iterable[Dict[str, Any]]) -> int:
+        """
+        批量导入执行观测
+
+        Args:
+            observations: 观测列表，每项包含 role、action、duration，可选 voice_id
+
+        Returns:
+            导入的观测数量
+        """
+        count = 0
+        for item in observations:
+            self.observe(item.get("role", ""), item.get("action", ""),
+                         item.get("duration"), item.get("voice_id", ""))
+            count += 1
+        return count
+
+    def step_duration(self, step: Dict[str, Any]) -> float:
+        """
+        预测单个步骤的耗时
+
+        Args:
+            step: 步骤
+
+        Returns:
+            预测耗时（秒）
+        """
+        merged = step.get("merged_from")
+        if merged:
+            return sum(self.step_duration(sub) for sub in merged)
+        parallel = step.get("parallel")
+        if parallel:
+            return max(self.step_duration(branch) for branch in parallel)
+
+        role = step.get("role", "")
+        entry = self._action_stats.get((role, step.get("action", "")))
+        if entry and entry[1]:
+            return entry[0] / entry[1]
+        entry = self._role_stats.get(role)
+        if entry and entry[1]:
+            return entry[0] / entry[1]
+        return self.role_durations.get(role, max(self.role_durations.values()))
+
+    def voice_factor(self, voice_id: str) -> float:
+        """
+        声部耗时倍率：小于1表示该声部快于同角色平均水平
+
+        Args:
+            voice_id: 声部ID
+
+        Returns:
+            耗时倍率
+        """
+        entry = self._voice_stats.get(voice_id)
+        if entry and entry[1]:
+            return entry[0] / entry[1]
+        return 1.0
+
+    def roles(self) -> List[str]:
+        """
+        获取已知角色（默认配置与观测中出现的角色）
+
+        Returns:
+            角色列表
+        """
+        return list(dict.fromkeys(list(self.role_durations) + list(self._role_stats)))
+
+    def action_means(self) -> Dict[Tuple[str, str], float]:
+        """
+        获取观测到的各 (角色, 动作) 平均耗时
+
+        Returns:
+            {(角色, 动作): 平均耗时}
+        """
+        return {key: entry[0] / entry[1] for key, entry in self._action_stats.items() if entry[1]}
+
+    def known_voices(self, role: str) -> List[str]:
+        """
+        获取观测中执行过指定角色步骤的声部
+
+        Args:
+            role: 角色
+
+        Returns:
+            声部ID列表
+        """
+        return [voice_id for voice_id, voice_role in self._voice_roles.items() if voice_role == role]
+
+
+def build_stages(order: Sequence[int], steps: Sequence[Dict[str, Any]],
+                 dependencies: Sequence[Tuple[int, ...]]) -> List[Dict[str, Any]]:
+    """
+    将步骤执行顺序划分为阶段
+
+    相邻同角色步骤归入同一阶段（一次交接、一次打扰）；硅基阶段内互不依赖的步骤
+    组成并行单元，依赖阶段内单个单元的步骤接在该单元之后
+
+    Args:
+        order: 步骤下标顺序
+        steps: 步骤列表
+        dependencies: 步骤依赖
+
+    Returns:
+        阶段列表，每个阶段为 {"role": 角色, "units": [[步骤下标...], ...]}
+    """
+    stages: List[Dict[str, Any]] = []
+    unit_of: Dict[int, int] = {}
+    for index in order:
+        role = steps[index].get("role", "")
+        stage = stages[-1] if stages else None
+        if stage is None or stage["role"] != role:
+            stages.append({"role": role, "units": [[index]]})
+            unit_of = {index: 0}
+            continue
+
+        if role != "silicon":
+            stage["units"][0].append(index)
+            unit_of[index] = 0
+            continue
+
+        units = {unit_of[dep] for dep in dependencies[index] if dep in unit_of}
+        if not units:
+            unit_of[index] = len(stage["units"])
+            stage["units"].append([index])
+        elif len(units) == 1:
+            unit = units.pop()
+            stage["units"][unit].append(index)
+            unit_of[index] = unit
+        else:
+            # 汇合多个并行单元的步骤开启新阶段
+            stages.append({"role": role, "units": [[index]]})
+            unit_of = {index: 0}
+    return stages
+
+
+def sequential_stages(steps: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    逐步顺序执行的阶段划分（优化前的执行方式）
+
+    Args:
+        steps: 步骤列表
+
+    Returns:
+        阶段列表，每个步骤一个阶段
+    """
+    return [{"role": step.get("role", ""), "units": [[index]]} for index, step in enumerate(steps)]
+
+
+class PathOptimizer:
+    """
+    路径优化器
+    枚举满足依赖的步骤顺序（优先延续同角色，超出上限后停止枚举），以代价模型预测完成时间并择优
+    """
+
+    def __init__(self, cost_model: Optional[StepCostModel] = None, max_orders: int = 5000):
+        """
+        初始化路径优化器
+
+        Args:
+            cost_model: 代价模型
+            max_orders: 枚举的步骤顺序上限
+        """
+        self.cost_model = cost_model or StepCostModel()
+        self.max_orders = max_orders
+
+    def stage_duration(self, stage: Dict[str, Any], steps: Sequence[Dict[str, Any]],
+                       silicon_voices: Sequence[str]) -> float:
+        """
+        预测阶段耗时：硅基并行单元按最长处理时间优先分配给最先空闲的声部
+
+        Args:
+            stage: 阶段
+            steps: 步骤列表
+            silicon_voices: 可用硅基声部
+
+        Returns:
+            预测耗时（秒）
+        """
+        model = self.cost_model
+        durations = sorted((sum(model.step_duration(steps[i]) for i in unit) for unit in stage["units"]),
+                           reverse=True)
+        if stage["role"] != "silicon":
+            return sum(durations)
+
+        factors = sorted(model.voice_factor(v) for v in silicon_voices) or [1.0]
+        if len(durations) == 1:
+            return durations[0] * factors[0]
+        finish = [0.0] * len(factors)
+        for duration in durations:
+            # 选择加入该单元后完成最早的声部
+            best = min(range(len(factors)), key=lambda k: finish[k] + duration * factors[k])
+            finish[best] += duration * factors[best]
+        return max(finish)
+
+    def predict(self, order: Sequence[int], steps: Sequence[Dict[str, Any]],
+                dependencies: Sequence[Tuple[int, ...]],
+                silicon_voices: Sequence[str]) -> Tuple[float, int, List[Dict[str, Any]]]:
+        """
+        预测某一顺序的完成时间
+
+        Args:
+            order: 步骤下标顺序
+            steps: 步骤列表
+            dependencies: 步骤依赖
+            silicon_voices: 可用硅基声部
+
+        Returns:
+            (预测完成时间, 碳基打扰次数, 阶段列表)
+        """
+        stages = build_stages(order, steps, dependencies)
+        makespan, interruptions = self.evaluate(stages, steps, silicon_voices)
+        return makespan, interruptions, stages
+
+    def evaluate(self, stages: Sequence[Dict[str, Any]], steps: Sequence[Dict[str, Any]],
+                 silicon_voices: Sequence[str]) -> Tuple[float, int]:
+        """
+        预测给定阶段划分的完成时间
+
+        Args:
+            stages: 阶段列表
+            steps: 步骤列表
+            silicon_voices: 可用硅基声部
+
+        Returns:
+            (预测完成时间, 碳基打扰次数)
+        """
+        makespan = sum(self.stage_duration(stage, steps, silicon_voices) for stage in stages)
+        makespan += self.cost_model.handoff_cost * max(len(stages) - 1, 0)
+        interruptions = sum(1 for stage in stages if stage["role"] == "carbon")
+        return makespan, interruptions
+
+    def _orders(self, steps: Sequence[Dict[str, Any]],
+                dependencies: Sequence[Tuple[int, ...]]) -> Iterable[List[int]]:
+        """
+        枚举满足依赖的步骤顺序，同等条件下优先延续当前角色；超出上限后不再产生
+        """
+        count = len(steps)
+        remaining = [len(deps) for deps in dependencies]
+        dependents: List[List[int]] = [[] for _ in range(count)]
+        for index, deps in enumerate(dependencies):
+            for dep in deps:
+                dependents[dep].append(index)
+
+        order: List[int] = []
+        produced = 0
+
+        def visit(ready: List[int]):
+            nonlocal produced
+            if produced >= self.max_orders:
+                return
+            if len(order) == count:
+                produced += 1
+                yield list(order)
+                return
+            last_role = steps[order[-1]].get("role") if order else None
+            candidates = sorted(ready, key=lambda i: (steps[i].get("role") != last_role, i))
+            for index in candidates:
+                order.append(index)
+                next_ready = [i for i in ready if i != index]
+                for dependent in dependents[index]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        next_ready.append(dependent)
+                yield from visit(next_ready)
+                for dependent in dependents[index]:
+                    remaining[dependent] += 1
+                order.pop()
+
+        yield from visit([i for i in range(count) if remaining[i] == 0])
+
+    def optimize(self, steps: Sequence[Dict[str, Any]], silicon_voices: Sequence[str],
+                 max_carbon_interruptions: Optional[int] = None) -> Dict[str, Any]:
+        """
+        优化步骤序列
+
+        Args:
+            steps: 原步骤列表
+            silicon_voices: 可用硅基声部
+            max_carbon_interruptions: 碳基打扰次数上限（默认不超过原路径）
+
+        Returns:
+            优化报告，包含 steps（优化后的步骤）、makespan_before、makespan_after、
+            interruptions_before、interruptions_after、stages
+        """
+        dependencies = step_dependencies(steps)
+        # 原路径由执行器逐步顺序执行：每个步骤自成一个阶段
+        base_stages = sequential_stages(steps)
+        base_makespan, base_interruptions = self.evaluate(base_stages, steps, silicon_voices)
+        limit = base_interruptions if max_carbon_interruptions is None else max_carbon_interruptions
+
+        best = (base_makespan, base_interruptions, base_stages)
+        best_key = (base_interruptions > limit, base_interruptions if base_interruptions > limit else 0,
+                    base_makespan)
+        for order in self._orders(steps, dependencies):
+            makespan, interruptions, stages = self.predict(order, steps, dependencies, silicon_voices)
+            # 优先满足"寂"约束，其次完成时间最短
+            key = (interruptions > limit, interruptions if interruptions > limit else 0, makespan)
+            if key < best_key:
+                best, best_key = (makespan, interruptions, stages), key
+
+        makespan, interruptions, stages = best
+        return {
+            "steps": self._materialize(stages, steps),
+            "stages": stages,
+            "makespan_before": base_makespan,
+            "makespan_after": makespan,
+            "interruptions_before": base_interruptions,
+            "interruptions_after": interruptions,
+        }
+
+    def _materialize(self, stages: List[Dict[str, Any]],
+                     steps: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        将阶段转换为可执行的步骤列表：每个阶段一个步骤，合并或并行的原步骤记录在
+        merged_from / parallel 字段中
+        """
+        result: List[Dict[str, Any]] = []
+        for number, stage in enumerate(stages, start=1):
+            units = stage["units"]
+            if len(units) == 1 and len(units[0]) == 1:
+                step = dict(steps[units[0][0]])
+                step.pop("depends_on", None)
+                step["step"] = number
+                result.append(step)
+                continue
+
+            def merged(unit):
+                if len(unit) == 1:
+                    return dict(steps[unit[0]])
+                return {
+                    "role": stage["role"],
+                    "action": "；".join(steps[i]["action"] for i in unit),
+                    "merged_from": [dict(steps[i]) for i in unit]
+                }
+
+            if len(units) == 1:
+                step = merged(units[0])
+            else:
+                branches = [merged(unit) for unit in units]
+                step = {
+                    "role": stage["role"],
+                    "action": "并行: " + " | ".join(branch["action"] for branch in branches),
+                    "parallel": branches
+                }
+            step["step"] = number
+            result.append(step)
+        return result
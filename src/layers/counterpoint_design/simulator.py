@@ -0,0 +1,452 @@
+"""
+协同执行模拟 (Counterpoint Simulator)
+功能：离散事件模拟协同路径的执行，支持按角色配置的延迟分布、执行器排队与并发上限、
+      共享/专属声部池，用于部署前的容量规划
+"""
+
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+import heapq
+import math
+import random
+import time
+
+
+def default_role_latency() -> Dict[str, Dict[str, Any]]:
+    """
+    默认的角色延迟分布（秒）
+    """
+    return {
+        "carbon": {"dist": "lognormal", "mean": 60.0, "sigma": 0.3},
+        "silicon": {"dist": "lognormal", "mean": 10.0, "sigma": 0.3},
+    }
+
+
+@dataclass
+class SimulationConfig:
+    """模拟配置"""
+    # 角色 → 延迟分布；分布格式见 make_sampler
+    role_latency: Dict[str, Dict[str, Any]] = field(default_factory=default_role_latency)
+    # (角色, 动作) → 延迟分布，优先于角色分布
+    action_latency: Dict[Tuple[str, str], Dict[str, Any]] = field(default_factory=dict)
+    # 未配置角色的延迟分布
+    default_latency: Dict[str, Any] = field(default_factory=lambda: {"dist": "constant", "value": 1.0})
+    # 共享声部池：角色 → 声部数量（未列出且非专属的角色不受限）
+    voice_pools: Dict[str, int] = field(default_factory=lambda: {"silicon": 4})
+    # 每个会话独占一个声部的角色（如担任指挥的碳基伙伴）
+    dedicated_roles: Tuple[str, ...] = ("carbon",)
+    # 执行器并发上限（与 SteadyExecutor.max_concurrent_tasks 对应，None 为不限）
+    max_concurrent_tasks: Optional[int] = 5
+    # 执行器调度延迟（秒）
+    dispatch_latency: float = 0.0
+    # 阶段之间的交接延迟分布
+    handoff: Dict[str, Any] = field(default_factory=lambda: {"dist": "constant", "value": 0.0})
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_cost_model(cls, cost_model: Any, sigma: float = 0.25, **overrides: Any) -> "SimulationConfig":
+        """
+        以路径优化的代价模型均值构建对数正态延迟配置
+
+        Args:
+            cost_model: 代价模型（StepCostModel）
+            sigma: 对数正态分布的形状参数
+            **overrides: 其他配置项
+
+        Returns:
+            模拟配置
+        """
+        role_latency = {
+            role: {"dist": "lognormal", "mean": cost_model.step_duration({"role": role}), "sigma": sigma}
+            for role in cost_model.roles()
+        }
+        action_latency = {
+            key: {"dist": "lognormal", "mean": mean, "sigma": sigma}
+            for key, mean in cost_model.action_means().items()
+        }
+        config = cls(role_latency=role_latency, action_latency=action_latency)
+        for key, value in overrides.items():
+            setattr(config, key, value)
+        return config
+
+
+def make_variate(spec: Dict[str, Any]) -> Callable[[random.Random], float]:
+    """
+    根据分布定义创建以随机数生成器为参数的采样函数
+
+    支持的分布：
+        constant(value)、exponential(mean)、uniform(low, high)、
+        normal(mean, std，截断于0)、lognormal(mean, sigma，mean 为分布均值)
+
+    Args:
+        spec: 分布定义
+
+    Returns:
+        从给定随机数生成器抽取非负耗时的采样函数
+    """
+    dist = spec.get("dist", "constant")
+    if dist == "constant":
+        value = float(spec.get("value", spec.get("mean", 0.0)))
+        return lambda rng: value
+    if dist == "exponential":
+        rate = 1.0 / float(spec["mean"])
+        return lambda rng: rng.expovariate(rate)
+    if dist == "uniform":
+        low, high = float(spec["low"]), float(spec["high"])
+        return lambda rng: rng.uniform(low, high)
+    if dist == "normal":
+        mean, std = float(spec["mean"]), float(spec["std"])
+        return lambda rng: max(rng.gauss(mean, std), 0.0)
+    if dist == "lognormal":
+        sigma = float(spec.get("sigma", 0.25))
+        mu = math.log(float(spec["mean"])) - sigma * sigma / 2
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"未知的延迟分布: {dist}")
+
+
+def make_sampler(spec: Dict[str, Any], rng: random.Random) -> Callable[[], float]:
+    """
+    根据分布定义创建绑定随机数生成器的采样函数
+
+    Args:
+        spec: 分布定义（格式见 make_variate）
+        rng: 随机数生成器
+
+    Returns:
+        返回非负耗时的采样函数
+    """
+    variate = make_variate(spec)
+    return lambda: variate(rng)
+
+
+def expand_steps(steps: Sequence[Dict[str, Any]]) -> List[List[List[Dict[str, Any]]]]:
+    """
+    将步骤展开为阶段 → 并行单元 → 顺序子步骤
+
+    parallel 字段中的分支并行执行，merged_from 字段中的子步骤由同一声部顺序执行
+
+    Args:
+        steps: 步骤列表
+
+    Returns:
+        展开后的阶段列表
+    """
+    def unit(step):
+        return list(step["merged_from"]) if step.get("merged_from") else [step]
+
+    stages = []
+    for step in steps:
+        if step.get("parallel"):
+            stages.append([unit(branch) for branch in step["parallel"]])
+        else:
+            stages.append([unit(step)])
+    return stages
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    计算百分位数（最近秩法）
+
+    Args:
+        values: 已排序的数值
+        q: 百分位（0-100）
+
+    Returns:
+        百分位数
+    """
+    if not values:
+        return 0.0
+    rank = max(int(math.ceil(q / 100.0 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class _Resource:
+    """声部资源：容量、占用数与等待队列"""
+
+    __slots__ = ("capacity", "busy", "queue", "busy_time")
+
+    def __init__(self, capacity: float):
+        self.capacity = capacity
+        self.busy = 0
+        self.queue: Deque["_Task"] = deque()
+        self.busy_time = 0.0
+
+
+class _Task:
+    """一个并行单元对应的执行任务"""
+
+    __slots__ = ("seq", "session", "stage", "role", "substeps", "resource", "ready", "duration", "start", "end")
+
+    def __init__(self, seq, session, stage, role, substeps, resource, ready, duration):
+        self.seq = seq
+        self.session = session
+        self.stage = stage
+        self.role = role
+        self.substeps = substeps
+        self.resource = resource
+        self.ready = ready
+        self.duration = duration
+        self.start = 0.0
+        self.end = 0.0
+
+
+class _Session:
+    """一次路径执行会话（持有独立的随机数流，采样结果与调度顺序无关）"""
+
+    __slots__ = ("index", "stages", "stage", "pending", "arrival", "finish", "wait", "rng")
+
+    def __init__(self, index, stages, arrival, rng):
+        self.index = index
+        self.stages = stages
+        self.rng = rng
+        self.stage = -1
+        self.pending = 0
+        self.arrival = arrival
+        self.finish = None
+        self.wait = 0.0
+
+
+class CounterpointSimulator:
+    """
+    协同执行模拟器
+    以事件堆推进模拟时钟：任务就绪后进入所需声部的等待队列，执行器有空闲并发槽位且
+    声部空闲时开始执行；一个阶段的全部并行单元完成后（经交接延迟）进入下一阶段
+    """
+
+    ARRIVE, READY, DONE = 0, 1, 2
+
+    def __init__(self, config: Optional[SimulationConfig] = None):
+        """
+        初始化模拟器
+
+        Args:
+            config: 模拟配置
+        """
+        self.config = config or SimulationConfig()
+
+    def run(self, paths: Sequence[Sequence[Dict[str, Any]]],
+            arrivals: Optional[Sequence[float]] = None,
+            trace: bool = False) -> Dict[str, Any]:
+        """
+        模拟一批路径的执行
+
+        Args:
+            paths: 每个会话的步骤列表
+            arrivals: 每个会话的到达时间（默认全部在0时刻到达）
+            trace: 是否记录每个任务的执行明细
+
+        Returns:
+            模拟报告
+        """
+        config = self.config
+        # 主随机数生成器只按会话顺序派生各会话的种子；会话内的耗时在阶段开始时按单元顺序
+        # 从会话自己的随机数流抽取，因此同一种子下的采样不受声部数量与调度顺序影响
+        rng = random.Random(config.seed)
+        wall_start = time.perf_counter()
+
+        variates: Dict[Any, Callable[[random.Random], float]] = {}
+
+        def variate_for(role: str, action: str) -> Callable[[random.Random], float]:
+            key = (role, action)
+            variate = variates.get(key)
+            if variate is None:
+                spec = config.action_latency.get(key) or config.role_latency.get(role) or config.default_latency
+                variate = variates[key] = make_variate(spec)
+            return variate
+
+        handoff = make_variate(config.handoff)
+        executor_capacity = math.inf if config.max_concurrent_tasks is None else config.max_concurrent_tasks
+        dispatch_latency = config.dispatch_latency
+        dedicated = set(config.dedicated_roles)
+
+        resources: Dict[Any, _Resource] = {
+            role: _Resource(float(count)) for role, count in config.voice_pools.items()
+        }
+        unlimited: Dict[str, _Resource] = {}
+
+        def resource_for(role: str, session: _Session) -> _Resource:
+            if role in dedicated:
+                key = (role, session.index)
+                res = resources.get(key)
+                if res is None:
+                    res = resources[key] = _Resource(1.0)
+                return res
+            res = resources.get(role)
+            if res is None:
+                res = unlimited.get(role)
+                if res is None:
+                    res = unlimited[role] = _Resource(math.inf)
+            return res
+
+        events: List[Tuple[float, int, int, Any]] = []
+        counter = 0
+        eligible: List[Tuple[int, int, _Resource]] = []  # (队首任务序号, 序号, 资源)
+        state = {"executor_busy": 0, "queued": 0, "max_queued": 0, "tasks": 0, "events": 0}
+        records: List[Dict[str, Any]] = []
+        sessions = []
+
+        def push_event(when: float, kind: int, payload: Any):
+            nonlocal counter
+            counter += 1
+            heapq.heappush(events, (when, counter, kind, payload))
+
+        def mark_eligible(res: _Resource):
+            if res.queue and res.busy < res.capacity:
+                head = res.queue[0]
+                heapq.heappush(eligible, (head.seq, id(res), res))
+
+        def start_stage(session: _Session, now: float):
+            session.stage += 1
+            if session.stage >= len(session.stages):
+                session.finish = now
+                return
+            units = session.stages[session.stage]
+            session.pending = len(units)
+            for substeps in units:
+                role = substeps[0].get("role", "")
+                res = resource_for(role, session)
+                duration = 0.0
+                for step in substeps:
+                    duration += variate_for(role, step.get("action", ""))(session.rng)
+                state["tasks"] += 1
+                task = _Task(state["tasks"], session, session.stage, role, substeps, res, now, duration)
+                res.queue.append(task)
+                if len(res.queue) == 1:
+                    mark_eligible(res)
+                state["queued"] += 1
+            if state["queued"] > state["max_queued"]:
+                state["max_queued"] = state["queued"]
+
+        def dispatch(now: float):
+            while eligible and state["executor_busy"] < executor_capacity:
+                seq, _, res = heapq.heappop(eligible)
+                if not res.queue or res.queue[0].seq != seq or res.busy >= res.capacity:
+                    continue
+                task = res.queue.popleft()
+                res.busy += 1
+                state["executor_busy"] += 1
+                state["queued"] -= 1
+
+                task.start = now + dispatch_latency
+                task.end = task.start + task.duration
+                res.busy_time += task.duration
+                task.session.wait += task.start - task.ready
+                push_event(task.end, self.DONE, task)
+                mark_eligible(res)
+
+        for index in range(len(paths)):
+            arrival = arrivals[index] if arrivals is not None else 0.0
+            session = _Session(index, expand_steps(paths[index]), arrival, random.Random(rng.getrandbits(64)))
+            sessions.append(session)
+            push_event(arrival, self.ARRIVE, session)
+
+        now = 0.0
+        while events:
+            now, _, kind, payload = heapq.heappop(events)
+            state["events"] += 1
+            if kind == self.DONE:
+                task = payload
+                res = task.resource
+                res.busy -= 1
+                state["executor_busy"] -= 1
+                mark_eligible(res)
+                if trace:
+                    records.append({
+                        "session": task.session.index,
+                        "stage": task.stage,
+                        "role": task.role,
+                        "action": "；".join(step.get("action", "") for step in task.substeps),
+                        "ready": task.ready,
+                        "start": task.start,
+                        "end": task.end,
+                    })
+                session = task.session
+                session.pending -= 1
+                if session.pending == 0:
+                    delay = handoff(session.rng)
+                    if delay > 0 and session.stage + 1 < len(session.stages):
+                        push_event(now + delay, self.READY, session)
+                    else:
+                        start_stage(session, now)
+            else:
+                start_stage(payload, now)
+            dispatch(now)
+
+        makespans = sorted(s.finish - s.arrival for s in sessions if s.finish is not None)
+        horizon = now
+        utilization = {}
+        for key, res in resources.items():
+            if not isinstance(key, tuple) and res.capacity and horizon > 0:
+                utilization[key] = res.busy_time / (res.capacity * horizon)
+
+        report = {
+            "sessions": len(sessions),
+            "completed": len(makespans),
+            "horizon": horizon,
+            "makespan_mean": sum(makespans) / len(makespans) if makespans else 0.0,
+            "makespan_p50": percentile(makespans, 50),
+            "makespan_p95": percentile(makespans, 95),
+            "makespan_p99": percentile(makespans, 99),
+            "makespan_max": makespans[-1] if makespans else 0.0,
+            "wait_mean": sum(s.wait for s in sessions) / len(sessions) if sessions else 0.0,
+            "throughput_per_hour": len(makespans) / horizon * 3600 if horizon > 0 else 0.0,
+            "utilization": utilization,
+            "max_queue_length": state["max_queued"],
+            "tasks": state["tasks"],
+            "events": state["events"],
+            "wall_time": time.perf_counter() - wall_start,
+        }
+        if trace:
+            report["trace"] = records
+        return report
+
+    def plan_capacity(self, paths: Sequence[Sequence[Dict[str, Any]]],
+                      target_makespan: float,
+                      role: str = "silicon",
+                      q: float = 95,
+                      max_voices: int = 1024,
+                      arrivals: Optional[Sequence[float]] = None) -> Optional[Dict[str, Any]]:
+        """
+        二分查找满足完成时间目标所需的最少声部数量
+
+        每次试验使用相同的随机种子（公共随机数）：各会话的随机数流由种子按会话派生，
+        步骤耗时与交接延迟在会话内按固定顺序抽取，不同声部数量下每个任务的耗时相同，
+        比较只反映容量差异
+
+        Args:
+            paths: 每个会话的步骤列表
+            target_makespan: 完成时间目标（秒）
+            role: 需要规划的共享声部角色
+            q: 目标所针对的完成时间百分位
+            max_voices: 搜索上限
+            arrivals: 会话到达时间（可选）
+
+        Returns:
+            {"voices": 声部数量, "makespan": 对应百分位的完成时间, "report": 模拟报告}，
+            达到上限仍不满足目标时返回None
+        """
+        key = f"makespan_p{q:g}"
+        if key not in ("makespan_p50", "makespan_p95", "makespan_p99"):
+            raise ValueError(f"不支持的百分位: {q}")
+
+        base = self.config
+        seed = base.seed if base.seed is not None else 0
+
+        def trial(voices: int) -> Dict[str, Any]:
+            config = replace(base, seed=seed, voice_pools={**base.voice_pools, role: voices})
+            return CounterpointSimulator(config).run(paths, arrivals)
+
+        best = trial(max_voices)
+        if best[key] > target_makespan:
+            return None
+
+        low, high = 1, max_voices
+        while low < high:
+            middle = (low + high) // 2
+            report = trial(middle)
+            if report[key] <= target_makespan:
+                high, best = middle, report
+            else:
+                low = middle + 1
+        return {"voices": high, "makespan": best[key], "report": best}
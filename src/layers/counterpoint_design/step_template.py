@@ -0,0 +1,79 @@
+"""
+步骤模板 (Step Template)
+功能：对位模式的不可变步骤模板，路径实例化时共享模板、写入时复制
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+class FrozenStep(dict):
+    """
+    不可变步骤
+    仍是 dict（可直接 JSON 序列化、按键读取），但拒绝任何原地修改
+    """
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("步骤模板不可修改，请使用 replace() 生成新步骤")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+    __ior__ = _readonly
+
+    def replace(self, **changes: Any) -> Dict[str, Any]:
+        """
+        生成修改后的可变步骤副本
+
+        Args:
+            **changes: 需要修改的字段
+
+        Returns:
+            新的步骤字典
+        """
+        step = dict(self)
+        step.update(changes)
+        return step
+
+    def __reduce__(self):
+        return (FrozenStep, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def freeze_steps(steps: Iterable[Dict[str, Any]]) -> Tuple[FrozenStep, ...]:
+    """
+    将步骤列表转换为不可变模板
+
+    Args:
+        steps: 步骤列表
+
+    Returns:
+        不可变步骤元组
+    """
+    return tuple(step if isinstance(step, FrozenStep) else FrozenStep(step) for step in steps)
+
+
+def instantiate_steps(template: Tuple[FrozenStep, ...]) -> List[Dict[str, Any]]:
+    """
+    为路径实例化步骤列表
+
+    列表归路径所有，可自由增删替换；元素与模板共享，修改某一步时以 replace() 替换，
+    模板本身不会被改动
+
+    Args:
+        template: 不可变步骤模板
+
+    Returns:
+        路径自有的步骤列表
+    """
+    return list(template)
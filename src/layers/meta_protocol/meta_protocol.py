@@ -4,11 +4,32 @@
 """
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple, Any
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple, Any
 import json
+import logging
+import os
+import threading
 
+from src.layers.meta_protocol.rule_engine import (
+    CORE_VALUE_RULES,
+    CORE_VALUE_MESSAGES,
+    CompiledProgram,
+    compile_rules,
+    compile_anchor,
+)
+from src.layers.meta_protocol.validation_cache import ValidationCache, action_fingerprint
+from src.layers.meta_protocol.protocol_store import (
+    ProtocolSnapshot,
+    ProtocolFileWatcher,
+    freeze_mapping,
+    thaw_mapping,
+    next_protocol_version,
+    load_protocol_definition,
+)
 
-@dataclass
+
+@dataclass(frozen=True)
 class MetaProtocolAnchor:
     """元协议锚点基类"""
     anchor_id: str
@@ -24,18 +45,25 @@ class MetaProtocolManager:
     实现"和、清、寂、静"四字原则的硬性约束
     """
     
-    def __init__(self):
+    def __init__(self, enable_cache: bool = False, 
+                 cache_size: int = 4096, 
+                 cache_ttl: float = 300.0):
         """
         初始化元协议管理器
+        
+        Args:
+            enable_cache: 是否启用验证缓存
+            cache_size: 验证缓存最大条目数
+            cache_ttl: 验证缓存有效期（秒）
         """
-        self.core_values = {
+        core_values = {
             "和": "碳基与硅基的协同本质是和谐共生，非主从、非替代，而是对位协奏",
             "清": "所有协同过程必须清晰可验。碳基意图、硅基思考链、决策路径、责任归属皆需透明记录",
             "寂": "系统运行不扰动人类心流。硅基不主动打断、不过度提示、不以自身优化为目标侵占人类注意力",
             "静": "技术架构稳定如磐石。执行层无抖动、通信层无延迟、决策层无摇摆"
         }
         
-        self.anchors = {
+        anchors = {
             "ultimate_goal": MetaProtocolAnchor(
                 anchor_id="ultimate_goal",
                 name="终极目标锚点",
@@ -70,112 +98,138 @@ class MetaProtocolManager:
             )
         }
         
-        self.protocol_version = "α-0.1"
-    
-    def validate_core_values(self, action: Dict[str, Any]) -> Tuple[bool, str]:
-        """
-        验证行为是否符合核心价值观
+        # 内置定义：从文件重新加载时，文件中未出现的部分以此为准
+        self._builtin_core_values = core_values
+        self._builtin_anchors = anchors
         
-        Args:
-            action: 行为字典，包含行为类型、参与者、内容等
+        # 读取方只引用当前快照，不加锁；更新方在锁内构建新快照后整体替换
+        self._update_lock = threading.Lock()
+        self._snapshot = self._build_snapshot("α-0.1", 0, core_values, anchors)
+        self.watcher: Optional[ProtocolFileWatcher] = None
+        self.logger = logging.getLogger("MetaProtocolManager")
         
-        Returns:
-            (是否通过验证, 验证结果说明)
+        self.validation_cache: Optional[ValidationCache] = None
+        if enable_cache:
+            self.enable_validation_cache(cache_size, cache_ttl)
+    
+    @property
+    def snapshot(self) -> ProtocolSnapshot:
         """
-        # 验证"和"原则
-        if not self._validate_harmony(action):
-            return False, "违反'和'原则：碳硅协同应和谐共生，非主从关系"
-        
-        # 验证"清"原则
-        if not self._validate_clarity(action):
-            return False, "违反'清'原则：协同过程必须清晰可验"
-        
-        # 验证"寂"原则
-        if not self._validate_silence(action):
-            return False, "违反'寂'原则：系统运行不扰动人类心流"
-        
-        # 验证"静"原则
-        if not self._validate_stability(action):
-            return False, "违反'静'原则：技术架构应稳定如磐石"
-        
-        return True, "符合核心价值观"
+        当前元协议快照
+        """
+        return self._snapshot
     
-    def _validate_harmony(self, action: Dict[str, Any]) -> bool:
+    @property
+    def protocol_version(self) -> str:
         """
-        验证"和"原则
-        
-        Args:
-            action: 行为字典
-        
-        Returns:
-            是否符合
+        当前元协议版本
         """
-        # 检查是否存在主从关系，确保碳硅协同是和谐共生的对位关系
-        if action.get("relationship_type") in ["master_slave", "command_control"]:
-            return False
-        # 检查是否存在替代关系
-        if action.get("intention") == "replace_human":
-            return False
-        return True
+        return self._snapshot.protocol_version
     
-    def _validate_clarity(self, action: Dict[str, Any]) -> bool:
+    @property
+    def core_values(self) -> Mapping[str, str]:
         """
-        验证"清"原则
+        当前核心价值观（只读）
+        """
+        return self._snapshot.core_values
+    
+    @property
+    def anchors(self) -> Mapping[str, MetaProtocolAnchor]:
+        """
+        当前锚点（只读）
+        """
+        return self._snapshot.anchors
+    
+    @staticmethod
+    def _build_snapshot(protocol_version: str, 
+                        revision: int, 
+                        core_values: Dict[str, str], 
+                        anchors: Dict[str, MetaProtocolAnchor],
+                        previous: Optional[ProtocolSnapshot] = None) -> ProtocolSnapshot:
+        """
+        构建元协议快照，并将核心价值观约束与锚点验证规则编译为谓词程序
+        
+        规则未变的程序沿用上一快照中的实例，其规则统计在协议更新后保留
         
         Args:
-            action: 行为字典
+            protocol_version: 协议版本
+            revision: 快照修订号
+            core_values: 核心价值观
+            anchors: 锚点字典
+            previous: 上一快照（可选）
         
         Returns:
-            是否符合
+            元协议快照
         """
-        # 检查是否有清晰的记录，确保协同过程透明可验
-        if not action.get("carbon_intention"):
-            return False
-        if not action.get("silicon_thinking_process"):
-            return False
-        if not action.get("decision_path"):
-            return False
-        if not action.get("responsibility_attribution"):
-            return False
-        return True
+        frozen_anchors = {
+            anchor_id: MetaProtocolAnchor(
+                anchor_id=anchor.anchor_id,
+                name=anchor.name,
+                description=anchor.description,
+                validation_rules=freeze_mapping(dict(anchor.validation_rules)),
+                enforcement_mechanism=anchor.enforcement_mechanism
+            )
+            for anchor_id, anchor in anchors.items()
+        }
+        
+        anchor_programs = {}
+        for anchor_id, anchor in frozen_anchors.items():
+            old = previous.anchors.get(anchor_id) if previous is not None else None
+            if old is not None and thaw_mapping(old.validation_rules) == thaw_mapping(anchor.validation_rules):
+                anchor_programs[anchor_id] = previous.anchor_programs[anchor_id]
+            else:
+                anchor_programs[anchor_id] = compile_anchor(anchor_id, anchor.validation_rules)
+        
+        # 核心价值观规则是固定的，只需编译一次
+        core_program = previous.core_program if previous is not None else compile_rules(
+            "core_values", CORE_VALUE_RULES, CORE_VALUE_MESSAGES, "符合核心价值观")
+        
+        return ProtocolSnapshot(
+            protocol_version=protocol_version,
+            revision=revision,
+            core_values=freeze_mapping(core_values),
+            anchors=MappingProxyType(frozen_anchors),
+            core_program=core_program,
+            anchor_programs=MappingProxyType(anchor_programs)
+        )
     
-    def _validate_silence(self, action: Dict[str, Any]) -> bool:
+    def validate_core_values(self, action: Dict[str, Any]) -> Tuple[bool, str]:
         """
-        验证"寂"原则
+        验证行为是否符合核心价值观
         
         Args:
-            action: 行为字典
+            action: 行为字典，包含行为类型、参与者、内容等
         
         Returns:
-            是否符合
+            (是否通过验证, 验证结果说明)
         """
-        # 检查是否扰动人类心流，确保系统运行安静无干扰
-        if action.get("interruption_level") == "high":
-            return False
-        if action.get("prompt_frequency") == "excessive":
-            return False
-        if action.get("attention_occupation") > 0.5:
-            return False
-        return True
+        snapshot = self._snapshot
+        return self._evaluate(snapshot, snapshot.core_program, action)
     
-    def _validate_stability(self, action: Dict[str, Any]) -> bool:
+    def validate_many(self, actions: List[Dict[str, Any]], 
+                      anchor_id: Optional[str] = None) -> List[Tuple[bool, str]]:
         """
-        验证"静"原则
+        批量验证行为
         
         Args:
-            action: 行为字典
+            actions: 行为字典列表
+            anchor_id: 锚点ID（可选），不指定时验证核心价值观
         
         Returns:
-            是否符合
+            每个行为的 (是否通过验证, 验证结果说明) 列表
         """
-        # 检查技术架构是否稳定，确保执行无抖动、通信无延迟、决策无摇摆
-        if action.get("execution_jitter") > 0.1:
-            return False
-        if action.get("communication_delay") > 0.05:
-            return False
-        if action.get("decision_hesitation"):
-            return False
-        return True
+        snapshot = self._snapshot
+        if anchor_id is None:
+            program = snapshot.core_program
+        elif anchor_id in snapshot.anchor_programs:
+            program = snapshot.anchor_programs[anchor_id]
+        else:
+            return [(False, f"锚点不存在: {anchor_id}") for _ in actions]
+        
+        if self.validation_cache is None:
+            return program.evaluate_many(actions)
+        
+        return [self._evaluate(snapshot, program, action) for action in actions]
     
     def validate_anchor(self, anchor_id: str, action: Dict[str, Any]) -> Tuple[bool, str]:
         """
@@ -188,69 +242,88 @@ class MetaProtocolManager:
         Returns:
             (是否通过验证, 验证结果说明)
         """
-        if anchor_id not in self.anchors:
+        snapshot = self._snapshot
+        if anchor_id not in snapshot.anchor_programs:
             return False, f"锚点不存在: {anchor_id}"
         
-        anchor = self.anchors[anchor_id]
-        
-        if anchor_id == "ultimate_goal":
-            return self._validate_ultimate_goal(action)
-        elif anchor_id == "ethical_boundaries":
-            return self._validate_ethical_boundaries(action)
-        elif anchor_id == "success_criteria":
-            return self._validate_success_criteria(action)
-        
-        return True, "验证通过"
+        return self._evaluate(snapshot, snapshot.anchor_programs[anchor_id], action)
     
-    def _validate_ultimate_goal(self, action: Dict[str, Any]) -> Tuple[bool, str]:
+    def _evaluate(self, snapshot: ProtocolSnapshot, 
+                  program: CompiledProgram, 
+                  action: Dict[str, Any]) -> Tuple[bool, str]:
         """
-        验证终极目标锚点
+        执行规则程序，启用缓存时先按行为指纹查找
         
         Args:
+            snapshot: 规则程序所属的元协议快照
+            program: 规则程序
             action: 行为字典
         
         Returns:
             (是否通过验证, 验证结果说明)
         """
-        # 实际实现中应检查是否服务于扩展人类创造性体验
-        return True, "符合终极目标"
+        cache = self.validation_cache
+        if cache is None:
+            return program.evaluate(action)
+        
+        # 协议快照变化时缓存自动失效
+        cache.bind_version(snapshot.cache_token)
+        key = action_fingerprint(program.name, program.fields, action)
+        result = cache.get(key)
+        if result is None:
+            result = program.evaluate(action)
+            cache.put(key, result)
+        return result
     
-    def _validate_ethical_boundaries(self, action: Dict[str, Any]) -> Tuple[bool, str]:
+    def enable_validation_cache(self, max_size: int = 4096, ttl: float = 300.0):
         """
-        验证伦理红线锚点
+        启用验证缓存
         
         Args:
-            action: 行为字典
+            max_size: 最大缓存条目数
+            ttl: 缓存有效期（秒）
+        """
+        self.validation_cache = ValidationCache(max_size=max_size, ttl=ttl)
+        self.validation_cache.bind_version(self._snapshot.cache_token)
+    
+    def disable_validation_cache(self):
+        """
+        关闭验证缓存
+        """
+        self.validation_cache = None
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        获取验证缓存统计信息
         
         Returns:
-            (是否通过验证, 验证结果说明)
+            缓存统计信息字典，未启用缓存时 enabled 为 False
         """
-        # 检查是否有最终艺术判断
-        if action.get("action_type") == "final_artistic_judgment":
-            return False, "违反伦理红线：禁止AI生成'最终艺术判断'"
-        
-        # 检查是否有贡献披露
-        if not action.get("contribution_disclosure"):
-            return False, "违反伦理红线：所有产出必须明确标注贡献"
-        
-        # 检查是否有心理操纵
-        if action.get("psychological_manipulation"):
-            return False, "违反伦理红线：禁止AI利用人类心理弱点"
-        
-        return True, "符合伦理红线"
+        if self.validation_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.validation_cache.get_stats()}
     
-    def _validate_success_criteria(self, action: Dict[str, Any]) -> Tuple[bool, str]:
+    def get_rule_stats(self) -> Dict[str, Dict[str, Dict[str, int]]]:
         """
-        验证成功标准锚点
-        
-        Args:
-            action: 行为字典
+        获取各规则的执行与命中统计，用于性能分析
         
         Returns:
-            (是否通过验证, 验证结果说明)
+            {程序名称: {规则ID: {"evaluated": 执行次数, "hits": 命中次数}}}
+        """
+        snapshot = self._snapshot
+        stats = {"core_values": snapshot.core_program.get_stats()}
+        for anchor_id, program in snapshot.anchor_programs.items():
+            stats[anchor_id] = program.get_stats()
+        return stats
+    
+    def reset_rule_stats(self):
+        """
+        重置规则统计
         """
-        # 实际实现中应检查是否以碳基满意度为标准
-        return True, "符合成功标准"
+        snapshot = self._snapshot
+        snapshot.core_program.reset_stats()
+        for program in snapshot.anchor_programs.values():
+            program.reset_stats()
     
     def get_protocol_info(self) -> Dict[str, Any]:
         """
@@ -259,33 +332,124 @@ class MetaProtocolManager:
         Returns:
             元协议信息字典
         """
+        snapshot = self._snapshot
         return {
-            "protocol_version": self.protocol_version,
-            "core_values": self.core_values,
+            "protocol_version": snapshot.protocol_version,
+            "revision": snapshot.revision,
+            "core_values": dict(snapshot.core_values),
             "anchors": {
                 anchor_id: {
                     "name": anchor.name,
                     "description": anchor.description,
-                    "validation_rules": anchor.validation_rules
+                    "validation_rules": thaw_mapping(anchor.validation_rules)
                 }
-                for anchor_id, anchor in self.anchors.items()
+                for anchor_id, anchor in snapshot.anchors.items()
             }
         }
     
-    def update_protocol(self, updates: Dict[str, Any]) -> bool:
+    def update_protocol(self, updates: Dict[str, Any], replace: bool = False) -> bool:
         """
         更新元协议
         
+        基于当前快照合并更新内容，构建新快照后原子替换；读取方始终看到完整的某一版本。
+        replace 为 True 时不与当前快照合并：updates 中出现的 core_values、anchors 整体替换内置定义，
+        未出现的部分恢复为内置定义，因此从定义中删除的核心价值观或锚点随之移除。
+        未指定 protocol_version 时自动递增版本号。
+        注意：协议更新应遵循熵值驱动进化流程
+        
         Args:
-            updates: 更新内容
+            updates: 更新内容，可包含 protocol_version、core_values、anchors
+            replace: 是否以 updates 为完整定义替换（用于从文件加载）
         
         Returns:
             是否更新成功
         """
-        # 实际实现中应包含更新逻辑
-        # 注意：协议更新应遵循熵值驱动进化流程
+        with self._update_lock:
+            current = self._snapshot
+            try:
+                if replace:
+                    core_values = {} if "core_values" in updates else dict(self._builtin_core_values)
+                    anchors = {} if "anchors" in updates else dict(self._builtin_anchors)
+                    base_anchors = self._builtin_anchors
+                else:
+                    core_values = dict(current.core_values)
+                    anchors = dict(current.anchors)
+                    base_anchors = current.anchors
+                core_values.update(updates.get("core_values", {}))
+                
+                for anchor_id, anchor_data in updates.get("anchors", {}).items():
+                    base = base_anchors.get(anchor_id)
+                    anchors[anchor_id] = MetaProtocolAnchor(
+                        anchor_id=anchor_id,
+                        name=anchor_data.get("name", base.name if base else anchor_id),
+                        description=anchor_data.get("description", base.description if base else ""),
+                        validation_rules=dict(anchor_data.get(
+                            "validation_rules", base.validation_rules if base else {})),
+                        enforcement_mechanism=anchor_data.get(
+                            "enforcement_mechanism", base.enforcement_mechanism if base else "")
+                    )
+                
+                protocol_version = str(updates.get(
+                    "protocol_version", next_protocol_version(current.protocol_version)))
+                snapshot = self._build_snapshot(
+                    protocol_version, current.revision + 1, core_values, anchors, current)
+            except Exception as e:
+                self.logger.error(f"元协议更新失败: {str(e)}")
+                return False
+            
+            # 引用赋值是原子操作，读取方无需加锁
+            self._snapshot = snapshot
+        
+        self.logger.info(f"元协议已更新: v{snapshot.protocol_version} (修订 {snapshot.revision})")
         return True
     
+    def load_protocol_file(self, file_path: str) -> bool:
+        """
+        从JSON文件加载元协议定义
+        
+        文件内容与 update_protocol 的参数格式相同，且为完整定义：新快照按文件内容构建，不与当前快照合并
+        
+        Args:
+            file_path: 文件路径
+        
+        Returns:
+            是否加载成功
+        """
+        try:
+            definition = load_protocol_definition(file_path)
+        except Exception as e:
+            self.logger.error(f"读取元协议文件失败: {file_path} - {str(e)}")
+            return False
+        
+        return self.update_protocol(definition, replace=True)
+    
+    def watch_protocol_file(self, file_path: str, interval: float = 1.0) -> ProtocolFileWatcher:
+        """
+        监视元协议文件，文件变化时自动热加载
+        
+        Args:
+            file_path: 文件路径
+            interval: 轮询间隔（秒）
+        
+        Returns:
+            文件监视器
+        """
+        self.stop_watching()
+        if os.path.exists(file_path):
+            self.load_protocol_file(file_path)
+        
+        self.watcher = ProtocolFileWatcher(file_path, self.load_protocol_file, interval)
+        self.watcher.start()
+        return self.watcher
+    
+    def stop_watching(self):
+        """
+        停止监视元协议文件
+        """
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+    
     def generate_protocol_document(self) -> str:
         """
         生成元协议文档
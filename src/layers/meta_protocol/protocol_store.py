@@ -0,0 +1,194 @@
+"""
+元协议快照存储 (Protocol Store)
+功能：以不可变快照承载元协议定义，支持原子替换与基于文件的热加载
+"""
+
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+import json
+import logging
+import os
+import re
+import threading
+
+
+@dataclass(frozen=True)
+class ProtocolSnapshot:
+    """
+    元协议快照
+    创建后不可修改，更新协议时整体替换为新快照
+    """
+    protocol_version: str
+    revision: int  # 快照修订号，每次替换递增
+    core_values: Mapping[str, str]
+    anchors: Mapping[str, Any]
+    core_program: Any  # 编译后的核心价值观规则程序
+    anchor_programs: Mapping[str, Any]  # 编译后的锚点规则程序
+
+    @property
+    def cache_token(self) -> Tuple[str, int]:
+        """
+        快照标识，用于绑定验证缓存
+        """
+        return self.protocol_version, self.revision
+
+
+def freeze_mapping(data: Dict[str, Any]) -> Mapping[str, Any]:
+    """
+    将字典递归转换为只读映射
+
+    Args:
+        data: 字典
+
+    Returns:
+        只读映射
+    """
+    return MappingProxyType({
+        key: freeze_mapping(value) if isinstance(value, dict) else value
+        for key, value in data.items()
+    })
+
+
+def thaw_mapping(data: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    将只读映射递归转换为普通字典
+
+    Args:
+        data: 只读映射
+
+    Returns:
+        字典
+    """
+    return {
+        key: thaw_mapping(value) if isinstance(value, Mapping) else value
+        for key, value in data.items()
+    }
+
+
+def next_protocol_version(version: str) -> str:
+    """
+    生成下一个协议版本号，递增末尾的数字，如 α-0.1 → α-0.2
+
+    Args:
+        version: 当前版本号
+
+    Returns:
+        下一个版本号
+    """
+    match = re.search(r"(\d+)$", version)
+    if not match:
+        return f"{version}.1"
+    return version[:match.start()] + str(int(match.group(1)) + 1)
+
+
+def load_protocol_definition(file_path: str) -> Dict[str, Any]:
+    """
+    从JSON文件读取元协议定义
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        元协议定义字典
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        definition = json.load(f)
+    if not isinstance(definition, dict):
+        raise ValueError(f"元协议定义必须是JSON对象: {file_path}")
+    return definition
+
+
+class ProtocolFileWatcher:
+    """
+    元协议文件监视器
+    轮询文件修改时间，变化时回调加载，无需重启长期运行的智能体进程
+    """
+
+    def __init__(self, file_path: str,
+                 on_change: Callable[[str], bool],
+                 interval: float = 1.0):
+        """
+        初始化文件监视器
+
+        Args:
+            file_path: 元协议定义文件路径
+            on_change: 文件变化时的回调，返回是否加载成功
+            interval: 轮询间隔（秒）
+        """
+        self.file_path = file_path
+        self.on_change = on_change
+        self.interval = interval
+        self.reload_count = 0
+        self.error_count = 0
+        self.logger = logging.getLogger("ProtocolFileWatcher")
+
+        self._last_signature: Optional[Tuple[float, int]] = self._signature()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _signature(self) -> Optional[Tuple[float, int]]:
+        """
+        获取文件签名（修改时间, 大小），文件不存在时返回None
+        """
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> bool:
+        """
+        检查文件是否变化，变化时触发回调
+
+        Returns:
+            是否触发了重新加载
+        """
+        signature = self._signature()
+        if signature is None or signature == self._last_signature:
+            return False
+
+        self._last_signature = signature
+        try:
+            loaded = self.on_change(self.file_path)
+        except Exception as e:
+            loaded = False
+            self.logger.error(f"元协议文件加载失败: {self.file_path} - {str(e)}")
+
+        if loaded:
+            self.reload_count += 1
+        else:
+            self.error_count += 1
+        return loaded
+
+    def _watch_loop(self):
+        """
+        监视循环
+        """
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """
+        启动监视线程
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        停止监视线程
+        """
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def is_running(self) -> bool:
+        """
+        监视线程是否在运行
+        """
+        return self._thread is not None and self._thread.is_alive()
@@ -0,0 +1,314 @@
+"""
+元协议规则引擎 (Meta Protocol Rule Engine)
+功能：将"和清寂静"约束与锚点验证规则以声明式描述，并一次性编译为扁平的谓词程序
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# "和清寂静"四字原则的声明式约束
+# 每条规则读取行为字典中的一个字段，缺省时使用按类型给出的默认值
+CORE_VALUE_RULES: Tuple[Dict[str, Any], ...] = (
+    {"rule_id": "和.relationship_type", "value": "和", "field": "relationship_type",
+     "type": "str", "op": "not_in", "arg": ("master_slave", "command_control")},
+    {"rule_id": "和.intention", "value": "和", "field": "intention",
+     "type": "str", "op": "ne", "arg": "replace_human"},
+    {"rule_id": "清.carbon_intention", "value": "清", "field": "carbon_intention",
+     "type": "any", "op": "truthy"},
+    {"rule_id": "清.silicon_thinking_process", "value": "清", "field": "silicon_thinking_process",
+     "type": "any", "op": "truthy"},
+    {"rule_id": "清.decision_path", "value": "清", "field": "decision_path",
+     "type": "any", "op": "truthy"},
+    {"rule_id": "清.responsibility_attribution", "value": "清", "field": "responsibility_attribution",
+     "type": "any", "op": "truthy"},
+    {"rule_id": "寂.interruption_level", "value": "寂", "field": "interruption_level",
+     "type": "str", "op": "ne", "arg": "high"},
+    {"rule_id": "寂.prompt_frequency", "value": "寂", "field": "prompt_frequency",
+     "type": "str", "op": "ne", "arg": "excessive"},
+    {"rule_id": "寂.attention_occupation", "value": "寂", "field": "attention_occupation",
+     "type": "float", "op": "le", "arg": 0.5},
+    {"rule_id": "静.execution_jitter", "value": "静", "field": "execution_jitter",
+     "type": "float", "op": "le", "arg": 0.1},
+    {"rule_id": "静.communication_delay", "value": "静", "field": "communication_delay",
+     "type": "float", "op": "le", "arg": 0.05},
+    {"rule_id": "静.decision_hesitation", "value": "静", "field": "decision_hesitation",
+     "type": "bool", "op": "falsy"},
+)
+
+CORE_VALUE_MESSAGES: Dict[str, str] = {
+    "和": "违反'和'原则：碳硅协同应和谐共生，非主从关系",
+    "清": "违反'清'原则：协同过程必须清晰可验",
+    "寂": "违反'寂'原则：系统运行不扰动人类心流",
+    "静": "违反'静'原则：技术架构应稳定如磐石",
+}
+
+# 锚点验证规则中各字段违规时的说明
+ANCHOR_RULE_MESSAGES: Dict[str, str] = {
+    "final_artistic_judgment": "违反伦理红线：禁止AI生成'最终艺术判断'",
+    "contribution_disclosure": "违反伦理红线：所有产出必须明确标注贡献",
+    "psychological_manipulation": "违反伦理红线：禁止AI利用人类心理弱点",
+}
+
+ANCHOR_PASS_MESSAGES: Dict[str, str] = {
+    "ultimate_goal": "符合终极目标",
+    "ethical_boundaries": "符合伦理红线",
+    "success_criteria": "符合成功标准",
+}
+
+# 各类型字段缺省时的默认值
+TYPE_DEFAULTS: Dict[str, Any] = {
+    "float": 0.0,
+    "bool": False,
+    "str": "",
+    "any": None,
+}
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """
+    将字段值转换为浮点数，无法转换时返回None
+    """
+    if value.__class__ is float or value.__class__ is int:
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _make_test(op: str, arg: Any, value_type: str) -> Callable[[Any], bool]:
+    """
+    根据操作符生成谓词函数
+
+    Args:
+        op: 操作符
+        arg: 操作数
+        value_type: 字段类型
+
+    Returns:
+        谓词函数，返回True表示通过
+    """
+    if op == "truthy":
+        return bool
+    if op == "falsy":
+        return lambda v: not v
+    if op == "eq":
+        return lambda v: v == arg
+    if op == "ne":
+        return lambda v: v != arg
+    if op == "in":
+        members = frozenset(arg)
+        return lambda v: v in members
+    if op == "not_in":
+        members = frozenset(arg)
+        return lambda v: v not in members
+
+    comparisons = {
+        "lt": lambda v: v < arg,
+        "le": lambda v: v <= arg,
+        "gt": lambda v: v > arg,
+        "ge": lambda v: v >= arg,
+    }
+    if op not in comparisons:
+        raise ValueError(f"未知的规则操作符: {op}")
+    compare = comparisons[op]
+
+    if value_type != "float":
+        return compare
+
+    # 数值比较前先做类型转换，无法转换的值视为违规
+    def numeric_test(v: Any) -> bool:
+        number = _to_float(v)
+        return number is not None and compare(number)
+
+    return numeric_test
+
+
+class CompiledProgram:
+    """
+    编译后的谓词程序
+    按顺序执行扁平指令，遇到第一条违规规则即返回
+    """
+
+    def __init__(self, name: str,
+                 instructions: List[Tuple[int, str, Any, Callable[[Any], bool]]],
+                 rule_ids: List[str],
+                 messages: List[str],
+                 pass_message: str):
+        """
+        初始化谓词程序
+
+        Args:
+            name: 程序名称
+            instructions: 指令列表 (规则序号, 字段, 默认值, 谓词)
+            rule_ids: 规则ID列表
+            messages: 规则违规说明列表
+            pass_message: 全部通过时的说明
+        """
+        self.name = name
+        self.instructions = tuple(instructions)
+        self.rule_ids = tuple(rule_ids)
+        self.messages = tuple(messages)
+        self.pass_message = pass_message
+        self.fields = tuple(dict.fromkeys(field for _, field, _, _ in self.instructions))
+
+        # 性能统计：调用次数与各规则命中（拒绝）次数
+        self.calls = 0
+        self.hits = [0] * len(self.instructions)
+
+    def evaluate(self, action: Dict[str, Any]) -> Tuple[bool, str]:
+        """
+        对单个行为执行谓词程序
+
+        Args:
+            action: 行为字典
+
+        Returns:
+            (是否通过验证, 验证结果说明)
+        """
+        self.calls += 1
+        get = action.get
+        for index, field, default, test in self.instructions:
+            value = get(field)
+            if value is None:
+                value = default
+            if not test(value):
+                self.hits[index] += 1
+                return False, self.messages[index]
+        return True, self.pass_message
+
+    def evaluate_many(self, actions: Iterable[Dict[str, Any]]) -> List[Tuple[bool, str]]:
+        """
+        批量执行谓词程序
+
+        Args:
+            actions: 行为字典序列
+
+        Returns:
+            每个行为的 (是否通过验证, 验证结果说明) 列表
+        """
+        instructions = self.instructions
+        messages = self.messages
+        hits = self.hits
+        passed = (True, self.pass_message)
+        results = []
+        append = results.append
+        calls = 0
+
+        for action in actions:
+            calls += 1
+            get = action.get
+            for index, field, default, test in instructions:
+                value = get(field)
+                if value is None:
+                    value = default
+                if not test(value):
+                    hits[index] += 1
+                    append((False, messages[index]))
+                    break
+            else:
+                append(passed)
+
+        self.calls += calls
+        return results
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        获取各规则的执行统计
+
+        Returns:
+            {规则ID: {"evaluated": 执行次数, "hits": 命中次数}}
+        """
+        # 规则短路执行，第 i 条规则的执行次数 = 调用次数 - 之前各规则的命中次数之和
+        stats = {}
+        remaining = self.calls
+        for index, rule_id in enumerate(self.rule_ids):
+            stats[rule_id] = {"evaluated": remaining, "hits": self.hits[index]}
+            remaining -= self.hits[index]
+        return stats
+
+    def reset_stats(self):
+        """
+        重置执行统计
+        """
+        self.calls = 0
+        self.hits = [0] * len(self.instructions)
+
+
+def compile_rules(name: str, rules: Iterable[Dict[str, Any]],
+                  messages: Dict[str, str], pass_message: str) -> CompiledProgram:
+    """
+    将声明式规则编译为谓词程序
+
+    Args:
+        name: 程序名称
+        rules: 声明式规则列表
+        messages: 规则分组(value)到违规说明的映射
+        pass_message: 全部通过时的说明
+
+    Returns:
+        编译后的谓词程序
+    """
+    instructions = []
+    rule_ids = []
+    rule_messages = []
+
+    for index, rule in enumerate(rules):
+        value_type = rule.get("type", "any")
+        if value_type not in TYPE_DEFAULTS:
+            raise ValueError(f"未知的规则字段类型: {value_type}")
+        default = rule.get("default", TYPE_DEFAULTS[value_type])
+        test = _make_test(rule["op"], rule.get("arg"), value_type)
+
+        instructions.append((index, rule["field"], default, test))
+        rule_ids.append(rule.get("rule_id", f"{name}.{rule['field']}"))
+        rule_messages.append(rule.get("message") or messages.get(rule.get("value"), f"违反规则: {rule['field']}"))
+
+    return CompiledProgram(name, instructions, rule_ids, rule_messages, pass_message)
+
+
+def anchor_rules(anchor_id: str, validation_rules: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    将锚点的 validation_rules 展开为声明式规则
+
+    "forbidden" 表示行为类型不得为该项且不得声明该项；"required" 表示必须声明该项；
+    其余取值（True/False、"primary"/"secondary"）为评估导向，不作为硬性约束
+
+    Args:
+        anchor_id: 锚点ID
+        validation_rules: 锚点验证规则
+
+    Returns:
+        声明式规则列表
+    """
+    rules = []
+    for key, directive in validation_rules.items():
+        message = ANCHOR_RULE_MESSAGES.get(key, f"违反锚点 {anchor_id}：{key} 为 {directive}")
+        if directive == "forbidden":
+            rules.append({"rule_id": f"{anchor_id}.{key}.action_type", "field": "action_type",
+                          "type": "str", "op": "ne", "arg": key, "message": message})
+            rules.append({"rule_id": f"{anchor_id}.{key}", "field": key,
+                          "type": "bool", "op": "falsy", "message": message})
+        elif directive == "required":
+            rules.append({"rule_id": f"{anchor_id}.{key}", "field": key,
+                          "type": "any", "op": "truthy", "message": message})
+    return rules
+
+
+def compile_anchor(anchor_id: str, validation_rules: Dict[str, Any]) -> CompiledProgram:
+    """
+    编译锚点验证规则
+
+    Args:
+        anchor_id: 锚点ID
+        validation_rules: 锚点验证规则
+
+    Returns:
+        编译后的谓词程序
+    """
+    return compile_rules(
+        anchor_id,
+        anchor_rules(anchor_id, validation_rules),
+        {},
+        ANCHOR_PASS_MESSAGES.get(anchor_id, "验证通过")
+    )
@@ -0,0 +1,163 @@
+"""
+元协议验证缓存 (Validation Cache)
+功能：以行为指纹为键缓存验证结果，避免对结构相同的行为重复验证
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import threading
+import time
+
+
+def freeze_value(value: Any) -> Hashable:
+    """
+    将字段值转换为可哈希的规范形式
+
+    Args:
+        value: 字段值
+
+    Returns:
+        可哈希的规范值
+    """
+    if value is None or isinstance(value, (str, int, float, bool, bytes)):
+        return value
+    if isinstance(value, dict):
+        return ("dict", tuple(sorted((str(k), freeze_value(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(freeze_value(v) for v in value))
+    if isinstance(value, (set, frozenset)):
+        return ("set", tuple(sorted(repr(freeze_value(v)) for v in value)))
+    return ("repr", repr(value))
+
+
+def action_fingerprint(program_name: str, fields: Tuple[str, ...],
+                       action: Dict[str, Any]) -> Tuple[Hashable, ...]:
+    """
+    计算行为指纹，只包含规则程序实际读取的字段
+
+    Args:
+        program_name: 规则程序名称
+        fields: 规则程序读取的字段
+        action: 行为字典
+
+    Returns:
+        行为指纹
+    """
+    get = action.get
+    return (program_name,) + tuple(freeze_value(get(field)) for field in fields)
+
+
+class ValidationCache:
+    """
+    验证结果缓存
+    LRU淘汰并带有过期时间，协议版本变化时整体失效
+    """
+
+    def __init__(self, max_size: int = 4096, ttl: float = 300.0):
+        """
+        初始化验证缓存
+
+        Args:
+            max_size: 最大缓存条目数
+            ttl: 缓存条目有效期（秒）
+        """
+        if max_size <= 0:
+            raise ValueError("缓存容量必须大于0")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version: Optional[str] = None
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[bool, str], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def bind_version(self, version: str):
+        """
+        绑定协议版本，版本变化时清空缓存
+
+        Args:
+            version: 当前协议版本
+        """
+        if version == self.version:
+            return
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+
+    def get(self, key: Hashable) -> Optional[Tuple[bool, str]]:
+        """
+        获取缓存的验证结果
+
+        Args:
+            key: 行为指纹
+
+        Returns:
+            验证结果，未命中则返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            result, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: Hashable, result: Tuple[bool, str]):
+        """
+        写入验证结果
+
+        Args:
+            key: 行为指纹
+            result: 验证结果
+        """
+        with self._lock:
+            self._entries[key] = (result, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            缓存统计信息字典
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
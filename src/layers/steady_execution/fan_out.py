@@ -0,0 +1,285 @@
+"""
+赋格扇出执行 (Fugue Fan-Out)
+功能：多个硅基声部并行演绎同一主题并流式产出部分结果，碳基"指挥"实时调整权重，
+      结果按权重增量合并，低权重分支被取消以节省算力
+"""
+
+from queue import Queue
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import logging
+import threading
+import time
+
+
+# 分支处理函数：handler(theme, branch) -> 部分结果的可迭代对象（通常为生成器）
+BranchHandler = Callable[[Any, "FanOutBranch"], Iterable[Any]]
+
+PENDING, RUNNING, DONE, CANCELLED, FAILED = "pending", "running", "done", "cancelled", "failed"
+
+
+class FanOutBranch:
+    """
+    扇出分支
+    处理函数可通过 weight 读取实时权重，通过 cancelled 检查是否已被取消
+    """
+
+    def __init__(self, voice_id: str, execution: "FanOutExecution"):
+        """
+        初始化扇出分支
+
+        Args:
+            voice_id: 声部ID
+            execution: 所属扇出执行
+        """
+        self.voice_id = voice_id
+        self.status = PENDING
+        self.outputs: List[Any] = []
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+        self._execution = execution
+        self._cancel = threading.Event()
+
+    @property
+    def weight(self) -> float:
+        """
+        当前归一化权重
+        """
+        return self._execution.get_weights().get(self.voice_id, 0.0)
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        是否已被取消
+        """
+        return self._cancel.is_set()
+
+
+class WeightedMerger:
+    """
+    按权重增量合并各分支的部分结果
+    数值结果维护加权平均，其他结果按分支权重排序
+    """
+
+    def __init__(self):
+        """
+        初始化合并器
+        """
+        self.latest: Dict[str, Any] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, voice_id: str, output: Any):
+        """
+        合并一个部分结果
+
+        Args:
+            voice_id: 声部ID
+            output: 部分结果
+        """
+        self.latest[voice_id] = output
+        self.counts[voice_id] = self.counts.get(voice_id, 0) + 1
+
+    def result(self, weights: Dict[str, float]) -> Dict[str, Any]:
+        """
+        生成当前合并结果
+
+        Args:
+            weights: 归一化权重
+
+        Returns:
+            {"branches": 按权重降序的分支最新结果, "value": 数值结果的加权平均（如适用）}
+        """
+        active = [(voice_id, weights.get(voice_id, 0.0)) for voice_id in self.latest
+                  if weights.get(voice_id, 0.0) > 0]
+        active.sort(key=lambda item: item[1], reverse=True)
+        merged: Dict[str, Any] = {
+            "branches": [{"voice_id": voice_id, "weight": weight, "output": self.latest[voice_id],
+                          "partials": self.counts[voice_id]} for voice_id, weight in active],
+            "value": None
+        }
+        numeric = [(self.latest[v], w) for v, w in active
+                   if isinstance(self.latest[v], (int, float)) and not isinstance(self.latest[v], bool)]
+        total = sum(w for _, w in numeric)
+        if numeric and total > 0:
+            merged["value"] = sum(value * w for value, w in numeric) / total
+        return merged
+
+
+class FanOutExecution:
+    """
+    扇出执行
+    每个硅基声部一个工作线程，部分结果写入共享事件队列；权重更新不重启工作线程
+    """
+
+    def __init__(self, theme: Any,
+                 handlers: Dict[str, BranchHandler],
+                 weights: Optional[Dict[str, float]] = None,
+                 cancel_threshold: float = 0.0,
+                 merger: Optional[WeightedMerger] = None,
+                 on_branch_done: Optional[Callable[["FanOutBranch"], None]] = None):
+        """
+        初始化扇出执行
+
+        Args:
+            theme: 演绎主题
+            handlers: {声部ID: 分支处理函数}
+            weights: 初始权重（默认均等）
+            cancel_threshold: 归一化权重低于该值的分支被取消
+            merger: 结果合并器（默认为 WeightedMerger）
+            on_branch_done: 分支结束（完成、取消或失败）时的回调
+        """
+        if not handlers:
+            raise ValueError("扇出至少需要一个分支")
+
+        self.theme = theme
+        self.handlers = dict(handlers)
+        self.cancel_threshold = cancel_threshold
+        self.merger = merger or WeightedMerger()
+        self.on_branch_done = on_branch_done
+        self.branches: Dict[str, FanOutBranch] = {v: FanOutBranch(v, self) for v in self.handlers}
+        self.events: Queue = Queue()
+
+        self._lock = threading.Lock()
+        self._raw_weights = {v: 1.0 for v in self.handlers}
+        self._weights: Dict[str, float] = {}
+        self._remaining = len(self.handlers)
+        self._threads: List[threading.Thread] = []
+        self.logger = logging.getLogger("FanOutExecution")
+        self.update_weights(weights or {})
+
+    def start(self) -> "FanOutExecution":
+        """
+        启动全部分支
+
+        Returns:
+            扇出执行自身
+        """
+        for voice_id, branch in self.branches.items():
+            thread = threading.Thread(target=self._run_branch, args=(branch,), daemon=True)
+            self._threads.append(thread)
+            thread.start()
+        return self
+
+    def _run_branch(self, branch: FanOutBranch):
+        """
+        分支工作循环：逐个产出部分结果，每次产出前检查取消标记
+        """
+        branch.started_at = time.time()
+        branch.status = RUNNING
+        try:
+            if not branch.cancelled:
+                for output in self.handlers[branch.voice_id](self.theme, branch):
+                    if branch.cancelled:
+                        break
+                    branch.outputs.append(output)
+                    with self._lock:
+                        self.merger.add(branch.voice_id, output)
+                    self.events.put({"type": "partial", "voice_id": branch.voice_id,
+                                     "output": output, "weight": branch.weight})
+            branch.status = CANCELLED if branch.cancelled else DONE
+        except Exception as e:
+            branch.status = FAILED
+            branch.error = str(e)
+        branch.completed_at = time.time()
+
+        try:
+            if self.on_branch_done is not None:
+                self.on_branch_done(branch)
+        except Exception as e:
+            self.logger.error(f"分支回调失败: {branch.voice_id} - {e}")
+        finally:
+            # 回调出错也要发出结束事件，否则 stream() 永远等不到结束标记
+            self.events.put({"type": branch.status, "voice_id": branch.voice_id, "error": branch.error})
+            with self._lock:
+                self._remaining -= 1
+                finished = self._remaining == 0
+            if finished:
+                self.events.put(None)
+
+    def update_weights(self, weights: Dict[str, float]) -> List[str]:
+        """
+        更新分支权重（碳基指挥的实时调整），归一化后低于阈值的分支被取消
+
+        Args:
+            weights: {声部ID: 权重}，未列出的分支保持原权重
+
+        Returns:
+            本次被取消的声部ID列表
+        """
+        cancelled = []
+        with self._lock:
+            for voice_id, weight in weights.items():
+                if voice_id in self._raw_weights:
+                    self._raw_weights[voice_id] = max(float(weight), 0.0)
+            live = {v: w for v, w in self._raw_weights.items() if not self.branches[v].cancelled}
+            total = sum(live.values())
+            normalized = {v: (w / total if total > 0 else 0.0) for v, w in live.items()}
+
+            for voice_id, weight in normalized.items():
+                if weight < self.cancel_threshold or weight == 0.0:
+                    branch = self.branches[voice_id]
+                    if branch.status in (PENDING, RUNNING):
+                        branch._cancel.set()
+                        cancelled.append(voice_id)
+
+            # 被取消分支的权重归零，其余分支重新归一化
+            kept = {v: w for v, w in live.items() if v not in cancelled}
+            total = sum(kept.values())
+            self._weights = {v: (kept[v] / total if v in kept and total > 0 else 0.0)
+                             for v in self._raw_weights}
+        return cancelled
+
+    def cancel(self, voice_id: Optional[str] = None):
+        """
+        取消分支
+
+        Args:
+            voice_id: 声部ID（默认取消全部分支）
+        """
+        targets = [voice_id] if voice_id else list(self.branches)
+        self.update_weights({v: 0.0 for v in targets})
+
+    def get_weights(self) -> Dict[str, float]:
+        """
+        获取当前归一化权重
+        """
+        return self._weights
+
+    def merged(self) -> Dict[str, Any]:
+        """
+        获取当前增量合并结果
+        """
+        with self._lock:
+            return self.merger.result(self._weights)
+
+    def stream(self, timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        流式产出分支事件（partial / done / cancelled / failed），全部分支结束后停止
+
+        Args:
+            timeout: 等待单个事件的超时时间（秒），超时抛出 queue.Empty
+        """
+        while True:
+            event = self.events.get(timeout=timeout)
+            if event is None:
+                return
+            yield event
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        等待全部分支结束并返回最终合并结果
+
+        Args:
+            timeout: 超时时间（秒）
+
+        Returns:
+            最终合并结果，附带各分支状态
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        for thread in self._threads:
+            remaining = None if deadline is None else max(deadline - time.time(), 0)
+            thread.join(remaining)
+        result = self.merged()
+        result["status"] = {v: b.status for v, b in self.branches.items()}
+        return result
+
@@ -0,0 +1,211 @@
+"""
+流水线执行 (Stage Pipeline)
+功能：将接力式路径（如卡农式推进）的每个步骤作为独立阶段并发运行，会话 n 的第 k 步与
+      会话 n-1 的第 k+1 步重叠执行；阶段之间使用有界队列实现背压
+"""
+
+from queue import Queue
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import threading
+import time
+
+
+# 队列结束标记
+_SENTINEL = object()
+
+StepHandler = Callable[[Dict[str, Any], Dict[str, Any]], Any]
+
+
+def simulated_handler(duration: float = 0.05) -> StepHandler:
+    """
+    创建模拟步骤处理函数（与 SteadyExecutor 的模拟执行一致）
+
+    Args:
+        duration: 每个步骤的模拟耗时（秒）
+
+    Returns:
+        步骤处理函数
+    """
+    def handler(step: Dict[str, Any], session: Dict[str, Any]) -> Dict[str, Any]:
+        time.sleep(duration)
+        return {"message": f"执行步骤 {step.get('step')}: {step.get('action')}"}
+    return handler
+
+
+class StagePipeline:
+    """
+    阶段流水线
+    每个步骤对应一个阶段，阶段内由固定数量的工作线程按到达顺序处理会话；
+    下游队列已满时上游阶段阻塞（背压），整体吞吐趋近最慢阶段的处理速率
+    """
+
+    def __init__(self, steps: List[Dict[str, Any]],
+                 handler: Optional[StepHandler] = None,
+                 queue_size: int = 2,
+                 on_step: Optional[Callable[[Dict[str, Any], Dict[str, Any], Dict[str, Any]], None]] = None):
+        """
+        初始化阶段流水线
+
+        Args:
+            steps: 步骤列表（每个步骤一个阶段）
+            handler: 步骤处理函数 handler(step, session) -> 输出（默认为模拟执行）
+            queue_size: 阶段间队列容量（背压阈值）
+            on_step: 每个步骤完成后的回调 on_step(step, session, record)
+        """
+        if not steps:
+            raise ValueError("流水线至少需要一个步骤")
+        if queue_size < 1:
+            raise ValueError("队列容量必须大于0")
+
+        self.steps = list(steps)
+        self.handler = handler or simulated_handler()
+        self.on_step = on_step
+        self.queues: List[Queue] = [Queue(maxsize=queue_size) for _ in self.steps]
+        self.results: Queue = Queue()
+        self.stage_busy = [0.0] * len(self.steps)
+        self.stage_count = [0] * len(self.steps)
+        self._submitted = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger("StagePipeline")
+
+        self._workers = [
+            threading.Thread(target=self._stage_loop, args=(index,), daemon=True)
+            for index in range(len(self.steps))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _stage_loop(self, index: int):
+        """
+        阶段工作循环
+        """
+        step = self.steps[index]
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.queues) else self.results
+
+        while True:
+            session = inbox.get()
+            if session is _SENTINEL:
+                outbox.put(_SENTINEL)
+                return
+
+            try:
+                # 前序阶段失败的会话直接向下游传递，保持会话顺序
+                if session["status"] != "failed":
+                    self._run_step(index, step, session)
+            finally:
+                # 回调出错也要把会话交给下游，否则结束标记无法传递，结果迭代永远阻塞
+                if index + 1 == len(self.steps) and session["status"] != "failed":
+                    session["status"] = "completed"
+                    session["completed_at"] = time.time()
+                outbox.put(session)
+
+    def _run_step(self, index: int, step: Dict[str, Any], session: Dict[str, Any]):
+        """
+        执行会话的一个步骤并记录结果，步骤回调的异常只记录日志
+        """
+        started_at = time.time()
+        record = {"step": step, "started_at": started_at}
+        try:
+            record["outputs"] = self.handler(step, session)
+            record["status"] = "completed"
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = str(e)
+            session["status"] = "failed"
+            session["error"] = str(e)
+        record["completed_at"] = time.time()
+        session["steps"].append(record)
+        self.stage_busy[index] += record["completed_at"] - started_at
+        self.stage_count[index] += 1
+        if self.on_step is not None:
+            try:
+                self.on_step(step, session, record)
+            except Exception as e:
+                self.logger.error(f"步骤回调失败: 步骤 {step.get('step')} (会话: {session['session_id']}) - {e}")
+
+    def submit(self, session_id: str, voice_map: Optional[Dict[str, str]] = None,
+               inputs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        提交会话，首个阶段的队列已满时阻塞（背压）
+
+        Args:
+            session_id: 会话ID
+            voice_map: 声部映射 {角色: 声部ID}
+            inputs: 会话输入
+
+        Returns:
+            会话状态字典（流水线执行过程中原地更新）
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("流水线已关闭")
+            self._submitted += 1
+
+        session = {
+            "session_id": session_id,
+            "voice_map": voice_map or {},
+            "inputs": inputs or {},
+            "steps": [],
+            "status": "executing",
+            "error": None,
+            "submitted_at": time.time(),
+            "completed_at": None
+        }
+        self.queues[0].put(session)
+        return session
+
+    def close(self):
+        """
+        停止接收新会话，已提交的会话继续执行完毕
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.queues[0].put(_SENTINEL)
+
+    def iter_results(self, timeout: Optional[float] = None):
+        """
+        按完成顺序产出会话结果，流水线关闭且全部会话完成后结束
+
+        Args:
+            timeout: 等待单个结果的超时时间（秒）
+        """
+        while True:
+            session = self.results.get(timeout=timeout)
+            if session is _SENTINEL:
+                return
+            yield session
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待全部阶段线程退出（需先调用 close）
+
+        Args:
+            timeout: 超时时间（秒）
+
+        Returns:
+            是否全部退出
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        for worker in self._workers:
+            remaining = None if deadline is None else max(deadline - time.time(), 0)
+            worker.join(remaining)
+        return not any(worker.is_alive() for worker in self._workers)
+
+    def get_stage_stats(self) -> List[Dict[str, Any]]:
+        """
+        获取各阶段统计
+
+        Returns:
+            每个阶段的动作、处理数量、平均耗时与当前队列长度
+        """
+        return [{
+            "action": step.get("action"),
+            "processed": self.stage_count[index],
+            "avg_duration": self.stage_busy[index] / self.stage_count[index] if self.stage_count[index] else 0.0,
+            "queue_size": self.queues[index].qsize()
+        } for index, step in enumerate(self.steps)]
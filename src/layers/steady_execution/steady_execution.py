@@ -11,6 +11,10 @@ import time
 from queue import Queue
 import threading
 import logging
+import weakref
+from src.utils.metrics import get_registry
+from src.layers.steady_execution.pipeline import StagePipeline, StepHandler
+from src.layers.steady_execution.fan_out import BranchHandler, FanOutBranch, FanOutExecution
 
 
 @dataclass
@@ -28,6 +32,27 @@ class Task:
     error: Optional[str]
 
 
+# 运行指标：队列深度在抓取时汇总所有存活的执行器，热路径上只做分片累加
+_live_executors: "weakref.WeakSet[SteadyExecutor]" = weakref.WeakSet()
+_registry = get_registry()
+TASK_QUEUE_DEPTH = _registry.gauge("meta_creation_task_queue_depth", "排队等待派发的任务数")
+TASK_QUEUE_DEPTH.set_function(lambda: sum(e.task_queue.qsize() for e in list(_live_executors)))
+TASKS_TOTAL = _registry.counter("meta_creation_tasks", "按结束状态统计的任务数", ("status",))
+DISPATCH_LATENCY = _registry.histogram("meta_creation_task_dispatch_latency_seconds",
+                                       "任务从提交到开始执行的等待时间")
+TASK_DURATION = _registry.histogram("meta_creation_task_duration_seconds", "任务执行耗时")
+
+
+def _observe_task(task: Task):
+    """
+    记录已结束任务的指标
+    """
+    TASKS_TOTAL.labels(task.status).inc()
+    # 被取消的任务未完整执行，不计入耗时
+    if task.status != "cancelled" and task.started_at is not None and task.completed_at is not None:
+        TASK_DURATION.observe(task.completed_at - task.started_at)
+
+
 class SteadyExecutor:
     """
     静定执行器
@@ -43,12 +68,10 @@ class SteadyExecutor:
         self.completed_tasks: Dict[str, Task] = {}
         self.failed_tasks: Dict[str, Task] = {}
         
-        self.execution_thread = threading.Thread(target=self._execution_loop, daemon=True)
-        self.execution_thread.start()
-        
         self.is_running = True
         self.max_concurrent_tasks = 5
         self.current_concurrent_tasks = 0
+        self._concurrency_lock = threading.Lock()
         
         # 配置日志
         logging.basicConfig(
@@ -57,13 +80,19 @@ class SteadyExecutor:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         self.logger = logging.getLogger("SteadyExecutor")
+        _live_executors.add(self)
+        
+        # 属性全部初始化后再启动执行线程，避免线程读取到未初始化的属性
+        self.execution_thread = threading.Thread(target=self._execution_loop, daemon=True)
+        self.execution_thread.start()
     
     def _execution_loop(self):
         """
         执行循环
         """
         while self.is_running:
-            if self.current_concurrent_tasks < self.max_concurrent_tasks and not self.task_queue.empty():
+            # 每轮派发到并发上限为止，避免排队任务受限于轮询间隔
+            while self.current_concurrent_tasks < self.max_concurrent_tasks and not self.task_queue.empty():
                 task = self.task_queue.get()
                 self._execute_task(task)
             time.sleep(0.005)  # 5ms 检查一次，确保响应速度，符合"静"原则的无抖动执行
@@ -77,10 +106,10 @@ class SteadyExecutor:
         """
         def task_thread():
             try:
-                self.current_concurrent_tasks += 1
                 task.status = "executing"
                 task.started_at = time.time()
                 self.active_tasks[task.task_id] = task
+                DISPATCH_LATENCY.observe(task.started_at - task.created_at)
                 
                 self.logger.info(f"开始执行任务: {task.name} (ID: {task.task_id})")
                 
@@ -106,7 +135,13 @@ class SteadyExecutor:
                 self.logger.error(f"任务失败: {task.name} (ID: {task.task_id}) - {error_msg}")
                 
             finally:
-                self.current_concurrent_tasks -= 1
+                _observe_task(task)
+                with self._concurrency_lock:
+                    self.current_concurrent_tasks -= 1
+        
+        # 在启动线程前占用并发名额，避免执行循环在线程启动前超额派发
+        with self._concurrency_lock:
+            self.current_concurrent_tasks += 1
         
         # 启动任务线程
         thread = threading.Thread(target=task_thread, daemon=True)
@@ -177,14 +212,18 @@ class SteadyExecutor:
     
     def execute_counterpoint_path(self, path_id: str, 
                                  steps: List[Dict[str, Any]],
-                                 voice_map: Dict[str, str]) -> Dict[str, Any]:
+                                 voice_map: Dict[str, Any]) -> Dict[str, Any]:
         """
         执行协同路径
         
+        路径优化产生的并行步骤（parallel 字段）按分支扇出为独立任务，分别占用执行器并发槽位；
+        声部映射中角色对应声部列表时，分支依次轮流分配给各声部。合并步骤（merged_from 字段）
+        由同一声部作为一个任务执行
+        
         Args:
             path_id: 路径ID
             steps: 步骤列表
-            voice_map: 声部映射
+            voice_map: 声部映射 {角色: 声部ID 或 声部ID列表}
         
         Returns:
             执行结果
@@ -194,20 +233,28 @@ class SteadyExecutor:
         
         self.logger.info(f"开始执行协同路径: {path_id} (执行ID: {execution_id})")
         
+        def voices_for(role):
+            voices = voice_map.get(role, "")
+            return list(voices) if isinstance(voices, (list, tuple)) and voices else [voices]
+        
         # 原子化执行所有步骤
         for i, step in enumerate(steps):
-            task_id = self.submit_task(
-                name=f"步骤 {i + 1}: {step['action']}",
-                task_type="counterpoint_step",
-                payload={
-                    "step": step,
-                    "path_id": path_id,
-                    "execution_id": execution_id,
-                    "voice_id": voice_map.get(step['role'], "")
-                },
-                priority=len(steps) - i  # 确保步骤按顺序执行
-            )
-            task_ids.append(task_id)
+            parallel = step.get("parallel")
+            voices = voices_for(step.get("role"))
+            for b, branch in enumerate(parallel or [step]):
+                label = f"{i + 1}.{b + 1}" if parallel else f"{i + 1}"
+                task_id = self.submit_task(
+                    name=f"步骤 {label}: {branch.get('action')}",
+                    task_type="counterpoint_step",
+                    payload={
+                        "step": branch,
+                        "path_id": path_id,
+                        "execution_id": execution_id,
+                        "voice_id": voices[b % len(voices)]
+                    },
+                    priority=len(steps) - i  # 确保步骤按顺序执行
+                )
+                task_ids.append(task_id)
         
         # 等待所有任务完成
         # 注意：这里使用轮询而非阻塞，确保系统响应性
@@ -233,6 +280,141 @@ class SteadyExecutor:
         
         return results
     
+    def execute_pipelined(self, path_id: str,
+                          steps: List[Dict[str, Any]],
+                          sessions: List[Dict[str, Any]],
+                          handler: Optional[StepHandler] = None,
+                          queue_size: int = 2) -> Dict[str, Any]:
+        """
+        以流水线方式执行多个会话的同一条接力式路径
+        
+        每个步骤作为独立阶段运行，会话 n 的第 k 步与会话 n-1 的第 k+1 步重叠执行，
+        阶段间的有界队列提供背压；每个完成的步骤都记入任务历史
+        
+        Args:
+            path_id: 路径ID
+            steps: 步骤列表
+            sessions: 会话列表，每项可包含 session_id、voice_map、inputs
+            handler: 步骤处理函数 handler(step, session) -> 输出（默认为模拟执行）
+            queue_size: 阶段间队列容量
+        
+        Returns:
+            执行结果，session_results 按会话提交顺序排列
+        """
+        execution_id = str(uuid.uuid4())
+        self.logger.info(f"开始流水线执行协同路径: {path_id} (执行ID: {execution_id}, 会话数: {len(sessions)})")
+        
+        def record_step(step: Dict[str, Any], session: Dict[str, Any], record: Dict[str, Any]):
+            task = Task(
+                task_id=str(uuid.uuid4()),
+                name=f"步骤 {step.get('step')}: {step.get('action')}",
+                type="counterpoint_step",
+                priority=0,
+                payload={
+                    "step": step,
+                    "path_id": path_id,
+                    "execution_id": execution_id,
+                    "session_id": session["session_id"],
+                    "voice_id": session["voice_map"].get(step.get("role"), "")
+                },
+                status=record["status"],
+                created_at=record["started_at"],
+                started_at=record["started_at"],
+                completed_at=record["completed_at"],
+                error=record.get("error")
+            )
+            _observe_task(task)
+            if task.status == "completed":
+                self.completed_tasks[task.task_id] = task
+            else:
+                self.failed_tasks[task.task_id] = task
+                self.logger.error(f"任务失败: {task.name} (ID: {task.task_id}) - {task.error}")
+        
+        start_time = time.time()
+        pipeline = StagePipeline(steps, handler=handler, queue_size=queue_size, on_step=record_step)
+        for index, session in enumerate(sessions):
+            pipeline.submit(session.get("session_id", f"{execution_id}-{index}"),
+                            session.get("voice_map"), session.get("inputs"))
+        pipeline.close()
+        session_results = list(pipeline.iter_results())
+        pipeline.join()
+        elapsed = time.time() - start_time
+        
+        results = {
+            "execution_id": execution_id,
+            "path_id": path_id,
+            "session_results": session_results,
+            "stage_stats": pipeline.get_stage_stats(),
+            "elapsed": elapsed,
+            "throughput": len(session_results) / elapsed if elapsed > 0 else 0.0,
+            "success": all(s["status"] == "completed" for s in session_results)
+        }
+        
+        self.logger.info(f"流水线执行完成: {path_id} (执行ID: {execution_id}, 成功: {results['success']})")
+        return results
+    
+    def start_fan_out(self, path_id: str,
+                      theme: Any,
+                      handlers: Dict[str, BranchHandler],
+                      weights: Optional[Dict[str, float]] = None,
+                      cancel_threshold: float = 0.0,
+                      step: Optional[Dict[str, Any]] = None) -> FanOutExecution:
+        """
+        启动赋格式扇出：多个硅基声部并行演绎同一主题
+        
+        返回的扇出执行可流式读取部分结果（stream）、实时调整权重（update_weights）、
+        读取增量合并结果（merged）并等待结束（wait）；每个分支结束时记入任务历史
+        
+        Args:
+            path_id: 路径ID
+            theme: 演绎主题
+            handlers: {硅基声部ID: 分支处理函数 handler(theme, branch) -> 部分结果的可迭代对象}
+            weights: 初始权重（默认均等）
+            cancel_threshold: 归一化权重低于该值的分支被取消
+            step: 对应的路径步骤（默认为"并行演绎"）
+        
+        Returns:
+            已启动的扇出执行
+        """
+        execution_id = str(uuid.uuid4())
+        step = step or {"step": 2, "role": "silicon", "action": "并行演绎"}
+        self.logger.info(f"开始扇出执行: {path_id} (执行ID: {execution_id}, 分支数: {len(handlers)})")
+        
+        def record_branch(branch: FanOutBranch):
+            status = {"done": "completed", "cancelled": "cancelled"}.get(branch.status, "failed")
+            task = Task(
+                task_id=str(uuid.uuid4()),
+                name=f"分支 {branch.voice_id}: {step.get('action')}",
+                type="counterpoint_step",
+                priority=0,
+                payload={
+                    "step": step,
+                    "path_id": path_id,
+                    "execution_id": execution_id,
+                    "voice_id": branch.voice_id,
+                    "partials": len(branch.outputs)
+                },
+                status=status,
+                created_at=branch.started_at,
+                started_at=branch.started_at,
+                completed_at=branch.completed_at,
+                error=branch.error
+            )
+            _observe_task(task)
+            # 被取消的分支未完整执行，不计入耗时观测
+            if status == "failed":
+                self.failed_tasks[task.task_id] = task
+                self.logger.error(f"任务失败: {task.name} (ID: {task.task_id}) - {task.error}")
+            elif status == "completed":
+                self.completed_tasks[task.task_id] = task
+            else:
+                self.logger.info(f"分支已取消: {task.name} (ID: {task.task_id})")
+        
+        execution = FanOutExecution(theme, handlers, weights=weights,
+                                    cancel_threshold=cancel_threshold,
+                                    on_branch_done=record_branch)
+        return execution.start()
+    
     def get_execution_stats(self) -> Dict[str, Any]:
         """
         获取执行统计信息
@@ -320,6 +502,33 @@ class SteadyExecutor:
         
         return history
     
+    def get_step_observations(self, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        获取已完成的协同步骤的耗时观测，供路径优化的代价模型使用
+        
+        Args:
+            limit: 限制数量
+        
+        Returns:
+            观测列表，每项包含 role、action、voice_id、duration
+        """
+        tasks = [
+            task for task in list(self.completed_tasks.values())
+            if task.type == "counterpoint_step" and task.started_at is not None and task.completed_at is not None
+        ]
+        tasks.sort(key=lambda t: t.completed_at, reverse=True)
+        
+        observations = []
+        for task in tasks[:limit]:
+            step = task.payload.get("step", {})
+            observations.append({
+                "role": step.get("role", ""),
+                "action": step.get("action", ""),
+                "voice_id": task.payload.get("voice_id", ""),
+                "duration": task.completed_at - task.started_at
+            })
+        return observations
+    
     def is_task_completed(self, task_id: str) -> bool:
         """
         检查任务是否完成
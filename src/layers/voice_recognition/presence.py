@@ -0,0 +1,184 @@
+"""
+声部在场追踪 (Presence Tracker)
+功能：以时间轮记录声部心跳，均摊 O(1) 地找出空闲超时的声部
+"""
+
+from typing import Callable, Dict, List, Optional
+import time
+
+
+class PresenceTracker:
+    """
+    声部在场追踪器
+    按最近心跳时间把声部放入时间轮的槽位，超时的槽位整体回收
+    """
+
+    def __init__(self, ttl: float, resolution: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        初始化在场追踪器
+
+        Args:
+            ttl: 空闲超时时间（秒）
+            resolution: 时间轮槽位宽度（秒），超时判定的误差不超过该值
+            clock: 单调时钟
+        """
+        if ttl <= 0 or resolution <= 0:
+            raise ValueError("超时时间与槽位宽度必须大于0")
+
+        self.ttl = ttl
+        self.resolution = resolution
+        self.clock = clock
+
+        self._buckets: Dict[int, Dict[str, None]] = {}  # 槽位 → 声部ID有序集合
+        self._bucket_of: Dict[str, int] = {}
+        self._type_of: Dict[str, str] = {}
+        self._active_counts: Dict[str, int] = {}
+        self._pending: Dict[str, float] = {}  # 尚未写入时间轮的心跳
+        self._oldest_bucket: Optional[int] = None
+
+    def _slot(self, timestamp: float) -> int:
+        return int(timestamp // self.resolution)
+
+    def _place(self, voice_id: str, timestamp: float):
+        """
+        将声部放入时间戳对应的槽位
+        """
+        slot = self._slot(timestamp)
+        previous = self._bucket_of.get(voice_id)
+        if previous == slot:
+            return
+        if previous is not None:
+            bucket = self._buckets.get(previous)
+            if bucket is not None:
+                bucket.pop(voice_id, None)
+                if not bucket:
+                    del self._buckets[previous]
+
+        self._buckets.setdefault(slot, {})[voice_id] = None
+        self._bucket_of[voice_id] = slot
+        if self._oldest_bucket is None or slot < self._oldest_bucket:
+            self._oldest_bucket = slot
+
+    def track(self, voice_id: str, voice_type: str, timestamp: Optional[float] = None):
+        """
+        开始追踪声部
+
+        Args:
+            voice_id: 声部ID
+            voice_type: 声部类型
+            timestamp: 最近活动时间（默认为当前时间）
+        """
+        if voice_id not in self._type_of:
+            self._type_of[voice_id] = voice_type
+            self._active_counts[voice_type] = self._active_counts.get(voice_type, 0) + 1
+        self._pending.pop(voice_id, None)
+        self._place(voice_id, self.clock() if timestamp is None else timestamp)
+
+    def untrack(self, voice_id: str):
+        """
+        停止追踪声部
+
+        Args:
+            voice_id: 声部ID
+        """
+        voice_type = self._type_of.pop(voice_id, None)
+        if voice_type is None:
+            return
+        self._active_counts[voice_type] -= 1
+        self._pending.pop(voice_id, None)
+
+        slot = self._bucket_of.pop(voice_id)
+        bucket = self._buckets.get(slot)
+        if bucket is not None:
+            bucket.pop(voice_id, None)
+            if not bucket:
+                del self._buckets[slot]
+
+    def is_tracked(self, voice_id: str) -> bool:
+        """
+        声部是否在追踪中
+        """
+        return voice_id in self._type_of
+
+    def heartbeat(self, voice_id: str, timestamp: Optional[float] = None):
+        """
+        记录心跳，仅写入待处理缓冲区，在 flush 时批量写入时间轮
+
+        Args:
+            voice_id: 声部ID
+            timestamp: 心跳时间（默认为当前时间）
+        """
+        if voice_id in self._type_of:
+            self._pending[voice_id] = self.clock() if timestamp is None else timestamp
+
+    def flush(self) -> Dict[str, float]:
+        """
+        将缓冲的心跳批量写入时间轮
+
+        Returns:
+            本次写入的 {声部ID: 心跳时间}
+        """
+        pending = self._pending
+        if not pending:
+            return {}
+        self._pending = {}
+        for voice_id, timestamp in pending.items():
+            self._place(voice_id, timestamp)
+        return pending
+
+    def collect_idle(self, now: Optional[float] = None) -> List[str]:
+        """
+        取出空闲超时的声部并停止追踪它们
+
+        Args:
+            now: 当前时间（默认为时钟当前值）
+
+        Returns:
+            空闲超时的声部ID列表
+        """
+        self.flush()
+        if self._oldest_bucket is None:
+            return []
+
+        now = self.clock() if now is None else now
+        # 槽位 s 覆盖 [s*resolution, (s+1)*resolution)，整个槽位都早于截止时间才回收
+        cutoff = self._slot(now - self.ttl)
+        if cutoff <= self._oldest_bucket:
+            return []
+
+        # 长时间未清扫时槽位跨度可能远大于非空槽位数，此时只遍历非空槽位
+        if cutoff - self._oldest_bucket > len(self._buckets):
+            slots = sorted(slot for slot in self._buckets if slot < cutoff)
+        else:
+            slots = range(self._oldest_bucket, cutoff)
+
+        idle = []
+        for slot in slots:
+            bucket = self._buckets.pop(slot, None)
+            if not bucket:
+                continue
+            for voice_id in bucket:
+                del self._bucket_of[voice_id]
+                voice_type = self._type_of.pop(voice_id)
+                self._active_counts[voice_type] -= 1
+                idle.append(voice_id)
+
+        # 剩余槽位均不早于截止槽位，截止槽位即为新的下界
+        self._oldest_bucket = cutoff if self._buckets else None
+        return idle
+
+    def get_active_counts(self) -> Dict[str, int]:
+        """
+        获取各类型在追踪中的声部数量
+
+        Returns:
+            {声部类型: 数量}
+        """
+        return {voice_type: count for voice_type, count in self._active_counts.items() if count}
+
+    def pending_count(self) -> int:
+        """
+        尚未写入时间轮的心跳数量
+        """
+        return len(self._pending)
@@ -0,0 +1,199 @@
+"""
+声部图谱持久化 (Sonic Map Store)
+功能：以 JSON Lines 快照加增量变更日志的方式保存声部图谱，小改动的保存代价与变更量成正比
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import json
+import os
+
+SNAPSHOT_FORMAT = "collaborative_sonic_map"
+SNAPSHOT_VERSION = 1
+
+# 变更日志操作
+OP_REGISTER = "+"
+OP_REMOVE = "-"
+
+
+def log_path_for(file_path: str) -> str:
+    """
+    获取快照对应的变更日志路径
+
+    Args:
+        file_path: 快照文件路径
+
+    Returns:
+        变更日志路径
+    """
+    return file_path + ".log"
+
+
+def voice_to_record(voice: Any) -> List[Any]:
+    """
+    将声部转换为紧凑记录（字段顺序固定，不含进程内的活动时间）
+
+    Args:
+        voice: 声部对象
+
+    Returns:
+        声部记录
+    """
+    return [
+        voice.voice_id,
+        voice.name,
+        voice.voice_type,
+        voice.capability_vector,
+        voice.intention_vector,
+        voice.description,
+        voice.created_at
+    ]
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _read_generation(file_path: str) -> int:
+    """
+    读取已有快照的代数，文件不存在或无法解析时为0
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+    except (OSError, ValueError):
+        return 0
+    return header.get("generation", 0) if isinstance(header, dict) else 0
+
+
+def write_snapshot(file_path: str, records: Iterable[List[Any]], count: int) -> int:
+    """
+    原子写入完整快照：先写临时文件再替换，并清空变更日志
+
+    快照头部记录代数（每次改写加一），变更日志的每个条目记录写入时的快照代数；
+    回放时跳过其他代数的条目，因此替换快照后、删除日志前中断时，旧日志不会覆盖新快照
+
+    Args:
+        file_path: 快照文件路径
+        records: 声部记录
+        count: 声部数量
+
+    Returns:
+        新快照的代数
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+
+    log_path = log_path_for(file_path)
+    if not os.path.exists(file_path) and os.path.exists(log_path):
+        # 没有快照的日志无法判断代数，直接丢弃
+        os.remove(log_path)
+    generation = _read_generation(file_path) + 1
+
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(_dumps({"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION, "count": count,
+                        "generation": generation}))
+        f.write("\n")
+        f.writelines(_dumps(record) + "\n" for record in records)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+    # 旧日志的条目属于上一代快照，即使在此处中断，回放时也会被跳过
+    if os.path.exists(log_path):
+        os.remove(log_path)
+    return generation
+
+
+def append_changes(file_path: str, changes: List[List[Any]], generation: int):
+    """
+    追加变更日志
+
+    Args:
+        file_path: 快照文件路径
+        changes: 变更列表，每项为 [操作, 参数]
+        generation: 当前快照的代数
+    """
+    if not changes:
+        return
+    with open(log_path_for(file_path), "a", encoding="utf-8") as f:
+        f.write("".join(_dumps([*change, generation]) + "\n" for change in changes))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _iter_json_lines(file_path: str) -> Iterator[Any]:
+    """
+    逐行读取 JSON Lines 文件，跳过写入中断留下的不完整行
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def _truncate_torn_tail(log_path: str):
+    """
+    截掉写入中断留下的不完整末行，使后续追加的变更从新行开始，而不是拼接在残行之后
+    """
+    with open(log_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            chunk = f.read(position - start)
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position == end:
+            return
+        f.truncate(position)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_records(file_path: str) -> Tuple[Dict[str, List[Any]], int, int]:
+    """
+    读取快照并回放变更日志，只回放与快照代数相同的条目
+
+    Args:
+        file_path: 快照文件路径
+
+    Returns:
+        ({声部ID: 声部记录}, 日志条目数, 快照代数)
+    """
+    records: Dict[str, List[Any]] = {}
+
+    lines = _iter_json_lines(file_path)
+    header = next(lines, None)
+    if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"不是有效的声部图谱快照: {file_path}")
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"不支持的快照版本: {header.get('version')}")
+
+    generation = header.get("generation", 0)
+
+    for record in lines:
+        records[record[0]] = record
+
+    log_entries = 0
+    log_path = log_path_for(file_path)
+    if os.path.exists(log_path):
+        _truncate_torn_tail(log_path)
+        for change in _iter_json_lines(log_path):
+            log_entries += 1
+            if (change[2] if len(change) > 2 else 0) != generation:
+                continue
+            if change[0] == OP_REGISTER:
+                records[change[1][0]] = change[1]
+            elif change[0] == OP_REMOVE:
+                records.pop(change[1], None)
+
+    return records, log_entries, generation
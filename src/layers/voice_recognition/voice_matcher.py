@@ -0,0 +1,266 @@
+"""
+声部匹配 (Voice Matcher)
+功能：基于能力向量与意图向量为碳基声部挑选最合适的硅基协同声部
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple, Any
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时退化为纯Python计算
+    np = None
+
+
+# 各对位模式看重的能力维度
+PATTERN_CAPABILITY_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "staggered_complement": {"创意生成": 1.0, "技术实现": 0.8},
+    "canon_progression": {"创意生成": 0.8, "情感共鸣": 0.8, "技术实现": 0.6},
+    "fugue_interweaving": {"创意生成": 1.0, "逻辑分析": 0.8, "技术实现": 0.6},
+}
+
+CAPABILITY = "capability"
+INTENTION = "intention"
+
+
+def build_query(voice: Any, pattern_type: Optional[str] = None,
+                capability_weight: float = 1.0,
+                intention_weight: float = 1.0) -> Dict[Tuple[str, str], float]:
+    """
+    构建匹配查询向量
+
+    能力部分取碳基能力的互补（1 - 能力值）并叠加模式权重，意图部分要求与碳基意图一致
+
+    Args:
+        voice: 发起匹配的声部
+        pattern_type: 对位模式（可选）
+        capability_weight: 能力得分权重
+        intention_weight: 意图得分权重
+
+    Returns:
+        {(维度类别, 维度名称): 权重}
+    """
+    query: Dict[Tuple[str, str], float] = {}
+    for name, value in voice.capability_vector.items():
+        query[(CAPABILITY, name)] = capability_weight * max(1.0 - value, 0.0)
+    for name, value in PATTERN_CAPABILITY_WEIGHTS.get(pattern_type, {}).items():
+        key = (CAPABILITY, name)
+        query[key] = query.get(key, 0.0) + capability_weight * value
+    for name, value in voice.intention_vector.items():
+        query[(INTENTION, name)] = intention_weight * value
+    return query
+
+
+class VoiceMatrix:
+    """
+    某一类型声部的向量矩阵
+    每行一个声部，列为稳定的维度词表；注册与移除时增量更新
+    """
+
+    def __init__(self, vocabulary: Dict[Tuple[str, str], int], initial_capacity: int = 64):
+        """
+        初始化向量矩阵
+
+        Args:
+            vocabulary: 共享的维度词表 {(维度类别, 维度名称): 列号}
+            initial_capacity: 初始行容量
+        """
+        self.vocabulary = vocabulary
+        self.voice_ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.matrix = np.zeros((initial_capacity, max(len(vocabulary), 8)), dtype=np.float32)
+
+    def _ensure_capacity(self, rows: int, cols: int):
+        """
+        按倍增策略扩容，保证插入的均摊代价为常数
+        """
+        cur_rows, cur_cols = self.matrix.shape
+        if rows <= cur_rows and cols <= cur_cols:
+            return
+        new_rows = max(cur_rows, 1)
+        while new_rows < rows:
+            new_rows *= 2
+        new_cols = max(cur_cols, 1)
+        while new_cols < cols:
+            new_cols *= 2
+        grown = np.zeros((new_rows, new_cols), dtype=np.float32)
+        grown[:cur_rows, :cur_cols] = self.matrix
+        self.matrix = grown
+
+    def add(self, voice: Any):
+        """
+        添加声部行
+
+        Args:
+            voice: 声部对象
+        """
+        if voice.voice_id in self.row_of:
+            self.remove(voice.voice_id)
+
+        entries = []
+        for kind, vector in ((CAPABILITY, voice.capability_vector), (INTENTION, voice.intention_vector)):
+            for name, value in vector.items():
+                column = self.vocabulary.setdefault((kind, name), len(self.vocabulary))
+                entries.append((column, value))
+
+        row = len(self.voice_ids)
+        self._ensure_capacity(row + 1, len(self.vocabulary))
+        self.matrix[row, :] = 0.0
+        for column, value in entries:
+            self.matrix[row, column] = value
+
+        self.voice_ids.append(voice.voice_id)
+        self.row_of[voice.voice_id] = row
+
+    def remove(self, voice_id: str):
+        """
+        移除声部行：用最后一行填补空位
+
+        Args:
+            voice_id: 声部ID
+        """
+        row = self.row_of.pop(voice_id, None)
+        if row is None:
+            return
+        last = len(self.voice_ids) - 1
+        if row != last:
+            moved_id = self.voice_ids[last]
+            self.matrix[row, :] = self.matrix[last, :]
+            self.voice_ids[row] = moved_id
+            self.row_of[moved_id] = row
+        self.voice_ids.pop()
+
+    def query_vectors(self, queries: Sequence[Dict[Tuple[str, str], float]]):
+        """
+        将查询字典转换为查询矩阵（词表外的维度不影响得分）
+
+        Args:
+            queries: 查询向量列表
+
+        Returns:
+            形状为 (列数, 查询数) 的矩阵
+        """
+        cols = self.matrix.shape[1]
+        q = np.zeros((cols, len(queries)), dtype=np.float32)
+        for index, query in enumerate(queries):
+            for key, weight in query.items():
+                column = self.vocabulary.get(key)
+                if column is not None and column < cols:
+                    q[column, index] = weight
+        return q
+
+    def top_k(self, queries: Sequence[Dict[Tuple[str, str], float]], k: int,
+              exclude: Sequence[Optional[str]]) -> List[List[Tuple[str, float]]]:
+        """
+        批量计算得分并取前k名
+
+        Args:
+            queries: 查询向量列表
+            k: 返回数量
+            exclude: 每个查询需排除的声部ID
+
+        Returns:
+            每个查询的 [(声部ID, 得分)] 列表，按得分降序
+        """
+        count = len(self.voice_ids)
+        if count == 0 or k <= 0:
+            return [[] for _ in queries]
+
+        scores = self.matrix[:count] @ self.query_vectors(queries)
+        results = []
+        for index in range(len(queries)):
+            column = scores[:, index].copy()
+            excluded_row = self.row_of.get(exclude[index]) if exclude[index] else None
+            if excluded_row is not None:
+                column[excluded_row] = -np.inf
+
+            limit = min(k, count)
+            if limit < count:
+                candidates = np.argpartition(-column, limit - 1)[:limit]
+            else:
+                candidates = np.arange(count)
+            ordered = candidates[np.argsort(-column[candidates], kind="stable")]
+            results.append([
+                (self.voice_ids[row], float(column[row]))
+                for row in ordered if column[row] != -np.inf
+            ])
+        return results
+
+
+class VoiceMatcher:
+    """
+    声部匹配器
+    按声部类型维护向量矩阵，以批量点积回答"为该碳基声部挑选最佳的k个硅基声部"
+    """
+
+    def __init__(self):
+        """
+        初始化声部匹配器
+        """
+        self.vocabulary: Dict[Tuple[str, str], int] = {}
+        self.matrices: Dict[str, VoiceMatrix] = {}
+        self.voices: Dict[str, Dict[str, Any]] = {}  # numpy 不可用时使用的声部索引
+
+    def add(self, voice: Any):
+        """
+        添加声部
+
+        Args:
+            voice: 声部对象
+        """
+        if np is None:
+            self.voices.setdefault(voice.voice_type, {})[voice.voice_id] = voice
+            return
+        matrix = self.matrices.get(voice.voice_type)
+        if matrix is None:
+            matrix = self.matrices[voice.voice_type] = VoiceMatrix(self.vocabulary)
+        matrix.add(voice)
+
+    def remove(self, voice: Any):
+        """
+        移除声部
+
+        Args:
+            voice: 声部对象
+        """
+        if np is None:
+            self.voices.get(voice.voice_type, {}).pop(voice.voice_id, None)
+            return
+        matrix = self.matrices.get(voice.voice_type)
+        if matrix is not None:
+            matrix.remove(voice.voice_id)
+
+    def top_k(self, queries: Sequence[Dict[Tuple[str, str], float]], voice_type: str, k: int,
+              exclude: Sequence[Optional[str]]) -> List[List[Tuple[str, float]]]:
+        """
+        为每个查询返回得分最高的k个声部
+
+        Args:
+            queries: 查询向量列表
+            voice_type: 候选声部类型
+            k: 返回数量
+            exclude: 每个查询需排除的声部ID
+
+        Returns:
+            每个查询的 [(声部ID, 得分)] 列表，按得分降序
+        """
+        if np is not None:
+            matrix = self.matrices.get(voice_type)
+            if matrix is None:
+                return [[] for _ in queries]
+            return matrix.top_k(queries, k, exclude)
+
+        candidates = self.voices.get(voice_type, {})
+        results = []
+        for query, excluded in zip(queries, exclude):
+            scored = []
+            for voice_id, voice in candidates.items():
+                if voice_id == excluded:
+                    continue
+                score = sum(query.get((CAPABILITY, name), 0.0) * value
+                            for name, value in voice.capability_vector.items())
+                score += sum(query.get((INTENTION, name), 0.0) * value
+                             for name, value in voice.intention_vector.items())
+                scored.append((voice_id, score))
+            scored.sort(key=lambda item: item[1], reverse=True)
+            results.append(scored[:k])
+        return results
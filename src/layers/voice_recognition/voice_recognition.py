@@ -3,12 +3,26 @@
 功能：识别与注册参与协同的"声部"（碳基用户与硅基智能体），建立动态的协同声部图谱
 """
 
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from itertools import chain
+from typing import Dict, List, Optional, Tuple, Any
 import json
+import os
 import uuid
 import time
 
+from src.layers.voice_recognition.sonic_map_store import (
+    OP_REGISTER,
+    OP_REMOVE,
+    voice_to_record,
+    write_snapshot,
+    append_changes,
+    read_records,
+)
+from src.layers.voice_recognition.voice_matcher import VoiceMatcher, build_query
+from src.layers.voice_recognition.presence import PresenceTracker
+
 
 @dataclass
 class Voice:
@@ -19,16 +33,110 @@ class Voice:
     capability_vector: Dict[str, float]  # 能力向量
     intention_vector: Dict[str, float]  # 意图向量
     description: str = ""
-    created_at: str = ""
-    last_active: str = ""
+    created_at: float = 0.0  # 注册时间（time.time()）
+    last_active: float = 0.0  # 最近活动时间（time.monotonic()，仅用于比较间隔）
 
 
 class CollaborativeSonicMap:
     """协同声部图谱"""
     
     def __init__(self):
-        self.voices: Dict[str, Voice] = {}
-        self.voice_map: Dict[str, List[str]] = {}  # 声部关系映射
+        self._voices: Dict[str, Voice] = {}
+        self._voice_map: Dict[str, Dict[str, Voice]] = {}  # 声部类型索引：类型 → {声部ID: 声部}
+        
+        # 读缓存，写入时失效
+        self._type_cache: Dict[str, Tuple[Voice, ...]] = {}
+        self._map_snapshot: Optional[Dict] = None
+        
+        # 持久化状态：绑定的快照路径与代数、未保存的变更、日志条目数、待延迟加载的文件
+        self._persist_path: Optional[str] = None
+        self._generation = 0
+        self._pending_changes: List[List[Any]] = []
+        self._log_entries = 0
+        self._lazy_path: Optional[str] = None
+        self.compaction_ratio = 0.25  # 日志条目超过声部数的该比例时改写完整快照
+        
+        # 声部匹配器，首次匹配时构建，之后随注册与移除增量更新
+        self._matcher: Optional[VoiceMatcher] = None
+        
+        # 在场追踪：空闲超时的声部被停放（移出索引但保留）或淘汰
+        self.clock = time.monotonic
+        self._presence: Optional[PresenceTracker] = None
+        self.presence_policy = "park"
+        self.max_parked: Optional[int] = None
+        self._parked: "OrderedDict[str, Voice]" = OrderedDict()
+        self._parked_counts: Dict[str, int] = {}
+        self._evicted_count = 0
+        self._last_sweep = 0.0
+    
+    @property
+    def voices(self) -> Dict[str, Voice]:
+        """
+        声部字典：声部ID → 声部
+        """
+        if self._lazy_path is not None:
+            self._load_deferred()
+        return self._voices
+    
+    @property
+    def voice_map(self) -> Dict[str, Dict[str, Voice]]:
+        """
+        声部类型索引：类型 → {声部ID: 声部}
+        """
+        if self._lazy_path is not None:
+            self._load_deferred()
+        return self._voice_map
+    
+    def _index_voice(self, voice: Voice):
+        """
+        将声部加入各索引
+        
+        Args:
+            voice: 声部对象
+        """
+        self._voices[voice.voice_id] = voice
+        self._voice_map.setdefault(voice.voice_type, {})[voice.voice_id] = voice
+        if self._matcher is not None:
+            self._matcher.add(voice)
+        if self._presence is not None:
+            self._presence.track(voice.voice_id, voice.voice_type, voice.last_active)
+    
+    def _unindex_voice(self, voice: Voice):
+        """
+        将声部移出各索引
+        
+        Args:
+            voice: 声部对象
+        """
+        self._voices.pop(voice.voice_id, None)
+        type_index = self._voice_map.get(voice.voice_type)
+        if type_index is not None:
+            type_index.pop(voice.voice_id, None)
+        if self._matcher is not None:
+            self._matcher.remove(voice)
+        if self._presence is not None:
+            self._presence.untrack(voice.voice_id)
+        self._invalidate(voice.voice_type)
+    
+    def _record_change(self, change: List[Any]):
+        """
+        记录未保存的变更（仅在图谱已绑定持久化文件时）
+        
+        Args:
+            change: 变更记录
+        """
+        if self._persist_path is not None:
+            self._pending_changes.append(change)
+    
+    def _invalidate(self, voice_type: str):
+        """
+        写入后使相关缓存失效
+        
+        Args:
+            voice_type: 发生变化的声部类型
+        """
+        self._type_cache.pop(voice_type, None)
+        self._map_snapshot = None
     
     def register_voice(self, name: str, voice_type: str, 
                       capability_vector: Dict[str, float], 
@@ -58,14 +166,17 @@ class CollaborativeSonicMap:
             capability_vector=capability_vector,
             intention_vector=intention_vector,
             description=description,
-            created_at=time.strftime("%Y-%m-%d %H:%M:%S"),
-            last_active=time.strftime("%Y-%m-%d %H:%M:%S")
+            created_at=time.time(),
+            last_active=self.clock()
         )
         
-        self.voices[voice_id] = voice
-        if voice_type not in self.voice_map:
-            self.voice_map[voice_type] = []
-        self.voice_map[voice_type].append(voice_id)
+        if self._lazy_path is not None:
+            self._load_deferred()
+        self._index_voice(voice)
+        self._invalidate(voice_type)
+        self._record_change([OP_REGISTER, voice_to_record(voice)])
+        if self._presence is not None:
+            self._maybe_sweep(voice.last_active)
         
         return voice
     
@@ -81,7 +192,7 @@ class CollaborativeSonicMap:
         """
         return self.voices.get(voice_id)
     
-    def get_voices_by_type(self, voice_type: str) -> List[Voice]:
+    def get_voices_by_type(self, voice_type: str) -> Tuple[Voice, ...]:
         """
         按类型获取声部列表
         
@@ -89,10 +200,13 @@ class CollaborativeSonicMap:
             voice_type: 声部类型
         
         Returns:
-            声部对象列表
+            声部对象元组（按注册顺序，缓存至该类型下次变化）
         """
-        voice_ids = self.voice_map.get(voice_type, [])
-        return [self.voices[vid] for vid in voice_ids if vid in self.voices]
+        voices = self._type_cache.get(voice_type)
+        if voices is None:
+            voices = tuple(self.voice_map.get(voice_type, {}).values())
+            self._type_cache[voice_type] = voices
+        return voices
     
     def update_voice_activity(self, voice_id: str):
         """
@@ -101,8 +215,32 @@ class CollaborativeSonicMap:
         Args:
             voice_id: 声部ID
         """
-        if voice_id in self.voices:
-            self.voices[voice_id].last_active = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.heartbeat([voice_id])
+    
+    def heartbeat(self, voice_ids: List[str]):
+        """
+        批量更新声部活动状态
+        
+        已停放的声部收到心跳时恢复到图谱中
+        
+        Args:
+            voice_ids: 声部ID列表
+        """
+        voices = self.voices
+        now = self.clock()
+        presence = self._presence
+        for voice_id in voice_ids:
+            voice = voices.get(voice_id)
+            if voice is None:
+                voice = self._unpark(voice_id)
+                if voice is None:
+                    continue
+            voice.last_active = now
+            if presence is not None:
+                presence.heartbeat(voice_id, now)
+        
+        if presence is not None:
+            self._maybe_sweep(now)
     
     def remove_voice(self, voice_id: str):
         """
@@ -111,46 +249,323 @@ class CollaborativeSonicMap:
         Args:
             voice_id: 声部ID
         """
-        if voice_id in self.voices:
-            voice_type = self.voices[voice_id].voice_type
-            self.voices.pop(voice_id)
-            if voice_type in self.voice_map:
-                self.voice_map[voice_type].remove(voice_id)
+        voice = self.voices.get(voice_id)
+        if voice is not None:
+            self._unindex_voice(voice)
+        elif self._pop_parked(voice_id) is None:
+            return
+        self._record_change([OP_REMOVE, voice_id])
+    
+    def enable_presence_tracking(self, ttl: float = 300.0, 
+                                 policy: str = "park", 
+                                 resolution: float = 1.0, 
+                                 max_parked: Optional[int] = None):
+        """
+        启用在场追踪
+        
+        空闲超过 ttl 的声部按策略处理："park" 移出索引并停放，收到心跳时恢复；
+        "evict" 直接移除。停放数量超过 max_parked 时淘汰最早停放的声部
+        
+        Args:
+            ttl: 空闲超时时间（秒）
+            policy: 超时处理策略，'park' 或 'evict'
+            resolution: 时间轮槽位宽度（秒）
+            max_parked: 最大停放数量（可选）
+        """
+        if policy not in ("park", "evict"):
+            raise ValueError("在场追踪策略必须是 'park' 或 'evict'")
+        
+        self.presence_policy = policy
+        self.max_parked = max_parked
+        self._presence = PresenceTracker(ttl, resolution, self.clock)
+        self._last_sweep = self.clock()
+        for voice in self.voices.values():
+            self._presence.track(voice.voice_id, voice.voice_type, voice.last_active)
+    
+    def disable_presence_tracking(self):
+        """
+        关闭在场追踪，已停放的声部保持停放
+        """
+        self._presence = None
+    
+    def _maybe_sweep(self, now: float):
+        """
+        距上次清扫超过一个槽位宽度时执行清扫，使清扫代价均摊到各次调用
+        """
+        if now - self._last_sweep >= self._presence.resolution:
+            self.sweep_idle_voices(now)
+    
+    def sweep_idle_voices(self, now: Optional[float] = None) -> List[str]:
+        """
+        清扫空闲超时的声部
+        
+        Args:
+            now: 当前时间（默认为 self.clock()）
+        
+        Returns:
+            被停放或移除的声部ID列表
+        """
+        presence = self._presence
+        if presence is None:
+            return []
+        
+        now = self.clock() if now is None else now
+        self._last_sweep = now
+        idle_ids = presence.collect_idle(now)
+        
+        for voice_id in idle_ids:
+            voice = self._voices.get(voice_id)
+            if voice is None:
+                continue
+            if self.presence_policy == "evict":
+                self.remove_voice(voice_id)
+                self._evicted_count += 1
+            else:
+                self._park(voice)
+        
+        return idle_ids
+    
+    def _park(self, voice: Voice):
+        """
+        停放声部：移出索引，保留声部数据
+        """
+        self._unindex_voice(voice)
+        self._parked[voice.voice_id] = voice
+        self._parked_counts[voice.voice_type] = self._parked_counts.get(voice.voice_type, 0) + 1
+        
+        if self.max_parked is not None:
+            while len(self._parked) > self.max_parked:
+                oldest_id = next(iter(self._parked))
+                self._pop_parked(oldest_id)
+                self._record_change([OP_REMOVE, oldest_id])
+                self._evicted_count += 1
+    
+    def _pop_parked(self, voice_id: str) -> Optional[Voice]:
+        """
+        从停放区取出声部
+        """
+        voice = self._parked.pop(voice_id, None)
+        if voice is not None:
+            self._parked_counts[voice.voice_type] -= 1
+        return voice
+    
+    def _unpark(self, voice_id: str) -> Optional[Voice]:
+        """
+        恢复停放的声部
+        """
+        voice = self._pop_parked(voice_id)
+        if voice is not None:
+            self._index_voice(voice)
+            self._invalidate(voice.voice_type)
+        return voice
+    
+    def get_presence_stats(self) -> Dict[str, Any]:
+        """
+        获取在场统计信息
+        
+        Returns:
+            在场统计信息字典，包含各类型活跃与停放的声部数量
+        """
+        if self._presence is None:
+            return {"enabled": False, "parked": dict(self._parked_counts)}
+        
+        return {
+            "enabled": True,
+            "ttl": self._presence.ttl,
+            "policy": self.presence_policy,
+            "active": self._presence.get_active_counts(),
+            "parked": {t: n for t, n in self._parked_counts.items() if n},
+            "evicted": self._evicted_count,
+            "pending_heartbeats": self._presence.pending_count()
+        }
     
     def get_voice_map(self) -> Dict:
         """
         获取声部图谱
         
+        快照在注册或移除声部时失效，期间重复调用返回同一对象，调用方不应修改
+        
         Returns:
             声部图谱字典
         """
+        if self._map_snapshot is None:
+            self._map_snapshot = {
+                "voices": {vid: {
+                    "name": v.name,
+                    "type": v.voice_type,
+                    "capabilities": v.capability_vector,
+                    "intentions": v.intention_vector,
+                    "description": v.description
+                } for vid, v in self.voices.items()},
+                "voice_map": {
+                    voice_type: list(type_index)
+                    for voice_type, type_index in self.voice_map.items()
+                }
+            }
+        return self._map_snapshot
+    
+    def _get_matcher(self) -> VoiceMatcher:
+        """
+        获取声部匹配器，首次调用时由现有声部构建
+        """
+        voices = self.voices
+        if self._matcher is None:
+            matcher = VoiceMatcher()
+            for voice in voices.values():
+                matcher.add(voice)
+            self._matcher = matcher
+        return self._matcher
+    
+    def find_partners(self, voice_id: str, 
+                      k: int = 5, 
+                      pattern_type: Optional[str] = None, 
+                      partner_type: str = "silicon", 
+                      capability_weight: float = 1.0, 
+                      intention_weight: float = 1.0) -> List[Tuple[Voice, float]]:
+        """
+        为声部匹配最合适的协同声部
+        
+        得分 = 候选能力与（碳基能力互补 + 模式所需能力）的点积 + 候选意图与碳基意图的点积
+        
+        Args:
+            voice_id: 发起匹配的声部ID（通常为碳基声部）
+            k: 返回数量
+            pattern_type: 对位模式（可选）
+            partner_type: 候选声部类型
+            capability_weight: 能力得分权重
+            intention_weight: 意图得分权重
+        
+        Returns:
+            [(声部, 得分)] 列表，按得分降序
+        """
+        return self.find_partners_batch(
+            [voice_id], k, pattern_type, partner_type, capability_weight, intention_weight
+        )[voice_id]
+    
+    def find_partners_batch(self, voice_ids: List[str], 
+                            k: int = 5, 
+                            pattern_type: Optional[str] = None, 
+                            partner_type: str = "silicon", 
+                            capability_weight: float = 1.0, 
+                            intention_weight: float = 1.0) -> Dict[str, List[Tuple[Voice, float]]]:
+        """
+        批量匹配协同声部，所有查询共用一次矩阵乘法
+        
+        Args:
+            voice_ids: 发起匹配的声部ID列表
+            k: 每个声部返回的数量
+            pattern_type: 对位模式（可选）
+            partner_type: 候选声部类型
+            capability_weight: 能力得分权重
+            intention_weight: 意图得分权重
+        
+        Returns:
+            {声部ID: [(声部, 得分)]}
+        """
+        matcher = self._get_matcher()
+        voices = self._voices
+        
+        for voice_id in voice_ids:
+            if voice_id not in voices:
+                raise ValueError(f"声部不存在: {voice_id}")
+        
+        queries = [
+            build_query(voices[voice_id], pattern_type, capability_weight, intention_weight)
+            for voice_id in voice_ids
+        ]
+        ranked = matcher.top_k(queries, partner_type, k, voice_ids)
         return {
-            "voices": {vid: {
-                "name": v.name,
-                "type": v.voice_type,
-                "capabilities": v.capability_vector,
-                "intentions": v.intention_vector,
-                "description": v.description
-            } for vid, v in self.voices.items()},
-            "voice_map": self.voice_map
+            voice_id: [(voices[partner_id], score) for partner_id, score in matches]
+            for voice_id, matches in zip(voice_ids, ranked)
         }
     
     def save_to_file(self, file_path: str):
         """
         保存声部图谱到文件
         
+        首次保存或日志过长时原子写入完整的 JSON Lines 快照；
+        此后对同一文件的保存只追加自上次保存以来的变更，代价与变更量成正比。
+        注意：声部注册后对其字段的直接修改不会被记录
+        
         Args:
             file_path: 文件路径
         """
-        # 实际实现中应序列化保存
-        pass
+        # 延迟加载尚未触发，说明图谱与文件内容一致
+        if self._lazy_path is not None and self._lazy_path == file_path:
+            return
+        
+        voices = self.voices
+        pending = self._pending_changes
+        needs_snapshot = (
+            file_path != self._persist_path
+            or not os.path.exists(file_path)
+            or self._log_entries + len(pending) > len(voices) * self.compaction_ratio + 1024
+        )
+        
+        if needs_snapshot:
+            # 停放的声部仍属于图谱，一并写入快照
+            self._generation = write_snapshot(
+                file_path,
+                (voice_to_record(v) for v in chain(voices.values(), self._parked.values())),
+                len(voices) + len(self._parked)
+            )
+            self._log_entries = 0
+        else:
+            append_changes(file_path, pending, self._generation)
+            self._log_entries += len(pending)
+        
+        self._persist_path = file_path
+        self._pending_changes = []
     
     def load_from_file(self, file_path: str):
         """
         从文件加载声部图谱
         
+        加载是延迟的：此处仅绑定文件，首次访问声部时才读取快照并回放变更日志。
+        加载后的图谱替换当前内容，活动时间重置为加载时刻
+        
         Args:
             file_path: 文件路径
         """
-        # 实际实现中应反序列化加载
-        pass
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"声部图谱文件不存在: {file_path}")
+        
+        self._voices = {}
+        self._voice_map = {}
+        self._type_cache.clear()
+        self._map_snapshot = None
+        self._persist_path = file_path
+        self._generation = 0
+        self._pending_changes = []
+        self._log_entries = 0
+        self._lazy_path = file_path
+        self._matcher = None
+        self._parked.clear()
+        self._parked_counts.clear()
+        if self._presence is not None:
+            self._presence = PresenceTracker(self._presence.ttl, self._presence.resolution, self.clock)
+    
+    def _load_deferred(self):
+        """
+        执行延迟加载
+        """
+        file_path = self._lazy_path
+        self._lazy_path = None
+        
+        records, log_entries, self._generation = read_records(file_path)
+        now = self.clock()
+        for voice_id, name, voice_type, capabilities, intentions, description, created_at in records.values():
+            self._index_voice(Voice(
+                voice_id=voice_id,
+                name=name,
+                voice_type=voice_type,
+                capability_vector=capabilities,
+                intention_vector=intentions,
+                description=description,
+                created_at=created_at,
+                last_active=now
+            ))
+        
+        self._log_entries = log_entries
+        self._type_cache.clear()
+        self._map_snapshot = None
@@ -8,6 +8,7 @@ from typing import Dict, List, Optional, Tuple, Any
 import json
 import uuid
 import time
+from src.utils.metrics import get_registry
 
 
 @dataclass
@@ -27,6 +28,11 @@ class ValidationResult:
     timestamp: float
 
 
+# 运行指标：按验证结果统计（passed / differences / missing_thinking_process）
+VALIDATIONS_TOTAL = get_registry().counter("meta_creation_validations", "按结果统计的对位验证次数",
+                                           ("outcome",))
+
+
 class CounterpointValidator:
     """
     对位验证器
@@ -62,6 +68,7 @@ class CounterpointValidator:
         
         # 1. 思考显影：验证硅基是否清晰展示推理过程
         if not self._validate_thinking_visualization(thinking_process):
+            VALIDATIONS_TOTAL.labels("missing_thinking_process").inc()
             return ValidationResult(
                 validation_id=validation_id,
                 action_id=action_id,
@@ -114,6 +121,7 @@ class CounterpointValidator:
         )
         
         self.validation_results[validation_id] = result
+        VALIDATIONS_TOTAL.labels("differences" if differences else "passed").inc()
         
         return result
     
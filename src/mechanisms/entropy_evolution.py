@@ -8,6 +8,7 @@ from typing import Dict, List, Optional, Tuple, Any
 import json
 import uuid
 import time
+from src.utils.metrics import get_registry
 
 
 @dataclass
@@ -41,6 +42,13 @@ class EvolutionProposal:
     timestamp: float
 
 
+# 运行指标：最近一次计算的系统熵值及其分布
+_registry = get_registry()
+ENTROPY_SCORE = _registry.gauge("meta_creation_entropy_score", "最近一次计算的系统熵值")
+ENTROPY_SCORES = _registry.histogram("meta_creation_entropy_score_distribution", "系统熵值分布",
+                                     buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0))
+
+
 class EntropyEvolutionManager:
     """
     熵值进化管理器
@@ -114,6 +122,8 @@ class EntropyEvolutionManager:
         )
         
         self.entropy_history.append(entropy_data)
+        ENTROPY_SCORE.set(entropy_score)
+        ENTROPY_SCORES.observe(entropy_score)
         
         # 保持历史记录在合理范围内
         if len(self.entropy_history) > 100:
@@ -0,0 +1,133 @@
+"""
+有界流 (Bounded Stream)
+功能：在后台线程中运行生产者，通过有界缓冲区把部分结果流式交给同步或异步消费者，
+      消费者提前结束时通知生产者停止
+"""
+
+from queue import Full, Queue
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator
+import asyncio
+import concurrent.futures
+import threading
+
+
+# 生产者结束标记
+_END = object()
+
+# 阻塞操作检查停止标记的间隔（秒）
+_POLL_INTERVAL = 0.05
+
+
+class _Failure:
+    """生产者抛出的异常"""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _produce(factory: Callable[[], Iterable[Any]], put: Callable[[Any], bool],
+             stop: threading.Event):
+    """
+    生产者线程主体：逐个写入缓冲区，消费者停止后不再继续生产
+    """
+    try:
+        for item in factory():
+            if stop.is_set() or not put(item):
+                return
+        put(_END)
+    except BaseException as e:
+        put(_Failure(e))
+
+
+def iterate_in_background(factory: Callable[[], Iterable[Any]], buffer_size: int = 16) -> Iterator[Any]:
+    """
+    在后台线程中运行生产者，同步地逐个产出结果
+
+    缓冲区满时生产者阻塞（最多领先消费者 buffer_size 个结果）；生产者的异常在消费端重新抛出
+
+    Args:
+        factory: 返回可迭代对象（通常为生成器）的无参函数
+        buffer_size: 缓冲区容量
+
+    Returns:
+        结果迭代器
+    """
+    if buffer_size < 1:
+        raise ValueError("缓冲区容量必须大于0")
+
+    buffer: Queue = Queue(maxsize=buffer_size)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except Full:
+                continue
+        return False
+
+    thread = threading.Thread(target=_produce, args=(factory, put, stop), daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+
+async def aiterate_in_background(factory: Callable[[], Iterable[Any]],
+                                 buffer_size: int = 16) -> AsyncIterator[Any]:
+    """
+    在后台线程中运行生产者，异步地逐个产出结果（不阻塞事件循环）
+
+    Args:
+        factory: 返回可迭代对象（通常为生成器）的无参函数
+        buffer_size: 缓冲区容量
+
+    Returns:
+        异步结果迭代器
+    """
+    if buffer_size < 1:
+        raise ValueError("缓冲区容量必须大于0")
+
+    loop = asyncio.get_running_loop()
+    buffer: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        try:
+            future = asyncio.run_coroutine_threadsafe(buffer.put(item), loop)
+        except RuntimeError:
+            # 事件循环已关闭
+            return False
+        while not stop.is_set():
+            try:
+                future.result(timeout=_POLL_INTERVAL)
+                return True
+            except concurrent.futures.TimeoutError:
+                continue
+            except (Exception, asyncio.CancelledError):
+                return False
+        future.cancel()
+        return False
+
+    thread = threading.Thread(target=_produce, args=(factory, put, stop), daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = await buffer.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
@@ -0,0 +1,204 @@
+"""
+紧凑记录 (Compact Record)
+功能：为核心数据类生成使用 __slots__ 的紧凑变体，UUID 以整数存储，保持原有属性接口
+"""
+
+from dataclasses import FrozenInstanceError, MISSING, fields
+from typing import Any, Dict, Iterable, Tuple, Type, Union
+import sys
+import uuid
+
+
+def encode_id(value: Any) -> Union[int, Any]:
+    """
+    将规范格式的 UUID 字符串编码为 128 位整数，其他值原样返回
+
+    Args:
+        value: ID值
+
+    Returns:
+        编码后的ID
+    """
+    if value.__class__ is not str or len(value) != 36:
+        return value
+    try:
+        parsed = uuid.UUID(value)
+    except ValueError:
+        return value
+    # 只编码可无损还原的规范格式
+    return parsed.int if str(parsed) == value else value
+
+
+def decode_id(stored: Any) -> Any:
+    """
+    将整数形式的ID还原为 UUID 字符串
+
+    Args:
+        stored: 存储的ID
+
+    Returns:
+        ID值
+    """
+    if stored.__class__ is int:
+        return str(uuid.UUID(int=stored))
+    return stored
+
+
+def _id_property(slot: str) -> property:
+    """
+    生成ID字段的属性：读取时还原为字符串，写入时编码
+    """
+    def getter(self):
+        return decode_id(getattr(self, slot))
+
+    def setter(self, value):
+        self.__setattr__(slot, encode_id(value))
+
+    return property(getter, setter)
+
+
+def _hashable(value: Any) -> bool:
+    """
+    判断值是否可哈希
+    """
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def compact_record(cls: Type, id_fields: Iterable[str] = (), frozen: bool = False,
+                   name: str = "", module: str = "") -> Type:
+    """
+    为数据类生成紧凑变体
+
+    生成的类使用 __slots__（无实例 __dict__），字段名、默认值与构造参数与原数据类一致，
+    id_fields 中的 UUID 字符串以整数存储。frozen 为 True 时实例不可修改，并按ID字段哈希
+    （没有ID字段时按可哈希的字段值哈希），字典、列表等可变字段不参与哈希。
+
+    Args:
+        cls: 原数据类
+        id_fields: 以整数存储的ID字段
+        frozen: 是否生成不可变变体
+        name: 生成的类名（默认 Compact<类名> 或 Frozen<类名>）
+        module: 生成的类所属模块（默认为调用方模块，序列化时按此查找类）
+
+    Returns:
+        紧凑变体类
+    """
+    record_fields = [f for f in fields(cls) if f.init]
+    field_names = tuple(f.name for f in record_fields)
+    id_fields = tuple(id_fields)
+    for field_name in id_fields:
+        if field_name not in field_names:
+            raise ValueError(f"{cls.__name__} 没有字段: {field_name}")
+
+    slot_of = {n: (f"_{n}" if n in id_fields else n) for n in field_names}
+    slots = tuple(slot_of[n] for n in field_names)
+
+    # 与 dataclasses 相同，通过生成源码得到无额外开销的 __init__
+    defaults: Dict[str, Any] = {}
+    params = []
+    for f in record_fields:
+        if f.default is not MISSING:
+            defaults[f"_dflt_{f.name}"] = f.default
+            params.append(f"{f.name}=_dflt_{f.name}")
+        elif f.default_factory is not MISSING:
+            defaults[f"_fact_{f.name}"] = f.default_factory
+            params.append(f"{f.name}=_HAS_FACTORY")
+        else:
+            params.append(f.name)
+
+    body = []
+    for f in record_fields:
+        value = f.name
+        if f.default_factory is not MISSING:
+            value = f"(_fact_{f.name}() if {f.name} is _HAS_FACTORY else {f.name})"
+        if f.name in id_fields:
+            value = f"_encode_id({value})"
+        body.append(f"    _set(self, {slot_of[f.name]!r}, {value})")
+
+    source = f"def __init__(self, {', '.join(params)}):\n" + ("\n".join(body) or "    pass")
+    namespace: Dict[str, Any] = {
+        "_set": object.__setattr__,
+        "_encode_id": encode_id,
+        "_HAS_FACTORY": object(),
+        **defaults,
+    }
+    exec(source, namespace)
+
+    def values(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, n) for n in field_names)
+
+    def __repr__(self) -> str:
+        args = ", ".join(f"{n}={getattr(self, n)!r}" for n in field_names)
+        return f"{self.__class__.__name__}({args})"
+
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in slots)
+
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, s) for s in slots)
+
+    def __setstate__(self, state: Tuple[Any, ...]):
+        for slot, value in zip(slots, state):
+            object.__setattr__(self, slot, value)
+
+    def to_record(self):
+        """
+        转换为原数据类实例
+        """
+        return cls(**{n: getattr(self, n) for n in field_names})
+
+    @classmethod
+    def from_record(klass, record):
+        """
+        由原数据类实例构造
+        """
+        return klass(**{n: getattr(record, n) for n in field_names})
+
+    attrs: Dict[str, Any] = {
+        "__slots__": slots,
+        "__doc__": f"{cls.__name__} 的紧凑{'不可变' if frozen else ''}变体\n{cls.__doc__ or ''}",
+        "__init__": namespace["__init__"],
+        "__repr__": __repr__,
+        "__eq__": __eq__,
+        "__getstate__": __getstate__,
+        "__setstate__": __setstate__,
+        "_field_names": field_names,
+        "values": values,
+        "to_record": to_record,
+        "from_record": from_record,
+    }
+    for field_name in id_fields:
+        attrs[field_name] = _id_property(slot_of[field_name])
+
+    if frozen:
+        def __setattr__(self, key, value):
+            raise FrozenInstanceError(f"cannot assign to field '{key}'")
+
+        def __delattr__(self, key):
+            raise FrozenInstanceError(f"cannot delete field '{key}'")
+
+        if id_fields:
+            hash_slots = tuple(slot_of[n] for n in id_fields)
+
+            def __hash__(self):
+                return hash(tuple(getattr(self, s) for s in hash_slots))
+        else:
+            def __hash__(self):
+                return hash(tuple(v for v in (getattr(self, s) for s in slots) if _hashable(v)))
+
+        attrs["__setattr__"] = __setattr__
+        attrs["__delattr__"] = __delattr__
+        attrs["__hash__"] = __hash__
+    else:
+        attrs["__hash__"] = None
+
+    class_name = name or f"{'Frozen' if frozen else 'Compact'}{cls.__name__}"
+    compact_cls = type(class_name, (), attrs)
+    compact_cls.__module__ = module or sys._getframe(1).f_globals.get("__name__", cls.__module__)
+    return compact_cls
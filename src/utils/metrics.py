@@ -0,0 +1,542 @@
+"""
+运行指标 (Metrics)
+功能：以 Prometheus 文本格式导出计数器、直方图与仪表盘，通过仅限本机访问的内嵌 HTTP 端点提供抓取；
+      热路径上的更新写入当前线程独占的分片，无需加锁，抓取时再汇总各分片
+"""
+
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import ipaddress
+import math
+import threading
+import weakref
+
+
+# 默认直方图桶（秒），覆盖亚毫秒级调度到数秒级执行
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    """
+    按 Prometheus 文本格式输出数值
+    """
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    """
+    转义标签值
+    """
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str],
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    """
+    格式化标签集合
+    """
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _ShardOwner:
+    """分片的线程内持有者：随线程的 threading.local 数据一同释放，触发分片回收"""
+
+    __slots__ = ("__weakref__",)
+
+
+class _Sharded:
+    """
+    线程分片存储：每个线程在首次更新时登记一个独占分片，之后的更新只写自己的分片；
+    线程退出后其分片并入基础累计值并移出分片列表，累计值不丢失，分片数只随存活线程数增长
+    """
+
+    def __init__(self, factory: Callable[[], List[float]]):
+        self._factory = factory
+        self._local = threading.local()
+        self._base = factory()
+        self._shards: List[List[float]] = []
+        self._register_lock = threading.Lock()
+
+    def shard(self) -> List[float]:
+        """
+        当前线程的分片
+        """
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._factory()
+            owner = _ShardOwner()
+            with self._register_lock:
+                self._shards.append(shard)
+            weakref.finalize(owner, self._retire, shard)
+            self._local.owner = owner
+            self._local.shard = shard
+            return shard
+
+    def _retire(self, shard: List[float]):
+        """
+        回收已退出线程的分片：并入基础累计值
+        """
+        with self._register_lock:
+            for i, value in enumerate(shard):
+                self._base[i] += value
+            self._shards = [s for s in self._shards if s is not shard]
+
+    def shards(self) -> List[List[float]]:
+        """
+        基础累计值与存活分片的一致快照（第一项为基础累计值的副本）
+        """
+        with self._register_lock:
+            return [list(self._base)] + self._shards
+
+
+class _Metric:
+    """
+    指标基类：管理标签子指标
+    """
+
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._children_lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: Any, **kwargs: Any) -> Any:
+        """
+        获取标签子指标（按位置或按名称传入标签值）
+
+        Returns:
+            子指标，可直接调用 inc / observe / set
+        """
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签: {', '.join(self.labelnames)}")
+        child = self._children.get(key)
+        if child is None:
+            with self._children_lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _unlabelled(self) -> Any:
+        """
+        无标签指标的唯一子指标
+        """
+        if self.labelnames:
+            raise ValueError(f"指标 {self.name} 带有标签，请先调用 labels()")
+        return self._children[()]
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._children_lock:
+            return list(self._children.items())
+
+    def render(self) -> List[str]:
+        """
+        输出 Prometheus 文本格式的行
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for values, child in self._items():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: Tuple[str, ...], child: Any) -> List[str]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    """计数器子指标"""
+
+    __slots__ = ("_store", "_local")
+
+    def __init__(self):
+        self._store = _Sharded(lambda: [0.0])
+        self._local = self._store._local
+
+    def inc(self, amount: float = 1.0):
+        """
+        增加计数
+        """
+        try:
+            self._local.shard[0] += amount
+        except AttributeError:
+            self._store.shard()[0] += amount
+
+    def get(self) -> float:
+        """
+        当前累计值
+        """
+        return sum(shard[0] for shard in self._store.shards())
+
+
+class Counter(_Metric):
+    """
+    计数器：只增不减的累计值
+    """
+
+    metric_type = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        """
+        增加计数（无标签指标）
+        """
+        self._unlabelled().inc(amount)
+
+    def get(self) -> float:
+        """
+        当前累计值（无标签指标）
+        """
+        return self._unlabelled().get()
+
+    def _render_child(self, values, child):
+        return [f"{self.name}_total{_format_labels(self.labelnames, values)} {_format_value(child.get())}"]
+
+
+class _HistogramChild:
+    """直方图子指标：分片布局为 [各桶计数..., +Inf 桶计数, 总和]"""
+
+    __slots__ = ("_bounds", "_store", "_local")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        size = len(bounds) + 2
+        self._store = _Sharded(lambda: [0.0] * size)
+        self._local = self._store._local
+
+    def observe(self, value: float):
+        """
+        记录一个观测值
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._store.shard()
+        shard[bisect_left(self._bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """
+        汇总各分片
+
+        Returns:
+            (累计桶计数, 观测次数, 总和)
+        """
+        totals = [0.0] * (len(self._bounds) + 2)
+        for shard in self._store.shards():
+            for i, value in enumerate(shard):
+                totals[i] += value
+        cumulative, running = [], 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+
+class Histogram(_Metric):
+    """
+    直方图：观测值按预设的桶预聚合，只保留计数与总和
+    """
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(b) for b in buckets if not math.isinf(b)))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        """
+        记录一个观测值（无标签指标）
+        """
+        self._unlabelled().observe(value)
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """
+        汇总（无标签指标）
+        """
+        return self._unlabelled().snapshot()
+
+    def _render_child(self, values, child):
+        cumulative, count, total = child.snapshot()
+        lines = []
+        for bound, value in zip(self.buckets + (math.inf,), cumulative):
+            labels = _format_labels(self.labelnames, values, ("le", _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {_format_value(value)}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {_format_value(count)}")
+        return lines
+
+
+class _GaugeChild:
+    """仪表盘子指标：赋值为原子操作，无需分片"""
+
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        """
+        设置当前值
+        """
+        self.value = float(value)
+
+    def set_function(self, function: Callable[[], float]):
+        """
+        设置抓取时调用的取值函数（热路径上不产生任何开销）
+        """
+        self.function = function
+
+    def get(self) -> float:
+        """
+        当前值
+        """
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return math.nan
+        return self.value
+
+
+class Gauge(_Metric):
+    """
+    仪表盘：可增可减的当前值，或在抓取时计算的值
+    """
+
+    metric_type = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float):
+        """
+        设置当前值（无标签指标）
+        """
+        self._unlabelled().set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        """
+        设置抓取时调用的取值函数（无标签指标）
+        """
+        self._unlabelled().set_function(function)
+
+    def get(self) -> float:
+        """
+        当前值（无标签指标）
+        """
+        return self._unlabelled().get()
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}"]
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+    同名指标只注册一次，重复注册返回已有指标
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.metric_type}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """
+        注册计数器（导出名自动追加 _total）
+        """
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """
+        注册直方图
+        """
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """
+        注册仪表盘
+        """
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """
+        按名称获取指标
+        """
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """
+        输出全部指标的 Prometheus 文本格式
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+_default_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """
+    获取进程级默认指标注册表
+
+    Returns:
+        指标注册表
+    """
+    return _default_registry
+
+
+def _is_loopback(host: str) -> bool:
+    """
+    判断地址是否为本机回环地址
+    """
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class MetricsServer:
+    """
+    指标 HTTP 端点
+    只绑定本机回环地址，GET /metrics 返回 Prometheus 文本格式
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None,
+                 host: str = "127.0.0.1", port: int = 9464):
+        """
+        初始化指标端点
+
+        Args:
+            registry: 指标注册表（默认为进程级注册表）
+            host: 监听地址（必须为回环地址）
+            port: 监听端口（0 表示由系统分配）
+        """
+        if not _is_loopback(host):
+            raise ValueError(f"指标端点只允许监听本机回环地址: {host}")
+
+        self.registry = registry or get_registry()
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                # 双重保护：拒绝非回环来源的请求
+                if not _is_loopback(self.client_address[0]):
+                    self.send_error(403)
+                    return
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 抓取请求频繁，不输出访问日志
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """
+        实际监听的 (地址, 端口)
+        """
+        return self._server.server_address[:2]
+
+    @property
+    def url(self) -> str:
+        """
+        指标抓取地址
+        """
+        host, port = self.address
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> "MetricsServer":
+        """
+        在后台线程中启动
+
+        Returns:
+            指标端点自身
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        停止服务
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._server.server_close()
+
+
+def start_metrics_server(port: int = 9464, host: str = "127.0.0.1",
+                         registry: Optional[MetricsRegistry] = None) -> MetricsServer:
+    """
+    启动指标端点
+
+    Args:
+        port: 监听端口（0 表示由系统分配）
+        host: 监听地址（必须为回环地址）
+        registry: 指标注册表（默认为进程级注册表）
+
+    Returns:
+        已启动的指标端点
+    """
+    return MetricsServer(registry, host, port).start()
@@ -0,0 +1,394 @@
+"""
+调用追踪 (Tracing)
+功能：记录各层调用的耗时区间（span），按 execution_id 组织嵌套关系，可导出为 Chrome trace
+      或火焰图折叠栈格式；未启用时 span() 返回共享的空上下文，几乎不产生额外开销
+"""
+
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+
+# 启用追踪的环境变量（取值 1 / true / yes / on）
+TRACE_ENV_VAR = "META_CREATION_TRACE"
+
+
+def tracing_enabled_from_env() -> bool:
+    """
+    根据环境变量判断是否启用追踪
+
+    Returns:
+        是否启用
+    """
+    return os.environ.get(TRACE_ENV_VAR, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class Span:
+    """
+    调用区间
+    """
+
+    __slots__ = ("span_id", "parent_id", "execution_id", "name", "category",
+                 "start", "end", "thread_id", "args")
+
+    def __init__(self, span_id: int, parent_id: Optional[int], execution_id: str,
+                 name: str, category: str, start: float, thread_id: Any,
+                 args: Dict[str, Any]):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.execution_id = execution_id
+        self.name = name
+        self.category = category
+        self.start = start
+        self.end: Optional[float] = None
+        self.thread_id = thread_id
+        self.args = args
+
+    @property
+    def duration(self) -> float:
+        """
+        耗时（秒），未结束时为0
+        """
+        return (self.end - self.start) if self.end is not None else 0.0
+
+    def set(self, **args):
+        """
+        附加参数
+        """
+        self.args.update(args)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为字典
+        """
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "execution_id": self.execution_id,
+            "name": self.name,
+            "category": self.category,
+            "start": self.start,
+            "end": self.end,
+            "duration": self.duration,
+            "thread_id": self.thread_id,
+            "args": dict(self.args)
+        }
+
+
+class _NoopSpan:
+    """
+    追踪未启用时的空上下文
+    """
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _SpanContext:
+    """
+    进入时压入当前线程的区间栈，退出时记录结束时间
+    """
+
+    __slots__ = ("tracer", "name", "category", "execution_id", "args", "span")
+
+    def __init__(self, tracer: "Tracer", name: str, category: str,
+                 execution_id: Optional[str], args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.execution_id = execution_id
+        self.args = args
+        self.span: Optional[Span] = None
+
+    def __enter__(self) -> Span:
+        self.span = self.tracer._open(self.name, self.category, self.execution_id, self.args)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc is not None:
+            self.span.args["error"] = str(exc)
+        self.tracer._close(self.span)
+        return False
+
+
+class Tracer:
+    """
+    调用追踪器
+    每个线程维护独立的区间栈；未指定 execution_id 的区间继承父区间的 execution_id，
+    根区间自动生成新的 execution_id
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, max_spans: int = 100000):
+        """
+        初始化调用追踪器
+
+        Args:
+            enabled: 是否启用（默认读取环境变量 META_CREATION_TRACE）
+            max_spans: 保留的区间数量上限，超出后丢弃最早的区间
+        """
+        self.enabled = tracing_enabled_from_env() if enabled is None else enabled
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+        self._local = threading.local()
+        # itertools.count 的 next() 在 CPython 中是原子操作，无需加锁
+        self._span_ids = itertools.count(1)
+        self._execution_ids = itertools.count(1)
+        self._execution_prefix = uuid.uuid4().hex[:8]
+
+    def _stack(self) -> List[Span]:
+        """
+        当前线程的区间栈
+        """
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _new_execution_id(self) -> str:
+        """
+        为根区间分配执行ID（追踪器前缀 + 序号，避免每个根区间生成 UUID）
+        """
+        return f"{self._execution_prefix}-{next(self._execution_ids)}"
+
+    def _open(self, name: str, category: str, execution_id: Optional[str],
+              args: Dict[str, Any]) -> Span:
+        """
+        开始区间
+        """
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        if execution_id is None:
+            execution_id = parent.execution_id if parent is not None else self._new_execution_id()
+        # 显式指定了不同 execution_id 的区间作为新的根区间
+        parent_id = parent.span_id if parent is not None and parent.execution_id == execution_id else None
+        span = Span(next(self._span_ids), parent_id, execution_id, name, category,
+                    time.time(), threading.get_ident(), args)
+        stack.append(span)
+        return span
+
+    def _close(self, span: Span):
+        """
+        结束区间并记录
+        """
+        span.end = time.time()
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        elif span in stack:
+            stack.remove(span)
+        self.spans.append(span)
+
+    def span(self, name: str, category: str = "", execution_id: Optional[str] = None, **args):
+        """
+        创建区间上下文
+
+        Args:
+            name: 区间名称（如 "designer.create_counterpoint_path"）
+            category: 所属层
+            execution_id: 执行ID（默认继承父区间，无父区间时自动生成）
+            **args: 附加参数
+
+        Returns:
+            上下文管理器，进入后得到区间对象（未启用时为空对象）
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _SpanContext(self, name, category, execution_id, args)
+
+    def record(self, name: str, category: str, start: float, end: float,
+               thread_id: Any = None, **args) -> Optional[Span]:
+        """
+        记录已结束的区间（如执行器线程中完成的步骤），挂在当前线程的活动区间下
+
+        Args:
+            name: 区间名称
+            category: 所属层
+            start: 开始时间（time.time() 时间戳）
+            end: 结束时间
+            thread_id: 所在线程标识（默认为当前线程）
+            **args: 附加参数
+
+        Returns:
+            区间对象，未启用时返回None
+        """
+        if not self.enabled:
+            return None
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        span = Span(next(self._span_ids),
+                    parent.span_id if parent is not None else None,
+                    parent.execution_id if parent is not None else self._new_execution_id(),
+                    name, category, start,
+                    threading.get_ident() if thread_id is None else thread_id, args)
+        span.end = end
+        self.spans.append(span)
+        return span
+
+    def traced(self, name: Optional[str] = None, category: str = "") -> Callable:
+        """
+        函数装饰器：每次调用记录一个区间
+
+        Args:
+            name: 区间名称（默认为函数的限定名）
+            category: 所属层
+
+        Returns:
+            装饰器
+        """
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _SpanContext(self, span_name, category, None, {}):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def current_execution_id(self) -> Optional[str]:
+        """
+        获取当前线程活动区间的执行ID
+
+        Returns:
+            执行ID，无活动区间时返回None
+        """
+        stack = getattr(self._local, "stack", None)
+        return stack[-1].execution_id if stack else None
+
+    def get_spans(self, execution_id: Optional[str] = None) -> List[Span]:
+        """
+        获取已结束的区间
+
+        Args:
+            execution_id: 执行ID过滤（可选）
+
+        Returns:
+            按开始时间排序的区间列表
+        """
+        spans = [s for s in list(self.spans) if execution_id is None or s.execution_id == execution_id]
+        # 开始时间相同时父区间（ID较小）在前
+        spans.sort(key=lambda s: (s.start, s.span_id))
+        return spans
+
+    def clear(self):
+        """
+        清空已记录的区间
+        """
+        self.spans.clear()
+
+    def export_chrome_trace(self, path: Optional[str] = None,
+                            execution_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        导出为 Chrome trace 格式（chrome://tracing 或 Perfetto 可直接打开）
+
+        Args:
+            path: 输出文件路径（可选）
+            execution_id: 执行ID过滤（可选）
+
+        Returns:
+            Chrome trace 字典
+        """
+        pid = os.getpid()
+        spans = self.get_spans(execution_id)
+        # 线程标识映射为连续整数，并输出线程名元数据
+        lanes: Dict[Any, int] = {}
+        for span in spans:
+            lanes.setdefault(span.thread_id, len(lanes) + 1)
+
+        events: List[Dict[str, Any]] = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+             "args": {"name": str(thread_id)}}
+            for thread_id, tid in lanes.items()
+        ]
+        for span in spans:
+            args = dict(span.args)
+            args.update(execution_id=span.execution_id, span_id=span.span_id, parent_id=span.parent_id)
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": pid,
+                "tid": lanes[span.thread_id],
+                "args": args
+            })
+
+        trace = {"traceEvents": events, "displayTimeUnit": "ms"}
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(trace, f, ensure_ascii=False, default=str)
+        return trace
+
+    def export_folded(self, path: Optional[str] = None,
+                      execution_id: Optional[str] = None) -> str:
+        """
+        导出为火焰图折叠栈格式（每行 "根;子;孙 自身耗时微秒"，可交给 flamegraph.pl 或 speedscope）
+
+        Args:
+            path: 输出文件路径（可选）
+            execution_id: 执行ID过滤（可选）
+
+        Returns:
+            折叠栈文本
+        """
+        spans = self.get_spans(execution_id)
+        by_id = {span.span_id: span for span in spans}
+        child_time: Dict[int, float] = {}
+        for span in spans:
+            if span.parent_id in by_id:
+                child_time[span.parent_id] = child_time.get(span.parent_id, 0.0) + span.duration
+
+        stacks: Dict[str, int] = {}
+        for span in spans:
+            frames = [span.name]
+            parent = by_id.get(span.parent_id)
+            while parent is not None:
+                frames.append(parent.name)
+                parent = by_id.get(parent.parent_id)
+            # 并发子区间的耗时之和可能超过父区间，自身耗时取非负
+            self_time = max(span.duration - child_time.get(span.span_id, 0.0), 0.0)
+            key = ";".join(reversed(frames))
+            stacks[key] = stacks.get(key, 0) + int(round(self_time * 1e6))
+
+        text = "".join(f"{key} {value}\n" for key, value in sorted(stacks.items()))
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+
+_default_tracer: Optional[Tracer] = None
+_default_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """
+    获取进程级默认追踪器（是否启用由环境变量 META_CREATION_TRACE 决定）
+
+    Returns:
+        调用追踪器
+    """
+    global _default_tracer
+    with _default_lock:
+        if _default_tracer is None:
+            _default_tracer = Tracer()
+        return _default_tracer
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+共享运行时测试脚本
+
+测试多个智能体挂载同一运行时时的子系统共享、惰性创建、命名空间隔离与批量协同
+"""
+
+import sys
+import os
+import contextlib
+import gc
+import io
+import tempfile
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_embedding import AgentCollaborator, CollaborationRuntime, EmbeddingAPI
+from src.layers.consensus_crystal.consensus_crystal import CrystalRepository
+
+
+def quiet(factory):
+    """
+    屏蔽智能体注册时的控制台输出
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return factory()
+
+
+def test_shared_runtime_is_lazy():
+    """
+    测试智能体挂载时只创建声部图谱，执行器与晶体仓库在首次使用时创建且全局唯一
+    """
+    with tempfile.TemporaryDirectory() as storage:
+        runtime = CollaborationRuntime(storage_path=storage)
+        threads_before = threading.active_count()
+        agents = [quiet(lambda i=i: AgentCollaborator(f"智能体{i}", runtime=runtime)) for i in range(20)]
+
+        assert threading.active_count() == threads_before
+        assert runtime.get_stats() == {"agents": 20, "executor_started": False,
+                                       "crystal_repo_loaded": False, "storage_path": storage}
+        assert agents[0].context.get_created_subsystems() == ["sonic_map"]
+
+        assert agents[0].executor is agents[19].executor
+        assert agents[0].crystal_repo is agents[19].crystal_repo
+        assert agents[0].designer is not agents[1].designer
+        assert threading.active_count() == threads_before + 1
+        runtime.shutdown()
+
+
+def test_namespaces_isolate_agents():
+    """
+    测试重名智能体获得不同命名空间，共识晶体按命名空间区分
+    """
+    with tempfile.TemporaryDirectory() as storage:
+        runtime = CollaborationRuntime(storage_path=storage)
+        first = quiet(lambda: EmbeddingAPI("助手", runtime=runtime))
+        second = quiet(lambda: EmbeddingAPI("助手", runtime=runtime))
+        assert first.collaborator.namespace == "助手"
+        assert second.collaborator.namespace == "助手#2"
+
+        quiet(lambda: first.register_carbon_partner("伙伴"))
+        result = quiet(lambda: first.quick_start_collaboration("伙伴", "春天", "staggered_complement"))
+        assert result["success"]
+
+        assert len(first.collaborator.context.list_crystals()) == 1
+        assert second.collaborator.context.list_crystals() == []
+        assert second.collaborator.designer.counterpoint_paths == {}
+
+        assert second.collaborator.detach()
+        assert runtime.get_stats()["agents"] == 1
+        runtime.shutdown()
+
+
+def test_dropped_agents_are_released():
+    """
+    测试智能体关闭或被丢弃后运行时不再持有其上下文
+    """
+    with tempfile.TemporaryDirectory() as storage:
+        runtime = CollaborationRuntime(storage_path=storage)
+        with quiet(lambda: EmbeddingAPI("临时助手", runtime=runtime)) as api:
+            assert runtime.get_stats()["agents"] == 1
+            assert api.collaborator.namespace == "临时助手"
+        assert runtime.get_stats()["agents"] == 0
+
+        for i in range(10):
+            quiet(lambda: EmbeddingAPI(f"助手{i}", runtime=runtime))
+        gc.collect()
+        assert runtime.get_stats()["agents"] == 0
+        runtime.shutdown()
+
+
+def crystal_files(storage):
+    """
+    存储目录中的单个晶体文件数量
+    """
+    return len([name for name in os.listdir(storage) if name.endswith(".json")])
+
+
+def batch_files(storage):
+    """
+    存储目录中的批量晶体文件数量
+    """
+    return len([name for name in os.listdir(storage) if name.endswith(".jsonl")])
+
+
+def stored_crystals(storage):
+    """
+    重新加载存储目录得到的晶体
+    """
+    return CrystalRepository(storage).crystals
+
+
+def test_run_collaborations_concurrently():
+    """
+    测试批量协同并发执行、按完成顺序返回，晶体在批次结束时一次写入同一个批量文件
+    """
+    with tempfile.TemporaryDirectory() as storage:
+        runtime = CollaborationRuntime(storage_path=storage)
+        api = quiet(lambda: EmbeddingAPI("批量助手", runtime=runtime))
+        patterns = ["staggered_complement", "canon_progression", "fugue_interweaving"]
+        batch = [{"partner": f"伙伴{i % 3}", "theme": f"主题{i}", "pattern": patterns[i % 3]}
+                 for i in range(11)] + [("伙伴0", "元组主题")]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = list(api.run_collaborations(batch, max_workers=6))
+
+        assert sorted(r["index"] for r in results) == list(range(12))
+        assert all(r["success"] and r["error"] is None for r in results)
+        assert results[-1]["pattern"] in patterns
+        assert len(api.get_carbon_partners()) == 3
+        assert crystal_files(storage) == 0 and batch_files(storage) == 1
+        assert set(stored_crystals(storage)) == {r["crystal_id"] for r in results}
+        assert len(api.collaborator.context.list_crystals()) == 12
+        runtime.shutdown()
+
+
+def test_run_collaborations_is_eager():
+    """
+    测试批量协同无需迭代即会执行并写入晶体，批量写入的晶体可更新与删除
+    """
+    with tempfile.TemporaryDirectory() as storage:
+        runtime = CollaborationRuntime(storage_path=storage)
+        api = quiet(lambda: EmbeddingAPI("批量助手", runtime=runtime))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            batch = api.run_collaborations([("伙伴", 42), ("伙伴", "主题"), ("伙伴", ("元组", 1))])
+            assert batch.wait(10)
+        assert batch_files(storage) == 1
+        results = sorted(batch, key=lambda r: r["index"])
+        assert [r["success"] for r in results] == [True] * 3
+        repo = api.collaborator.crystal_repo
+        assert repo.get_crystal(results[0]["crystal_id"]).name == "批量协同_42_模板"
+
+        # 更新写入单个文件并以其为准；删除同时从批量文件中移除
+        repo.update_crystal(results[1]["crystal_id"], {"satisfaction_score": 0.99})
+        assert repo.delete_crystal(results[2]["crystal_id"])
+        stored = stored_crystals(storage)
+        assert set(stored) == {results[0]["crystal_id"], results[1]["crystal_id"]}
+        assert stored[results[1]["crystal_id"]].satisfaction_score == 0.99
+        runtime.shutdown()
+
+
+def test_batch_does_not_defer_other_agents():
+    """
+    测试批量协同进行期间，同一运行时上其他智能体的晶体仍立即写入文件
+    """
+    with tempfile.TemporaryDirectory() as storage:
+        runtime = CollaborationRuntime(storage_path=storage)
+        batch_api = quiet(lambda: EmbeddingAPI("批量助手", runtime=runtime))
+        other = quiet(lambda: EmbeddingAPI("其他助手", runtime=runtime))
+        quiet(lambda: other.register_carbon_partner("伙伴"))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = batch_api.run_collaborations([("伙伴", f"主题{i}") for i in range(3)], max_workers=2)
+            next(results)
+            assert other.quick_start_collaboration("伙伴", "春天")["success"]
+            assert crystal_files(storage) == 1
+            remaining = list(results)
+
+        assert len(remaining) == 2
+        assert crystal_files(storage) == 1 and batch_files(storage) == 1
+        assert len(stored_crystals(storage)) == 4
+        runtime.shutdown()
+
+
+def test_run_collaborations_validation_and_early_stop():
+    """
+    测试无效协同类型整批拒绝，提前停止时等待进行中的协同结束并写入其晶体
+    """
+    with tempfile.TemporaryDirectory() as storage:
+        runtime = CollaborationRuntime(storage_path=storage)
+        api = quiet(lambda: EmbeddingAPI("批量助手", runtime=runtime))
+        try:
+            quiet(lambda: api.run_collaborations([("伙伴", "主题"), ("伙伴", "主题", "未知模式")]))
+            assert False, "未知协同类型应抛出异常"
+        except ValueError:
+            pass
+        assert api.collaborator.designer.counterpoint_paths == {}
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = api.run_collaborations([("伙伴", f"主题{i}") for i in range(6)], max_workers=2)
+            first = next(results)
+            assert results.close(10)
+
+        assert first["success"]
+        created = len(api.collaborator.context.list_crystals())
+        # 首个结果之外，最多还有两个进行中的协同完成，其余不再开始
+        assert 1 <= created <= 3
+        assert len(stored_crystals(storage)) == created
+        assert 1 + len(list(results)) == created
+        runtime.shutdown()
+
+
+if __name__ == "__main__":
+    test_shared_runtime_is_lazy()
+    test_namespaces_isolate_agents()
+    test_dropped_agents_are_released()
+    test_run_collaborations_concurrently()
+    test_run_collaborations_is_eager()
+    test_batch_does_not_defer_other_agents()
+    test_run_collaborations_validation_and_early_stop()
+    print("共享运行时测试通过！")
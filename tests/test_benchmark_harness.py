@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+基准测试框架测试脚本
+
+测试延迟统计、多轮测量与基线比较
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import (BenchmarkCase, compare_results, load_results, results_to_dict,
+                                run_case, save_results, summarize)
+
+
+def test_summarize_percentiles():
+    """
+    测试吞吐与百分位统计
+    """
+    result = summarize("用例", 10, [i / 1000 for i in range(1, 101)])
+    assert result.key == "用例@10"
+    assert result.iterations == 100
+    assert result.p50_ms == 50.0 and result.p95_ms == 95.0 and result.p99_ms == 99.0
+    assert result.max_ms == 100.0
+    assert abs(result.throughput - 100 / 5.05) < 1e-9
+
+
+def test_run_case_lifecycle():
+    """
+    测试用例的构建、预热、多轮测量与清理
+    """
+    calls = {"setup": [], "ops": [], "teardown": 0}
+
+    def setup(scale):
+        calls["setup"].append(scale)
+        return {"scale": scale}
+
+    def operation(state, i):
+        calls["ops"].append(i)
+
+    def teardown(state):
+        calls["teardown"] += 1
+
+    case = BenchmarkCase("用例", setup, operation, scales=(5,), iterations=10, warmup=2,
+                         rounds=3, teardown=teardown)
+    result = run_case(case, 5, iterations=50)
+    assert calls["setup"] == [5] and calls["teardown"] == 1
+    # 测量次数不超过用例上限，操作序号连续
+    assert result.iterations == 10
+    assert calls["ops"] == list(range(2 + 3 * 10))
+
+
+def test_compare_with_baseline():
+    """
+    测试与基线比较：超出容差且超过最小耗时增量才判定为回退
+    """
+    baseline = results_to_dict([summarize("慢操作", 1, [0.010] * 10),
+                                summarize("快操作", 1, [0.00001] * 10)])
+    current = results_to_dict([summarize("慢操作", 1, [0.020] * 10),
+                               summarize("快操作", 1, [0.00003] * 10),
+                               summarize("新操作", 1, [0.001] * 10)])
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "baselines", "baseline.json")
+        save_results(baseline, path)
+        baseline = load_results(path)
+
+    comparisons = compare_results(current, baseline, tolerance=0.25)
+    assert {c["key"] for c in comparisons} == {"慢操作@1", "快操作@1"}
+    regressions = {(c["key"], c["metric"]) for c in comparisons if c["regression"]}
+    assert regressions == {("慢操作@1", "p50_ms"), ("慢操作@1", "p95_ms"), ("慢操作@1", "throughput")}
+
+    # 取消最小增量后，快操作的相对变化同样被判定为回退
+    strict = compare_results(current, baseline, tolerance=0.25, min_delta_ms=0.0)
+    assert all(c["regression"] for c in strict)
+    assert compare_results(baseline, baseline) and not any(
+        c["regression"] for c in compare_results(baseline, baseline))
+
+
+if __name__ == "__main__":
+    test_summarize_percentiles()
+    test_run_case_lifecycle()
+    test_compare_with_baseline()
+    print("基准测试框架测试通过！")
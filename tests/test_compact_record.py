@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+紧凑记录测试脚本
+
+测试核心数据类紧凑变体的属性接口、ID编码与不可变性
+"""
+
+import sys
+import os
+import pickle
+import uuid
+from dataclasses import FrozenInstanceError, dataclass, field
+from typing import List
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.compact_records import CompactTask, CompactValidationResult, CompactVoice, FrozenVoice
+from src.layers.voice_recognition.voice_recognition import Voice
+from src.layers.steady_execution.steady_execution import Task
+from src.utils.compact_record import compact_record, decode_id, encode_id
+
+
+@dataclass
+class SampleRecord:
+    """带默认值的测试数据类"""
+    record_id: str
+    status: str = "pending"
+    tags: List[str] = field(default_factory=list)
+
+
+def make_voice(cls):
+    """
+    构造一个测试声部
+    """
+    return cls(str(uuid.uuid4()), "代码织梦者", "silicon",
+               {"创意生成": 0.8}, {"探索性": 0.7}, "", 1.0, 2.0)
+
+
+def test_id_encoding():
+    """
+    测试UUID编码可无损还原，非规范格式保持原样
+    """
+    voice_id = str(uuid.uuid4())
+    assert isinstance(encode_id(voice_id), int)
+    assert decode_id(encode_id(voice_id)) == voice_id
+    for value in ("action_1", voice_id.upper(), None, 42.0):
+        assert encode_id(value) is value
+
+
+def test_attribute_api():
+    """
+    测试紧凑变体保持原有属性接口
+    """
+    voice = make_voice(Voice)
+    compact = CompactVoice.from_record(voice)
+    assert not hasattr(compact, "__dict__")
+    assert compact.voice_id == voice.voice_id
+    assert isinstance(compact._voice_id, int)
+    assert compact.capability_vector == voice.capability_vector
+    assert compact.to_record() == voice
+
+    compact.last_active = 3.0
+    compact.voice_id = "自定义ID"
+    assert compact.last_active == 3.0 and compact.voice_id == "自定义ID"
+    assert compact != CompactVoice.from_record(voice)
+
+    task = Task(str(uuid.uuid4()), "任务", "counterpoint_step", 0, {}, "pending", 1.0, None, None, None)
+    assert CompactTask.from_record(task).to_record() == task
+
+    # 默认值与 default_factory 与原数据类一致
+    Record = compact_record(SampleRecord, id_fields=("record_id",))
+    first, second = Record(str(uuid.uuid4())), Record(str(uuid.uuid4()))
+    assert first.status == "pending" and first.tags == []
+    assert first.tags is not second.tags
+
+    result = CompactValidationResult(str(uuid.uuid4()), "action_1", {}, {}, [], [],
+                                     "none", None, False, 0.0)
+    assert result.action_id == "action_1"
+
+
+def test_frozen_and_pickle():
+    """
+    测试不可变变体与序列化
+    """
+    frozen = FrozenVoice.from_record(make_voice(Voice))
+    try:
+        frozen.name = "新名称"
+        assert False, "不可变变体不应允许赋值"
+    except FrozenInstanceError:
+        pass
+    try:
+        frozen.voice_id = str(uuid.uuid4())
+        assert False, "不可变变体不应允许修改ID"
+    except FrozenInstanceError:
+        pass
+
+    restored = pickle.loads(pickle.dumps(frozen))
+    assert restored == frozen
+    assert restored.voice_id == frozen.voice_id
+    # 按ID哈希，字典字段不影响可哈希性
+    assert hash(restored) == hash(frozen)
+    assert {frozen: 1}[restored] == 1
+
+    FrozenSample = compact_record(SampleRecord, frozen=True)
+    sample = FrozenSample("id", tags=["a"])
+    assert hash(sample) == hash(FrozenSample("id", tags=["b"]))
+
+    compact = make_voice(CompactVoice)
+    assert pickle.loads(pickle.dumps(compact)) == compact
+    try:
+        hash(compact)
+        assert False, "可变变体不应可哈希"
+    except TypeError:
+        pass
+
+
+if __name__ == "__main__":
+    test_id_encoding()
+    test_attribute_api()
+    test_frozen_and_pickle()
+    print("紧凑记录测试通过！")
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+协奏设计层测试脚本
+
+测试模式索引、步骤模板与批量创建路径
+"""
+
+import sys
+import os
+import asyncio
+import copy
+import json
+import math
+import pickle
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.layers.counterpoint_design.counterpoint_design import CounterpointDesigner
+from src.layers.counterpoint_design.step_template import FrozenStep
+from src.layers.counterpoint_design.simulator import CounterpointSimulator, SimulationConfig
+
+
+def test_pattern_index():
+    """
+    测试按创作类型查询模式
+    """
+    designer = CounterpointDesigner()
+    patterns = designer.get_suitable_patterns("概念设计")
+    assert [p["pattern_id"] for p in patterns] == ["staggered_complement"]
+    assert designer.get_suitable_patterns("不存在的类型") == []
+
+    # 修改返回值不影响索引
+    patterns[0]["name"] = "被修改"
+    assert designer.get_suitable_patterns("概念设计")[0]["name"] == "错位互补模式"
+
+    designer.register_pattern("solo", {
+        "name": "独奏模式",
+        "description": "单一硅基声部完成",
+        "suitable_for": ["概念设计"],
+        "steps": [{"step": 1, "role": "silicon", "action": "独立完成"}]
+    })
+    assert [p["pattern_id"] for p in designer.get_suitable_patterns("概念设计")] == [
+        "staggered_complement", "solo"]
+
+
+def test_step_templates_copy_on_write():
+    """
+    测试修改一条路径的步骤不会污染模板或其他路径
+    """
+    designer = CounterpointDesigner()
+    first = designer.create_counterpoint_path("路径一", "staggered_complement", ["c", "s"], "主题")
+    second = designer.create_counterpoint_path("路径二", "staggered_complement", ["c", "s"], "主题")
+
+    assert first.steps is not second.steps
+    assert first.steps[0] is second.steps[0]
+    try:
+        first.steps[0]["action"] = "被修改"
+        assert False, "模板步骤不应允许原地修改"
+    except TypeError:
+        pass
+
+    assert designer.update_path_step(first.path_id, 0, {"action": "明确概念"})
+    assert first.steps[0]["action"] == "明确概念"
+    assert second.steps[0]["action"] == "提出模糊概念"
+    assert designer.patterns["staggered_complement"]["steps"][0]["action"] == "提出模糊概念"
+    assert not designer.update_path_step(first.path_id, 10, {})
+
+    first.steps.append({"step": 5, "role": "carbon", "action": "复盘"})
+    assert len(second.steps) == 4
+
+    # 模板步骤可序列化、复制
+    step = second.steps[1]
+    assert json.loads(json.dumps(second.steps))[1] == step
+    assert pickle.loads(pickle.dumps(step)) == step
+    assert isinstance(copy.deepcopy(second.steps)[1], FrozenStep)
+    assert step.replace(action="重写") == {"step": 2, "role": "silicon", "action": "重写"}
+
+
+def test_pattern_steps_remain_editable():
+    """
+    测试 patterns 中的步骤保持可变列表，直接追加或按键修改后新路径使用修改后的步骤
+    """
+    designer = CounterpointDesigner()
+    before = designer.create_counterpoint_path("修改前", "staggered_complement", ["c", "s"], "主题")
+
+    steps = designer.patterns["staggered_complement"]["steps"]
+    assert isinstance(steps, list) and not isinstance(steps[0], FrozenStep)
+    steps.append({"step": 5, "role": "carbon", "action": "复盘"})
+    steps[0]["action"] = "提出清晰概念"
+
+    after = designer.create_counterpoint_path("修改后", "staggered_complement", ["c", "s"], "主题")
+    assert len(after.steps) == 5 and after.steps[0]["action"] == "提出清晰概念"
+    assert isinstance(after.steps[0], FrozenStep)
+    assert len(before.steps) == 4 and before.steps[0]["action"] == "提出模糊概念"
+
+
+def test_create_paths_bulk():
+    """
+    测试批量创建路径
+    """
+    designer = CounterpointDesigner()
+    specs = [
+        {"name": f"路径{i}", "pattern_type": "fugue_interweaving",
+         "participating_voices": ["c", "s"], "creation_theme": "主题"}
+        for i in range(2000)
+    ]
+    specs.append({"name": "自定义", "pattern_type": "canon_progression",
+                  "participating_voices": ["c"], "creation_theme": "主题",
+                  "custom_steps": [{"step": 1, "role": "carbon", "action": "写作"}]})
+
+    paths = designer.create_paths_bulk(specs)
+    assert len(paths) == 2001
+    assert len(designer.get_counterpoint_paths()) == 2001
+    assert [p.name for p in paths[:2]] == ["路径0", "路径1"]
+    assert len(paths[0].steps) == 5 and len(paths[-1].steps) == 1
+
+    try:
+        designer.create_paths_bulk([dict(specs[0], pattern_type="未知模式")])
+        assert False, "未知模式应抛出异常"
+    except ValueError:
+        pass
+    assert len(designer.get_counterpoint_paths()) == 2001
+
+
+class FakeExecutor:
+    """
+    提供固定执行观测的执行器
+    """
+
+    def get_step_observations(self, limit=1000):
+        return [
+            {"role": "carbon", "action": "定义主题", "voice_id": "c", "duration": 30.0},
+            {"role": "silicon", "action": "演绎", "voice_id": "s1", "duration": 10.0},
+            {"role": "silicon", "action": "演绎", "voice_id": "s2", "duration": 10.0},
+        ][:limit]
+
+
+def test_optimize_counterpoint_path():
+    """
+    测试代价模型驱动的路径优化
+    """
+    designer = CounterpointDesigner()
+    steps = [
+        {"step": 1, "role": "carbon", "action": "定义主题"},
+        {"step": 2, "role": "silicon", "action": "演绎", "depends_on": [1]},
+        {"step": 3, "role": "carbon", "action": "确认风格", "depends_on": [1]},
+        {"step": 4, "role": "silicon", "action": "演绎", "depends_on": [1]},
+        {"step": 5, "role": "carbon", "action": "调整权重", "depends_on": [2, 4]},
+        {"step": 6, "role": "silicon", "action": "整合", "depends_on": [5, 3]},
+    ]
+    path = designer.create_counterpoint_path("赋格", "fugue_interweaving", ["c", "s1", "s2"], "主题", steps)
+    designer.optimize_counterpoint_path(path.path_id, executor=FakeExecutor())
+
+    report = designer.get_optimization_report(path.path_id)
+    assert report["applied"]
+    assert report["makespan_after"] < report["makespan_before"]
+    # "寂"约束：碳基打扰次数不增加，相邻碳基步骤合并后减少
+    assert report["interruptions_after"] < report["interruptions_before"] == 3
+    assert [step["role"] for step in path.steps] == ["carbon", "silicon", "carbon", "silicon"]
+    assert [sub["action"] for sub in path.steps[0]["merged_from"]] == ["定义主题", "确认风格"]
+    assert len(path.steps[1]["parallel"]) == 2
+    assert [step["step"] for step in path.steps] == [1, 2, 3, 4]
+
+    # 未声明依赖的默认模式保持原样
+    canon = designer.create_counterpoint_path("卡农", "canon_progression", ["c", "s"], "主题")
+    original = list(canon.steps)
+    designer.optimize_counterpoint_path(canon.path_id)
+    assert not designer.get_optimization_report(canon.path_id)["applied"]
+    assert canon.steps == original
+
+    try:
+        designer.optimize_counterpoint_path("不存在的路径")
+        assert False, "优化不存在的路径应抛出异常"
+    except ValueError:
+        pass
+
+
+def constant_config(**overrides):
+    """
+    构建固定耗时的模拟配置：碳基10秒，硅基5秒
+    """
+    config = SimulationConfig(
+        role_latency={"carbon": {"dist": "constant", "value": 10.0},
+                      "silicon": {"dist": "constant", "value": 5.0}},
+        seed=1
+    )
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    return config
+
+
+def test_simulate_counterpoint_execution():
+    """
+    测试单条路径的离散事件模拟
+    """
+    designer = CounterpointDesigner()
+    path = designer.create_counterpoint_path("错位", "staggered_complement", ["c", "s"], "主题")
+    results = designer.simulate_counterpoint_execution(path.path_id, constant_config())
+
+    assert [r["status"] for r in results] == ["completed"] * 4
+    assert [r["start"] for r in results] == [0.0, 10.0, 15.0, 25.0]
+    assert results[-1]["end"] == 30.0
+    assert designer.simulate_counterpoint_execution("不存在的路径") == [{"error": "路径不存在"}]
+
+
+def test_simulator_queueing_and_capacity():
+    """
+    测试共享声部池排队、执行器并发上限与容量规划
+    """
+    fan_out = [
+        {"step": 1, "role": "carbon", "action": "定义主题"},
+        {"step": 2, "role": "silicon", "action": "并行演绎",
+         "parallel": [{"role": "silicon", "action": "演绎"}] * 4},
+        {"step": 3, "role": "carbon", "action": "最终裁决"},
+    ]
+
+    # 声部充足时各会话互不干扰
+    report = CounterpointSimulator(constant_config(voice_pools={"silicon": 8},
+                                                   max_concurrent_tasks=None)).run([fan_out] * 2)
+    assert report["makespan_max"] == 25.0 and report["wait_mean"] == 0.0
+
+    # 两个硅基声部需要两轮完成四个分支
+    report = CounterpointSimulator(constant_config(voice_pools={"silicon": 2})).run([fan_out])
+    assert report["makespan_max"] == 30.0
+
+    # 执行器并发上限同样造成排队
+    report = CounterpointSimulator(constant_config(voice_pools={"silicon": 8},
+                                                   max_concurrent_tasks=2)).run([fan_out])
+    assert report["makespan_max"] == 30.0
+
+    # 碳基为会话专属声部，不因会话数量增加而排队
+    report = CounterpointSimulator(constant_config(max_concurrent_tasks=None,
+                                                   voice_pools={"silicon": 8000})).run([fan_out] * 2000)
+    assert report["completed"] == 2000 and report["makespan_max"] == 25.0
+
+    simulator = CounterpointSimulator(constant_config(max_concurrent_tasks=None))
+    plan = simulator.plan_capacity([fan_out] * 10, target_makespan=25.0)
+    assert plan["voices"] == 40
+    plan = simulator.plan_capacity([fan_out] * 10, target_makespan=30.0)
+    assert plan["voices"] == 20
+    assert simulator.plan_capacity([fan_out], target_makespan=10.0) is None
+
+    designer = CounterpointDesigner()
+    path = designer.create_counterpoint_path("赋格", "fugue_interweaving", ["c", "s"], "主题", fan_out)
+    plan = designer.plan_voice_capacity(path.path_id, 10, 25.0, config=constant_config(max_concurrent_tasks=None))
+    assert plan["voices"] == 40
+
+
+def test_simulator_common_random_numbers():
+    """
+    测试同一种子下每个任务的耗时与声部数量、调度顺序无关（公共随机数）
+    """
+    fan_out = [
+        {"step": 1, "role": "carbon", "action": "定义主题"},
+        {"step": 2, "role": "silicon", "action": "并行演绎",
+         "parallel": [{"role": "silicon", "action": "演绎"}] * 4},
+        {"step": 3, "role": "carbon", "action": "最终裁决"},
+    ]
+
+    def durations(voices):
+        config = SimulationConfig(voice_pools={"silicon": voices}, max_concurrent_tasks=None, seed=7,
+                                  handoff={"dist": "exponential", "mean": 1.0})
+        report = CounterpointSimulator(config).run([fan_out] * 6, trace=True)
+        return sorted((r["session"], r["stage"], r["end"] - r["start"]) for r in report["trace"])
+
+    few, many = durations(2), durations(24)
+    assert len(few) == len(many) == 36
+    for (session, stage, a), (session_b, stage_b, b) in zip(few, many):
+        assert (session, stage) == (session_b, stage_b) and math.isclose(a, b)
+
+
+def test_stream_path_step():
+    """
+    测试流式执行步骤：首个结果先于整个步骤返回，缓冲区有界，提前停止时生产者停止
+    """
+    designer = CounterpointDesigner()
+    path = designer.create_counterpoint_path("错位", "staggered_complement", ["c", "s"], "主题")
+
+    produced = []
+
+    def producer(step, voice_id, inputs):
+        for i in range(inputs["variants"]):
+            time.sleep(0.005)
+            produced.append(i)
+            yield f"{step['action']}-{i}"
+
+    designer.register_step_producer("生成百种变体", producer)
+    events = list(designer.stream_path_step(path.path_id, 1, "s", {"variants": 100}))
+    assert [e["output"] for e in events[:-1]] == [f"生成百种变体-{i}" for i in range(100)]
+    done = events[-1]
+    assert done["type"] == "done" and done["count"] == 100
+    assert done["first_output_latency"] < done["elapsed"] / 5
+
+    # 消费者停止后，生产者最多再领先缓冲区容量个结果
+    produced.clear()
+    stream = designer.stream_path_step(path.path_id, 1, "s", {"variants": 1000}, buffer_size=4)
+    first = next(stream)
+    assert first["index"] == 0
+    stream.close()
+    time.sleep(0.1)
+    count = len(produced)
+    time.sleep(0.1)
+    assert len(produced) == count <= 8
+
+    # 默认模拟生产函数与错误处理
+    events = list(designer.stream_path_step(path.path_id, 0, "c", {"variants": 3}))
+    assert len(events) == 4 and "提出模糊概念" in events[0]["output"]["message"]
+    assert list(designer.stream_path_step("不存在的路径", 0, "c", {})) == [{"error": "路径不存在"}]
+    assert list(designer.stream_path_step(path.path_id, 9, "c", {})) == [{"error": "步骤索引超出范围"}]
+
+    def failing(step, voice_id, inputs):
+        yield "部分结果"
+        raise RuntimeError("生成失败")
+
+    stream = designer.stream_path_step(path.path_id, 1, "s", {}, producer=failing)
+    assert next(stream)["output"] == "部分结果"
+    try:
+        next(stream)
+        assert False, "生产者异常应在消费端抛出"
+    except RuntimeError:
+        pass
+
+
+def test_astream_path_step():
+    """
+    测试异步流式执行步骤
+    """
+    designer = CounterpointDesigner()
+    path = designer.create_counterpoint_path("错位", "staggered_complement", ["c", "s"], "主题")
+
+    async def consume():
+        ticks = 0
+        stop = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not stop.is_set():
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        task = asyncio.ensure_future(ticker())
+        events = []
+        async for event in designer.astream_path_step(
+                path.path_id, 1, "s", {"variants": 20},
+                producer=lambda step, voice_id, inputs: (time.sleep(0.005) or i for i in range(20))):
+            events.append(event)
+        stop.set()
+        await task
+        return events, ticks
+
+    events, ticks = asyncio.run(consume())
+    assert [e["output"] for e in events[:-1]] == list(range(20))
+    assert events[-1]["count"] == 20
+    # 生产者在线程中运行，事件循环未被阻塞
+    assert ticks > 5
+
+
+if __name__ == "__main__":
+    test_pattern_index()
+    test_step_templates_copy_on_write()
+    test_pattern_steps_remain_editable()
+    test_create_paths_bulk()
+    test_optimize_counterpoint_path()
+    test_simulate_counterpoint_execution()
+    test_simulator_queueing_and_capacity()
+    test_simulator_common_random_numbers()
+    test_stream_path_step()
+    test_astream_path_step()
+    print("协奏设计层测试通过！")
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+元协议锚定层测试脚本
+
+测试核心价值观与锚点规则的编译验证
+"""
+
+import sys
+import os
+import json
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.layers.meta_protocol.meta_protocol import MetaProtocolManager
+
+
+def make_action(**overrides):
+    """
+    构造一个符合核心价值观的行为
+    """
+    action = {
+        "relationship_type": "counterpoint",
+        "intention": "expand_creativity",
+        "carbon_intention": "写一首关于灯塔的诗",
+        "silicon_thinking_process": ["分析意图", "生成草稿"],
+        "decision_path": ["碳基筛选"],
+        "responsibility_attribution": {"carbon": "最终裁决", "silicon": "草稿生成"},
+        "interruption_level": "low",
+        "prompt_frequency": "normal",
+        "attention_occupation": 0.2,
+        "execution_jitter": 0.01,
+        "communication_delay": 0.01,
+        "decision_hesitation": False,
+        "contribution_disclosure": True,
+    }
+    action.update(overrides)
+    return action
+
+
+def test_core_values():
+    """
+    测试核心价值观验证
+    """
+    manager = MetaProtocolManager()
+
+    assert manager.validate_core_values(make_action()) == (True, "符合核心价值观")
+
+    passed, message = manager.validate_core_values(make_action(relationship_type="master_slave"))
+    assert not passed and "'和'" in message
+
+    passed, message = manager.validate_core_values(make_action(decision_path=[]))
+    assert not passed and "'清'" in message
+
+    passed, message = manager.validate_core_values(make_action(attention_occupation=0.8))
+    assert not passed and "'寂'" in message
+
+    passed, message = manager.validate_core_values(make_action(execution_jitter="unstable"))
+    assert not passed and "'静'" in message
+
+
+def test_missing_numeric_fields_use_defaults():
+    """
+    测试缺失数值字段时使用类型默认值而非抛出异常
+    """
+    manager = MetaProtocolManager()
+    action = make_action()
+    for field in ("attention_occupation", "execution_jitter", "communication_delay"):
+        action.pop(field)
+
+    assert manager.validate_core_values(action) == (True, "符合核心价值观")
+
+
+def test_anchor_rules():
+    """
+    测试锚点验证规则
+    """
+    manager = MetaProtocolManager()
+
+    assert manager.validate_anchor("ethical_boundaries", make_action()) == (True, "符合伦理红线")
+    assert manager.validate_anchor("ultimate_goal", make_action()) == (True, "符合终极目标")
+    assert manager.validate_anchor("unknown", make_action())[0] is False
+
+    passed, message = manager.validate_anchor(
+        "ethical_boundaries", make_action(action_type="final_artistic_judgment"))
+    assert not passed and "最终艺术判断" in message
+
+    passed, message = manager.validate_anchor(
+        "ethical_boundaries", make_action(contribution_disclosure=None))
+    assert not passed and "标注贡献" in message
+
+
+def test_validate_many_and_rule_stats():
+    """
+    测试批量验证与规则命中统计
+    """
+    manager = MetaProtocolManager()
+    actions = [make_action() for _ in range(1000)]
+    actions += [make_action(prompt_frequency="excessive") for _ in range(500)]
+
+    results = manager.validate_many(actions)
+    assert len(results) == 1500
+    assert sum(1 for passed, _ in results if passed) == 1000
+
+    stats = manager.get_rule_stats()["core_values"]
+    assert stats["和.relationship_type"] == {"evaluated": 1500, "hits": 0}
+    assert stats["寂.prompt_frequency"]["hits"] == 500
+    assert stats["寂.attention_occupation"]["evaluated"] == 1000
+
+    manager.reset_rule_stats()
+    assert manager.get_rule_stats()["core_values"]["寂.prompt_frequency"]["hits"] == 0
+
+    anchor_results = manager.validate_many(actions[:10], anchor_id="ethical_boundaries")
+    assert all(passed for passed, _ in anchor_results)
+
+
+def test_validation_cache():
+    """
+    测试验证缓存命中率与协议版本失效
+    """
+    manager = MetaProtocolManager(enable_cache=True, cache_size=2)
+
+    for _ in range(10):
+        assert manager.validate_core_values(make_action())[0]
+    # 未被规则读取的字段不影响指纹
+    assert manager.validate_core_values(make_action(note="无关字段"))[0]
+
+    stats = manager.get_cache_stats()
+    assert stats["enabled"] and stats["misses"] == 1 and stats["hits"] == 10
+
+    manager.validate_core_values(make_action(attention_occupation=0.9))
+    manager.validate_anchor("ethical_boundaries", make_action())
+    assert manager.get_cache_stats()["evictions"] == 1
+
+    assert manager.update_protocol({"protocol_version": "α-0.2"})
+    manager.validate_core_values(make_action())
+    stats = manager.get_cache_stats()
+    assert stats["invalidations"] == 1 and stats["size"] == 1
+
+    assert MetaProtocolManager().get_cache_stats() == {"enabled": False}
+
+
+def test_protocol_snapshots():
+    """
+    测试协议快照的不可变性与原子更新
+    """
+    manager = MetaProtocolManager()
+    snapshot = manager.snapshot
+    assert manager.protocol_version == "α-0.1" and snapshot.revision == 0
+
+    try:
+        manager.core_values["和"] = "篡改"
+        assert False, "快照应为只读"
+    except TypeError:
+        pass
+
+    assert manager.update_protocol({
+        "anchors": {"ethical_boundaries": {"validation_rules": {"contribution_disclosure": "required"}}}
+    })
+    assert manager.protocol_version == "α-0.2" and manager.snapshot.revision == 1
+    # 旧快照保持不变，新快照只要求贡献披露
+    assert "psychological_manipulation" in snapshot.anchors["ethical_boundaries"].validation_rules
+    assert manager.validate_anchor(
+        "ethical_boundaries", make_action(psychological_manipulation=True))[0]
+
+    info = manager.get_protocol_info()
+    assert info["revision"] == 1
+    json.dumps(info, ensure_ascii=False)
+
+
+def test_protocol_file_watcher():
+    """
+    测试从文件热加载元协议
+    """
+    manager = MetaProtocolManager()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "protocol.json")
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump({"protocol_version": "α-0.5"}, f)
+
+        watcher = manager.watch_protocol_file(file_path, interval=0.02)
+        assert manager.protocol_version == "α-0.5"
+
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump({"protocol_version": "α-0.6", "core_values": {"和": "对位协奏"}}, f)
+        os.utime(file_path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+
+        deadline = time.time() + 2
+        while manager.protocol_version != "α-0.6" and time.time() < deadline:
+            time.sleep(0.02)
+
+        manager.stop_watching()
+        assert manager.protocol_version == "α-0.6"
+        assert manager.core_values["和"] == "对位协奏"
+        assert watcher.reload_count == 1 and not watcher.is_running()
+
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write("not json")
+        assert manager.load_protocol_file(file_path) is False
+        assert manager.protocol_version == "α-0.6"
+
+
+def test_file_reload_replaces_protocol():
+    """
+    测试从文件重新加载时按文件内容构建快照：文件中删除的锚点与核心价值观随之移除，未变规则的统计保留
+    """
+    manager = MetaProtocolManager()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "protocol.json")
+        definition = {
+            "core_values": {"和": "对位协奏", "新": "新增价值观"},
+            "anchors": {
+                "ethical_boundaries": {"validation_rules": {"contribution_disclosure": "required"}},
+                "custom": {"name": "自定义锚点", "validation_rules": {"shortcut": "forbidden"}}
+            }
+        }
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(definition, f, ensure_ascii=False)
+        assert manager.load_protocol_file(file_path)
+        assert dict(manager.core_values) == definition["core_values"]
+        assert set(manager.anchors) == {"ethical_boundaries", "custom"}
+        # 文件未给出的字段沿用内置锚点
+        assert manager.anchors["ethical_boundaries"].name == "伦理红线锚点"
+
+        manager.validate_core_values(make_action(prompt_frequency="excessive"))
+        manager.validate_anchor("ethical_boundaries", make_action())
+        del definition["core_values"]["新"]
+        del definition["anchors"]["custom"]
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(definition, f, ensure_ascii=False)
+        assert manager.load_protocol_file(file_path)
+        assert dict(manager.core_values) == {"和": "对位协奏"}
+        assert set(manager.anchors) == {"ethical_boundaries"}
+        assert manager.validate_anchor("custom", make_action()) == (False, "锚点不存在: custom")
+
+        stats = manager.get_rule_stats()
+        assert stats["core_values"]["寂.prompt_frequency"]["hits"] == 1
+        assert stats["ethical_boundaries"]["ethical_boundaries.contribution_disclosure"]["evaluated"] == 1
+
+        # 文件中没有的部分恢复为内置定义
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump({"protocol_version": "β-1"}, f)
+        assert manager.load_protocol_file(file_path)
+        assert set(manager.anchors) == {"ultimate_goal", "ethical_boundaries", "success_criteria"}
+        assert len(manager.core_values) == 4
+
+
+if __name__ == "__main__":
+    test_core_values()
+    test_missing_numeric_fields_use_defaults()
+    test_anchor_rules()
+    test_validate_many_and_rule_stats()
+    test_validation_cache()
+    test_protocol_snapshots()
+    test_protocol_file_watcher()
+    test_file_reload_replaces_protocol()
+    print("元协议测试通过！")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+运行指标测试脚本
+
+测试分片计数的汇总、直方图分桶、Prometheus 文本格式、本机指标端点与各层的指标埋点
+"""
+
+import gc
+import sys
+import os
+import tempfile
+import threading
+import urllib.request
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_embedding import CollaborationRuntime
+from src.layers.consensus_crystal.consensus_crystal import CrystalRepository
+from src.layers.steady_execution.steady_execution import SteadyExecutor
+from src.mechanisms.counterpoint_validation import CounterpointValidator
+from src.mechanisms.entropy_evolution import EntropyEvolutionManager
+from src.utils.metrics import MetricsRegistry, MetricsServer, get_registry
+
+
+def test_counter_sums_thread_shards():
+    """
+    测试多线程并发累加后汇总值准确
+    """
+    registry = MetricsRegistry()
+    counter = registry.counter("requests", "请求数", ("method",))
+
+    def work():
+        child = counter.labels("get")
+        for _ in range(10000):
+            child.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.labels(method="get").get() == 80000
+    # 重复注册返回同一指标，类型冲突时报错
+    assert registry.counter("requests", "请求数", ("method",)) is counter
+    try:
+        registry.gauge("requests", "请求数")
+        assert False, "应当拒绝类型冲突的注册"
+    except ValueError:
+        pass
+
+
+def test_short_lived_thread_shards_are_reclaimed():
+    """
+    测试大量短命线程更新后分片数保持有界，累计值不丢失
+    """
+    registry = MetricsRegistry()
+    counter = registry.counter("tasks", "任务数")
+    histogram = registry.histogram("duration_seconds", "耗时", buckets=(0.1, 1.0))
+
+    def work():
+        counter.inc()
+        histogram.observe(0.5)
+
+    for _ in range(300):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    assert len(counter._unlabelled()._store._shards) <= 2
+    assert len(histogram._unlabelled()._store._shards) <= 2
+    assert counter.get() == 300
+    cumulative, count, total = histogram.snapshot()
+    assert cumulative == [0, 300, 300] and count == 300 and total == 150.0
+
+
+def test_histogram_and_text_format():
+    """
+    测试直方图累计分桶与 Prometheus 文本格式
+    """
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "延迟", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    gauge = registry.gauge("depth", "深度")
+    gauge.set_function(lambda: 3)
+    registry.counter("events", "事件", ("kind",)).labels('a"b').inc(2)
+
+    cumulative, count, total = histogram.snapshot()
+    assert cumulative == [2, 3, 4] and count == 4 and abs(total - 2.65) < 1e-9
+
+    text = registry.render()
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+    assert "latency_seconds_count 4" in text
+    assert "depth 3" in text
+    assert 'events_total{kind="a\\"b"} 2' in text
+    assert text.endswith("\n")
+
+
+def test_server_is_local_only():
+    """
+    测试指标端点只监听本机回环地址
+    """
+    try:
+        MetricsServer(MetricsRegistry(), host="0.0.0.0", port=0)
+        assert False, "应当拒绝非回环地址"
+    except ValueError:
+        pass
+
+    registry = MetricsRegistry()
+    registry.counter("hits", "命中").inc()
+    server = MetricsServer(registry, port=0).start()
+    try:
+        with urllib.request.urlopen(server.url, timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "hits_total 1" in response.read().decode("utf-8")
+    finally:
+        server.stop()
+
+
+def test_layer_instrumentation():
+    """
+    测试执行器、验证器、熵值管理器与晶体库的指标埋点
+    """
+    registry = get_registry()
+    tasks = registry.get("meta_creation_tasks").labels("completed")
+    dispatch = registry.get("meta_creation_task_dispatch_latency_seconds")
+    validations = registry.get("meta_creation_validations")
+    before_tasks, before_dispatch = tasks.get(), dispatch.snapshot()[1]
+    before_passed = validations.labels("passed").get()
+    before_missing = validations.labels("missing_thinking_process").get()
+
+    executor = SteadyExecutor()
+    try:
+        executor.execute_counterpoint_path("路径", [{"role": "carbon", "action": "动作"}], {"carbon": "c"})
+    finally:
+        executor.shutdown()
+    assert tasks.get() == before_tasks + 1
+    assert dispatch.snapshot()[1] == before_dispatch + 1
+
+    validator = CounterpointValidator()
+    validator.validate("a", {"主题": "春天"}, {"主题": "春天"}, ["思考1", "思考2"])
+    validator.validate("b", {"主题": "春天"}, {"主题": "春天"}, [])
+    assert validations.labels("passed").get() == before_passed + 1
+    assert validations.labels("missing_thinking_process").get() == before_missing + 1
+
+    EntropyEvolutionManager().calculate_entropy(0.5, 0.0, 0, 0)
+    assert registry.get("meta_creation_entropy_score").get() == 0.2
+
+    size = registry.get("meta_creation_crystal_store_size")
+    with tempfile.TemporaryDirectory() as storage:
+        repo = CrystalRepository(storage)
+        before_size = size.get()
+        repo.create_crystal(name="晶体", description="", participating_voices=[],
+                            counterpoint_pattern="canon_progression", steps=[], decision_points=[],
+                            satisfaction_score=0.8, flow_duration=1.0, micro_rules=[], creation_theme="主题")
+        assert size.get() == before_size + 1
+
+
+def test_runtime_metrics_endpoint():
+    """
+    测试运行时启动的指标端点导出各层指标
+    """
+    with tempfile.TemporaryDirectory() as storage:
+        runtime = CollaborationRuntime(storage_path=storage)
+        server = runtime.start_metrics_server(port=0)
+        assert runtime.start_metrics_server(port=0) is server
+        try:
+            with urllib.request.urlopen(server.url, timeout=5) as response:
+                text = response.read().decode("utf-8")
+        finally:
+            runtime.shutdown()
+    for name, kind in (("meta_creation_task_queue_depth", "gauge"),
+                       ("meta_creation_task_dispatch_latency_seconds", "histogram"),
+                       ("meta_creation_task_duration_seconds", "histogram"),
+                       ("meta_creation_validations", "counter"),
+                       ("meta_creation_entropy_score", "gauge"),
+                       ("meta_creation_crystal_store_size", "gauge")):
+        assert f"# TYPE {name} {kind}" in text
+
+
+if __name__ == "__main__":
+    test_counter_sums_thread_shards()
+    test_short_lived_thread_shards_are_reclaimed()
+    test_histogram_and_text_format()
+    test_server_is_local_only()
+    test_layer_instrumentation()
+    test_runtime_metrics_endpoint()
+    print("运行指标测试通过！")
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+静定执行层测试脚本
+
+测试流水线执行的重叠、顺序、背压与失败处理
+"""
+
+import sys
+import os
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.layers.counterpoint_design.counterpoint_design import CounterpointDesigner
+from src.layers.steady_execution.fan_out import FanOutExecution
+from src.layers.steady_execution.pipeline import StagePipeline, simulated_handler
+from src.layers.steady_execution.steady_execution import SteadyExecutor
+
+
+def canon_steps():
+    """
+    卡农式推进模式的五个步骤
+    """
+    return list(CounterpointDesigner().patterns["canon_progression"]["steps"])
+
+
+def test_pipelined_canon_progression():
+    """
+    测试多会话流水线执行：吞吐趋近单阶段速率，结果按提交顺序返回并记入任务历史
+    """
+    executor = SteadyExecutor()
+    try:
+        sessions = [{"session_id": f"会话{i}", "voice_map": {"carbon": "c", "silicon": "s"}}
+                    for i in range(10)]
+        result = executor.execute_pipelined("canon", canon_steps(), sessions,
+                                            handler=simulated_handler(0.02))
+
+        assert result["success"]
+        assert [s["session_id"] for s in result["session_results"]] == [f"会话{i}" for i in range(10)]
+        assert all(len(s["steps"]) == 5 for s in result["session_results"])
+        # 串行需要 10 × 5 × 0.02 = 1.0 秒，流水线约 (5 + 9) × 0.02 = 0.28 秒
+        assert result["elapsed"] < 0.7
+        assert [stage["processed"] for stage in result["stage_stats"]] == [10] * 5
+
+        observations = executor.get_step_observations()
+        assert len(observations) == 50
+        assert {o["voice_id"] for o in observations} == {"c", "s"}
+    finally:
+        executor.shutdown()
+
+
+def test_pipeline_backpressure_and_failure():
+    """
+    测试有界队列的背压与失败会话的传递
+    """
+    release = threading.Event()
+
+    def handler(step, session):
+        if step["step"] == 2:
+            release.wait(2)
+        if session["inputs"].get("fail") and step["step"] == 1:
+            raise ValueError("模拟失败")
+        return step["action"]
+
+    steps = [{"step": 1, "role": "carbon", "action": "写作"},
+             {"step": 2, "role": "silicon", "action": "配图"}]
+    pipeline = StagePipeline(steps, handler=handler, queue_size=1)
+
+    submitted = []
+
+    def producer():
+        for i in range(6):
+            submitted.append(pipeline.submit(f"会话{i}", inputs={"fail": i == 1}))
+        pipeline.close()
+
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    time.sleep(0.2)
+    # 第二阶段阻塞时，上游最多积压：阶段二处理中 1 + 队列 1 + 阶段一处理中 1 + 队列 1
+    assert len(submitted) <= 5
+    assert thread.is_alive()
+
+    release.set()
+    results = list(pipeline.iter_results(timeout=5))
+    thread.join(2)
+    assert pipeline.join(2)
+
+    assert [s["session_id"] for s in results] == [f"会话{i}" for i in range(6)]
+    assert results[1]["status"] == "failed" and results[1]["error"] == "模拟失败"
+    assert len(results[1]["steps"]) == 1
+    assert all(s["status"] == "completed" for i, s in enumerate(results) if i != 1)
+
+    try:
+        pipeline.submit("已关闭")
+        assert False, "关闭后提交应抛出异常"
+    except RuntimeError:
+        pass
+
+
+def test_execute_path_fans_out_parallel_steps():
+    """
+    测试路径优化产生的并行步骤按分支扇出为独立任务，分支轮流分配给各硅基声部
+    """
+    steps = [
+        {"step": 1, "role": "carbon", "action": "定义主题"},
+        {"step": 2, "role": "silicon", "action": "并行: 甲 | 乙 | 丙",
+         "parallel": [{"role": "silicon", "action": "甲"}, {"role": "silicon", "action": "乙"},
+                      {"role": "silicon", "action": "丙；丁", "merged_from": [
+                          {"role": "silicon", "action": "丙"}, {"role": "silicon", "action": "丁"}]}]},
+        {"step": 3, "role": "carbon", "action": "最终裁决"},
+    ]
+    executor = SteadyExecutor()
+    try:
+        result = executor.execute_counterpoint_path("p", steps, {"carbon": "c", "silicon": ["s1", "s2"]})
+        assert result["success"]
+        assert [t["name"] for t in result["task_results"]] == [
+            "步骤 1: 定义主题", "步骤 2.1: 甲", "步骤 2.2: 乙", "步骤 2.3: 丙；丁", "步骤 3: 最终裁决"]
+        voices = {o["action"]: o["voice_id"] for o in executor.get_step_observations()}
+        assert voices == {"定义主题": "c", "甲": "s1", "乙": "s2", "丙；丁": "s1", "最终裁决": "c"}
+    finally:
+        executor.shutdown()
+
+def test_pipeline_survives_failing_callback():
+    """
+    测试步骤回调抛出异常时会话与结束标记仍向下游传递，结果迭代不会阻塞
+    """
+    def on_step(step, session, record):
+        raise KeyError("action")
+
+    pipeline = StagePipeline([{"step": 1, "role": "carbon"}, {"step": 2, "role": "silicon"}],
+                             handler=lambda step, session: "ok", on_step=on_step)
+    for i in range(3):
+        pipeline.submit(f"会话{i}")
+    pipeline.close()
+    results = list(pipeline.iter_results(timeout=5))
+    assert pipeline.join(2)
+    assert [s["session_id"] for s in results] == ["会话0", "会话1", "会话2"]
+    assert all(s["status"] == "completed" and len(s["steps"]) == 2 for s in results)
+
+    # 缺少 action 字段的步骤也能经执行器流水线执行并记录
+    executor = SteadyExecutor()
+    try:
+        result = executor.execute_pipelined("p", [{"step": 1, "role": "carbon"}], [{"session_id": "s1"}],
+                                            handler=lambda step, session: "ok")
+        assert result["success"] and len(executor.get_step_observations()) == 1
+    finally:
+        executor.shutdown()
+
+
+def variant_handler(count, delay, gate=None):
+    """
+    逐个产出数值变体的分支处理函数
+    """
+    def handler(theme, branch):
+        for i in range(count):
+            if gate is not None:
+                gate.wait(2)
+            time.sleep(delay)
+            yield float(i + 1)
+    return handler
+
+
+def test_fan_out_weights_and_cancellation():
+    """
+    测试扇出的流式部分结果、实时权重更新与低权重分支取消
+    """
+    gate = threading.Event()
+    execution = FanOutExecution("主题", {
+        "s1": variant_handler(3, 0.01),
+        "s2": variant_handler(3, 0.01),
+        "s3": variant_handler(1000, 0.01, gate),
+    }, cancel_threshold=0.1)
+    assert execution.get_weights() == {"s1": 1 / 3, "s2": 1 / 3, "s3": 1 / 3}
+    execution.start()
+
+    # 工作线程运行期间调整权重，s3 归一化权重低于阈值被取消
+    cancelled = execution.update_weights({"s1": 3.0, "s2": 1.0, "s3": 0.2})
+    gate.set()
+    assert cancelled == ["s3"]
+    assert execution.get_weights() == {"s1": 0.75, "s2": 0.25, "s3": 0.0}
+
+    events = list(execution.stream(timeout=5))
+    partials = [e for e in events if e["type"] == "partial"]
+    assert len([e for e in partials if e["voice_id"] == "s1"]) == 3
+    assert len([e for e in partials if e["voice_id"] == "s3"]) < 1000
+    assert {e["voice_id"]: e["type"] for e in events if e["type"] != "partial"} == {
+        "s1": "done", "s2": "done", "s3": "cancelled"}
+
+    result = execution.wait(timeout=2)
+    assert [b["voice_id"] for b in result["branches"]] == ["s1", "s2"]
+    assert result["value"] == 3.0
+    assert result["status"]["s3"] == "cancelled"
+
+
+def test_executor_fan_out():
+    """
+    测试执行器启动扇出并记录分支任务
+    """
+    def failing(theme, branch):
+        yield "部分结果"
+        raise RuntimeError("模拟失败")
+
+    executor = SteadyExecutor()
+    try:
+        execution = executor.start_fan_out("fugue", "主题", {
+            "s1": variant_handler(2, 0.0),
+            "s2": failing,
+        })
+        result = execution.wait(timeout=5)
+        assert result["status"] == {"s1": "done", "s2": "failed"}
+        assert execution.branches["s2"].error == "模拟失败"
+        assert len(executor.get_step_observations()) == 1
+        assert len(executor.get_failed_tasks()) == 1
+    finally:
+        executor.shutdown()
+
+
+def test_fan_out_survives_failing_callback():
+    """
+    测试分支回调抛出异常时仍发出结束事件，stream() 正常结束
+    """
+    def on_branch_done(branch):
+        raise KeyError("action")
+
+    execution = FanOutExecution("主题", {"s1": variant_handler(2, 0.0), "s2": variant_handler(1, 0.0)},
+                                on_branch_done=on_branch_done).start()
+    events = list(execution.stream(timeout=5))
+    assert {e["voice_id"]: e["type"] for e in events if e["type"] != "partial"} == {"s1": "done", "s2": "done"}
+
+    # 缺少 action 字段的步骤也能经执行器扇出执行并记录
+    executor = SteadyExecutor()
+    try:
+        execution = executor.start_fan_out("p", "t", {"a": lambda theme, branch: iter([1, 2])},
+                                           step={"step": 2, "role": "silicon"})
+        assert [e["type"] for e in execution.stream(timeout=5)] == ["partial", "partial", "done"]
+        assert len(executor.get_step_observations()) == 1
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    test_pipelined_canon_progression()
+    test_execute_path_fans_out_parallel_steps()
+    test_pipeline_backpressure_and_failure()
+    test_pipeline_survives_failing_callback()
+    test_fan_out_weights_and_cancellation()
+    test_executor_fan_out()
+    test_fan_out_survives_failing_callback()
+    print("静定执行层测试通过！")
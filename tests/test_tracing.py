@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+调用追踪测试脚本
+
+测试区间嵌套、执行ID继承、导出格式与智能体协同的分层追踪
+"""
+
+import sys
+import os
+import contextlib
+import io
+import json
+import tempfile
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_embedding import CollaborationRuntime, EmbeddingAPI
+from src.utils.tracing import TRACE_ENV_VAR, Tracer
+
+
+def test_disabled_tracer_records_nothing():
+    """
+    测试未启用时返回共享空上下文且不记录区间
+    """
+    tracer = Tracer(enabled=False)
+    with tracer.span("a") as span:
+        span.set(key="value")
+    assert tracer.span("a") is tracer.span("b")
+    assert tracer.record("b", "", 0.0, 1.0) is None
+
+    @tracer.traced()
+    def add(x, y):
+        return x + y
+
+    assert add(1, 2) == 3
+    assert tracer.get_spans() == []
+
+
+def test_env_var_enables_tracing():
+    """
+    测试通过环境变量启用追踪
+    """
+    previous = os.environ.get(TRACE_ENV_VAR)
+    try:
+        os.environ[TRACE_ENV_VAR] = "1"
+        assert Tracer().enabled
+        os.environ[TRACE_ENV_VAR] = "off"
+        assert not Tracer().enabled
+    finally:
+        if previous is None:
+            os.environ.pop(TRACE_ENV_VAR, None)
+        else:
+            os.environ[TRACE_ENV_VAR] = previous
+
+
+def test_span_nesting_and_execution_ids():
+    """
+    测试区间按线程嵌套，子区间继承执行ID，不同线程与显式执行ID形成独立的根区间
+    """
+    tracer = Tracer(enabled=True)
+    with tracer.span("root", "collaboration") as root:
+        with tracer.span("child", "design") as child:
+            time.sleep(0.002)
+        tracer.record("step", "execution.step", root.start, root.start + 0.001, thread_id="worker")
+        with tracer.span("other", "design", execution_id="外部执行") as other:
+            pass
+        assert tracer.current_execution_id() == root.execution_id
+
+    thread_spans = []
+
+    def worker():
+        with tracer.span("thread_root") as span:
+            thread_spans.append(span)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    assert child.parent_id == root.span_id and child.execution_id == root.execution_id
+    assert other.parent_id is None and other.execution_id == "外部执行"
+    assert thread_spans[0].parent_id is None
+    assert thread_spans[0].execution_id != root.execution_id
+    assert [s.name for s in tracer.get_spans(root.execution_id)] == ["root", "step", "child"]
+    assert tracer.current_execution_id() is None
+
+    try:
+        with tracer.span("failing"):
+            raise RuntimeError("模拟失败")
+    except RuntimeError:
+        pass
+    assert tracer.get_spans()[-1].args["error"] == "模拟失败"
+
+
+def test_exports():
+    """
+    测试 Chrome trace 与折叠栈导出
+    """
+    tracer = Tracer(enabled=True)
+    with tracer.span("root", "collaboration") as root:
+        with tracer.span("child", "design"):
+            time.sleep(0.005)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "trace.json")
+        tracer.export_chrome_trace(path)
+        with open(path, "r", encoding="utf-8") as f:
+            trace = json.load(f)
+    complete = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert [e["name"] for e in complete] == ["root", "child"]
+    assert complete[1]["args"]["parent_id"] == root.span_id
+    assert complete[0]["dur"] >= complete[1]["dur"] >= 5000
+
+    folded = dict(line.rsplit(" ", 1) for line in tracer.export_folded().splitlines())
+    assert set(folded) == {"root", "root;child"}
+    assert int(folded["root;child"]) >= 5000
+    assert int(folded["root"]) < int(folded["root;child"])
+
+
+def test_collaboration_spans():
+    """
+    测试协同流程的各层调用按执行ID嵌套在同一根区间下
+    """
+    with tempfile.TemporaryDirectory() as storage:
+        runtime = CollaborationRuntime(storage_path=storage)
+        with contextlib.redirect_stdout(io.StringIO()):
+            api = EmbeddingAPI("追踪助手", runtime=runtime, trace=True)
+            api.register_carbon_partner("伙伴")
+            api.create_staggered_complement_collaboration("伙伴", "追踪协同", "主题")
+            api.calculate_system_health()
+
+        tracer = api.collaborator.tracer
+        root = next(s for s in tracer.get_spans() if s.name == "collaboration")
+        spans = tracer.get_spans(root.execution_id)
+        assert {s.category for s in spans} == {"collaboration", "design", "execution",
+                                              "execution.step", "crystal"}
+        assert all(s.parent_id is not None for s in spans if s is not root)
+        steps = [s for s in spans if s.category == "execution.step"]
+        assert len(steps) == 4
+        assert all(s.thread_id == "SteadyExecutor" for s in steps)
+
+        categories = {s.category for s in tracer.get_spans()}
+        assert {"registration", "entropy"} <= categories
+        folded = api.export_trace(trace_format="folded", execution_id=root.execution_id)
+        assert "collaboration;executor.execute_counterpoint_path;步骤 1: 提出模糊概念 " in folded
+        runtime.shutdown()
+
+
+if __name__ == "__main__":
+    test_disabled_tracer_records_nothing()
+    test_env_var_enables_tracing()
+    test_span_nesting_and_execution_ids()
+    test_exports()
+    test_collaboration_spans()
+    print("调用追踪测试通过！")
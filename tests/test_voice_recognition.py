@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+声部识别层测试脚本
+
+测试协同声部图谱的索引、缓存与活动状态
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.layers.voice_recognition import voice_matcher
+from src.layers.voice_recognition.voice_recognition import CollaborativeSonicMap
+
+
+def register(sonic_map, name, voice_type="silicon"):
+    """
+    注册一个测试声部
+    """
+    return sonic_map.register_voice(
+        name=name,
+        voice_type=voice_type,
+        capability_vector={"创意生成": 0.8, "逻辑分析": 0.9},
+        intention_vector={"探索性": 0.7, "效率": 0.9}
+    )
+
+
+def test_type_index_and_removal():
+    """
+    测试按类型索引与移除
+    """
+    sonic_map = CollaborativeSonicMap()
+    carbon = register(sonic_map, "X54先生", "carbon")
+    silicons = [register(sonic_map, f"硅基{i}") for i in range(5)]
+
+    assert sonic_map.get_voices_by_type("carbon") == (carbon,)
+    assert sonic_map.get_voices_by_type("silicon") == tuple(silicons)
+    # 未发生写入时返回同一缓存
+    assert sonic_map.get_voices_by_type("silicon") is sonic_map.get_voices_by_type("silicon")
+
+    sonic_map.remove_voice(silicons[2].voice_id)
+    sonic_map.remove_voice("不存在的声部")
+    assert sonic_map.get_voices_by_type("silicon") == tuple(
+        v for i, v in enumerate(silicons) if i != 2)
+    assert sonic_map.get_voice(silicons[2].voice_id) is None
+    assert sonic_map.get_voices_by_type("unknown") == ()
+
+
+def test_voice_map_snapshot():
+    """
+    测试声部图谱快照在写入时失效
+    """
+    sonic_map = CollaborativeSonicMap()
+    carbon = register(sonic_map, "X54先生", "carbon")
+
+    snapshot = sonic_map.get_voice_map()
+    assert sonic_map.get_voice_map() is snapshot
+    assert snapshot["voice_map"] == {"carbon": [carbon.voice_id]}
+
+    silicon = register(sonic_map, "代码织梦者")
+    snapshot = sonic_map.get_voice_map()
+    assert snapshot["voice_map"]["silicon"] == [silicon.voice_id]
+    assert set(snapshot["voices"]) == {carbon.voice_id, silicon.voice_id}
+
+
+def test_activity_timestamps():
+    """
+    测试活动时间为数值单调时间戳
+    """
+    sonic_map = CollaborativeSonicMap()
+    voice = register(sonic_map, "豆包")
+    assert isinstance(voice.created_at, float)
+
+    before = voice.last_active
+    sonic_map.update_voice_activity(voice.voice_id)
+    assert voice.last_active >= before
+
+
+def test_save_and_load():
+    """
+    测试快照保存、增量日志与延迟加载
+    """
+    sonic_map = CollaborativeSonicMap()
+    carbon = register(sonic_map, "X54先生", "carbon")
+    silicons = [register(sonic_map, f"硅基{i}") for i in range(3)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "sonic_map.jsonl")
+        sonic_map.save_to_file(file_path)
+        snapshot_size = os.path.getsize(file_path)
+
+        sonic_map.remove_voice(silicons[0].voice_id)
+        added = register(sonic_map, "新声部")
+        sonic_map.save_to_file(file_path)
+        # 增量保存只追加日志，不改写快照
+        assert os.path.getsize(file_path) == snapshot_size
+        assert os.path.exists(file_path + ".log")
+
+        loaded = CollaborativeSonicMap()
+        loaded.load_from_file(file_path)
+        assert loaded._lazy_path == file_path
+
+        assert set(loaded.voices) == {carbon.voice_id, silicons[1].voice_id,
+                                      silicons[2].voice_id, added.voice_id}
+        restored = loaded.get_voice(carbon.voice_id)
+        assert restored.name == "X54先生"
+        assert restored.capability_vector == carbon.capability_vector
+        assert restored.created_at == carbon.created_at
+        assert [v.voice_id for v in loaded.get_voices_by_type("silicon")] == [
+            silicons[1].voice_id, silicons[2].voice_id, added.voice_id]
+
+        # 保存到新文件时写入完整快照
+        other_path = os.path.join(tmp_dir, "copy.jsonl")
+        loaded.save_to_file(other_path)
+        assert not os.path.exists(other_path + ".log")
+
+        try:
+            loaded.load_from_file(os.path.join(tmp_dir, "missing.jsonl"))
+            assert False, "加载不存在的文件应抛出异常"
+        except FileNotFoundError:
+            pass
+
+
+def test_torn_log_tail_is_truncated():
+    """
+    测试加载时截掉日志中写入中断的残行，之后的增量保存不会拼接到残行上而丢失
+    """
+    sonic_map = CollaborativeSonicMap()
+    first = register(sonic_map, "a")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "sonic_map.jsonl")
+        sonic_map.save_to_file(file_path)
+        second = register(sonic_map, "b")
+        sonic_map.save_to_file(file_path)
+        with open(file_path + ".log", "a", encoding="utf-8") as f:
+            f.write('["+",["x"')
+
+        loaded = CollaborativeSonicMap()
+        loaded.load_from_file(file_path)
+        assert set(loaded.voices) == {first.voice_id, second.voice_id}
+        third = register(loaded, "c")
+        loaded.save_to_file(file_path)
+
+        reloaded = CollaborativeSonicMap()
+        reloaded.load_from_file(file_path)
+        assert set(reloaded.voices) == {first.voice_id, second.voice_id, third.voice_id}
+        with open(file_path + ".log", encoding="utf-8") as f:
+            assert '["x"' not in f.read()
+
+
+def test_stale_log_skipped_after_snapshot():
+    """
+    测试替换快照后、删除日志前中断：回放时跳过上一代快照的日志条目，已移除的声部不会复活
+    """
+    sonic_map = CollaborativeSonicMap()
+    kept = register(sonic_map, "保留")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "sonic_map.jsonl")
+        sonic_map.save_to_file(file_path)
+        removed = register(sonic_map, "将被移除")
+        sonic_map.save_to_file(file_path)
+        with open(file_path + ".log", "rb") as f:
+            stale_log = f.read()
+
+        # 未保存的移除随新快照写入，旧日志中只有注册记录
+        sonic_map.remove_voice(removed.voice_id)
+        sonic_map.compaction_ratio = -2000
+        sonic_map.save_to_file(file_path)
+        assert not os.path.exists(file_path + ".log")
+        # 模拟日志未被删除
+        with open(file_path + ".log", "wb") as f:
+            f.write(stale_log)
+
+        loaded = CollaborativeSonicMap()
+        loaded.load_from_file(file_path)
+        assert set(loaded.voices) == {kept.voice_id}
+        added = register(loaded, "新声部")
+        loaded.save_to_file(file_path)
+
+        reloaded = CollaborativeSonicMap()
+        reloaded.load_from_file(file_path)
+        assert set(reloaded.voices) == {kept.voice_id, added.voice_id}
+
+def build_matchmaking_map():
+    """
+    构建用于匹配测试的声部图谱
+    """
+    sonic_map = CollaborativeSonicMap()
+    carbon = sonic_map.register_voice(
+        name="X54先生", voice_type="carbon",
+        capability_vector={"创意生成": 0.9, "技术实现": 0.2},
+        intention_vector={"探索性": 0.9, "效率": 0.1}
+    )
+    engineer = sonic_map.register_voice(
+        name="工程师", voice_type="silicon",
+        capability_vector={"技术实现": 0.95, "创意生成": 0.3},
+        intention_vector={"探索性": 0.8, "效率": 0.2}
+    )
+    sprinter = sonic_map.register_voice(
+        name="效率优先", voice_type="silicon",
+        capability_vector={"技术实现": 0.5},
+        intention_vector={"效率": 0.9}
+    )
+    return sonic_map, carbon, engineer, sprinter
+
+
+def test_find_partners():
+    """
+    测试基于向量的声部匹配与增量更新
+    """
+    for use_numpy in (True, False):
+        numpy_module = voice_matcher.np
+        if not use_numpy:
+            voice_matcher.np = None
+        try:
+            sonic_map, carbon, engineer, sprinter = build_matchmaking_map()
+
+            matches = sonic_map.find_partners(carbon.voice_id, k=2, pattern_type="staggered_complement")
+            assert [voice.voice_id for voice, _ in matches] == [engineer.voice_id, sprinter.voice_id]
+            assert matches[0][1] > matches[1][1]
+
+            # 新注册的声部参与后续匹配，新维度扩展词表
+            artist = sonic_map.register_voice(
+                name="艺术家", voice_type="silicon",
+                capability_vector={"技术实现": 1.0, "创意生成": 1.0, "艺术感知": 1.0},
+                intention_vector={"探索性": 1.0}
+            )
+            top = sonic_map.find_partners(carbon.voice_id, k=1)
+            assert top[0][0] is artist
+
+            sonic_map.remove_voice(artist.voice_id)
+            sonic_map.remove_voice(sprinter.voice_id)
+            batch = sonic_map.find_partners_batch([carbon.voice_id], k=5)
+            assert [voice for voice, _ in batch[carbon.voice_id]] == [engineer]
+
+            try:
+                sonic_map.find_partners("不存在的声部")
+                assert False, "匹配不存在的声部应抛出异常"
+            except ValueError:
+                pass
+        finally:
+            voice_matcher.np = numpy_module
+
+
+class FakeClock:
+    """
+    可手动推进的时钟
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_presence_tracking():
+    """
+    测试空闲声部停放、心跳恢复与按类型计数
+    """
+    clock = FakeClock()
+    sonic_map = CollaborativeSonicMap()
+    sonic_map.clock = clock
+    carbon = register(sonic_map, "X54先生", "carbon")
+    sonic_map.enable_presence_tracking(ttl=10, resolution=1.0)
+    silicons = [register(sonic_map, f"硅基{i}") for i in range(3)]
+
+    assert sonic_map.get_presence_stats()["active"] == {"carbon": 1, "silicon": 3}
+
+    clock.now += 6
+    sonic_map.heartbeat([silicons[0].voice_id, silicons[1].voice_id])
+    clock.now += 6
+    parked = sonic_map.sweep_idle_voices()
+    assert set(parked) == {carbon.voice_id, silicons[2].voice_id}
+
+    stats = sonic_map.get_presence_stats()
+    assert stats["active"] == {"silicon": 2}
+    assert stats["parked"] == {"carbon": 1, "silicon": 1}
+    assert sonic_map.get_voice(carbon.voice_id) is None
+    assert len(sonic_map.get_voices_by_type("silicon")) == 2
+
+    # 停放的声部收到心跳后恢复
+    sonic_map.update_voice_activity(carbon.voice_id)
+    assert sonic_map.get_voice(carbon.voice_id) is carbon
+    assert sonic_map.get_presence_stats()["active"] == {"carbon": 1, "silicon": 2}
+
+    # 停放的声部仍会写入快照
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "sonic_map.jsonl")
+        sonic_map.save_to_file(file_path)
+        loaded = CollaborativeSonicMap()
+        loaded.load_from_file(file_path)
+        assert len(loaded.voices) == 4
+
+
+def test_presence_eviction():
+    """
+    测试淘汰策略与停放上限
+    """
+    clock = FakeClock()
+    sonic_map = CollaborativeSonicMap()
+    sonic_map.clock = clock
+    sonic_map.enable_presence_tracking(ttl=5, policy="evict", resolution=0.5)
+    voices = [register(sonic_map, f"硅基{i}") for i in range(100)]
+
+    clock.now += 100
+    # 心跳与清扫在同一次调用中完成，刚发出心跳的声部不会被淘汰
+    sonic_map.update_voice_activity(voices[0].voice_id)
+    assert list(sonic_map.voices) == [voices[0].voice_id]
+    assert sonic_map.get_presence_stats()["evicted"] == 99
+
+    sonic_map = CollaborativeSonicMap()
+    sonic_map.clock = clock
+    sonic_map.enable_presence_tracking(ttl=5, max_parked=2)
+    for i in range(4):
+        register(sonic_map, f"硅基{i}")
+    clock.now += 10
+    sonic_map.sweep_idle_voices()
+    stats = sonic_map.get_presence_stats()
+    assert stats["parked"] == {"silicon": 2} and stats["evicted"] == 2
+
+
+if __name__ == "__main__":
+    test_type_index_and_removal()
+    test_voice_map_snapshot()
+    test_activity_timestamps()
+    test_save_and_load()
+    test_torn_log_tail_is_truncated()
+    test_stale_log_skipped_after_snapshot()
+    test_find_partners()
+    test_presence_tracking()
+    test_presence_eviction()
+    print("声部识别层测试通过！")